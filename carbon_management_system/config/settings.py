@@ -7,16 +7,33 @@
 # @Description: 存储应用程序的全局配置项，例如API密钥、默认路径、外部服务URL等。
 
 # Python 标准库导入
-import sys
 import os
 
-# PyQt5 相关导入 (根据实际需要调整)
-# from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel
-# from PyQt5.QtCore import Qt, pyqtSignal, QObject
+# 本地数据根目录，可通过环境变量 CARBON_MS_DATA_DIR 覆盖
+DATA_DIR = os.environ.get(
+    "CARBON_MS_DATA_DIR",
+    os.path.join(os.path.expanduser("~"), ".carbon_management_system"),
+)
 
-# 项目内部模块导入 (示例)
-# from ..core.base_controller import BaseController
-# from ...utils.logger_setup import logger
+# 支撑文档内容寻址存储目录
+DOCUMENT_STORE_DIR = os.path.join(DATA_DIR, "documents")
 
+# 核算结果磁盘缓存目录
+CALCULATION_CACHE_DIR = os.path.join(DATA_DIR, "calculation_cache")
 
-pass # 请在此处实现具体功能
+# 报告片段缓存目录（按段落/机组缓存已渲染的报告片段）
+REPORT_CACHE_DIR = os.path.join(DATA_DIR, "report_cache")
+
+# 数据质量控制计划（DQCP）版本库目录
+DQCP_STORE_DIR = os.path.join(DATA_DIR, "dqcp_versions")
+
+# 合规日历：义务规则与完成记录
+COMPLIANCE_SCHEDULE_FILE = os.path.join(DATA_DIR, "compliance_schedule.json")
+
+# 核查不符合项登记
+NON_CONFORMITY_FILE = os.path.join(DATA_DIR, "non_conformities.json")
+
+# 报告模板目录（随程序发布的只读资源）
+REPORT_TEMPLATE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "resources", "templates",
+)
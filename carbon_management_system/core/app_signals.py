@@ -6,17 +6,31 @@
 # @Software: PyCharm / VSCode
 # @Description: 定义应用级别的全局信号，用于不同模块间的解耦通信。
 
-# Python 标准库导入
-import sys
-import os
+# PyQt5 相关导入
+from PyQt5.QtCore import QObject, pyqtSignal
 
-# PyQt5 相关导入 (根据实际需要调整)
-# from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel
-# from PyQt5.QtCore import Qt, pyqtSignal, QObject
 
-# 项目内部模块导入 (示例)
-# from ..core.base_controller import BaseController
-# from ...utils.logger_setup import logger
+class AppSignals(QObject):
+    """
+    应用级信号总线。
 
+    跨模块、跨界面的事件通过这里广播：发布方只需 emit，不必知道有哪些界面在监听；
+    信号在工作线程中发出时，Qt 会自动排队投递到各接收对象所在的线程。
+    """
 
-pass # 请在此处实现具体功能
+    calculation_progress = pyqtSignal(object)      # CalculationProgress
+    calculation_partial = pyqtSignal(object)       # PartitionResult
+    calculation_finished = pyqtSignal(object)      # CombustionCube
+    calculation_failed = pyqtSignal(str)
+    calculation_cancelled = pyqtSignal()
+
+
+_instance = None
+
+
+def app_signals():
+    """返回进程内唯一的信号总线（首次调用时创建）。"""
+    global _instance
+    if _instance is None:
+        _instance = AppSignals()
+    return _instance
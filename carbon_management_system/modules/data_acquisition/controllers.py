@@ -7,16 +7,278 @@
 # @Description: 实现 data_acquisition 模块的业务逻辑和流程控制，协调模型和视图。
 
 # Python 标准库导入
-import sys
+import logging
 import os
+import threading
 
-# PyQt5 相关导入 (根据实际需要调整)
-# from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel
-# from PyQt5.QtCore import Qt, pyqtSignal, QObject
+# PyQt5 相关导入
+from PyQt5.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
 
-# 项目内部模块导入 (示例)
-# from ..core.base_controller import BaseController
-# from ...utils.logger_setup import logger
+# 项目内部模块导入
+from ...config.settings import DOCUMENT_STORE_DIR
+from ...utils.constants import HISTORIAN_STOP_TIMEOUT
+from ...utils.exceptions import DataImportError, DocumentStoreError, ImportCancelledError
+from .models import RULE_TARGET_ACTIVITY, RULE_TARGET_PARAMETER, ActivityColumnStore, ParameterColumnStore
+from .services import (
+    ActivityDataImportService,
+    ColumnStoreQueryService,
+    ContentAddressedBlobStore,
+    DocumentService,
+    HistorianIngestionService,
+    ResumableUploadService,
+    TimeRollupService,
+    ValidationRuleEngine,
+    export_columnar,
+    export_csv,
+    import_columnar,
+)
 
+logger = logging.getLogger(__name__)
 
-pass # 请在此处实现具体功能
+
+class ActivityImportWorker(QObject):
+    """
+    在后台线程中执行流式导入的工作对象。
+
+    服务层的进度回调在工作线程中触发，这里把它转成 Qt 信号，
+    由 Qt 排队投递到 GUI 线程，视图只需连接信号即可订阅进度。
+    """
+
+    progress = pyqtSignal(object)   # ImportProgress
+    finished = pyqtSignal(object)   # ImportResult
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, service, path, writer, sheet_name=None):
+        super().__init__()
+        self._service = service
+        self._path = path
+        self._writer = writer
+        self._sheet_name = sheet_name
+        self._cancel_event = threading.Event()
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            result = self._service.import_file(
+                self._path, self._writer,
+                progress_callback=self.progress.emit,
+                cancel_event=self._cancel_event,
+                sheet_name=self._sheet_name,
+            )
+        except ImportCancelledError:
+            self.cancelled.emit()
+        except DataImportError as exc:
+            self.failed.emit(str(exc))
+        except Exception as exc:  # 工作线程内的异常必须转成信号，否则会被静默吞掉
+            logger.exception("导入 %s 时发生未预期错误", self._path)
+            self.failed.emit(f"导入失败: {exc}")
+        else:
+            self.finished.emit(result)
+
+    def cancel(self):
+        """请求取消；导入在当前分块写入完成后停止。"""
+        self._cancel_event.set()
+
+
+class DocumentUploadWorker(QObject):
+    """
+    在后台线程中执行可续传上传的工作对象。
+
+    分块哈希与压缩由上传服务的线程池完成，本对象所在线程只负责顺序读取与提交，
+    GUI 线程只接收信号。
+    """
+
+    progress = pyqtSignal(object)   # UploadProgress
+    finished = pyqtSignal(object)   # SupportingDocument
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, upload_service, document_service, path, record_refs=()):
+        super().__init__()
+        self._upload_service = upload_service
+        self._document_service = document_service
+        self._path = path
+        self._record_refs = tuple(record_refs)
+        self._cancel_event = threading.Event()
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            info = self._upload_service.upload(
+                self._path, progress_callback=self.progress.emit, cancel_event=self._cancel_event)
+            document = self._document_service.register_blob(
+                info, os.path.basename(self._path), self._record_refs)
+        except ImportCancelledError:
+            self.cancelled.emit()
+        except (OSError, DocumentStoreError) as exc:
+            self.failed.emit(f"上传失败: {exc}")
+        except Exception as exc:
+            logger.exception("上传 %s 时发生未预期错误", self._path)
+            self.failed.emit(f"上传失败: {exc}")
+        else:
+            self.finished.emit(document)
+
+    def cancel(self):
+        """请求取消；在途分块提交完成后停止，下次选择同一文件即可续传。"""
+        self._cancel_event.set()
+
+
+class DataAcquisitionController(QObject):
+    """数据采集模块控制器：数据录入、校验、导入导出等流程的协调者。"""
+
+    import_started = pyqtSignal(object)  # ActivityImportWorker
+
+    def __init__(self, activity_store=None, parameter_store=None, import_service=None, document_service=None,
+                 parent=None):
+        """
+        :param activity_store: 活动数据列式存储，默认新建 ActivityColumnStore
+        :param parameter_store: 参数数据列式存储，默认新建 ParameterColumnStore
+        :param import_service: 可注入的导入服务，默认 ActivityDataImportService()
+        :param document_service: 支撑文档服务，默认在首次使用时基于 DOCUMENT_STORE_DIR 创建
+        """
+        super().__init__(parent)
+        self._document_service = document_service
+        self._upload_service = None
+        self._historian = None
+        self.activity_store = activity_store if activity_store is not None else ActivityColumnStore()
+        self.parameter_store = parameter_store if parameter_store is not None else ParameterColumnStore()
+        self.activity_writer = self.activity_store.append_records
+        self.import_service = import_service or ActivityDataImportService()
+        self.validation_engine = ValidationRuleEngine()
+        self.activity_query = ColumnStoreQueryService(self.activity_store)
+        self.parameter_query = ColumnStoreQueryService(self.parameter_store)
+        self.activity_rollups = TimeRollupService(self.activity_store)
+        self._jobs = {}
+
+    def set_validation_rules(self, rules):
+        """替换校验规则集：重新编译规则，并让后续导入在分块阶段执行单行规则。"""
+        self.validation_engine = ValidationRuleEngine(rules)
+        self.import_service.validator = self.validation_engine.import_validator()
+
+    def validate_activity(self, plant=None, unit=None, start=None, end=None):
+        """对活动数据（可按电厂/机组/时间切片）执行全部活动数据规则。"""
+        view = self.activity_store.slice(plant=plant, unit=unit, start=start, end=end)
+        return view, self.validation_engine.validate(view, target=RULE_TARGET_ACTIVITY)
+
+    def validate_parameters(self, plant=None, unit=None, start=None, end=None):
+        """对参数数据执行全部参数规则。"""
+        view = self.parameter_store.slice(plant=plant, unit=unit, start=start, end=end)
+        return view, self.validation_engine.validate(view, target=RULE_TARGET_PARAMETER)
+
+    @property
+    def document_service(self):
+        if self._document_service is None:
+            self._document_service = DocumentService(ContentAddressedBlobStore(DOCUMENT_STORE_DIR))
+        return self._document_service
+
+    @property
+    def upload_service(self):
+        if self._upload_service is None:
+            self._upload_service = ResumableUploadService(self.document_service.blob_store)
+        return self._upload_service
+
+    def start_document_upload(self, path, record_refs=(), connect=None):
+        """
+        在后台线程上传支撑文档。
+
+        :param connect: 可选，在线程启动前以工作对象为参数调用，用于连接信号（见 start_activity_import）
+        :return: DocumentUploadWorker
+        """
+        worker = DocumentUploadWorker(self.upload_service, self.document_service, path, record_refs)
+        return self._start_worker(worker, connect)
+
+    def start_historian_ingestion(self, tags, clients, **options):
+        """
+        启动 DCS/SIS 历史库采集（后台事件循环线程），数据写入活动数据存储。
+
+        已在运行的采集先停止，最多等待 HISTORIAN_STOP_TIMEOUT 秒，不会长时间阻塞界面线程。
+        :param tags: HistorianTag 列表
+        :param clients: 数据源列表，见 HistorianIngestionService
+        :return: HistorianIngestionService，调用其 stop() 停止采集
+        """
+        self.stop_historian_ingestion()
+        self._historian = HistorianIngestionService(self.activity_store, tags, clients, **options)
+        self._historian.start_in_thread()
+        return self._historian
+
+    def stop_historian_ingestion(self, timeout=HISTORIAN_STOP_TIMEOUT):
+        """
+        停止历史库采集，最多等待 timeout 秒（None 表示一直等待）。
+
+        超时后采集线程已收到停止请求，会在写完队列中剩余的读数后自行退出；存储有锁，
+        与随后启动的新采集并发写入是安全的。
+        """
+        if self._historian is not None:
+            if not self._historian.stop(timeout):
+                logger.warning("历史库采集未在 %.1fs 内停止，将在后台继续收尾", timeout)
+            self._historian = None
+
+    def correct_activity_values(self, row_ids, values):
+        """更正活动数据读数；日/月/年汇总随之增量更新。返回更正前的值。"""
+        return self.activity_store.update_values(row_ids, values)
+
+    def import_activity_file(self, path, progress_callback=None, cancel_event=None, sheet_name=None):
+        """在调用线程中同步导入，适用于脚本与批处理。"""
+        return self.import_service.import_file(
+            path, self.activity_writer, progress_callback=progress_callback,
+            cancel_event=cancel_event, sheet_name=sheet_name,
+        )
+
+    def export_activity(self, path, query_filter=None):
+        """
+        按查询条件导出活动数据；按后缀选择 CSV、Parquet 或 Arrow IPC 格式。
+
+        :return: 导出行数
+        """
+        result = self.activity_query.query(query_filter)
+        if path.lower().endswith(".csv"):
+            return export_csv(result, path)
+        return export_columnar(result, path)
+
+    def import_activity_columnar(self, path, query_filter=None):
+        """
+        从 Parquet/Arrow 文件导入活动数据，只读取存储需要的列，
+        query_filter 下推到文件扫描（只导入满足条件的行）。
+
+        :return: 导入行数
+        """
+        return import_columnar(path, self.activity_store, query_filter)
+
+    def start_activity_import(self, path, sheet_name=None, connect=None):
+        """
+        在后台线程启动导入。
+
+        导入可能立即失败（如表头校验不通过），线程启动后再连接的槽会错过信号，
+        因此需要订阅信号的调用方应通过 connect 回调连接；import_started 同样在线程启动前发出。
+
+        :param connect: 可选，在线程启动前以工作对象为参数调用
+        :return: ActivityImportWorker
+        """
+        worker = ActivityImportWorker(self.import_service, path, self.activity_writer, sheet_name)
+
+        def prepare(started):
+            if connect is not None:
+                connect(started)
+            self.import_started.emit(started)
+
+        return self._start_worker(worker, prepare)
+
+    def _start_worker(self, worker, connect=None):
+        """把工作对象移入新线程，先调用 connect(worker) 供调用方连接信号，最后启动线程。"""
+        thread = QThread(self)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        for signal in (worker.finished, worker.failed, worker.cancelled):
+            signal.connect(thread.quit)
+        thread.finished.connect(lambda: self._jobs.pop(id(worker), None))
+        thread.finished.connect(thread.deleteLater)
+        self._jobs[id(worker)] = (thread, worker)
+        if connect is not None:
+            connect(worker)
+        thread.start()
+        return worker
+
+    def cancel_all_jobs(self):
+        for _thread, worker in list(self._jobs.values()):
+            worker.cancel()
@@ -7,16 +7,544 @@
 # @Description: 定义 data_acquisition 模块的数据模型 (例如，与数据库表对应的类，或业务对象类)。
 
 # Python 标准库导入
-import sys
-import os
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
 
-# PyQt5 相关导入 (根据实际需要调整)
-# from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel
-# from PyQt5.QtCore import Qt, pyqtSignal, QObject
+# 第三方库导入
+import numpy as np
 
-# 项目内部模块导入 (示例)
-# from ..core.base_controller import BaseController
-# from ...utils.logger_setup import logger
 
+@dataclass
+class ActivityData:
+    """
+    单条活动数据记录（燃料消耗量、发电量等）。
 
-pass # 请在此处实现具体功能
+    period_start 为该读数所属统计时段的起始时刻（小时/日/月数据均以起点表示）。
+    """
+
+    plant_code: str
+    unit_code: str
+    fuel_type: str
+    period_start: datetime
+    quantity: float
+    measure_unit: str = ""
+    data_source: str = ""
+    remark: str = ""
+    record_id: Optional[int] = field(default=None, compare=False)
+
+
+# 导入文件中允许出现的列名（含中文表头）到 ActivityData 字段的映射
+ACTIVITY_DATA_COLUMN_ALIASES = {
+    "plant_code": ("plant_code", "plant", "电厂编码", "电厂"),
+    "unit_code": ("unit_code", "unit", "机组编码", "机组"),
+    "fuel_type": ("fuel_type", "fuel", "燃料类型", "燃料品种"),
+    "period_start": ("period_start", "period", "timestamp", "时间", "统计时段"),
+    "quantity": ("quantity", "value", "消耗量", "数值"),
+    "measure_unit": ("measure_unit", "uom", "计量单位", "单位"),
+    "data_source": ("data_source", "source", "数据来源"),
+    "remark": ("remark", "备注"),
+}
+
+ACTIVITY_DATA_REQUIRED_FIELDS = ("plant_code", "unit_code", "fuel_type", "period_start", "quantity")
+
+
+@dataclass
+class ParameterData:
+    """
+    单条参数数据记录（低位发热量、单位热值含碳量、碳氧化率等煤质/燃料参数）。
+    """
+
+    plant_code: str
+    unit_code: str
+    fuel_type: str
+    period_start: datetime
+    parameter_type: str
+    value: float
+    measure_unit: str = ""
+    data_source: str = ""
+    record_id: Optional[int] = field(default=None, compare=False)
+
+
+@dataclass
+class SupportingDocument:
+    """
+    支撑文档（燃料发票、化验报告、CEMS 导出文件等）。
+
+    文件内容保存在内容寻址存储中，content_hash 为内容的 SHA-256；
+    同一份文件关联到多条记录时只保存一份内容，record_refs 记录关联关系，
+    格式为 "<数据类型>:<记录编号>"，如 "activity:1024"。
+    """
+
+    document_id: int
+    file_name: str
+    content_hash: str
+    size: int
+    mime_type: str = ""
+    uploaded_at: Optional[datetime] = None
+    uploaded_by: str = ""
+    record_refs: set = field(default_factory=set)
+
+
+# 数据校验规则类型
+RULE_TYPE_RANGE = "range"                # 数值范围
+RULE_TYPE_JUMP = "jump"                  # 月度环比跳变
+RULE_TYPE_CONSISTENCY = "consistency"    # 两个参数之间的比值一致性（如含碳量/低位发热量）
+RULE_TYPE_COMPLETENESS = "completeness"  # 缺失值与时间序列断档
+
+RULE_TYPES = (RULE_TYPE_RANGE, RULE_TYPE_JUMP, RULE_TYPE_CONSISTENCY, RULE_TYPE_COMPLETENESS)
+
+RULE_TARGET_ACTIVITY = "activity"
+RULE_TARGET_PARAMETER = "parameter"
+
+
+@dataclass
+class ValidationRule:
+    """
+    数据校验规则定义。
+
+    params 的键随 rule_type 而定：
+    - range:        min_value, max_value（任一可省略）
+    - jump:         max_change_ratio，相邻两个月合计值的相对变化上限
+    - consistency:  numerator, denominator（参数类型）, min_ratio, max_ratio
+    - completeness: max_gap_hours，同一序列相邻读数的最大时间间隔
+    fuel_type / parameter_type 为空表示对所有燃料/参数生效。
+    """
+
+    rule_id: int
+    name: str
+    rule_type: str
+    target: str = RULE_TARGET_ACTIVITY
+    fuel_type: str = ""
+    parameter_type: str = ""
+    params: dict = field(default_factory=dict)
+    enabled: bool = True
+
+
+# ---------------------------------------------------------------------------
+# 列式存储
+# ---------------------------------------------------------------------------
+
+class CategoryCodec:
+    """
+    分类值与整数编码之间的双向映射。
+
+    编码按首次出现顺序分配，一经分配不再改变，因此编码数组可以长期缓存、跨视图共享。
+    """
+
+    def __init__(self, labels=()):
+        self._labels = []
+        self._codes = {}
+        for label in labels:
+            self.encode(label)
+
+    def __len__(self):
+        return len(self._labels)
+
+    def __contains__(self, label):
+        return label in self._codes
+
+    @property
+    def labels(self):
+        return tuple(self._labels)
+
+    def encode(self, label):
+        code = self._codes.get(label)
+        if code is None:
+            code = len(self._labels)
+            self._codes[label] = code
+            self._labels.append(label)
+        return code
+
+    def encode_many(self, labels):
+        encode = self.encode
+        return np.fromiter((encode(label) for label in labels), dtype=np.int32, count=len(labels))
+
+    def code_of(self, label):
+        """只查询不分配；未知的值返回 None。"""
+        return self._codes.get(label)
+
+    def decode(self, code):
+        return self._labels[int(code)]
+
+    def decode_many(self, codes):
+        labels = np.empty(len(self._labels), dtype=object)
+        labels[:] = self._labels
+        return labels[np.asarray(codes)]
+
+
+class ColumnView:
+    """
+    列式存储的只读视图：每个属性都是一个 NumPy 数组。
+
+    由 ColumnarStore.slice() 返回的视图中，数组均为底层缓冲区的切片（零拷贝）。
+    version 是创建视图时（在存储锁内）存储的行布局版本，索引按它判断是否与视图匹配；
+    创建之后存储再追加数据，视图的 version 不变。
+    """
+
+    def __init__(self, store, columns, version=None):
+        self.store = store
+        self.version = version
+        self._columns = columns
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__["_columns"][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __len__(self):
+        return len(self._columns["row_id"])
+
+    @property
+    def column_names(self):
+        return tuple(self._columns)
+
+    @property
+    def nbytes(self):
+        return sum(col.nbytes for col in self._columns.values())
+
+    def take(self, indices):
+        """按位置或布尔掩码取子集（会复制数据）。"""
+        return ColumnView(self.store, {name: col[indices] for name, col in self._columns.items()}, self.version)
+
+    def group_sum(self, by, value_column=None):
+        """
+        按分类列汇总数值列。
+
+        :param by: 分类列名，如 "unit" / "plant" / "fuel"
+        :return: {分类值: 合计}
+        """
+        value_column = value_column or self.store.VALUE_COLUMN
+        codes = self._columns[by]
+        sums = np.bincount(codes, weights=self._columns[value_column], minlength=len(self.store.codecs[by]))
+        present = np.flatnonzero(np.bincount(codes, minlength=len(sums)))
+        codec = self.store.codecs[by]
+        return {codec.decode(code): float(sums[code]) for code in present}
+
+
+class ColumnarStore:
+    """
+    以类型化 NumPy 数组逐列保存读数的存储基类。
+
+    - 电厂、机组、燃料等分类字段以 int32 编码保存，编码表见 codecs；
+    - 机组以 (电厂编码, 机组编码) 作为编码键，保证跨电厂同名机组不冲突；
+    - period 为 datetime64[s]，row_id 为插入时分配的单调递增 int64 编号；
+    - 数据按 (plant, unit, period, [其余分类列]) 排序后，任一电厂、机组的数据以及
+      单台机组内任一时间区间都是连续区段，slice() 直接返回数组切片而不复制。
+
+    追加数据后排序状态失效，在下一次读取时一次性重排。重排会生成新数组，
+    已经发出的视图仍指向旧缓冲区，保持各自的一致快照。
+
+    追加、更正、重排与取视图都在存储级可重入锁 lock 下进行，监听者的回调也在
+    锁内执行，因此多个线程可以同时写入与读取。需要同时持有其他锁（如增量计算器）
+    时，应先取得存储锁，避免交叉加锁导致死锁。
+    """
+
+    CATEGORICAL_COLUMNS = ("plant", "unit", "fuel")
+    NUMERIC_COLUMNS = {}
+    VALUE_COLUMN = ""
+
+    def __init__(self, initial_capacity=1024):
+        self.codecs = {name: CategoryCodec() for name in self.CATEGORICAL_COLUMNS}
+        dtypes = {name: np.int32 for name in self.CATEGORICAL_COLUMNS}
+        dtypes.update(period="datetime64[s]", row_id=np.int64)
+        dtypes.update(self.NUMERIC_COLUMNS)
+        self._dtypes = dtypes
+        self._data = {name: np.empty(initial_capacity, dtype=dtype) for name, dtype in dtypes.items()}
+        self._size = 0
+        self._next_row_id = 0
+        self._sorted = True
+        self._partitions = {}
+        self._row_positions = None
+        self._listeners = []
+        self.lock = threading.RLock()
+        # version 在追加数据（行布局变化）后递增，索引据此判断是否失效；
+        # value_version 在任何数值变化（追加或更正）后递增，汇总与缓存据此判断是否失效
+        self.version = 0
+        self.value_version = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self):
+        with self.lock:
+            return sum(col[:self._size].nbytes for col in self._data.values())
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        capacity = len(self._data["row_id"])
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        for name, col in self._data.items():
+            grown = np.empty(new_capacity, dtype=col.dtype)
+            grown[:self._size] = col[:self._size]
+            self._data[name] = grown
+
+    def _append_encoded(self, columns):
+        """追加已编码的列数据，返回分配的 row_id 数组。"""
+        n = len(columns["period"])
+        if n == 0:
+            return np.empty(0, dtype=np.int64)
+        with self.lock:
+            self._reserve(n)
+            lo, hi = self._size, self._size + n
+            for name, values in columns.items():
+                self._data[name][lo:hi] = values
+            row_ids = np.arange(self._next_row_id, self._next_row_id + n, dtype=np.int64)
+            self._data["row_id"][lo:hi] = row_ids
+            self._next_row_id += n
+            self._size = hi
+            self._sorted = False
+            self.version += 1
+            self.value_version += 1
+            if self._listeners:
+                batch = ColumnView(self, {name: col[lo:hi] for name, col in self._data.items()}, self.version)
+                for listener in list(self._listeners):
+                    listener.rows_appended(batch)
+        return row_ids
+
+    def subscribe(self, listener):
+        """
+        注册数据变更监听者。
+
+        监听者需实现 rows_appended(batch) 与 rows_updated(batch, old_values)，
+        batch 为受影响行的 ColumnView（更正时其中的数值列已是新值）。
+        """
+        with self.lock:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        with self.lock:
+            self._listeners.remove(listener)
+
+    def positions_of(self, row_ids):
+        """把 row_id 转为当前排序布局下的行位置。"""
+        with self.lock:
+            self._ensure_sorted()
+            if self._row_positions is None:
+                positions = np.full(self._next_row_id, -1, dtype=np.int64)
+                positions[self._data["row_id"][:self._size]] = np.arange(self._size)
+                self._row_positions = positions
+            row_ids = np.asarray(row_ids, dtype=np.int64)
+            if len(row_ids) and (row_ids.min() < 0 or row_ids.max() >= self._next_row_id):
+                raise KeyError("row_id 不存在")
+            return self._row_positions[row_ids]
+
+    def update_values(self, row_ids, values, column=None):
+        """
+        更正指定行的数值列（默认 VALUE_COLUMN），通知监听者并返回更正前的值。
+
+        更正直接写入底层缓冲区，已发出的视图会看到新值。
+        """
+        column = column or self.VALUE_COLUMN
+        if column not in self.NUMERIC_COLUMNS:
+            raise ValueError(f"只能更正数值列: {column}")
+        with self.lock:
+            positions = self.positions_of(row_ids)
+            target = self._data[column]
+            old_values = target[positions].copy()
+            target[positions] = values
+            self.value_version += 1
+            if self._listeners:
+                batch = ColumnView(self, {name: col[positions] for name, col in self._data.items()}, self.version)
+                for listener in list(self._listeners):
+                    listener.rows_updated(batch, old_values)
+        return old_values
+
+    def append_encoded(self, columns):
+        """
+        追加已按本存储编码表编码好的列（批量导入时避免逐值编码）。
+
+        :param columns: {列名: 数组}，须包含全部分类列、period 与数值列
+        :return: 新分配的 row_id 数组
+        """
+        expected = set(self.CATEGORICAL_COLUMNS) | {"period"} | set(self.NUMERIC_COLUMNS)
+        if set(columns) != expected:
+            raise ValueError(f"列不匹配，应为: {sorted(expected)}")
+        return self._append_encoded(columns)
+
+    def encode_dictionary(self, column, labels, indices):
+        """
+        把“字典 + 下标”形式的分类列（如 Arrow 字典列）转为本存储的编码，
+        每个不同取值只查一次编码表。
+        """
+        with self.lock:
+            mapping = self.codecs[column].encode_many(list(labels))
+        return mapping[np.asarray(indices)] if len(mapping) else np.zeros(len(indices), dtype=np.int32)
+
+    def encode_unit_pairs(self, plant_codes, unit_labels, unit_indices):
+        """由已编码的电厂列与机组字典列得到机组编码（机组以 (电厂, 机组) 为键）。"""
+        plant_codes = np.asarray(plant_codes, dtype=np.int64)
+        unit_indices = np.asarray(unit_indices, dtype=np.int64)
+        pair_key = plant_codes * max(len(unit_labels), 1) + unit_indices
+        pairs, inverse = np.unique(pair_key, return_inverse=True)
+        with self.lock:
+            plant_labels = self.codecs["plant"].labels
+            codes = np.array([
+                self.codecs["unit"].encode((plant_labels[pair // max(len(unit_labels), 1)],
+                                            unit_labels[pair % max(len(unit_labels), 1)]))
+                for pair in pairs.tolist()
+            ], dtype=np.int32)
+        return codes[inverse.reshape(-1)] if len(codes) else np.zeros(0, dtype=np.int32)
+
+    def _encode_units(self, plant_codes, unit_codes):
+        return self.codecs["unit"].encode_many(list(zip(plant_codes, unit_codes)))
+
+    def _ensure_sorted(self):
+        with self.lock:
+            if self._sorted:
+                return
+            n = self._size
+            # np.lexsort 以最后一个键为主键：plant > unit > period > 其余分类列
+            extra = [name for name in self.CATEGORICAL_COLUMNS if name not in ("plant", "unit")]
+            keys = [self._data[name][:n] for name in reversed(extra)]
+            keys += [self._data["period"][:n], self._data["unit"][:n], self._data["plant"][:n]]
+            order = np.lexsort(keys)
+            self._data = {name: col[:n][order] for name, col in self._data.items()}
+            self._partitions = {}
+            self._row_positions = None
+            self._sorted = True
+
+    def _partition(self, column):
+        """返回分类列在排序布局下的 {编码: (起, 止)}，结果按列缓存。"""
+        bounds = self._partitions.get(column)
+        if bounds is None:
+            codes = self._data[column][:self._size]
+            if len(codes):
+                starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+            else:
+                starts = np.empty(0, dtype=np.int64)
+            ends = np.r_[starts[1:], len(codes)]
+            bounds = {int(codes[s]): (int(s), int(e)) for s, e in zip(starts, ends)}
+            self._partitions[column] = bounds
+        return bounds
+
+    def columns(self):
+        """返回全部数据的视图（零拷贝）。"""
+        with self.lock:
+            self._ensure_sorted()
+            return ColumnView(self, {name: col[:self._size] for name, col in self._data.items()}, self.version)
+
+    def slice(self, plant=None, unit=None, start=None, end=None):
+        """
+        按电厂/机组与时间区间 [start, end) 取零拷贝视图。
+
+        :param plant: 电厂编码
+        :param unit: 机组编码，需同时给出 plant
+        :param start: 起始时刻（含），datetime 或 datetime64
+        :param end: 截止时刻（不含）
+        """
+        with self.lock:
+            self._ensure_sorted()
+            lo, hi = 0, self._size
+            if unit is not None:
+                if plant is None:
+                    raise ValueError("按机组切片时必须同时指定电厂")
+                code = self.codecs["unit"].code_of((plant, unit))
+                lo, hi = self._partition("unit").get(code, (0, 0)) if code is not None else (0, 0)
+            elif plant is not None:
+                code = self.codecs["plant"].code_of(plant)
+                lo, hi = self._partition("plant").get(code, (0, 0)) if code is not None else (0, 0)
+
+            view = {name: col[lo:hi] for name, col in self._data.items()}
+            if start is not None or end is not None:
+                if unit is None and self._spans_multiple_units(lo, hi):
+                    # 跨机组的数据整体并非按时间有序，只能退化为掩码过滤
+                    period = view["period"]
+                    mask = np.ones(len(period), dtype=bool)
+                    if start is not None:
+                        mask &= period >= np.datetime64(start, "s")
+                    if end is not None:
+                        mask &= period < np.datetime64(end, "s")
+                    return ColumnView(self, {name: col[mask] for name, col in view.items()}, self.version)
+                view = self._time_window(view, start, end)
+            return ColumnView(self, view, self.version)
+
+    def _spans_multiple_units(self, lo, hi):
+        unit = self._data["unit"]
+        return hi - lo > 1 and unit[lo] != unit[hi - 1]
+
+    @staticmethod
+    def _time_window(view, start, end):
+        period = view["period"]
+        i = np.searchsorted(period, np.datetime64(start, "s"), side="left") if start is not None else 0
+        j = np.searchsorted(period, np.datetime64(end, "s"), side="left") if end is not None else len(period)
+        return {name: col[i:j] for name, col in view.items()}
+
+    def decode(self, column, codes):
+        return self.codecs[column].decode_many(codes)
+
+
+class ActivityColumnStore(ColumnarStore):
+    """活动数据列式存储，数值列为 quantity (float64)。"""
+
+    NUMERIC_COLUMNS = {"quantity": np.float64}
+    VALUE_COLUMN = "quantity"
+
+    def append(self, plant_codes, unit_codes, fuel_types, periods, quantities):
+        """
+        按列追加读数。
+
+        :return: 新分配的 row_id 数组
+        """
+        with self.lock:
+            return self._append_encoded({
+                "plant": self.codecs["plant"].encode_many(plant_codes),
+                "unit": self._encode_units(plant_codes, unit_codes),
+                "fuel": self.codecs["fuel"].encode_many(fuel_types),
+                "period": np.asarray(periods, dtype="datetime64[s]"),
+                "quantity": np.asarray(quantities, dtype=np.float64),
+            })
+
+    def append_records(self, records):
+        """
+        追加 ActivityData 列表，可直接作为流式导入的分块写入函数。
+
+        :return: 写入条数
+        """
+        if not records:
+            return 0
+        row_ids = self.append(
+            [r.plant_code for r in records],
+            [r.unit_code for r in records],
+            [r.fuel_type for r in records],
+            [r.period_start for r in records],
+            [r.quantity for r in records],
+        )
+        return len(row_ids)
+
+
+class ParameterColumnStore(ColumnarStore):
+    """参数数据列式存储，参数类型为额外的分类列，数值列为 value (float64)。"""
+
+    CATEGORICAL_COLUMNS = ("plant", "unit", "fuel", "parameter")
+    NUMERIC_COLUMNS = {"value": np.float64}
+    VALUE_COLUMN = "value"
+
+    def append(self, plant_codes, unit_codes, fuel_types, periods, parameter_types, values):
+        with self.lock:
+            return self._append_encoded({
+                "plant": self.codecs["plant"].encode_many(plant_codes),
+                "unit": self._encode_units(plant_codes, unit_codes),
+                "fuel": self.codecs["fuel"].encode_many(fuel_types),
+                "parameter": self.codecs["parameter"].encode_many(parameter_types),
+                "period": np.asarray(periods, dtype="datetime64[s]"),
+                "value": np.asarray(values, dtype=np.float64),
+            })
+
+    def append_records(self, records):
+        if not records:
+            return 0
+        row_ids = self.append(
+            [r.plant_code for r in records],
+            [r.unit_code for r in records],
+            [r.fuel_type for r in records],
+            [r.period_start for r in records],
+            [r.parameter_type for r in records],
+            [r.value for r in records],
+        )
+        return len(row_ids)
@@ -7,16 +7,2291 @@
 # @Description: 提供 data_acquisition 模块中更复杂或可复用的业务服务逻辑。
 
 # Python 标准库导入
-import sys
+import asyncio
+import contextlib
+import csv
+import hashlib
+import io
+import json
+import logging
+import mimetypes
+import mmap
 import os
+import shutil
+import tempfile
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import chain, islice
+from typing import Callable, Iterator, List, Optional, Tuple
 
-# PyQt5 相关导入 (根据实际需要调整)
-# from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel
-# from PyQt5.QtCore import Qt, pyqtSignal, QObject
+# 第三方库导入
+import numpy as np
 
-# 项目内部模块导入 (示例)
-# from ..core.base_controller import BaseController
-# from ...utils.logger_setup import logger
+# 项目内部模块导入
+from ...utils.constants import (
+    COLUMNAR_EXPORT_SUFFIXES,
+    DEFAULT_IMPORT_CHUNK_SIZE,
+    DOCUMENT_HASH_CHUNK_SIZE,
+    MAX_IMPORT_ERRORS_KEPT,
+    PARQUET_ROW_GROUP_SIZE,
+    SUPPORTED_IMPORT_SUFFIXES,
+)
+from ...utils.exceptions import DataImportError, DocumentStoreError, ImportCancelledError
+from .models import (
+    ACTIVITY_DATA_COLUMN_ALIASES,
+    ACTIVITY_DATA_REQUIRED_FIELDS,
+    RULE_TARGET_ACTIVITY,
+    RULE_TARGET_PARAMETER,
+    RULE_TYPE_COMPLETENESS,
+    RULE_TYPE_CONSISTENCY,
+    RULE_TYPE_JUMP,
+    RULE_TYPE_RANGE,
+    ActivityData,
+    ColumnView,
+    SupportingDocument,
+    ValidationRule,
+)
 
+logger = logging.getLogger(__name__)
 
-pass # 请在此处实现具体功能
+
+# ---------------------------------------------------------------------------
+# 流式分块导入
+# ---------------------------------------------------------------------------
+
+@dataclass
+class RowError:
+    """导入文件中某一行的错误描述。"""
+
+    line_no: int
+    message: str
+    field: str = ""
+
+
+@dataclass
+class ImportProgress:
+    """
+    导入进度快照，每处理完一个分块回调一次。
+
+    processed/total 的单位由数据源决定：CSV 为字节数，XLSX 为行数。
+    """
+
+    source: str
+    processed: int
+    total: int
+    rows_read: int
+    rows_written: int
+    rows_rejected: int
+    chunks_done: int
+    elapsed: float
+    finished: bool = False
+
+    @property
+    def fraction(self):
+        """完成比例 0~1；总量未知时返回 0。"""
+        if self.finished:
+            return 1.0
+        if self.total <= 0:
+            return 0.0
+        return min(self.processed / self.total, 1.0)
+
+    @property
+    def eta_seconds(self):
+        """按当前平均速度估算的剩余秒数；尚无法估算时返回 None。"""
+        if self.finished:
+            return 0.0
+        if self.processed <= 0 or self.total <= 0:
+            return None
+        return self.elapsed * (self.total - self.processed) / self.processed
+
+    @property
+    def rows_per_second(self):
+        return self.rows_read / self.elapsed if self.elapsed > 0 else 0.0
+
+
+@dataclass
+class ImportResult:
+    """一次导入的汇总结果。errors 最多保留 MAX_IMPORT_ERRORS_KEPT 条。"""
+
+    source: str
+    rows_read: int = 0
+    rows_written: int = 0
+    rows_rejected: int = 0
+    chunks: int = 0
+    elapsed: float = 0.0
+    errors: List[RowError] = field(default_factory=list)
+
+
+ProgressCallback = Callable[[ImportProgress], None]
+ChunkWriter = Callable[[List[ActivityData]], Optional[int]]
+ChunkValidator = Callable[[List[Tuple[int, ActivityData]]], Tuple[List[ActivityData], List[RowError]]]
+
+
+class _CountingReader(io.RawIOBase):
+    """包装二进制文件对象，统计已读取的字节数，用于 CSV 进度计算。"""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = self._raw.readinto(buffer)
+        if n:
+            self.bytes_read += n
+        return n
+
+    def close(self):
+        self._raw.close()
+        super().close()
+
+
+class CsvRowSource:
+    """
+    逐行读取 CSV 文件的数据源。
+
+    迭代产出 (行号, 原始值元组)，行号从 2 开始（第 1 行为表头）。
+    文件始终只保留底层缓冲区大小的内容在内存中。
+    """
+
+    def __init__(self, path, encoding="utf-8-sig", delimiter=","):
+        self.path = path
+        self.encoding = encoding
+        self.delimiter = delimiter
+        self.total = os.path.getsize(path)
+        self.header = []
+        self._counter = None
+
+    @property
+    def position(self):
+        return self._counter.bytes_read if self._counter else 0
+
+    def __iter__(self):
+        self._counter = _CountingReader(open(self.path, "rb"))
+        text = io.TextIOWrapper(io.BufferedReader(self._counter), encoding=self.encoding, newline="")
+        try:
+            reader = csv.reader(text, delimiter=self.delimiter)
+            try:
+                self.header = [h.strip() for h in next(reader)]
+            except StopIteration:
+                return
+            for line_no, values in enumerate(reader, start=2):
+                if not any(values):
+                    continue
+                yield line_no, values
+        finally:
+            text.close()
+
+
+class XlsxRowSource:
+    """
+    以只读流式模式读取 XLSX 工作表的数据源（依赖 openpyxl）。
+
+    openpyxl 的 read_only 模式按需解析工作表 XML，不会把整个工作簿载入内存。
+    """
+
+    def __init__(self, path, sheet_name=None):
+        self.path = path
+        self.sheet_name = sheet_name
+        self.total = 0
+        self.header = []
+        self._rows_consumed = 0
+
+    @property
+    def position(self):
+        return self._rows_consumed
+
+    def __iter__(self):
+        try:
+            from openpyxl import load_workbook
+        except ImportError as exc:  # pragma: no cover - 取决于运行环境
+            raise DataImportError("读取 XLSX 文件需要安装 openpyxl", source=self.path) from exc
+
+        workbook = load_workbook(self.path, read_only=True, data_only=True)
+        try:
+            sheet = workbook[self.sheet_name] if self.sheet_name else workbook.active
+            self.total = sheet.max_row or 0
+            rows = sheet.iter_rows(values_only=True)
+            try:
+                self.header = ["" if h is None else str(h).strip() for h in next(rows)]
+            except StopIteration:
+                return
+            self._rows_consumed = 1
+            for line_no, values in enumerate(rows, start=2):
+                self._rows_consumed = line_no
+                if not any(v not in (None, "") for v in values):
+                    continue
+                yield line_no, values
+        finally:
+            workbook.close()
+
+
+def open_row_source(path, sheet_name=None, encoding="utf-8-sig"):
+    """根据文件后缀创建对应的数据源。"""
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix not in SUPPORTED_IMPORT_SUFFIXES:
+        raise DataImportError(f"不支持的导入文件类型: {suffix}", source=path)
+    if suffix == ".csv":
+        return CsvRowSource(path, encoding=encoding)
+    return XlsxRowSource(path, sheet_name=sheet_name)
+
+
+def chunked(iterable, size):
+    """把任意可迭代对象切分为长度不超过 size 的列表，惰性产出。"""
+    if size <= 0:
+        raise ValueError("chunk size must be positive")
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def resolve_column_map(header, aliases=ACTIVITY_DATA_COLUMN_ALIASES, required=ACTIVITY_DATA_REQUIRED_FIELDS):
+    """
+    把文件表头解析为 {字段名: 列下标}。
+
+    :raises DataImportError: 缺少必需列时
+    """
+    normalized = {str(h).strip().lower(): idx for idx, h in enumerate(header)}
+    column_map = {}
+    for field_name, names in aliases.items():
+        for name in names:
+            idx = normalized.get(name.lower())
+            if idx is not None:
+                column_map[field_name] = idx
+                break
+    missing = [f for f in required if f not in column_map]
+    if missing:
+        raise DataImportError(f"导入文件缺少必需列: {', '.join(missing)}")
+    return column_map
+
+
+_DATETIME_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d", "%Y-%m")
+
+
+def parse_datetime(value):
+    """解析导入文件中的时间值，兼容 Excel 日期单元格与常见文本格式。"""
+    if isinstance(value, datetime):
+        return value
+    text = str(value).strip().replace("/", "-")
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        pass
+    for fmt in _DATETIME_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"无法识别的时间格式: {value!r}")
+
+
+def _cell(values, column_map, field_name):
+    idx = column_map.get(field_name)
+    if idx is None or idx >= len(values):
+        return None
+    value = values[idx]
+    if isinstance(value, str):
+        value = value.strip()
+    return value
+
+
+def parse_activity_rows(rows, column_map):
+    """
+    把原始行转换为 ActivityData。
+
+    :param rows: [(行号, 原始值序列), ...]
+    :return: ([(行号, ActivityData), ...], [RowError, ...])
+    """
+    records, errors = [], []
+    for line_no, values in rows:
+        missing = [f for f in ACTIVITY_DATA_REQUIRED_FIELDS if _cell(values, column_map, f) in (None, "")]
+        if missing:
+            errors.append(RowError(line_no, "必填字段为空", ",".join(missing)))
+            continue
+        try:
+            period_start = parse_datetime(_cell(values, column_map, "period_start"))
+        except ValueError as exc:
+            errors.append(RowError(line_no, str(exc), "period_start"))
+            continue
+        try:
+            quantity = float(_cell(values, column_map, "quantity"))
+        except (TypeError, ValueError):
+            errors.append(RowError(line_no, "数值格式错误", "quantity"))
+            continue
+        records.append((line_no, ActivityData(
+            plant_code=str(_cell(values, column_map, "plant_code")),
+            unit_code=str(_cell(values, column_map, "unit_code")),
+            fuel_type=str(_cell(values, column_map, "fuel_type")),
+            period_start=period_start,
+            quantity=quantity,
+            measure_unit=str(_cell(values, column_map, "measure_unit") or ""),
+            data_source=str(_cell(values, column_map, "data_source") or ""),
+            remark=str(_cell(values, column_map, "remark") or ""),
+        )))
+    return records, errors
+
+
+def basic_activity_validator(records):
+    """默认的分块校验：剔除非有限值与负值读数。"""
+    valid, errors = [], []
+    for line_no, record in records:
+        if record.quantity != record.quantity or record.quantity in (float("inf"), float("-inf")):
+            errors.append(RowError(line_no, "数值非有限值", "quantity"))
+        elif record.quantity < 0:
+            errors.append(RowError(line_no, "活动数据不能为负", "quantity"))
+        else:
+            valid.append(record)
+    return valid, errors
+
+
+class ActivityDataImportService:
+    """
+    活动数据流式导入服务。
+
+    处理流程为生成器管线：读取原始行 -> 按 chunk_size 分块 -> 解析 -> 校验 -> 写入。
+    每个分块写入完成后才读取下一块，内存占用只与 chunk_size 有关，与文件大小无关。
+    """
+
+    def __init__(self, chunk_size=DEFAULT_IMPORT_CHUNK_SIZE, validator: Optional[ChunkValidator] = None,
+                 max_errors=MAX_IMPORT_ERRORS_KEPT):
+        self.chunk_size = chunk_size
+        self.validator = validator or basic_activity_validator
+        self.max_errors = max_errors
+
+    def iter_chunks(self, source) -> Iterator[Tuple[List[Tuple[int, ActivityData]], List[RowError]]]:
+        """
+        逐块产出 (已解析记录, 解析错误)，供导入或预览使用。
+
+        数据源在产出第一行之前读入表头，因此先取一行即可在解析、写入任何数据前校验表头。
+
+        :raises DataImportError: 文件为空、缺少必需列或只有表头没有数据行时
+        """
+        rows = iter(source)
+        first = next(rows, None)
+        if not source.header:
+            raise DataImportError("导入文件为空，缺少表头")
+        column_map = resolve_column_map(source.header)
+        if first is None:
+            raise DataImportError("导入文件只有表头，没有数据行")
+        for raw_chunk in chunked(chain([first], rows), self.chunk_size):
+            yield parse_activity_rows(raw_chunk, column_map)
+
+    def import_file(self, path, writer: ChunkWriter, progress_callback: Optional[ProgressCallback] = None,
+                    cancel_event=None, sheet_name=None):
+        """
+        流式导入一个 CSV/XLSX 活动数据文件。
+
+        :param path: 文件路径
+        :param writer: 分块写入函数，接收 ActivityData 列表，可返回实际写入条数
+        :param progress_callback: 每个分块完成后以 ImportProgress 回调
+        :param cancel_event: threading.Event，被置位时在下一个分块边界停止
+        :param sheet_name: XLSX 工作表名，默认活动工作表
+        :return: ImportResult
+        :raises ImportCancelledError: 用户取消导入
+        """
+        source = open_row_source(path, sheet_name=sheet_name)
+        return self.import_source(source, writer, progress_callback, cancel_event)
+
+    def import_source(self, source, writer: ChunkWriter, progress_callback: Optional[ProgressCallback] = None,
+                      cancel_event=None):
+        """对任意行数据源执行导入，见 import_file。"""
+        result = ImportResult(source=str(source.path))
+        started = time.monotonic()
+        try:
+            for parsed, parse_errors in self.iter_chunks(source):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise ImportCancelledError("导入已取消", source=result.source)
+                valid, invalid = self.validator(parsed)
+                written = writer(valid)
+                result.chunks += 1
+                result.rows_read += len(parsed) + len(parse_errors)
+                result.rows_written += len(valid) if written is None else written
+                result.rows_rejected += len(parse_errors) + len(invalid)
+                self._keep_errors(result, parse_errors)
+                self._keep_errors(result, invalid)
+                result.elapsed = time.monotonic() - started
+                if progress_callback is not None:
+                    progress_callback(self._progress(source, result, finished=False))
+        except DataImportError as exc:
+            if exc.source is None:
+                exc.source = result.source
+            raise
+        result.elapsed = time.monotonic() - started
+        if progress_callback is not None:
+            progress_callback(self._progress(source, result, finished=True))
+        logger.info("导入完成 %s: 读取 %d 行, 写入 %d 行, 拒绝 %d 行, 耗时 %.1fs",
+                    result.source, result.rows_read, result.rows_written, result.rows_rejected, result.elapsed)
+        return result
+
+    def _keep_errors(self, result, errors):
+        room = self.max_errors - len(result.errors)
+        if room > 0:
+            result.errors.extend(errors[:room])
+
+    @staticmethod
+    def _progress(source, result, finished):
+        return ImportProgress(
+            source=result.source,
+            processed=source.position,
+            total=source.total,
+            rows_read=result.rows_read,
+            rows_written=result.rows_written,
+            rows_rejected=result.rows_rejected,
+            chunks_done=result.chunks,
+            elapsed=result.elapsed,
+            finished=finished,
+        )
+
+
+# ---------------------------------------------------------------------------
+# 批量向量化数据校验
+# ---------------------------------------------------------------------------
+
+@dataclass
+class ValidationReport:
+    """
+    一次批量校验的结果。
+
+    违规记录以两条等长数组表示：rule_ids[i] 对应的规则命中了视图中第 row_indices[i] 行。
+    """
+
+    rule_ids: np.ndarray
+    row_indices: np.ndarray
+    rows_checked: int
+    elapsed: float
+
+    def __len__(self):
+        return len(self.row_indices)
+
+    @property
+    def rows_per_second(self):
+        return self.rows_checked / self.elapsed if self.elapsed > 0 else float("inf")
+
+    def by_rule(self):
+        """返回 {规则编号: 违规行下标数组}。"""
+        return {int(rule_id): self.row_indices[self.rule_ids == rule_id] for rule_id in np.unique(self.rule_ids)}
+
+    def violating_rows(self):
+        """返回去重后的违规行下标。"""
+        return np.unique(self.row_indices)
+
+
+def composite_key(*code_arrays):
+    """
+    把多列离散值压缩为单个 int64 组合键（按列逐级稠密编码，不会溢出）。
+
+    :return: (键数组, 各列的唯一值数组列表)
+    """
+    key = np.zeros(len(code_arrays[0]), dtype=np.int64)
+    uniques = []
+    for codes in code_arrays:
+        uniq, inverse = np.unique(codes, return_inverse=True)
+        key = key * len(uniq) + inverse.reshape(-1)
+        uniques.append(uniq)
+    return key, uniques
+
+
+def _series_columns(view):
+    """同一时间序列的标识列：机组、燃料，以及参数数据的参数类型。"""
+    names = ["unit", "fuel"]
+    if "parameter" in view.column_names:
+        names.append("parameter")
+    return [getattr(view, name) for name in names]
+
+
+def _selector_mask(view, rule):
+    """
+    规则作用范围（燃料/参数类型）对应的行掩码；无过滤条件时返回 None。
+    规则引用的分类值在数据中不存在时返回全 False。
+    """
+    mask = None
+    filters = (("fuel", rule.fuel_type), ("parameter", rule.parameter_type))
+    for column, label in filters:
+        if not label:
+            continue
+        codec = view.store.codecs.get(column)
+        code = codec.code_of(label) if codec is not None else None
+        if code is None:
+            return np.zeros(len(view), dtype=bool)
+        current = getattr(view, column) == code
+        mask = current if mask is None else mask & current
+    return mask
+
+
+def _compile_range(rule):
+    lower = rule.params.get("min_value")
+    upper = rule.params.get("max_value")
+
+    def predicate(view):
+        values = getattr(view, view.store.VALUE_COLUMN)
+        mask = np.zeros(len(values), dtype=bool)
+        if lower is not None:
+            mask |= values < lower
+        if upper is not None:
+            mask |= values > upper
+        selector = _selector_mask(view, rule)
+        if selector is not None:
+            mask &= selector
+        return np.flatnonzero(mask)
+    return predicate
+
+
+def _compile_jump(rule):
+    max_ratio = float(rule.params["max_change_ratio"])
+    aggregate = rule.params.get("aggregate", "sum" if rule.target == RULE_TARGET_ACTIVITY else "mean")
+
+    def predicate(view):
+        selector = _selector_mask(view, rule)
+        rows = np.arange(len(view)) if selector is None else np.flatnonzero(selector)
+        if len(rows) == 0:
+            return rows
+        values = getattr(view, view.store.VALUE_COLUMN)[rows]
+        months = view.period[rows].astype("datetime64[M]").astype(np.int64)
+        series, _ = composite_key(*[col[rows] for col in _series_columns(view)])
+        order = np.lexsort((months, series))
+        series_s, months_s = series[order], months[order]
+        starts = np.flatnonzero(np.r_[True, (series_s[1:] != series_s[:-1]) | (months_s[1:] != months_s[:-1])])
+        totals = np.add.reduceat(values[order], starts)
+        if aggregate == "mean":
+            totals = totals / np.diff(np.r_[starts, len(order)])
+        g_series, g_month = series_s[starts], months_s[starts]
+        previous = np.r_[np.nan, totals[:-1]]
+        consecutive = np.r_[False, (g_series[1:] == g_series[:-1]) & (g_month[1:] == g_month[:-1] + 1)]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            change = np.abs(totals - previous) / np.abs(previous)
+        flagged_groups = consecutive & (change > max_ratio)
+        group_of_row = np.cumsum(np.r_[True, (series_s[1:] != series_s[:-1]) | (months_s[1:] != months_s[:-1])]) - 1
+        return np.sort(rows[order][flagged_groups[group_of_row]])
+    return predicate
+
+
+def _compile_consistency(rule):
+    params = rule.params
+    numerator, denominator = params["numerator"], params["denominator"]
+    lower, upper = params.get("min_ratio"), params.get("max_ratio")
+
+    def predicate(view):
+        if "parameter" not in view.column_names:
+            return np.empty(0, dtype=np.int64)
+        codec = view.store.codecs["parameter"]
+        num_code, den_code = codec.code_of(numerator), codec.code_of(denominator)
+        if num_code is None or den_code is None:
+            return np.empty(0, dtype=np.int64)
+        selector = _selector_mask(view, rule)
+        num_mask = view.parameter == num_code
+        den_mask = view.parameter == den_code
+        if selector is not None:
+            num_mask &= selector
+            den_mask &= selector
+        num_rows, den_rows = np.flatnonzero(num_mask), np.flatnonzero(den_mask)
+        both = np.r_[num_rows, den_rows]
+        key, _ = composite_key(view.unit[both], view.fuel[both], view.period[both])
+        num_key, den_key = key[:len(num_rows)], key[len(num_rows):]
+        order = np.argsort(num_key, kind="stable")
+        pos = np.searchsorted(num_key[order], den_key)
+        pos_clipped = np.minimum(pos, max(len(order) - 1, 0))
+        matched = (pos < len(order)) & (num_key[order][pos_clipped] == den_key) if len(order) else np.zeros(len(den_key), bool)
+        num_idx = num_rows[order[pos_clipped[matched]]]
+        den_idx = den_rows[matched]
+        values = getattr(view, view.store.VALUE_COLUMN)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = values[num_idx] / values[den_idx]
+        bad = ~np.isfinite(ratio)
+        if lower is not None:
+            bad |= ratio < lower
+        if upper is not None:
+            bad |= ratio > upper
+        return np.unique(np.r_[num_idx[bad], den_idx[bad]])
+    return predicate
+
+
+def _compile_completeness(rule):
+    max_gap = rule.params.get("max_gap_hours")
+    max_gap_seconds = None if max_gap is None else int(float(max_gap) * 3600)
+
+    def predicate(view):
+        selector = _selector_mask(view, rule)
+        rows = np.arange(len(view)) if selector is None else np.flatnonzero(selector)
+        values = getattr(view, view.store.VALUE_COLUMN)[rows]
+        flagged = [rows[np.isnan(values)]]
+        if max_gap_seconds is not None and len(rows) > 1:
+            series, _ = composite_key(*[col[rows] for col in _series_columns(view)])
+            seconds = view.period[rows].astype(np.int64)
+            order = np.lexsort((seconds, series))
+            series_s, seconds_s = series[order], seconds[order]
+            gap = (series_s[1:] == series_s[:-1]) & (np.diff(seconds_s) > max_gap_seconds)
+            # 断档本身没有对应的行，以断档之后的第一条读数作为违规行
+            flagged.append(rows[order][1:][gap])
+        return np.unique(np.concatenate(flagged))
+    return predicate
+
+
+_RULE_COMPILERS = {
+    RULE_TYPE_RANGE: _compile_range,
+    RULE_TYPE_JUMP: _compile_jump,
+    RULE_TYPE_CONSISTENCY: _compile_consistency,
+    RULE_TYPE_COMPLETENESS: _compile_completeness,
+}
+
+
+class ValidationRuleEngine:
+    """
+    把 ValidationRule 编译为批量数组谓词并对列式数据整体求值。
+
+    每条规则编译为一个函数 view -> 违规行下标数组，全部计算都是 NumPy 向量运算，
+    不会逐行调用 Python 代码。规则只编译一次，可重复用于不同的数据视图。
+    """
+
+    def __init__(self, rules=()):
+        self._compiled = []
+        self.rules = []
+        for rule in rules:
+            self.add_rule(rule)
+
+    def add_rule(self, rule):
+        compiler = _RULE_COMPILERS.get(rule.rule_type)
+        if compiler is None:
+            raise ValueError(f"未知的校验规则类型: {rule.rule_type}")
+        self.rules.append(rule)
+        if rule.enabled:
+            self._compiled.append((rule, compiler(rule)))
+
+    def validate(self, view, target=None):
+        """
+        对一个 ColumnView 执行全部适用规则。
+
+        :param view: ColumnarStore.columns() / slice() 返回的视图
+        :param target: 只执行该目标（activity/parameter）的规则；默认按视图自动判断
+        :return: ValidationReport
+        """
+        if target is None:
+            target = RULE_TARGET_PARAMETER if "parameter" in view.column_names else RULE_TARGET_ACTIVITY
+        started = time.perf_counter()
+        rule_ids, row_indices = [], []
+        for rule, predicate in self._compiled:
+            if rule.target != target:
+                continue
+            hits = np.asarray(predicate(view), dtype=np.int64)
+            if len(hits):
+                row_indices.append(hits)
+                rule_ids.append(np.full(len(hits), rule.rule_id, dtype=np.int32))
+        return ValidationReport(
+            rule_ids=np.concatenate(rule_ids) if rule_ids else np.empty(0, dtype=np.int32),
+            row_indices=np.concatenate(row_indices) if row_indices else np.empty(0, dtype=np.int64),
+            rows_checked=len(view),
+            elapsed=time.perf_counter() - started,
+        )
+
+    def import_validator(self):
+        """
+        生成可用于流式导入的分块校验函数。
+
+        导入阶段只执行与单行相关的检查（非有限值、负值与活动数据范围规则），
+        跨行的环比、一致性与完整性规则需在数据入库后对整个序列执行。
+        """
+        range_rules = [rule for rule, _ in self._compiled
+                       if rule.rule_type == RULE_TYPE_RANGE and rule.target == RULE_TARGET_ACTIVITY]
+
+        def validate_chunk(records):
+            if not records:
+                return [], []
+            values = np.fromiter((r.quantity for _, r in records), dtype=np.float64, count=len(records))
+            fuels = np.array([r.fuel_type for _, r in records], dtype=object)
+            reasons = np.full(len(records), -1, dtype=np.int32)
+            reasons[values < 0] = -2
+            reasons[~np.isfinite(values)] = -3
+            for rule in range_rules:
+                bad = np.zeros(len(values), dtype=bool)
+                if rule.params.get("min_value") is not None:
+                    bad |= values < rule.params["min_value"]
+                if rule.params.get("max_value") is not None:
+                    bad |= values > rule.params["max_value"]
+                if rule.fuel_type:
+                    bad &= fuels == rule.fuel_type
+                reasons[bad & (reasons == -1)] = rule.rule_id
+            valid = [records[i][1] for i in np.flatnonzero(reasons == -1)]
+            errors = []
+            for i in np.flatnonzero(reasons != -1):
+                code = int(reasons[i])
+                if code == -2:
+                    message = "活动数据不能为负"
+                elif code == -3:
+                    message = "数值非有限值"
+                else:
+                    message = f"违反校验规则 #{code}"
+                errors.append(RowError(records[i][0], message, "quantity"))
+            return valid, errors
+        return validate_chunk
+
+
+def benchmark_validation(units=4, days=365, freq_minutes=1, rules=None, repeat=3, seed=0):
+    """
+    生成分钟级的合成活动数据与日度参数数据，测量校验吞吐量。
+
+    :param units: 机组数
+    :param days: 天数
+    :param freq_minutes: 活动数据采样间隔（分钟）
+    :param rules: 自定义规则列表，默认使用覆盖四类规则的示例规则集
+    :param repeat: 重复次数，取最快一次
+    :return: {"activity_rows", "activity_rows_per_second", "parameter_rows",
+              "parameter_rows_per_second", "violations"}
+    """
+    from .models import ActivityColumnStore, ParameterColumnStore
+
+    rng = np.random.default_rng(seed)
+    steps = days * 24 * 60 // freq_minutes
+    start = np.datetime64("2024-01-01T00:00:00", "s")
+    periods = start + np.arange(steps, dtype=np.int64) * (freq_minutes * 60)
+    activity = ActivityColumnStore(initial_capacity=units * steps)
+    for u in range(units):
+        quantity = rng.normal(50.0, 5.0, steps)
+        quantity[rng.random(steps) < 1e-4] = np.nan
+        activity.append(["P1"] * steps, [f"U{u}"] * steps, ["coal"] * steps, periods, quantity)
+
+    day_periods = start + np.arange(days, dtype=np.int64) * 86400
+    parameter = ParameterColumnStore(initial_capacity=units * days * 2)
+    for u in range(units):
+        ncv = rng.normal(20.9, 0.5, days)
+        parameter.append(["P1"] * days, [f"U{u}"] * days, ["coal"] * days, day_periods, ["ncv"] * days, ncv)
+        parameter.append(["P1"] * days, [f"U{u}"] * days, ["coal"] * days, day_periods, ["carbon_content"] * days,
+                         ncv * rng.normal(0.02636, 0.0005, days))
+
+    if rules is None:
+        rules = [
+            ValidationRule(1, "消耗量范围", RULE_TYPE_RANGE, params={"min_value": 0, "max_value": 70}),
+            ValidationRule(2, "月度环比", RULE_TYPE_JUMP, params={"max_change_ratio": 0.3}),
+            ValidationRule(3, "完整性", RULE_TYPE_COMPLETENESS, params={"max_gap_hours": 1}),
+            ValidationRule(4, "含碳量/热值一致性", RULE_TYPE_CONSISTENCY, target=RULE_TARGET_PARAMETER,
+                           params={"numerator": "carbon_content", "denominator": "ncv",
+                                   "min_ratio": 0.024, "max_ratio": 0.029}),
+            ValidationRule(5, "热值范围", RULE_TYPE_RANGE, target=RULE_TARGET_PARAMETER, parameter_type="ncv",
+                           params={"min_value": 15, "max_value": 30}),
+        ]
+    engine = ValidationRuleEngine(rules)
+    activity_view, parameter_view = activity.columns(), parameter.columns()
+    best_activity = min((engine.validate(activity_view) for _ in range(repeat)), key=lambda r: r.elapsed)
+    best_parameter = min((engine.validate(parameter_view) for _ in range(repeat)), key=lambda r: r.elapsed)
+    return {
+        "activity_rows": len(activity_view),
+        "activity_rows_per_second": best_activity.rows_per_second,
+        "parameter_rows": len(parameter_view),
+        "parameter_rows_per_second": best_parameter.rows_per_second,
+        "violations": len(best_activity) + len(best_parameter),
+    }
+
+
+# ---------------------------------------------------------------------------
+# 数据查询（分页、排序、过滤均在查询层完成）
+# ---------------------------------------------------------------------------
+
+@dataclass
+class QueryFilter:
+    """数据查询条件；为空的条件不参与过滤。时间区间为 [start, end)。"""
+
+    plant_code: str = ""
+    unit_code: str = ""
+    fuel_type: str = ""
+    parameter_type: str = ""
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+
+
+class ColumnQueryResult:
+    """
+    一次查询的结果集。
+
+    结果集只持有列式存储的视图和（排序或过滤后才有的）行号数组，不会把行物化为
+    Python 对象；界面通过 fetch(offset, limit) 按页取出需要显示的行。
+    """
+
+    def __init__(self, view, order=None, plan=None):
+        """
+        :param view: ColumnView
+        :param order: 可选的行位置数组，表示过滤/排序后的行顺序
+        :param plan: 生成该结果集的 QueryPlan
+        """
+        self.view = view
+        self.order = order
+        self.plan = plan
+
+    def __len__(self):
+        return len(self.view) if self.order is None else len(self.order)
+
+    @property
+    def column_names(self):
+        return self.view.column_names
+
+    def positions(self, offset, limit):
+        """返回 [offset, offset+limit) 区间对应的视图行位置。"""
+        if self.order is None:
+            stop = min(offset + limit, len(self.view))
+            return np.arange(offset, max(offset, stop))
+        return self.order[offset:offset + limit]
+
+    def fetch(self, offset, limit, columns=None):
+        """
+        取出一页数据，分类编码解码为文本、时间格式化为字符串。
+
+        :return: 行元组列表
+        """
+        positions = self.positions(offset, limit)
+        columns = columns or self.column_names
+        store = self.view.store
+        decoded = []
+        for name in columns:
+            values = getattr(self.view, name)[positions]
+            if name in store.codecs:
+                labels = store.decode(name, values)
+                if name == "unit":
+                    labels = [label[1] for label in labels]
+                decoded.append(labels)
+            elif name == "period":
+                decoded.append(np.datetime_as_string(values, unit="m"))
+            else:
+                decoded.append(values.tolist())
+        return list(zip(*decoded))
+
+    def sort_keys(self, column):
+        """排序用的键数组：分类列按显示文本的字典序排名，其余列按原值。"""
+        values = getattr(self.view, column)
+        codec = self.view.store.codecs.get(column)
+        if codec is None:
+            return values
+        labels = [label[1] if column == "unit" else label for label in codec.labels]
+        rank = np.empty(len(labels), dtype=np.int64)
+        rank[np.argsort(np.array(labels, dtype=object), kind="stable")] = np.arange(len(labels))
+        return rank[values] if len(labels) else values
+
+    def sorted_by(self, column, descending=False):
+        """返回按指定列排序的新结果集（稳定排序，原结果集不变）。"""
+        keys = self.sort_keys(column)
+        if keys.dtype.kind == "M":
+            keys = keys.astype(np.int64)
+        if self.order is not None:
+            keys = keys[self.order]
+        # 取负后做稳定升序，降序时相等的键仍保持原有先后顺序
+        order = np.argsort(-keys if descending else keys, kind="stable")
+        if self.order is not None:
+            order = self.order[order]
+        return ColumnQueryResult(self.view, order, self.plan)
+
+
+class CompositeIndex:
+    """
+    列式存储上的组合索引。
+
+    索引保存按 columns 字典序排列的行位置数组 order 以及排序后的键列，
+    对前缀列做等值查找、对 period 做区间查找时只需逐列二分，结果是 order 中的连续区段。
+    clustered=True 表示存储本身已按该顺序排列（主排序键），此时不另存 order 与键列。
+    索引记录构建时所用视图的 version：行位置只对同一版本的视图有效，
+    视图版本与索引不一致（存储已追加数据，或视图早于索引）时重新构建。
+    """
+
+    def __init__(self, name, columns, clustered=False):
+        self.name = name
+        self.columns = tuple(columns)
+        self.clustered = clustered
+        self.order = None
+        self._keys = {}
+        self._built_version = None
+
+    def is_stale(self, view):
+        return self._built_version is None or self._built_version != view.version
+
+    def build(self, view):
+        if self.clustered:
+            self._keys = {name: self._key_array(view, name) for name in self.columns}
+        else:
+            keys = [self._key_array(view, name) for name in self.columns]
+            self.order = np.lexsort(keys[::-1])
+            self._keys = {name: key[self.order] for name, key in zip(self.columns, keys)}
+        self._built_version = view.version
+
+    @staticmethod
+    def _key_array(view, name):
+        values = getattr(view, name)
+        return values.astype(np.int64) if values.dtype.kind == "M" else values
+
+    @property
+    def nbytes(self):
+        total = 0 if self.order is None else self.order.nbytes
+        if not self.clustered:
+            total += sum(key.nbytes for key in self._keys.values())
+        return total
+
+    def lookup(self, equalities, period_range):
+        """
+        :param equalities: {列名: 编码}
+        :param period_range: (起始秒或 None, 截止秒或 None)
+        :return: (lo, hi, 实际使用的条件列名元组)
+        """
+        lo, hi = 0, len(self._keys[self.columns[0]]) if self._keys else 0
+        used = []
+        for name in self.columns:
+            key = self._keys[name]
+            if name == "period":
+                start, end = period_range
+                if start is None and end is None:
+                    break
+                window = key[lo:hi]
+                new_lo = lo + (np.searchsorted(window, start, side="left") if start is not None else 0)
+                new_hi = lo + (np.searchsorted(window, end, side="left") if end is not None else len(window))
+                lo, hi = int(new_lo), int(new_hi)
+                used.append(name)
+                break
+            if name not in equalities:
+                break
+            window = key[lo:hi]
+            code = equalities[name]
+            lo, hi = lo + int(np.searchsorted(window, code, side="left")), lo + int(np.searchsorted(window, code, side="right"))
+            used.append(name)
+        return lo, hi, tuple(used)
+
+    def positions(self, lo, hi):
+        return np.arange(lo, hi) if self.clustered else self.order[lo:hi]
+
+
+@dataclass
+class QueryPlan:
+    """查询计划：选用的索引、索引可处理的条件、剩余过滤条件以及各候选方案的估算行数。"""
+
+    index: Optional[CompositeIndex]
+    lo: int
+    hi: int
+    used_columns: Tuple[str, ...]
+    residual: List[str]
+    total_rows: int
+    candidates: List[Tuple[str, int]]
+    empty_reason: str = ""
+    elapsed: float = 0.0
+    result_rows: Optional[int] = None
+
+    @property
+    def estimated_rows(self):
+        return self.hi - self.lo
+
+    def explain(self):
+        """生成类似 EXPLAIN 的多行文本。"""
+        lines = []
+        if self.empty_reason:
+            lines.append(f"空结果 (条件不可能满足: {self.empty_reason})")
+        elif self.index is None:
+            lines.append(f"全表扫描  rows={self.total_rows:,}")
+        else:
+            scan = "聚簇区间扫描" if self.index.clustered else "索引区间扫描"
+            cond = ", ".join(self.used_columns) or "无"
+            lines.append(f"{scan} 使用 {self.index.name} ({', '.join(self.index.columns)})")
+            lines.append(f"  索引条件: {cond}  rows={self.estimated_rows:,} / {self.total_rows:,}")
+        if self.residual:
+            lines.append(f"  剩余过滤: {', '.join(self.residual)}")
+        if self.result_rows is not None:
+            lines.append(f"  实际返回: {self.result_rows:,} 行，耗时 {self.elapsed * 1000:.1f} ms")
+        if self.candidates:
+            lines.append("候选方案:")
+            for name, rows in self.candidates:
+                lines.append(f"  {name:<32} 估算 {rows:,} 行")
+        return "\n".join(lines)
+
+
+def default_index_definitions(store):
+    """
+    默认索引集合：
+
+    - clustered_plant_unit_period：存储自身的排列顺序，不占额外内存；
+    - idx_<全部分类列>_period：如 (plant, unit, fuel, period)；
+    - idx_<分类列>_period：除电厂、机组外的每个分类列，如 (fuel, period)；
+    - idx_period：只有时间条件时使用。
+    """
+    categorical = store.CATEGORICAL_COLUMNS
+    others = [name for name in categorical if name not in ("plant", "unit")]
+    definitions = [CompositeIndex("clustered_plant_unit_period", ("plant", "unit", "period"), clustered=True)]
+    definitions.append(CompositeIndex(f"idx_{'_'.join(categorical)}_period", tuple(categorical) + ("period",)))
+    for name in others:
+        definitions.append(CompositeIndex(f"idx_{name}_period", (name, "period")))
+    definitions.append(CompositeIndex("idx_period", ("period",)))
+    return definitions
+
+
+class QueryPlanner:
+    """
+    为一组过滤条件选择最具选择性的索引。
+
+    估算直接在各索引上做二分查找得到精确的区间行数（代价为 O(列数 × log n)），
+    选择行数最少的方案；行数相同时优先聚簇扫描，因为它的结果可以零拷贝返回。
+    """
+
+    def __init__(self, store, indexes=None):
+        self.store = store
+        self.indexes = list(indexes) if indexes is not None else default_index_definitions(store)
+
+    def _refresh(self, view):
+        for index in self.indexes:
+            if index.is_stale(view):
+                index.build(view)
+
+    def _encode(self, query_filter):
+        """把过滤条件转为编码；返回 (等值条件, 剩余的按名称匹配机组, 不可能满足的原因)。"""
+        codecs = self.store.codecs
+        equalities = {}
+        unit_label_only = None
+        for column, label in (("plant", query_filter.plant_code), ("fuel", query_filter.fuel_type),
+                              ("parameter", query_filter.parameter_type)):
+            if not label:
+                continue
+            if column not in codecs:
+                continue
+            code = codecs[column].code_of(label)
+            if code is None:
+                return None, None, f"{column}={label}"
+            equalities[column] = code
+        if query_filter.unit_code:
+            if query_filter.plant_code:
+                code = codecs["unit"].code_of((query_filter.plant_code, query_filter.unit_code))
+                if code is None:
+                    return None, None, f"unit={query_filter.unit_code}"
+                equalities["unit"] = code
+            else:
+                unit_label_only = query_filter.unit_code
+        return equalities, unit_label_only, ""
+
+    def plan(self, query_filter, view):
+        equalities, unit_label_only, empty_reason = self._encode(query_filter)
+        total = len(view)
+        if empty_reason:
+            return QueryPlan(None, 0, 0, (), [], total, [], empty_reason=empty_reason)
+        self._refresh(view)
+        period_range = (
+            None if query_filter.start is None else np.datetime64(query_filter.start, "s").astype(np.int64),
+            None if query_filter.end is None else np.datetime64(query_filter.end, "s").astype(np.int64),
+        )
+        wanted = set(equalities)
+        if period_range != (None, None):
+            wanted.add("period")
+
+        best = None
+        candidates = [("全表扫描", total)]
+        for index in self.indexes:
+            lo, hi, used = index.lookup(equalities, period_range)
+            if not used:
+                continue
+            candidates.append((index.name, hi - lo))
+            if best is None or hi - lo < best[1] - best[0]:
+                best = (lo, hi, used, index)
+        if best is None:
+            residual = sorted(wanted) + (["unit(名称)"] if unit_label_only else [])
+            return QueryPlan(None, 0, total, (), residual, total, candidates)
+        lo, hi, used, index = best
+        residual = sorted(wanted - set(used)) + (["unit(名称)"] if unit_label_only else [])
+        return QueryPlan(index, lo, hi, used, residual, total, candidates)
+
+
+class ColumnStoreQueryService:
+    """
+    面向列式存储的查询服务。
+
+    每次查询先由 QueryPlanner 选出最具选择性的索引得到候选行区段，再对剩余条件
+    做向量掩码过滤；聚簇索引且无剩余条件时直接返回零拷贝切片。
+    界面层只需调用 query()，排序通过结果集的 sorted_by() 下推到本层。
+    """
+
+    def __init__(self, store, indexes=None):
+        self.store = store
+        self.planner = QueryPlanner(store, indexes)
+
+    def explain(self, query_filter=None):
+        """只生成查询计划，不取数。"""
+        return self.planner.plan(query_filter or QueryFilter(), self.store.columns())
+
+    def query(self, query_filter=None):
+        query_filter = query_filter or QueryFilter()
+        started = time.perf_counter()
+        view = self.store.columns()
+        plan = self.planner.plan(query_filter, view)
+        if plan.empty_reason:
+            result = ColumnQueryResult(view, np.empty(0, dtype=np.int64))
+        elif plan.index is not None and plan.index.clustered and not plan.residual:
+            result = ColumnQueryResult(self._slice_view(view, plan.lo, plan.hi))
+        else:
+            positions = plan.index.positions(plan.lo, plan.hi) if plan.index is not None else None
+            result = ColumnQueryResult(view, self._apply_residual(view, positions, query_filter, plan))
+        plan.elapsed = time.perf_counter() - started
+        plan.result_rows = len(result)
+        result.plan = plan
+        return result
+
+    @staticmethod
+    def _slice_view(view, lo, hi):
+        return ColumnView(view.store, {name: getattr(view, name)[lo:hi] for name in view.column_names}, view.version)
+
+    def _apply_residual(self, view, positions, query_filter, plan):
+        if not plan.residual:
+            return positions
+        rows = np.arange(len(view)) if positions is None else positions
+        mask = np.ones(len(rows), dtype=bool)
+        codecs = self.store.codecs
+        for column, label in (("plant", query_filter.plant_code), ("fuel", query_filter.fuel_type),
+                              ("parameter", query_filter.parameter_type)):
+            if label and column in plan.residual:
+                mask &= getattr(view, column)[rows] == codecs[column].code_of(label)
+        if "unit" in plan.residual:
+            mask &= view.unit[rows] == codecs["unit"].code_of((query_filter.plant_code, query_filter.unit_code))
+        if "unit(名称)" in plan.residual:
+            units = [code for code, (_plant, label) in enumerate(codecs["unit"].labels)
+                     if label == query_filter.unit_code]
+            mask &= np.isin(view.unit[rows], units)
+        if "period" in plan.residual:
+            period = view.period[rows]
+            if query_filter.start is not None:
+                mask &= period >= np.datetime64(query_filter.start, "s")
+            if query_filter.end is not None:
+                mask &= period < np.datetime64(query_filter.end, "s")
+        return rows[mask]
+
+
+# ---------------------------------------------------------------------------
+# 时间维度增量汇总（小时 -> 日 -> 月 -> 年）
+# ---------------------------------------------------------------------------
+
+ROLLUP_GRANULARITIES = {"day": "datetime64[D]", "month": "datetime64[M]", "year": "datetime64[Y]"}
+ROLLUP_SCOPES = ("unit", "plant")
+
+
+class TimeRollupService:
+    """
+    按机组、电厂维护日/月/年三级物化汇总，并随原始数据的写入与更正增量更新。
+
+    汇总以 (范围, 范围编码, 燃料编码) 为序列，每个序列保存 {时段: [合计, 有效读数数]}。
+    不同燃料的计量单位不同，因此燃料始终是序列键的一部分。
+    写入或更正时，先在批内用 NumPy 按 (序列, 时段) 归并出增量，再把增量累加到
+    对应时段上，代价与批内涉及的时段数成正比；读取某序列的一段时间只访问该序列
+    在区间内的时段，与原始读数条数无关。
+    NaN 视为缺失值：不计入合计，也不计入读数数。
+    存储在自身锁内回调监听者，重建与读取也在存储锁内进行，与其他线程的写入互斥。
+    """
+
+    def __init__(self, store, granularities=tuple(ROLLUP_GRANULARITIES), subscribe=True):
+        self.store = store
+        self.granularities = tuple(granularities)
+        self._tables = {}
+        with store.lock:
+            self.rebuild()
+            if subscribe:
+                store.subscribe(self)
+
+    def rebuild(self):
+        """从存储的全部数据重建汇总。"""
+        with self.store.lock:
+            self._tables = {(g, scope): {} for g in self.granularities for scope in ROLLUP_SCOPES}
+            view = self.store.columns()
+            if len(view):
+                values = getattr(view, self.store.VALUE_COLUMN)
+                self._apply(view, np.nan_to_num(values), (~np.isnan(values)).astype(np.int64))
+
+    # ---- 存储监听接口 -------------------------------------------------------
+
+    def rows_appended(self, batch):
+        values = getattr(batch, self.store.VALUE_COLUMN)
+        self._apply(batch, np.nan_to_num(values), (~np.isnan(values)).astype(np.int64))
+
+    def rows_updated(self, batch, old_values):
+        new_values = getattr(batch, self.store.VALUE_COLUMN)
+        delta = np.nan_to_num(new_values) - np.nan_to_num(old_values)
+        count_delta = (~np.isnan(new_values)).astype(np.int64) - (~np.isnan(old_values)).astype(np.int64)
+        self._apply(batch, delta, count_delta)
+
+    # ---- 增量归并 -----------------------------------------------------------
+
+    def _apply(self, batch, deltas, count_deltas):
+        if len(deltas) == 0:
+            return
+        fuel = batch.fuel
+        for granularity in self.granularities:
+            buckets = batch.period.astype(ROLLUP_GRANULARITIES[granularity]).astype(np.int64)
+            for scope in ROLLUP_SCOPES:
+                scope_codes = getattr(batch, scope)
+                key, (scope_u, fuel_u, bucket_u) = composite_key(scope_codes, fuel, buckets)
+                groups, inverse = np.unique(key, return_inverse=True)
+                sums = np.bincount(inverse, weights=deltas, minlength=len(groups))
+                counts = np.bincount(inverse, weights=count_deltas, minlength=len(groups)).astype(np.int64)
+                # 由组合键反推各组的 (范围编码, 燃料编码, 时段)
+                n_fuel, n_bucket = len(fuel_u), len(bucket_u)
+                table = self._tables[(granularity, scope)]
+                for group_key, total, count in zip(groups.tolist(), sums.tolist(), counts.tolist()):
+                    scope_idx, rest = divmod(group_key, n_fuel * n_bucket)
+                    fuel_idx, bucket_idx = divmod(rest, n_bucket)
+                    series = table.setdefault((int(scope_u[scope_idx]), int(fuel_u[fuel_idx])), {})
+                    cell = series.get(int(bucket_u[bucket_idx]))
+                    if cell is None:
+                        series[int(bucket_u[bucket_idx])] = [total, count]
+                    else:
+                        cell[0] += total
+                        cell[1] += count
+
+    # ---- 读取 ---------------------------------------------------------------
+
+    def _scope_code(self, plant_code, unit_code):
+        codecs = self.store.codecs
+        return codecs["unit"].code_of((plant_code, unit_code)) if unit_code else codecs["plant"].code_of(plant_code)
+
+    def fuels(self, plant_code, unit_code=None):
+        """电厂（unit_code 为空）或机组有汇总数据的燃料类型，按名称排序。"""
+        scope = "unit" if unit_code else "plant"
+        with self.store.lock:
+            scope_code = self._scope_code(plant_code, unit_code)
+            table = self._tables[(self.granularities[0], scope)]
+            fuel_codes = [fuel for code, fuel in table if code == scope_code] if scope_code is not None else []
+            return sorted(self.store.codecs["fuel"].decode(fuel) for fuel in fuel_codes)
+
+    def series(self, granularity, plant_code, unit_code=None, fuel_type="", start=None, end=None):
+        """
+        读取一个电厂（unit_code 为空）或机组某种燃料的汇总序列。
+
+        不同燃料的计量单位不同（t、万Nm3 等），合计只能按燃料分别读取；
+        需要全部燃料时先用 fuels() 列出，再逐个读取。
+        :param granularity: "day" / "month" / "year"
+        :param fuel_type: 燃料类型，必填
+        :param start: 起始时段（含），datetime / datetime64
+        :param end: 截止时段（不含）
+        :return: (时段 datetime64 数组, 合计数组, 有效读数数数组)
+        :raises ValueError: 粒度未维护或未指定燃料
+        """
+        if granularity not in self.granularities:
+            raise ValueError(f"未维护该粒度的汇总: {granularity}")
+        if not fuel_type:
+            raise ValueError("不同燃料的计量单位不同，读取汇总时必须指定燃料类型")
+        scope = "unit" if unit_code else "plant"
+        dtype = ROLLUP_GRANULARITIES[granularity]
+        lo = None if start is None else np.datetime64(start).astype(dtype).astype(np.int64)
+        hi = None if end is None else np.datetime64(end).astype(dtype).astype(np.int64)
+        with self.store.lock:
+            scope_code = self._scope_code(plant_code, unit_code)
+            fuel_code = self.store.codecs["fuel"].code_of(fuel_type)
+            cells = self._tables[(granularity, scope)].get((scope_code, fuel_code), {})
+            selected = sorted((bucket, total, count) for bucket, (total, count) in cells.items()
+                              if (lo is None or bucket >= lo) and (hi is None or bucket < hi))
+        buckets = np.array([bucket for bucket, _total, _count in selected], dtype=np.int64)
+        totals = np.array([total for _bucket, total, _count in selected], dtype=np.float64)
+        counts = np.array([count for _bucket, _total, count in selected], dtype=np.int64)
+        return buckets.astype(dtype), totals, counts
+
+    def total(self, granularity, plant_code, unit_code=None, fuel_type="", start=None, end=None):
+        """区间内某种燃料汇总值之和（fuel_type 必填，见 series）。"""
+        return float(self.series(granularity, plant_code, unit_code, fuel_type, start, end)[1].sum())
+
+
+# ---------------------------------------------------------------------------
+# 支撑文档：内容寻址、去重存储
+# ---------------------------------------------------------------------------
+
+@dataclass
+class BlobInfo:
+    """内容寻址存储中一个对象的元数据。"""
+
+    digest: str
+    size: int
+    chunk_size: int
+    chunk_hashes: List[str]
+    deduplicated: bool = False
+
+
+class ContentAddressedBlobStore:
+    """
+    以内容 SHA-256 为键的文件存储。
+
+    - 写入时按 chunk_size 分块流式读取并计算整体哈希与每块哈希，内存占用与文件大小无关；
+    - 内容相同的文件只保存一份：写入完成后若同哈希对象已存在，直接丢弃临时文件；
+    - 每个对象以单一连续文件保存，读取时通过 mmap 映射，
+      调用方拿到的是映射内存的 memoryview，大文件不会被整体复制进进程内存；
+    - 旁边的 .chunks 清单记录各块哈希，用于完整性校验与断点续传时的逐块比对。
+
+    目录布局：<root>/objects/<前2位>/<3-4位>/<digest>[.chunks]，<root>/tmp/ 为写入临时区。
+    """
+
+    def __init__(self, root, chunk_size=DOCUMENT_HASH_CHUNK_SIZE):
+        self.root = root
+        self.chunk_size = chunk_size
+        self._objects_dir = os.path.join(root, "objects")
+        self._tmp_dir = os.path.join(root, "tmp")
+        os.makedirs(self._objects_dir, exist_ok=True)
+        os.makedirs(self._tmp_dir, exist_ok=True)
+
+    def _path(self, digest):
+        if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+            raise DocumentStoreError(f"无效的内容哈希: {digest!r}")
+        return os.path.join(self._objects_dir, digest[:2], digest[2:4], digest)
+
+    def exists(self, digest):
+        return os.path.exists(self._path(digest))
+
+    # ---- 写入 ---------------------------------------------------------------
+
+    def put_file(self, path):
+        with open(path, "rb") as source:
+            return self.put_stream(source)
+
+    def put_bytes(self, data):
+        return self.put_stream(io.BytesIO(data))
+
+    def put_stream(self, stream):
+        """
+        从二进制流写入一个对象。
+
+        :return: BlobInfo；deduplicated 为 True 表示内容已存在、本次未占用新空间
+        """
+        total_hash = hashlib.sha256()
+        chunk_hashes = []
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                while True:
+                    chunk = stream.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    total_hash.update(chunk)
+                    chunk_hashes.append(hashlib.sha256(chunk).hexdigest())
+                    tmp.write(chunk)
+                    size += len(chunk)
+            digest = total_hash.hexdigest()
+            return self.commit_file(tmp_path, digest, size, chunk_hashes)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def commit_file(self, tmp_path, digest, size, chunk_hashes, chunk_size=None):
+        """
+        把已写好并算好哈希的临时文件登记为对象（调用方负责保证哈希正确）。
+
+        同哈希对象已存在时保留原对象，临时文件由调用方清理。
+        """
+        target = self._path(digest)
+        info = BlobInfo(digest, size, chunk_size or self.chunk_size, list(chunk_hashes))
+        if os.path.exists(target):
+            info.deduplicated = True
+            return info
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        manifest_tmp = tmp_path + ".chunks"
+        with open(manifest_tmp, "w", encoding="utf-8") as fh:
+            json.dump({"size": size, "chunk_size": info.chunk_size, "chunks": info.chunk_hashes}, fh)
+        # 先落清单再落内容：对象文件出现即代表清单已完整
+        os.replace(manifest_tmp, target + ".chunks")
+        os.replace(tmp_path, target)
+        return info
+
+    # ---- 读取 ---------------------------------------------------------------
+
+    def info(self, digest):
+        path = self._path(digest)
+        try:
+            with open(path + ".chunks", encoding="utf-8") as fh:
+                manifest = json.load(fh)
+        except FileNotFoundError:
+            raise DocumentStoreError(f"对象不存在: {digest}") from None
+        return BlobInfo(digest, manifest["size"], manifest["chunk_size"], manifest["chunks"])
+
+    @contextlib.contextmanager
+    def open_mapped(self, digest):
+        """
+        以只读 mmap 打开对象，产出 memoryview（空文件产出空 memoryview）。
+
+        memoryview 只能在 with 块内使用，退出时映射被关闭。
+        """
+        path = self._path(digest)
+        try:
+            fh = open(path, "rb")
+        except FileNotFoundError:
+            raise DocumentStoreError(f"对象不存在: {digest}") from None
+        with fh:
+            if os.fstat(fh.fileno()).st_size == 0:
+                yield memoryview(b"")
+                return
+            mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(mapped)
+            try:
+                yield view
+            finally:
+                view.release()
+                mapped.close()
+
+    def iter_blocks(self, digest, block_size=1024 * 1024):
+        """
+        逐块产出对象内容的字节串，供流式发送给查看器或写入压缩包。
+
+        每块从映射内存复制出来（最多 block_size 字节），生成器暂停期间不持有整文件副本。
+        """
+        with self.open_mapped(digest) as view:
+            for offset in range(0, len(view), block_size):
+                yield bytes(view[offset:offset + block_size])
+
+    def copy_to(self, digest, dest_path):
+        """把对象流式写出到目标路径。"""
+        with open(dest_path, "wb") as out:
+            for block in self.iter_blocks(digest):
+                out.write(block)
+        return dest_path
+
+    def verify(self, digest):
+        """重新计算整体与分块哈希，检查对象是否损坏。"""
+        info = self.info(digest)
+        total = hashlib.sha256()
+        with self.open_mapped(digest) as view:
+            for index, offset in enumerate(range(0, len(view), info.chunk_size)):
+                # 切片 memoryview 必须及时释放，否则无法关闭映射
+                with view[offset:offset + info.chunk_size] as chunk:
+                    total.update(chunk)
+                    if index >= len(info.chunk_hashes) or hashlib.sha256(chunk).hexdigest() != info.chunk_hashes[index]:
+                        return False
+        return total.hexdigest() == digest
+
+    # ---- 维护 ---------------------------------------------------------------
+
+    def iter_digests(self):
+        for dirpath, _dirnames, filenames in os.walk(self._objects_dir):
+            for name in filenames:
+                if len(name) == 64:
+                    yield name
+
+    def delete(self, digest):
+        path = self._path(digest)
+        for candidate in (path, path + ".chunks"):
+            if os.path.exists(candidate):
+                os.remove(candidate)
+
+    def collect_garbage(self, dead_digests):
+        """
+        删除给定的对象（由调用方根据持久化的引用计数确定已无引用），返回释放的字节数。
+
+        不会按“未出现在某个集合中”来删除：尚未登记的对象（例如刚完成上传、还未登记为文档）
+        以及其他会话登记的对象都不受影响。
+        """
+        freed = 0
+        for digest in set(dead_digests):
+            path = self._path(digest)
+            if os.path.exists(path):
+                freed += os.path.getsize(path)
+            self.delete(digest)
+        return freed
+
+
+class DocumentService:
+    """
+    支撑文档服务：上传、关联、读取与去重统计。
+
+    文件内容交给 ContentAddressedBlobStore；文档登记表（SupportingDocument 及各对象的引用计数）
+    持久化在存储目录下的 index.json 中，启动时重新加载，因此文档编号跨会话稳定。
+    同一内容被多次上传时复用已有文档记录，只追加关联。
+    登记表的每次修改都先写临时文件再替换，垃圾回收只删除登记表中引用计数为 0 的对象。
+    """
+
+    INDEX = "index.json"
+
+    def __init__(self, blob_store, index_path=None):
+        self.blob_store = blob_store
+        self.index_path = index_path or os.path.join(blob_store.root, self.INDEX)
+        self._documents = {}
+        self._by_hash = {}
+        self._next_id = 1
+        self._lock = threading.RLock()
+        self._load()
+
+    # ---- 登记表持久化 ---------------------------------------------------------
+
+    def _load(self):
+        try:
+            with open(self.index_path, encoding="utf-8") as fh:
+                data = json.load(fh)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as exc:
+            raise DocumentStoreError(f"文档登记表无法读取: {self.index_path}: {exc}") from exc
+        for item in data.get("documents", []):
+            document = SupportingDocument(
+                document_id=int(item["document_id"]),
+                file_name=item["file_name"],
+                content_hash=item["content_hash"],
+                size=int(item["size"]),
+                mime_type=item.get("mime_type", ""),
+                uploaded_at=datetime.fromisoformat(item["uploaded_at"]) if item.get("uploaded_at") else None,
+                uploaded_by=item.get("uploaded_by", ""),
+                record_refs=set(item.get("record_refs", ())),
+            )
+            self._documents[document.document_id] = document
+            self._by_hash[document.content_hash] = document
+        self._next_id = max(int(data.get("next_id", 1)), max(self._documents, default=0) + 1)
+
+    def _save(self):
+        data = {
+            "next_id": self._next_id,
+            "documents": [
+                {
+                    "document_id": doc.document_id,
+                    "file_name": doc.file_name,
+                    "content_hash": doc.content_hash,
+                    "size": doc.size,
+                    "mime_type": doc.mime_type,
+                    "uploaded_at": doc.uploaded_at.isoformat(timespec="seconds") if doc.uploaded_at else None,
+                    "uploaded_by": doc.uploaded_by,
+                    "record_refs": sorted(doc.record_refs),
+                    "refcount": len(doc.record_refs),
+                }
+                for doc in self._documents.values()
+            ],
+        }
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(data, fh, ensure_ascii=False)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, self.index_path)
+
+    # ---- 查询 ---------------------------------------------------------------
+
+    def documents(self):
+        with self._lock:
+            return list(self._documents.values())
+
+    def get(self, document_id):
+        return self._documents[document_id]
+
+    def find(self, document_id):
+        """按编号查找文档；不存在时返回 None。"""
+        return self._documents.get(document_id)
+
+    # ---- 登记与关联 -----------------------------------------------------------
+
+    def attach_file(self, path, record_refs=(), uploaded_by=""):
+        """
+        上传文件并关联到记录；内容已存在时只增加关联，不重复保存。
+
+        :return: (SupportingDocument, BlobInfo)
+        """
+        info = self.blob_store.put_file(path)
+        return self.register_blob(info, os.path.basename(path), record_refs, uploaded_by), info
+
+    def register_blob(self, info, file_name, record_refs=(), uploaded_by=""):
+        """为已写入存储的对象登记（或复用）文档记录，并立即写入登记表。"""
+        with self._lock:
+            document = self._by_hash.get(info.digest)
+            if document is None:
+                document = SupportingDocument(
+                    document_id=self._next_id,
+                    file_name=file_name,
+                    content_hash=info.digest,
+                    size=info.size,
+                    mime_type=mimetypes.guess_type(file_name)[0] or "",
+                    uploaded_at=datetime.now(),
+                    uploaded_by=uploaded_by,
+                )
+                self._next_id += 1
+                self._documents[document.document_id] = document
+                self._by_hash[info.digest] = document
+            document.record_refs.update(record_refs)
+            self._save()
+            return document
+
+    def link(self, document_id, record_ref):
+        with self._lock:
+            self._documents[document_id].record_refs.add(record_ref)
+            self._save()
+
+    def unlink(self, document_id, record_ref):
+        with self._lock:
+            self._documents[document_id].record_refs.discard(record_ref)
+            self._save()
+
+    def documents_for(self, record_ref):
+        return [doc for doc in self.documents() if record_ref in doc.record_refs]
+
+    def remove_orphans(self):
+        """
+        删除引用计数为 0（没有任何关联记录）的文档及其内容，返回释放的字节数。
+
+        只删除登记表中已登记、且关联已全部解除的对象；先从登记表移除并落盘，再删除内容，
+        中途失败时最多留下无人引用的对象文件，不会出现登记表指向已删除内容的情况。
+        """
+        with self._lock:
+            orphans = [doc for doc in self._documents.values() if not doc.record_refs]
+            for document in orphans:
+                del self._documents[document.document_id]
+                del self._by_hash[document.content_hash]
+            if orphans:
+                self._save()
+            return self.blob_store.collect_garbage(doc.content_hash for doc in orphans)
+
+    def storage_stats(self):
+        """
+        :return: {"documents", "links", "logical_bytes", "physical_bytes", "saved_bytes"}
+                 logical_bytes 为每个关联各存一份时需要的空间
+        """
+        documents = self.documents()
+        links = sum(len(doc.record_refs) for doc in documents)
+        logical = sum(doc.size * max(len(doc.record_refs), 1) for doc in documents)
+        physical = sum(doc.size for doc in documents)
+        return {
+            "documents": len(documents),
+            "links": links,
+            "logical_bytes": logical,
+            "physical_bytes": physical,
+            "saved_bytes": logical - physical,
+        }
+
+
+# ---------------------------------------------------------------------------
+# 可断点续传的分块上传
+# ---------------------------------------------------------------------------
+
+@dataclass
+class UploadProgress:
+    """上传进度快照，每提交一个分块回调一次。"""
+
+    source: str
+    bytes_committed: int
+    total_bytes: int
+    chunks_committed: int
+    chunks_total: int
+    elapsed: float
+    resumed_chunks: int = 0
+    finished: bool = False
+
+    @property
+    def fraction(self):
+        if self.finished or self.total_bytes == 0:
+            return 1.0
+        return self.bytes_committed / self.total_bytes
+
+    @property
+    def eta_seconds(self):
+        """只按本次会话实际传输的字节估算，续传跳过的分块不计入速度。"""
+        if self.finished:
+            return 0.0
+        transferred = self.chunks_committed - self.resumed_chunks
+        if transferred <= 0 or self.elapsed <= 0:
+            return None
+        per_chunk = self.elapsed / transferred
+        return per_chunk * (self.chunks_total - self.chunks_committed)
+
+
+def _hash_and_compress(data, level):
+    """在线程池中执行：hashlib 与 zlib 处理大块数据时都会释放 GIL，可真正并行。"""
+    return hashlib.sha256(data).hexdigest(), zlib.compress(data, level)
+
+
+class ResumableUploadService:
+    """
+    分块、可续传的文档上传服务。
+
+    - 源文件按存储的分块大小顺序读取，每块的 SHA-256 与压缩交给线程池并行计算，
+      在途分块数有上限，内存占用约为 (2 × 线程数) 个分块；
+    - 分块按顺序写入会话暂存目录，并以一行 JSON 追加到 committed.log 作为提交记录；
+    - 中断后对同一文件（路径、大小、修改时间均未变）重新上传时，从最后一个已提交的
+      分块之后继续；暂存分块缺失或损坏时从该处重新上传；
+    - 全部分块提交后解压拼接为对象文件，登记到 ContentAddressedBlobStore 并清理会话。
+    """
+
+    JOURNAL = "committed.log"
+    SESSION = "session.json"
+
+    def __init__(self, blob_store, staging_root=None, max_workers=None, compress_level=1):
+        self.blob_store = blob_store
+        self.chunk_size = blob_store.chunk_size
+        self.staging_root = staging_root or os.path.join(blob_store.root, "uploads")
+        self.max_workers = max_workers or min(8, os.cpu_count() or 2)
+        self.compress_level = compress_level
+        os.makedirs(self.staging_root, exist_ok=True)
+
+    # ---- 会话 ---------------------------------------------------------------
+
+    @staticmethod
+    def _fingerprint(path):
+        stat = os.stat(path)
+        return {"path": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def _session_dir(self, fingerprint):
+        key = hashlib.sha1(json.dumps(fingerprint, sort_keys=True).encode("utf-8")).hexdigest()
+        return os.path.join(self.staging_root, key)
+
+    def pending_sessions(self):
+        """列出未完成的上传会话：[(源文件路径, 已提交字节数, 总字节数), ...]"""
+        sessions = []
+        for name in sorted(os.listdir(self.staging_root)):
+            session_dir = os.path.join(self.staging_root, name)
+            try:
+                with open(os.path.join(session_dir, self.SESSION), encoding="utf-8") as fh:
+                    meta = json.load(fh)
+            except (OSError, ValueError):
+                continue
+            committed = self._read_journal(session_dir, meta["chunk_size"])
+            sessions.append((meta["path"], min(len(committed) * meta["chunk_size"], meta["size"]), meta["size"]))
+        return sessions
+
+    def discard_session(self, path):
+        shutil.rmtree(self._session_dir(self._fingerprint(path)), ignore_errors=True)
+
+    def _read_journal(self, session_dir, chunk_size):
+        """读取提交记录，只保留从 0 开始连续、暂存文件完好的分块。"""
+        committed = []
+        try:
+            with open(os.path.join(session_dir, self.JOURNAL), encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # 中断时写了半行
+                    if entry.get("index") != len(committed):
+                        break
+                    chunk_path = os.path.join(session_dir, f"{entry['index']:08d}.z")
+                    if not os.path.exists(chunk_path) or os.path.getsize(chunk_path) != entry["stored_size"]:
+                        break
+                    committed.append(entry)
+        except FileNotFoundError:
+            pass
+        return committed
+
+    def _open_session(self, path):
+        fingerprint = self._fingerprint(path)
+        session_dir = self._session_dir(fingerprint)
+        meta_path = os.path.join(session_dir, self.SESSION)
+        meta = dict(fingerprint, chunk_size=self.chunk_size)
+        try:
+            with open(meta_path, encoding="utf-8") as fh:
+                existing = json.load(fh)
+        except (OSError, ValueError):
+            existing = None
+        if existing != meta:
+            shutil.rmtree(session_dir, ignore_errors=True)
+            os.makedirs(session_dir)
+            with open(meta_path, "w", encoding="utf-8") as fh:
+                json.dump(meta, fh)
+            return session_dir, []
+        committed = self._read_journal(session_dir, self.chunk_size)
+        # 把提交记录截断到可信的部分，之后的追加才不会与残留行混在一起
+        with open(os.path.join(session_dir, self.JOURNAL), "w", encoding="utf-8") as fh:
+            for entry in committed:
+                fh.write(json.dumps(entry) + "\n")
+        return session_dir, committed
+
+    # ---- 上传 ---------------------------------------------------------------
+
+    def upload(self, path, progress_callback=None, cancel_event=None):
+        """
+        上传（或续传）一个文件到文档存储。
+
+        :param progress_callback: 每提交一个分块以 UploadProgress 回调（在调用线程中）
+        :param cancel_event: threading.Event，置位后等待在途分块提交完毕即停止
+        :return: BlobInfo
+        :raises ImportCancelledError: 上传被取消；已提交的分块保留，下次可续传
+        """
+        session_dir, committed = self._open_session(path)
+        total = os.path.getsize(path)
+        chunks_total = max(1, -(-total // self.chunk_size))
+        resumed = len(committed)
+        started = time.monotonic()
+
+        def report(finished=False):
+            if progress_callback is not None:
+                progress_callback(UploadProgress(
+                    source=path,
+                    bytes_committed=min(len(committed) * self.chunk_size, total),
+                    total_bytes=total,
+                    chunks_committed=len(committed),
+                    chunks_total=chunks_total,
+                    elapsed=time.monotonic() - started,
+                    resumed_chunks=resumed,
+                    finished=finished,
+                ))
+
+        report()
+        cancelled = False
+        with open(path, "rb") as source, \
+                open(os.path.join(session_dir, self.JOURNAL), "a", encoding="utf-8") as journal, \
+                ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="upload") as pool:
+            source.seek(len(committed) * self.chunk_size)
+            in_flight = deque()
+            index = len(committed)
+            exhausted = total == 0 and index > 0
+            while True:
+                while not exhausted and not cancelled and len(in_flight) < self.max_workers * 2:
+                    data = source.read(self.chunk_size)
+                    if not data and index > 0:
+                        exhausted = True
+                        break
+                    in_flight.append((index, len(data), pool.submit(_hash_and_compress, data, self.compress_level)))
+                    index += 1
+                    if len(data) < self.chunk_size:
+                        exhausted = True
+                if not in_flight:
+                    break
+                chunk_index, raw_size, future = in_flight.popleft()
+                digest, compressed = future.result()
+                self._commit_chunk(session_dir, journal, chunk_index, raw_size, digest, compressed)
+                committed.append({"index": chunk_index, "sha256": digest})
+                report()
+                if cancel_event is not None and cancel_event.is_set():
+                    cancelled = True
+        if cancelled and len(committed) < chunks_total:
+            raise ImportCancelledError("上传已取消，可稍后续传", source=path)
+
+        info = self._assemble(session_dir, committed)
+        shutil.rmtree(session_dir, ignore_errors=True)
+        report(finished=True)
+        return info
+
+    @staticmethod
+    def _commit_chunk(session_dir, journal, index, raw_size, digest, compressed):
+        chunk_path = os.path.join(session_dir, f"{index:08d}.z")
+        with open(chunk_path + ".part", "wb") as fh:
+            fh.write(compressed)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(chunk_path + ".part", chunk_path)
+        journal.write(json.dumps({"index": index, "sha256": digest, "raw_size": raw_size,
+                                  "stored_size": len(compressed)}) + "\n")
+        journal.flush()
+        os.fsync(journal.fileno())
+
+    def _assemble(self, session_dir, committed):
+        """按顺序解压分块并写成对象文件，同时校验分块哈希、计算整体哈希。"""
+        total_hash = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.join(self.blob_store.root, "tmp"))
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for entry in committed:
+                    with open(os.path.join(session_dir, f"{entry['index']:08d}.z"), "rb") as fh:
+                        data = zlib.decompress(fh.read())
+                    if hashlib.sha256(data).hexdigest() != entry["sha256"]:
+                        raise DocumentStoreError(f"分块 {entry['index']} 校验失败，请重新上传")
+                    total_hash.update(data)
+                    out.write(data)
+                    size += len(data)
+            chunk_hashes = [entry["sha256"] for entry in committed if size > 0]
+            return self.blob_store.commit_file(tmp_path, total_hash.hexdigest(), size, chunk_hashes)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+# ---------------------------------------------------------------------------
+# 外部数据源集成：电厂 DCS/SIS 历史库异步采集
+# ---------------------------------------------------------------------------
+
+@dataclass
+class HistorianTag:
+    """历史库测点到活动数据序列的映射；scale 用于单位换算（如 kg -> t 取 0.001）。"""
+
+    tag: str
+    plant_code: str
+    unit_code: str
+    fuel_type: str
+    scale: float = 1.0
+
+
+@dataclass
+class IngestionStats:
+    """采集运行统计。"""
+
+    readings_received: int = 0
+    readings_written: int = 0
+    readings_dropped: int = 0
+    batches_written: int = 0
+    poll_errors: int = 0
+    backpressure_waits: int = 0
+    last_write_seconds: float = 0.0
+
+
+class FileHistorianClient:
+    """
+    历史库的本地文件替身：每个数据源对应一个持续追加的 CSV 文件，
+    每行格式为 "tag,ISO 时间,数值"。每次 poll() 返回上次读取位置之后的完整行，
+    文件读取放到线程中执行，不阻塞事件循环。
+    """
+
+    def __init__(self, path, max_bytes_per_poll=4 * 1024 * 1024):
+        self.path = path
+        self.max_bytes_per_poll = max_bytes_per_poll
+        self._offset = 0
+
+    def _read_new(self):
+        try:
+            with open(self.path, "rb") as fh:
+                fh.seek(self._offset)
+                data = fh.read(self.max_bytes_per_poll)
+        except FileNotFoundError:
+            return []
+        end = data.rfind(b"\n")
+        if end < 0:
+            return []
+        self._offset += end + 1
+        readings = []
+        for line in data[:end].decode("utf-8").splitlines():
+            parts = line.split(",")
+            if len(parts) != 3:
+                continue
+            readings.append((parts[0].strip(), parts[1].strip(), parts[2].strip()))
+        return readings
+
+    async def poll(self):
+        """:return: [(tag, 时间文本, 数值文本), ...]"""
+        return await asyncio.to_thread(self._read_new)
+
+
+class HistorianIngestionService:
+    """
+    基于 asyncio 的历史库采集服务。
+
+    - 每个数据源一个轮询协程，全部在同一个事件循环中并发，不为每台机组开线程；
+    - 轮询结果放入有界队列，写入协程把多次轮询的读数合并成批，达到 batch_size 或
+      距上次写入超过 flush_interval 时一次性批量写入存储；
+    - 存储写入较慢时队列被填满，轮询协程在 put() 处等待，采集速度自动降到写入速度
+      （背压），内存占用以 max_pending × 单次轮询读数数为上限；
+    - 批量写入在单线程执行器中进行：存储自身有锁，写入可与界面线程的查询、更正并发，
+      单一写入线程保证各批按合并顺序依次写入；
+    - 写入失败时停止并取消全部轮询协程（否则它们会在已满的队列上永远等待），
+      异常记录在 error 中并由 run() 重新抛出。
+    """
+
+    def __init__(self, store, tags, clients, batch_size=10_000, flush_interval=1.0, poll_interval=1.0,
+                 max_pending=64):
+        """
+        :param store: ActivityColumnStore
+        :param tags: HistorianTag 列表
+        :param clients: 数据源列表，每个对象需提供 async poll() -> [(tag, 时间, 数值), ...]
+        """
+        self.store = store
+        self.tags = {tag.tag: tag for tag in tags}
+        self.clients = list(clients)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.poll_interval = poll_interval
+        self.max_pending = max_pending
+        self.stats = IngestionStats()
+        self.error = None
+        self._loop = None
+        self._stop = None
+        # 停止请求先记在线程安全的事件上：stop() 可能早于事件循环建立 asyncio.Event 被调用
+        self._stop_requested = threading.Event()
+        self._thread = None
+
+    async def _poll_source(self, client, queue):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                readings = await client.poll()
+            except Exception:  # 单个数据源故障不能拖垮其余机组的采集
+                self.stats.poll_errors += 1
+                logger.exception("历史库轮询失败: %r", client)
+                readings = []
+            if readings:
+                self.stats.readings_received += len(readings)
+                if queue.full():
+                    self.stats.backpressure_waits += 1
+                await queue.put(readings)
+            remaining = self.poll_interval - (time.monotonic() - started)
+            if remaining > 0:
+                try:
+                    await asyncio.wait_for(self._stop.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+    def _columns(self, readings):
+        """把一批原始读数转为存储的列；未配置的测点与无法解析的数值计入丢弃。"""
+        known = [r for r in readings if r[0] in self.tags]
+        self.stats.readings_dropped += len(readings) - len(known)
+        if not known:
+            return None
+        tags = [self.tags[r[0]] for r in known]
+        try:
+            periods = np.array([r[1] for r in known], dtype="datetime64[s]")
+            values = np.array([r[2] for r in known], dtype=np.float64)
+        except ValueError:
+            # 批内存在坏数据时退回逐条解析，只丢弃坏行
+            good = []
+            for tag, reading in zip(tags, known):
+                try:
+                    good.append((tag, np.datetime64(reading[1], "s"), float(reading[2])))
+                except ValueError:
+                    self.stats.readings_dropped += 1
+            if not good:
+                return None
+            tags = [g[0] for g in good]
+            periods = np.array([g[1] for g in good], dtype="datetime64[s]")
+            values = np.array([g[2] for g in good], dtype=np.float64)
+        scale = np.array([t.scale for t in tags], dtype=np.float64)
+        return ([t.plant_code for t in tags], [t.unit_code for t in tags], [t.fuel_type for t in tags],
+                periods, values * scale)
+
+    def _write_batch(self, readings):
+        columns = self._columns(readings)
+        if columns is None:
+            return 0
+        started = time.perf_counter()
+        self.store.append(*columns)
+        self.stats.last_write_seconds = time.perf_counter() - started
+        return len(columns[3])
+
+    async def _writer(self, queue, executor):
+        loop = asyncio.get_running_loop()
+        buffer = []
+        last_flush = time.monotonic()
+
+        async def flush():
+            nonlocal buffer, last_flush
+            if buffer:
+                batch, buffer = buffer, []
+                written = await loop.run_in_executor(executor, self._write_batch, batch)
+                self.stats.readings_written += written
+                self.stats.batches_written += 1
+            last_flush = time.monotonic()
+
+        while not (self._stop.is_set() and queue.empty()):
+            timeout = max(0.0, self.flush_interval - (time.monotonic() - last_flush))
+            try:
+                readings = await asyncio.wait_for(queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                await flush()
+                continue
+            buffer.extend(readings)
+            if len(buffer) >= self.batch_size:
+                await flush()
+        await flush()
+
+    async def run(self):
+        """
+        运行采集直到 stop() 被调用；退出前会把队列中剩余的读数写完。
+
+        :raises Exception: 批量写入失败时停止采集并抛出写入异常（同时记录在 error 中）
+        """
+        self._stop = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        if self._stop_requested.is_set():
+            self._stop.set()
+        queue = asyncio.Queue(maxsize=self.max_pending)
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="historian-writer") as executor:
+            writer = asyncio.create_task(self._writer(queue, executor))
+            pollers = [asyncio.create_task(self._poll_source(client, queue)) for client in self.clients]
+            await asyncio.wait([writer, *pollers], return_when=asyncio.FIRST_EXCEPTION)
+            if writer.done() and writer.exception() is not None:
+                self._stop.set()
+                for poller in pollers:
+                    poller.cancel()
+                await asyncio.gather(*pollers, return_exceptions=True)
+                self.error = writer.exception()
+                logger.error("历史库采集写入失败，已停止采集", exc_info=self.error)
+                raise self.error
+            await asyncio.gather(*pollers)
+            await writer
+
+    def _run_in_thread(self):
+        try:
+            asyncio.run(self.run())
+        except Exception as exc:  # 写入失败已在 run() 中记录到 error，其余异常同样不能被线程静默吞掉
+            if self.error is None:
+                logger.exception("历史库采集异常退出")
+                self.error = exc
+
+    def start_in_thread(self):
+        """在独立线程中运行事件循环，供 GUI 程序使用；采集异常退出后可从 error 读取原因。"""
+        self.error = None
+        self._stop_requested = threading.Event()
+        self._thread = threading.Thread(target=self._run_in_thread, name="historian-ingestion", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout=None):
+        """
+        请求停止（线程安全，可在事件循环启动前调用）；若由 start_in_thread 启动则最多等待 timeout 秒线程退出。
+
+        :return: 采集线程是否已经退出（未在线程中运行时为 True）
+        """
+        self._stop_requested.set()
+        loop, stop = self._loop, self._stop
+        if loop is not None and stop is not None:
+            try:
+                loop.call_soon_threadsafe(stop.set)
+            except RuntimeError:  # 事件循环已经结束
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return True
+
+
+# ---------------------------------------------------------------------------
+# 列式文件交换：Parquet / Arrow IPC
+# ---------------------------------------------------------------------------
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError as exc:  # pragma: no cover - 取决于运行环境
+        raise DataImportError("Parquet/Arrow 导入导出需要安装 pyarrow") from exc
+    return pyarrow
+
+
+def _columnar_format(path):
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix not in COLUMNAR_EXPORT_SUFFIXES:
+        raise DataImportError(f"不支持的列式文件类型: {suffix}", source=path)
+    return "parquet" if suffix == ".parquet" else "ipc"
+
+
+def _arrow_batch(pa, view, positions):
+    """把视图中的一段行转成 Arrow RecordBatch；分类列直接写成字典列，不逐值解码。"""
+    store = view.store
+    arrays, names = [], []
+    for name in view.column_names:
+        values = getattr(view, name)[positions]
+        if name == "unit":
+            labels = [label[1] for label in store.codecs["unit"].labels]
+            arrays.append(pa.DictionaryArray.from_arrays(pa.array(values, pa.int32()), pa.array(labels, pa.string())))
+        elif name in store.codecs:
+            labels = list(store.codecs[name].labels)
+            arrays.append(pa.DictionaryArray.from_arrays(pa.array(values, pa.int32()), pa.array(labels, pa.string())))
+        elif name == "period":
+            arrays.append(pa.array(values, pa.timestamp("s")))
+        else:
+            arrays.append(pa.array(values))
+        names.append(name)
+    return pa.RecordBatch.from_arrays(arrays, names=names)
+
+
+def export_columnar(result, path, row_group_size=PARQUET_ROW_GROUP_SIZE, compression="zstd"):
+    """
+    把查询结果导出为 Parquet（.parquet）或 Arrow IPC（.arrow/.feather）文件。
+
+    按行组逐批写出，内存中同时只有一个行组；分类列保存为字典编码。时间列在 Arrow IPC
+    中保存为 timestamp[s]；Parquet 没有秒精度的时间类型，写出时提升为 timestamp[ms]，
+    import_columnar 读回时再转换为秒。
+
+    :param result: ColumnQueryResult
+    :return: 导出的行数
+    """
+    pa = _require_pyarrow()
+    import pyarrow.parquet as pq
+
+    file_format = _columnar_format(path)
+    total = len(result)
+    schema = _arrow_batch(pa, result.view, result.positions(0, 0)).schema
+    if file_format == "parquet":
+        writer = pq.ParquetWriter(path, schema, compression=compression)
+        write = writer.write_batch
+    else:
+        sink = pa.OSFile(path, "wb")
+        writer = pa.ipc.new_file(sink, schema, options=pa.ipc.IpcWriteOptions(compression=compression))
+        write = writer.write_batch
+    try:
+        for offset in range(0, total, row_group_size):
+            write(_arrow_batch(pa, result.view, result.positions(offset, row_group_size)))
+    finally:
+        writer.close()
+        if file_format == "ipc":
+            sink.close()
+    return total
+
+
+def _filter_expression(query_filter):
+    """把 QueryFilter 转为 pyarrow.dataset 表达式，用于谓词下推。"""
+    import pyarrow.dataset as ds
+
+    expression = None
+    conditions = []
+    for column, value in (("plant", query_filter.plant_code), ("unit", query_filter.unit_code),
+                          ("fuel", query_filter.fuel_type), ("parameter", query_filter.parameter_type)):
+        if value:
+            conditions.append(ds.field(column) == value)
+    if query_filter.start is not None:
+        conditions.append(ds.field("period") >= np.datetime64(query_filter.start, "s"))
+    if query_filter.end is not None:
+        conditions.append(ds.field("period") < np.datetime64(query_filter.end, "s"))
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def scan_columnar(path, columns=None, query_filter=None, batch_size=PARQUET_ROW_GROUP_SIZE):
+    """
+    流式读取 Parquet/Arrow 文件。
+
+    只读取 columns 指定的列（列裁剪）；query_filter 作为表达式下推给扫描器，
+    Parquet 会先用行组统计信息跳过不可能命中的行组，再在批内过滤。
+
+    :return: pyarrow.RecordBatch 迭代器
+    """
+    _require_pyarrow()
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(path, format="parquet" if _columnar_format(path) == "parquet" else "arrow")
+    expression = _filter_expression(query_filter) if query_filter is not None else None
+    return dataset.to_batches(columns=columns, filter=expression, batch_size=batch_size)
+
+
+def read_columnar_table(path, columns=None, query_filter=None):
+    """读取为 pyarrow.Table（供分析人员在 Notebook 中使用，可直接 .to_pandas()）。"""
+    pa = _require_pyarrow()
+    return pa.Table.from_batches(list(scan_columnar(path, columns, query_filter)))
+
+
+def import_columnar(path, store, query_filter=None):
+    """
+    把 Parquet/Arrow 文件中的数据追加到列式存储。
+
+    字典列按“每个不同取值编码一次”的方式转换，数值与时间列直接取 NumPy 数组。
+
+    :return: 导入的行数
+    """
+    pa = _require_pyarrow()
+    import pyarrow.compute as pc
+
+    wanted = list(store.CATEGORICAL_COLUMNS) + ["period"] + list(store.NUMERIC_COLUMNS)
+    imported = 0
+    try:
+        batches = scan_columnar(path, wanted, query_filter)
+        for batch in batches:
+            if batch.num_rows == 0:
+                continue
+            columns = {}
+            unit_dict = None
+            for name in wanted:
+                array = batch.column(batch.schema.get_field_index(name))
+                if name in store.codecs:
+                    if not pa.types.is_dictionary(array.type):
+                        array = pc.dictionary_encode(array)
+                    labels = array.dictionary.to_pylist()
+                    indices = array.indices.to_numpy(zero_copy_only=False)
+                    if name == "unit":
+                        unit_dict = (labels, indices)
+                        continue
+                    columns[name] = store.encode_dictionary(name, labels, indices)
+                elif name == "period":
+                    columns[name] = array.cast(pa.timestamp("s")).to_numpy(zero_copy_only=False).astype("datetime64[s]")
+                else:
+                    columns[name] = array.to_numpy(zero_copy_only=False).astype(store.NUMERIC_COLUMNS[name])
+            columns["unit"] = store.encode_unit_pairs(columns["plant"], *unit_dict)
+            imported += len(store.append_encoded(columns))
+    except (pa.ArrowInvalid, KeyError, OSError) as exc:
+        raise DataImportError(f"读取列式文件失败: {exc}", source=path) from exc
+    return imported
+
+
+def export_csv(result, path, page_size=50_000, encoding="utf-8-sig"):
+    """按页流式导出 CSV，表头与导入模板一致。"""
+    headers = {"plant": "plant_code", "unit": "unit_code", "fuel": "fuel_type", "period": "period_start"}
+    names = [name for name in result.column_names if name != "row_id"]
+    with open(path, "w", newline="", encoding=encoding) as fh:
+        writer = csv.writer(fh)
+        writer.writerow([headers.get(name, name) for name in names])
+        for offset in range(0, len(result), page_size):
+            writer.writerows(result.fetch(offset, page_size, names))
+    return len(result)
@@ -6,17 +6,98 @@
 # @Software: PyCharm / VSCode
 # @Description: data_acquisition 模块的 activity_data_form.py 文件。
 
-# Python 标准库导入
-import sys
-import os
+# PyQt5 相关导入
+from PyQt5.QtCore import QDateTime, pyqtSlot
+from PyQt5.QtWidgets import (
+    QDateTimeEdit, QDoubleSpinBox, QFormLayout, QGroupBox, QLabel, QLineEdit, QMessageBox,
+    QPushButton, QVBoxLayout, QWidget,
+)
 
-# PyQt5 相关导入 (根据实际需要调整)
-# from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel
-# from PyQt5.QtCore import Qt, pyqtSignal, QObject
+# 项目内部模块导入
+from ..models import ActivityData
+from ..widgets.file_upload_widget import FileUploadWidget
 
-# 项目内部模块导入 (示例)
-# from ..core.base_controller import BaseController
-# from ...utils.logger_setup import logger
 
+class ActivityDataForm(QWidget):
+    """活动数据录入表单：单条手工录入 + 批量文件导入。"""
 
-pass # 请在此处实现具体功能
+    def __init__(self, controller, parent=None):
+        """
+        :param controller: DataAcquisitionController
+        """
+        super().__init__(parent)
+        self.controller = controller
+
+        self.plant_edit = QLineEdit(self)
+        self.unit_edit = QLineEdit(self)
+        self.fuel_edit = QLineEdit(self)
+        self.period_edit = QDateTimeEdit(QDateTime.currentDateTime(), self)
+        self.period_edit.setDisplayFormat("yyyy-MM-dd HH:mm")
+        self.quantity_spin = QDoubleSpinBox(self)
+        self.quantity_spin.setRange(0, 1e12)
+        self.quantity_spin.setDecimals(4)
+        self.measure_unit_edit = QLineEdit(self)
+        self.save_button = QPushButton("保存", self)
+
+        form = QFormLayout()
+        form.addRow("电厂编码", self.plant_edit)
+        form.addRow("机组编码", self.unit_edit)
+        form.addRow("燃料类型", self.fuel_edit)
+        form.addRow("统计时段", self.period_edit)
+        form.addRow("消耗量", self.quantity_spin)
+        form.addRow("计量单位", self.measure_unit_edit)
+        form.addRow(self.save_button)
+        manual_box = QGroupBox("手工录入", self)
+        manual_box.setLayout(form)
+
+        self.upload_widget = FileUploadWidget(parent=self)
+        self.import_summary_label = QLabel("", self)
+        import_layout = QVBoxLayout()
+        import_layout.addWidget(self.upload_widget)
+        import_layout.addWidget(self.import_summary_label)
+        import_box = QGroupBox("批量导入 (CSV / XLSX)", self)
+        import_box.setLayout(import_layout)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(manual_box)
+        layout.addWidget(import_box)
+        layout.addStretch(1)
+
+        self.save_button.clicked.connect(self._save_manual_record)
+        self.upload_widget.file_selected.connect(self._start_import)
+
+    def _save_manual_record(self):
+        record = ActivityData(
+            plant_code=self.plant_edit.text().strip(),
+            unit_code=self.unit_edit.text().strip(),
+            fuel_type=self.fuel_edit.text().strip(),
+            period_start=self.period_edit.dateTime().toPyDateTime(),
+            quantity=self.quantity_spin.value(),
+            measure_unit=self.measure_unit_edit.text().strip(),
+            data_source="手工录入",
+        )
+        if not (record.plant_code and record.unit_code and record.fuel_type):
+            QMessageBox.warning(self, "提示", "电厂、机组与燃料类型不能为空")
+            return
+        self.controller.activity_writer([record])
+
+    @pyqtSlot(str)
+    def _start_import(self, path):
+        self.controller.start_activity_import(path, connect=self._bind_import_worker)
+
+    def _bind_import_worker(self, worker):
+        self.upload_widget.bind_import_worker(worker)
+        worker.progress.connect(self._on_import_progress)
+        worker.finished.connect(self._on_import_finished)
+
+    @pyqtSlot(object)
+    def _on_import_progress(self, progress):
+        self.import_summary_label.setText(f"已处理 {progress.chunks_done} 个分块")
+
+    @pyqtSlot(object)
+    def _on_import_finished(self, result):
+        if result.errors:
+            preview = "\n".join(f"第 {e.line_no} 行 {e.field}: {e.message}" for e in result.errors[:20])
+            self.import_summary_label.setText(f"部分行被拒绝（显示前 20 条）：\n{preview}")
+        else:
+            self.import_summary_label.setText("")
@@ -6,17 +6,133 @@
 # @Software: PyCharm / VSCode
 # @Description: data_acquisition 模块的 data_query_widget.py 文件。
 
-# Python 标准库导入
-import sys
-import os
+# PyQt5 相关导入
+from PyQt5.QtCore import QDateTime, Qt
+from PyQt5.QtGui import QFont
+from PyQt5.QtWidgets import (
+    QCheckBox, QComboBox, QDateTimeEdit, QGridLayout, QGroupBox, QLabel, QLineEdit, QPlainTextEdit,
+    QPushButton, QSplitter, QVBoxLayout, QWidget,
+)
 
-# PyQt5 相关导入 (根据实际需要调整)
-# from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel
-# from PyQt5.QtCore import Qt, pyqtSignal, QObject
+# 项目内部模块导入
+from ..services import QueryFilter
+from ..widgets.data_table_view import DEFAULT_ACTIVITY_COLUMNS, DataTableView
 
-# 项目内部模块导入 (示例)
-# from ..core.base_controller import BaseController
-# from ...utils.logger_setup import logger
+PARAMETER_COLUMNS = (
+    ("plant", "电厂"),
+    ("unit", "机组"),
+    ("fuel", "燃料"),
+    ("parameter", "参数类型"),
+    ("period", "统计时段"),
+    ("value", "数值"),
+)
 
 
-pass # 请在此处实现具体功能
+class DataQueryWidget(QWidget):
+    """
+    活动数据 / 参数数据查询浏览界面。
+
+    查询条件交给查询服务规划执行，下方“执行计划”面板显示本次查询选用的索引、
+    索引条件、剩余过滤条件与各候选方案的估算行数。
+    """
+
+    def __init__(self, controller, parent=None):
+        super().__init__(parent)
+        self.controller = controller
+        self._last_result = None
+
+        self.dataset_combo = QComboBox(self)
+        self.dataset_combo.addItem("活动数据", "activity")
+        self.dataset_combo.addItem("参数数据", "parameter")
+        self.plant_edit = QLineEdit(self)
+        self.unit_edit = QLineEdit(self)
+        self.fuel_edit = QLineEdit(self)
+        self.parameter_edit = QLineEdit(self)
+        self.start_check = QCheckBox("起始", self)
+        self.start_edit = QDateTimeEdit(QDateTime.currentDateTime().addMonths(-1), self)
+        self.end_check = QCheckBox("截止", self)
+        self.end_edit = QDateTimeEdit(QDateTime.currentDateTime(), self)
+        for edit in (self.start_edit, self.end_edit):
+            edit.setDisplayFormat("yyyy-MM-dd HH:mm")
+            edit.setCalendarPopup(True)
+        self.query_button = QPushButton("查询", self)
+        self.summary_label = QLabel("", self)
+
+        grid = QGridLayout()
+        grid.addWidget(QLabel("数据集"), 0, 0)
+        grid.addWidget(self.dataset_combo, 0, 1)
+        grid.addWidget(QLabel("电厂"), 0, 2)
+        grid.addWidget(self.plant_edit, 0, 3)
+        grid.addWidget(QLabel("机组"), 0, 4)
+        grid.addWidget(self.unit_edit, 0, 5)
+        grid.addWidget(QLabel("燃料"), 1, 0)
+        grid.addWidget(self.fuel_edit, 1, 1)
+        grid.addWidget(QLabel("参数类型"), 1, 2)
+        grid.addWidget(self.parameter_edit, 1, 3)
+        grid.addWidget(self.start_check, 2, 0)
+        grid.addWidget(self.start_edit, 2, 1)
+        grid.addWidget(self.end_check, 2, 2)
+        grid.addWidget(self.end_edit, 2, 3)
+        grid.addWidget(self.query_button, 2, 5)
+        filter_box = QGroupBox("查询条件", self)
+        filter_box.setLayout(grid)
+
+        self.activity_table = DataTableView(self._query_activity, DEFAULT_ACTIVITY_COLUMNS, parent=self)
+        self.parameter_table = DataTableView(self._query_parameter, PARAMETER_COLUMNS, parent=self)
+        self.parameter_table.hide()
+
+        self.plan_text = QPlainTextEdit(self)
+        self.plan_text.setReadOnly(True)
+        self.plan_text.setFont(QFont("Monospace"))
+        plan_box = QGroupBox("执行计划", self)
+        plan_layout = QVBoxLayout(plan_box)
+        plan_layout.addWidget(self.plan_text)
+
+        tables = QWidget(self)
+        tables_layout = QVBoxLayout(tables)
+        tables_layout.setContentsMargins(0, 0, 0, 0)
+        tables_layout.addWidget(self.activity_table)
+        tables_layout.addWidget(self.parameter_table)
+        splitter = QSplitter(Qt.Vertical, self)
+        splitter.addWidget(tables)
+        splitter.addWidget(plan_box)
+        splitter.setStretchFactor(0, 4)
+        splitter.setStretchFactor(1, 1)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(filter_box)
+        layout.addWidget(self.summary_label)
+        layout.addWidget(splitter, 1)
+
+        self.query_button.clicked.connect(self.run_query)
+        self.dataset_combo.currentIndexChanged.connect(self._switch_dataset)
+
+    def current_filter(self):
+        return QueryFilter(
+            plant_code=self.plant_edit.text().strip(),
+            unit_code=self.unit_edit.text().strip(),
+            fuel_type=self.fuel_edit.text().strip(),
+            parameter_type=self.parameter_edit.text().strip(),
+            start=self.start_edit.dateTime().toPyDateTime() if self.start_check.isChecked() else None,
+            end=self.end_edit.dateTime().toPyDateTime() if self.end_check.isChecked() else None,
+        )
+
+    def _switch_dataset(self):
+        is_activity = self.dataset_combo.currentData() == "activity"
+        self.activity_table.setVisible(is_activity)
+        self.parameter_table.setVisible(not is_activity)
+
+    def _query_activity(self, query_filter):
+        self._last_result = self.controller.activity_query.query(query_filter)
+        return self._last_result
+
+    def _query_parameter(self, query_filter):
+        self._last_result = self.controller.parameter_query.query(query_filter)
+        return self._last_result
+
+    def run_query(self):
+        table = self.activity_table if self.dataset_combo.currentData() == "activity" else self.parameter_table
+        table.set_filter(self.current_filter())
+        plan = self._last_result.plan
+        self.summary_label.setText(f"共 {len(self._last_result):,} 行，查询耗时 {plan.elapsed * 1000:.1f} ms")
+        self.plan_text.setPlainText(plan.explain())
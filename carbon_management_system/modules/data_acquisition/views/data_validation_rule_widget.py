@@ -6,17 +6,176 @@
 # @Software: PyCharm / VSCode
 # @Description: data_acquisition 模块的 data_validation_rule_widget.py 文件。
 
-# Python 标准库导入
-import sys
-import os
+# PyQt5 相关导入
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import (
+    QComboBox, QHBoxLayout, QHeaderView, QLabel, QMessageBox, QPushButton, QTableWidget,
+    QTableWidgetItem, QVBoxLayout, QWidget,
+)
 
-# PyQt5 相关导入 (根据实际需要调整)
-# from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel
-# from PyQt5.QtCore import Qt, pyqtSignal, QObject
+# 项目内部模块导入
+from ..models import RULE_TARGET_ACTIVITY, RULE_TARGET_PARAMETER, RULE_TYPES, ValidationRule
 
-# 项目内部模块导入 (示例)
-# from ..core.base_controller import BaseController
-# from ...utils.logger_setup import logger
+_RULE_TYPE_LABELS = {
+    "range": "数值范围",
+    "jump": "月度环比跳变",
+    "consistency": "参数一致性",
+    "completeness": "完整性",
+}
 
+_PARAM_HINTS = {
+    "range": "min_value=0; max_value=100",
+    "jump": "max_change_ratio=0.3",
+    "consistency": "numerator=carbon_content; denominator=ncv; min_ratio=0.024; max_ratio=0.029",
+    "completeness": "max_gap_hours=1",
+}
 
-pass # 请在此处实现具体功能
+# 这些参数的值是参数类型名称，其余参数按数值解析
+_TEXT_PARAMS = ("numerator", "denominator", "aggregate")
+
+COL_ID, COL_NAME, COL_TYPE, COL_TARGET, COL_FUEL, COL_PARAMETER, COL_PARAMS, COL_ENABLED = range(8)
+
+
+def parse_rule_params(text):
+    """把 "key=value; key=value" 形式的文本解析为规则参数字典。"""
+    params = {}
+    for part in text.replace("；", ";").split(";"):
+        if not part.strip():
+            continue
+        key, sep, value = part.partition("=")
+        if not sep:
+            raise ValueError(f"参数格式应为 key=value: {part.strip()}")
+        key, value = key.strip(), value.strip()
+        params[key] = value if key in _TEXT_PARAMS else float(value)
+    return params
+
+
+def format_rule_params(params):
+    return "; ".join(f"{key}={value}" for key, value in params.items())
+
+
+class DataValidationRuleWidget(QWidget):
+    """
+    数据校验规则配置界面。
+
+    规则在“应用规则”时整体提交给控制器编译为批量数组谓词；
+    “执行校验”对已入库的活动数据与参数数据整体求值并汇总违规数。
+    """
+
+    HEADERS = ("编号", "名称", "类型", "对象", "燃料", "参数类型", "规则参数", "启用")
+
+    def __init__(self, controller, parent=None):
+        super().__init__(parent)
+        self.controller = controller
+
+        self.table = QTableWidget(0, len(self.HEADERS), self)
+        self.table.setHorizontalHeaderLabels(self.HEADERS)
+        self.table.horizontalHeader().setSectionResizeMode(COL_PARAMS, QHeaderView.Stretch)
+        self.add_button = QPushButton("添加规则", self)
+        self.remove_button = QPushButton("删除规则", self)
+        self.apply_button = QPushButton("应用规则", self)
+        self.run_button = QPushButton("执行校验", self)
+        self.result_label = QLabel("", self)
+        self.result_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+
+        buttons = QHBoxLayout()
+        for button in (self.add_button, self.remove_button, self.apply_button, self.run_button):
+            buttons.addWidget(button)
+        buttons.addStretch(1)
+        layout = QVBoxLayout(self)
+        layout.addLayout(buttons)
+        layout.addWidget(self.table, 1)
+        layout.addWidget(self.result_label)
+
+        self.add_button.clicked.connect(lambda: self.add_rule_row())
+        self.remove_button.clicked.connect(self._remove_selected)
+        self.apply_button.clicked.connect(self.apply_rules)
+        self.run_button.clicked.connect(self.run_validation)
+
+        for rule in controller.validation_engine.rules:
+            self.add_rule_row(rule)
+
+    def add_rule_row(self, rule=None):
+        if rule is None:
+            next_id = max([r.rule_id for r in self._safe_rules()] + [0]) + 1
+            rule = ValidationRule(next_id, f"规则{next_id}", "range", params={})
+        row = self.table.rowCount()
+        self.table.insertRow(row)
+        self.table.setItem(row, COL_ID, QTableWidgetItem(str(rule.rule_id)))
+        self.table.setItem(row, COL_NAME, QTableWidgetItem(rule.name))
+        type_combo = QComboBox(self.table)
+        for rule_type in RULE_TYPES:
+            type_combo.addItem(_RULE_TYPE_LABELS[rule_type], rule_type)
+        type_combo.setCurrentIndex(RULE_TYPES.index(rule.rule_type))
+        self.table.setCellWidget(row, COL_TYPE, type_combo)
+        target_combo = QComboBox(self.table)
+        target_combo.addItem("活动数据", RULE_TARGET_ACTIVITY)
+        target_combo.addItem("参数数据", RULE_TARGET_PARAMETER)
+        target_combo.setCurrentIndex(0 if rule.target == RULE_TARGET_ACTIVITY else 1)
+        self.table.setCellWidget(row, COL_TARGET, target_combo)
+        self.table.setItem(row, COL_FUEL, QTableWidgetItem(rule.fuel_type))
+        self.table.setItem(row, COL_PARAMETER, QTableWidgetItem(rule.parameter_type))
+        params_item = QTableWidgetItem(format_rule_params(rule.params))
+        params_item.setToolTip(_PARAM_HINTS[rule.rule_type])
+        self.table.setItem(row, COL_PARAMS, params_item)
+        enabled_item = QTableWidgetItem()
+        enabled_item.setFlags(Qt.ItemIsUserCheckable | Qt.ItemIsEnabled)
+        enabled_item.setCheckState(Qt.Checked if rule.enabled else Qt.Unchecked)
+        self.table.setItem(row, COL_ENABLED, enabled_item)
+        type_combo.currentIndexChanged.connect(
+            lambda _i, combo=type_combo, item=params_item: item.setToolTip(_PARAM_HINTS[combo.currentData()]))
+
+    def _remove_selected(self):
+        for row in sorted({index.row() for index in self.table.selectedIndexes()}, reverse=True):
+            self.table.removeRow(row)
+
+    def _safe_rules(self):
+        try:
+            return self.rules()
+        except ValueError:
+            return []
+
+    def rules(self):
+        """
+        读取表格中的全部规则。
+
+        :raises ValueError: 编号或规则参数格式错误
+        """
+        rules = []
+        for row in range(self.table.rowCount()):
+            text = lambda col: (self.table.item(row, col).text().strip() if self.table.item(row, col) else "")
+            rules.append(ValidationRule(
+                rule_id=int(text(COL_ID)),
+                name=text(COL_NAME),
+                rule_type=self.table.cellWidget(row, COL_TYPE).currentData(),
+                target=self.table.cellWidget(row, COL_TARGET).currentData(),
+                fuel_type=text(COL_FUEL),
+                parameter_type=text(COL_PARAMETER),
+                params=parse_rule_params(text(COL_PARAMS)),
+                enabled=self.table.item(row, COL_ENABLED).checkState() == Qt.Checked,
+            ))
+        return rules
+
+    def apply_rules(self):
+        try:
+            rules = self.rules()
+            self.controller.set_validation_rules(rules)
+        except (ValueError, KeyError) as exc:
+            QMessageBox.warning(self, "规则配置错误", str(exc))
+            return False
+        self.result_label.setText(f"已应用 {sum(r.enabled for r in rules)} 条启用规则")
+        return True
+
+    def run_validation(self):
+        if not self.apply_rules():
+            return
+        names = {rule.rule_id: rule.name for rule in self.controller.validation_engine.rules}
+        lines = []
+        for title, validate in (("活动数据", self.controller.validate_activity),
+                                ("参数数据", self.controller.validate_parameters)):
+            view, report = validate()
+            lines.append(f"{title}: 校验 {report.rows_checked:,} 行，违规 {len(report.violating_rows()):,} 行，"
+                         f"{report.rows_per_second:,.0f} 行/秒")
+            for rule_id, rows in sorted(report.by_rule().items()):
+                lines.append(f"    #{rule_id} {names.get(rule_id, '')}: {len(rows):,} 行")
+        self.result_label.setText("\n".join(lines))
@@ -7,16 +7,180 @@
 # @Description: data_acquisition 模块的 document_management_widget.py 文件。
 
 # Python 标准库导入
-import sys
 import os
+import tempfile
 
-# PyQt5 相关导入 (根据实际需要调整)
-# from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel
-# from PyQt5.QtCore import Qt, pyqtSignal, QObject
+# PyQt5 相关导入
+from PyQt5.QtCore import QUrl
+from PyQt5.QtGui import QDesktopServices
+from PyQt5.QtWidgets import (
+    QFileDialog, QHBoxLayout, QHeaderView, QInputDialog, QLabel, QLineEdit, QMessageBox, QPushButton,
+    QTableWidget, QTableWidgetItem, QVBoxLayout, QWidget,
+)
 
-# 项目内部模块导入 (示例)
-# from ..core.base_controller import BaseController
-# from ...utils.logger_setup import logger
+# 项目内部模块导入
+from ....utils.exceptions import DocumentStoreError
+from ....utils.helpers import format_bytes
+from ..widgets.file_upload_widget import FileUploadWidget
 
 
-pass # 请在此处实现具体功能
+class DocumentManagementWidget(QWidget):
+    """
+    支撑文档管理界面。
+
+    上传在后台线程分块进行、可断点续传，文件进入内容寻址存储，内容相同的文件只保存一份；
+    查看时从映射内存分块写出到临时文件后交给系统查看器，不会把整个文件读入内存；
+    临时文件放在界面独占的临时目录中，每个文档（按内容哈希）只写出一次，界面关闭时整体删除。
+    """
+
+    HEADERS = ("编号", "文件名", "大小", "内容哈希", "关联记录")
+
+    def __init__(self, controller, parent=None):
+        super().__init__(parent)
+        self.controller = controller
+        self._view_dir = None
+
+        self.record_edit = QLineEdit(self)
+        self.record_edit.setPlaceholderText("关联记录，如 activity:1024；多个以逗号分隔")
+        self.link_button = QPushButton("关联到记录", self)
+        self.open_button = QPushButton("查看", self)
+        self.export_button = QPushButton("导出", self)
+        self.table = QTableWidget(0, len(self.HEADERS), self)
+        self.table.setHorizontalHeaderLabels(self.HEADERS)
+        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.stats_label = QLabel("", self)
+        self.upload_widget = FileUploadWidget("所有文件 (*)", parent=self)
+        self.pending_label = QLabel("", self)
+
+        top = QHBoxLayout()
+        top.addWidget(self.record_edit, 1)
+        for button in (self.link_button, self.open_button, self.export_button):
+            top.addWidget(button)
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.upload_widget)
+        layout.addWidget(self.pending_label)
+        layout.addLayout(top)
+        layout.addWidget(self.table, 1)
+        layout.addWidget(self.stats_label)
+
+        self.upload_widget.file_selected.connect(self._upload)
+        self.link_button.clicked.connect(self._link)
+        self.open_button.clicked.connect(self._open)
+        self.export_button.clicked.connect(self._export)
+        self.refresh()
+        self._show_pending_uploads()
+
+    @property
+    def service(self):
+        return self.controller.document_service
+
+    def _record_refs(self):
+        return [ref.strip() for ref in self.record_edit.text().split(",") if ref.strip()]
+
+    def _selected_document(self):
+        row = self.table.currentRow()
+        if row < 0:
+            return None
+        return self.service.get(int(self.table.item(row, 0).text()))
+
+    def refresh(self):
+        if self.pending_label.text():
+            self._show_pending_uploads()
+        documents = sorted(self.service.documents(), key=lambda d: d.document_id)
+        self.table.setRowCount(len(documents))
+        for row, doc in enumerate(documents):
+            values = (str(doc.document_id), doc.file_name, format_bytes(doc.size), doc.content_hash[:16],
+                      ", ".join(sorted(doc.record_refs)))
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if col == 3:
+                    item.setToolTip(doc.content_hash)
+                self.table.setItem(row, col, item)
+        stats = self.service.storage_stats()
+        self.stats_label.setText(
+            f"{stats['documents']} 个文件 / {stats['links']} 个关联，实际占用 {format_bytes(stats['physical_bytes'])}，"
+            f"去重节省 {format_bytes(stats['saved_bytes'])}"
+        )
+
+    def _upload(self, path):
+        self.controller.start_document_upload(path, self._record_refs(), connect=self._bind_upload_worker)
+
+    def _bind_upload_worker(self, worker):
+        self.upload_widget.bind_upload_worker(worker)
+        worker.finished.connect(lambda _doc: self.refresh())
+        worker.cancelled.connect(self._show_pending_uploads)
+
+    def _show_pending_uploads(self):
+        pending = self.controller.upload_service.pending_sessions()
+        if not pending:
+            self.pending_label.setText("")
+            return
+        lines = [f"{os.path.basename(path)}：已提交 {format_bytes(done)} / {format_bytes(total)}"
+                 for path, done, total in pending]
+        self.pending_label.setText("未完成的上传（重新选择同一文件即可续传）：\n" + "\n".join(lines))
+
+    def _link(self):
+        doc = self._selected_document()
+        if doc is None:
+            return
+        refs = self._record_refs()
+        if not refs:
+            text, ok = QInputDialog.getText(self, "关联到记录", "记录编号 (如 activity:1024)")
+            refs = [text.strip()] if ok and text.strip() else []
+        for ref in refs:
+            self.service.link(doc.document_id, ref)
+        self.refresh()
+
+    def _open(self):
+        doc = self._selected_document()
+        if doc is None:
+            return
+        try:
+            path = self._view_copy(doc)
+        except (OSError, DocumentStoreError) as exc:
+            QMessageBox.warning(self, "打开失败", str(exc))
+            return
+        QDesktopServices.openUrl(QUrl.fromLocalFile(path))
+
+    def _view_copy(self, doc):
+        """
+        返回供系统查看器打开的临时副本路径，同一内容已写出过时直接复用。
+
+        先写入 .part 文件再改名，写出失败不会留下半个文件被下次当作完整副本复用。
+        """
+        if self._view_dir is None:
+            self._view_dir = tempfile.TemporaryDirectory(prefix="cms_documents_")
+        suffix = os.path.splitext(doc.file_name)[1]
+        path = os.path.join(self._view_dir.name, f"doc{doc.document_id}_{doc.content_hash[:16]}{suffix}")
+        if not os.path.exists(path):
+            partial = path + ".part"
+            try:
+                self.service.blob_store.copy_to(doc.content_hash, partial)
+                os.replace(partial, path)
+            finally:
+                if os.path.exists(partial):
+                    os.remove(partial)
+        return path
+
+    def closeEvent(self, event):
+        # 查看器仍占用文件时（Windows）删除会失败，留给 TemporaryDirectory 在进程退出时再清理
+        if self._view_dir is not None:
+            try:
+                self._view_dir.cleanup()
+                self._view_dir = None
+            except OSError:
+                pass
+        super().closeEvent(event)
+
+    def _export(self):
+        doc = self._selected_document()
+        if doc is None:
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "导出文档", doc.file_name)
+        if path:
+            try:
+                self.service.blob_store.copy_to(doc.content_hash, path)
+            except (OSError, DocumentStoreError) as exc:
+                QMessageBox.warning(self, "导出失败", str(exc))
@@ -7,16 +7,147 @@
 # @Description: data_acquisition 模块的 data_table_view.py 文件。
 
 # Python 标准库导入
-import sys
-import os
+from collections import OrderedDict
 
-# PyQt5 相关导入 (根据实际需要调整)
-# from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel
-# from PyQt5.QtCore import Qt, pyqtSignal, QObject
+# PyQt5 相关导入
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, QVariant, pyqtSignal
+from PyQt5.QtWidgets import QAbstractItemView, QTableView
 
-# 项目内部模块导入 (示例)
-# from ..core.base_controller import BaseController
-# from ...utils.logger_setup import logger
+# 默认列定义：(结果集列名, 表头)
+DEFAULT_ACTIVITY_COLUMNS = (
+    ("plant", "电厂"),
+    ("unit", "机组"),
+    ("fuel", "燃料"),
+    ("period", "统计时段"),
+    ("quantity", "消耗量"),
+)
 
 
-pass # 请在此处实现具体功能
+class LazyQueryTableModel(QAbstractTableModel):
+    """
+    虚拟化表格模型。
+
+    - rowCount 随 fetchMore() 按页增长，视图滚动到底部时才向查询层要下一页；
+    - data() 只读取所在页，页面放在容量固定的 LRU 缓存中，滚动时内存恒定；
+    - sort() 与 set_filter() 都交给查询层执行，模型本身从不持有完整结果集。
+
+    查询层约定：query_fn(filter) 返回结果集对象，结果集需提供 __len__、
+    fetch(offset, limit, columns) 与 sorted_by(column, descending)。
+    """
+
+    result_changed = pyqtSignal(int)  # 结果总行数
+
+    def __init__(self, query_fn, columns=DEFAULT_ACTIVITY_COLUMNS, page_size=500, max_cached_pages=20, parent=None):
+        super().__init__(parent)
+        self._query_fn = query_fn
+        self._columns = tuple(columns)
+        self._page_size = page_size
+        self._max_cached_pages = max_cached_pages
+        self._pages = OrderedDict()
+        self._result = None
+        self._loaded = 0
+        self._filter = None
+        self._sort = None
+
+    # ---- 查询 ----------------------------------------------------------------
+
+    @property
+    def total_rows(self):
+        return len(self._result) if self._result is not None else 0
+
+    def set_filter(self, query_filter):
+        """执行新查询；已选择的排序会保留并重新下推到查询层。"""
+        self._filter = query_filter
+        result = self._query_fn(query_filter)
+        if self._sort is not None:
+            result = result.sorted_by(*self._sort)
+        self._reset(result)
+
+    def refresh(self):
+        self.set_filter(self._filter)
+
+    def _reset(self, result):
+        self.beginResetModel()
+        self._result = result
+        self._pages.clear()
+        self._loaded = min(self._page_size, len(result))
+        self.endResetModel()
+        self.result_changed.emit(len(result))
+
+    # ---- Qt 模型接口 ---------------------------------------------------------
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return QVariant()
+        if orientation == Qt.Horizontal:
+            return self._columns[section][1]
+        return str(section + 1)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._result is not None and self._loaded < len(self._result)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._result is None:
+            return
+        count = min(self._page_size, len(self._result) - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.TextAlignmentRole):
+            return QVariant()
+        value = self._page(index.row() // self._page_size)[index.row() % self._page_size][index.column()]
+        if role == Qt.TextAlignmentRole:
+            return int(Qt.AlignRight | Qt.AlignVCenter) if isinstance(value, float) else QVariant()
+        if isinstance(value, float):
+            return f"{value:,.4f}"
+        return str(value)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        if self._result is None:
+            return
+        self._sort = (self._columns[column][0], order == Qt.DescendingOrder)
+        self.layoutAboutToBeChanged.emit()
+        self._result = self._result.sorted_by(*self._sort)
+        self._pages.clear()
+        self.layoutChanged.emit()
+
+    def _page(self, page_no):
+        page = self._pages.get(page_no)
+        if page is None:
+            names = [name for name, _ in self._columns]
+            page = self._result.fetch(page_no * self._page_size, self._page_size, names)
+            self._pages[page_no] = page
+            if len(self._pages) > self._max_cached_pages:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(page_no)
+        return page
+
+
+class DataTableView(QTableView):
+    """基于 LazyQueryTableModel 的通用数据表格，点击表头排序由查询层完成。"""
+
+    def __init__(self, query_fn, columns=DEFAULT_ACTIVITY_COLUMNS, page_size=500, parent=None):
+        super().__init__(parent)
+        self.table_model = LazyQueryTableModel(query_fn, columns, page_size, parent=self)
+        self.setModel(self.table_model)
+        self.setSortingEnabled(True)
+        self.horizontalHeader().setSortIndicatorShown(True)
+        self.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.setAlternatingRowColors(True)
+        # 行高统一后 Qt 不必逐行测量，大结果集滚动更流畅
+        self.verticalHeader().setDefaultSectionSize(22)
+        self.verticalHeader().setSectionResizeMode(self.verticalHeader().Fixed)
+
+    def set_filter(self, query_filter):
+        self.table_model.set_filter(query_filter)
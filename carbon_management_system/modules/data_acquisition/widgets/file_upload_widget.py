@@ -7,16 +7,131 @@
 # @Description: data_acquisition 模块的 file_upload_widget.py 文件。
 
 # Python 标准库导入
-import sys
 import os
 
-# PyQt5 相关导入 (根据实际需要调整)
-# from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel
-# from PyQt5.QtCore import Qt, pyqtSignal, QObject
+# PyQt5 相关导入
+from PyQt5.QtCore import pyqtSignal, pyqtSlot
+from PyQt5.QtWidgets import (
+    QFileDialog, QHBoxLayout, QLabel, QLineEdit, QProgressBar, QPushButton, QVBoxLayout, QWidget,
+)
 
-# 项目内部模块导入 (示例)
-# from ..core.base_controller import BaseController
-# from ...utils.logger_setup import logger
+# 项目内部模块导入
+from ....utils.helpers import format_bytes, format_duration
+from ..models import SupportingDocument
+from ..services import UploadProgress
 
 
-pass # 请在此处实现具体功能
+class FileUploadWidget(QWidget):
+    """
+    文件选择 + 进度展示组件。
+
+    通过 bind_import_worker() / bind_upload_worker() 订阅后台导入或上传任务的
+    progress/finished/failed/cancelled 信号，显示完成百分比与预计剩余时间。
+    """
+
+    file_selected = pyqtSignal(str)
+    cancel_requested = pyqtSignal()
+
+    def __init__(self, file_filter="数据文件 (*.csv *.xlsx *.xlsm)", parent=None):
+        super().__init__(parent)
+        self._file_filter = file_filter
+        self._worker = None
+
+        self.path_edit = QLineEdit(self)
+        self.path_edit.setReadOnly(True)
+        self.browse_button = QPushButton("选择文件...", self)
+        self.cancel_button = QPushButton("取消", self)
+        self.cancel_button.setEnabled(False)
+        self.progress_bar = QProgressBar(self)
+        self.progress_bar.setRange(0, 1000)
+        self.progress_bar.setTextVisible(False)
+        self.status_label = QLabel("", self)
+
+        row = QHBoxLayout()
+        row.addWidget(self.path_edit, 1)
+        row.addWidget(self.browse_button)
+        row.addWidget(self.cancel_button)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(row)
+        layout.addWidget(self.progress_bar)
+        layout.addWidget(self.status_label)
+
+        self.browse_button.clicked.connect(self._browse)
+        self.cancel_button.clicked.connect(self._on_cancel_clicked)
+
+    def _browse(self):
+        path, _ = QFileDialog.getOpenFileName(self, "选择导入文件", "", self._file_filter)
+        if path:
+            self.path_edit.setText(path)
+            self.file_selected.emit(path)
+
+    def _on_cancel_clicked(self):
+        self.cancel_button.setEnabled(False)
+        self.status_label.setText("正在取消，等待当前分块写入完成...")
+        if self._worker is not None:
+            self._worker.cancel()
+        self.cancel_requested.emit()
+
+    def bind_import_worker(self, worker):
+        """订阅一个 ActivityImportWorker 的进度信号。"""
+        self._bind(worker, f"正在读取 {os.path.basename(self.path_edit.text())} ...")
+
+    def bind_upload_worker(self, worker):
+        """订阅一个 DocumentUploadWorker 的进度信号（分块上传，可续传）。"""
+        self._bind(worker, f"正在上传 {os.path.basename(self.path_edit.text())} ...")
+
+    def _bind(self, worker, status):
+        self._worker = worker
+        self._set_busy(True)
+        self.progress_bar.setValue(0)
+        self.status_label.setText(status)
+        worker.progress.connect(self.on_progress)
+        worker.finished.connect(self.on_finished)
+        worker.failed.connect(self.on_failed)
+        worker.cancelled.connect(self.on_cancelled)
+
+    @pyqtSlot(object)
+    def on_progress(self, progress):
+        self.progress_bar.setValue(int(progress.fraction * 1000))
+        eta = format_duration(progress.eta_seconds)
+        if isinstance(progress, UploadProgress):
+            resumed = f"（续传，跳过 {progress.resumed_chunks} 块）" if progress.resumed_chunks else ""
+            self.status_label.setText(
+                f"{progress.fraction:.0%}  已提交 {format_bytes(progress.bytes_committed)} / "
+                f"{format_bytes(progress.total_bytes)}{resumed}，剩余约 {eta}"
+            )
+        else:
+            self.status_label.setText(
+                f"{progress.fraction:.0%}  已读取 {progress.rows_read:,} 行，"
+                f"拒绝 {progress.rows_rejected:,} 行，"
+                f"{progress.rows_per_second:,.0f} 行/秒，剩余约 {eta}"
+            )
+
+    @pyqtSlot(object)
+    def on_finished(self, result):
+        self._set_busy(False)
+        self.progress_bar.setValue(1000)
+        if isinstance(result, SupportingDocument):
+            self.status_label.setText(f"上传完成：{result.file_name}（{format_bytes(result.size)}）")
+            return
+        self.status_label.setText(
+            f"导入完成：写入 {result.rows_written:,} 行，拒绝 {result.rows_rejected:,} 行，"
+            f"耗时 {format_duration(result.elapsed)}"
+        )
+
+    @pyqtSlot(str)
+    def on_failed(self, message):
+        self._set_busy(False)
+        self.status_label.setText(message)
+
+    @pyqtSlot()
+    def on_cancelled(self):
+        self._set_busy(False)
+        self.status_label.setText("已取消（已提交的分块保留）")
+
+    def _set_busy(self, busy):
+        self.browse_button.setEnabled(not busy)
+        self.cancel_button.setEnabled(busy)
+        if not busy:
+            self._worker = None
@@ -7,16 +7,427 @@
 # @Description: 实现 emission_calculation 模块的业务逻辑和流程控制，协调模型和视图。
 
 # Python 标准库导入
-import sys
-import os
+import copy
+import logging
+import threading
+import time
 
-# PyQt5 相关导入 (根据实际需要调整)
-# from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel
-# from PyQt5.QtCore import Qt, pyqtSignal, QObject
+# 第三方库导入
+import numpy as np
 
-# 项目内部模块导入 (示例)
-# from ..core.base_controller import BaseController
-# from ...utils.logger_setup import logger
+# PyQt5 相关导入
+from PyQt5.QtCore import QObject, QThread, QTimer, pyqtSignal, pyqtSlot
 
+# 项目内部模块导入
+from ...config.settings import CALCULATION_CACHE_DIR
+from ...core.app_signals import app_signals
+from ...utils.constants import DEFAULT_JURISDICTION
+from ...utils.exceptions import CalculationCancelledError
+from .services import (
+    CalculationCache,
+    EmissionFactorService,
+    FormulaLibrary,
+    IncrementalCombustionCalculator,
+    LineageTracer,
+    ParallelCalculationScheduler,
+    build_combustion_cube,
+    build_lineage,
+    calculate_combustion,
+    calculation_fingerprint,
+    monte_carlo_uncertainty,
+)
 
-pass # 请在此处实现具体功能
+logger = logging.getLogger(__name__)
+
+
+class CalculationTaskWorker(QObject):
+    """
+    在后台线程中驱动并行核算调度器的工作对象。
+
+    调度器的回调在工作线程中触发，这里转成 Qt 信号排队投递到 GUI 线程。
+    给出 cache 时先在工作线程中计算输入指纹、查磁盘缓存，命中则直接完成；
+    未命中则并行核算后把合并结果写入缓存（写缓存失败只记录日志，不影响核算结果）。
+    """
+
+    progress = pyqtSignal(object)   # CalculationProgress
+    partial = pyqtSignal(object)    # PartitionResult
+    finished = pyqtSignal(object)   # CombustionCube
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, scheduler, first_month, n_months, defaults, plants=None, fixed_point=False, cache=None,
+                 cache_key=None):
+        """
+        :param cache: CalculationCache，为 None 时不使用缓存
+        :param cache_key: 无参可调用对象，返回本次核算的输入指纹
+        """
+        super().__init__()
+        self._scheduler = scheduler
+        self._args = (first_month, n_months, defaults, plants)
+        self._fixed_point = fixed_point
+        self._cache = cache
+        self._cache_key = cache_key
+        self._cancel_event = threading.Event()
+
+    @pyqtSlot()
+    def run(self):
+        first_month, n_months, defaults, plants = self._args
+        try:
+            key = self._cache_key() if self._cache is not None else None
+            cube = self._cache.get(key) if key is not None else None
+            if cube is not None:
+                logger.info("并行核算命中缓存 %s", key[:12])
+                self.finished.emit(cube)
+                return
+            cube = self._scheduler.run(
+                first_month, n_months, defaults, plants,
+                progress_callback=self.progress.emit,
+                partial_callback=self.partial.emit,
+                cancel_event=self._cancel_event,
+                fixed_point=self._fixed_point,
+            )
+        except CalculationCancelledError:
+            self.cancelled.emit()
+        except Exception as exc:  # 工作线程内的异常必须转成信号，否则会被静默吞掉
+            logger.exception("并行核算失败")
+            self.failed.emit(f"核算失败: {exc}")
+        else:
+            if key is not None:
+                try:
+                    self._cache.put(key, cube)
+                except OSError as exc:
+                    logger.warning("核算结果写入缓存失败: %s", exc)
+            self.finished.emit(cube)
+
+    def cancel(self):
+        """请求取消；排队中的分区被放弃，正在计算的分区结束后结果丢弃。"""
+        self._cancel_event.set()
+
+
+class EmissionCalculationController(QObject):
+    """
+    排放核算控制器：从数据采集模块的列式存储取数，整体计算全厂群的燃烧排放。
+
+    activity_store / parameter_store 通常直接传入 DataAcquisitionController 的同名属性，
+    两个模块共享同一份内存数据，不做复制。
+
+    调用 enable_incremental() 后，控制器持有一个 IncrementalCombustionCalculator：
+    数据更正、补录只把受影响的格子标脏，定时器按 refresh_interval 合并刷新，
+    仅重算脏格子并沿 机组 → 电厂 → 集团 传播，结果通过 results_updated 发出。
+    """
+
+    calculation_finished = pyqtSignal(object)   # CombustionCube
+    results_updated = pyqtSignal(object)        # RecalculationStats
+
+    def __init__(self, activity_store, parameter_store=None, defaults=None, plant_groups=None,
+                 factor_service=None, formula_library=None, calculation_cache=None, fixed_point=False,
+                 refresh_interval=1000, parent=None):
+        super().__init__(parent)
+        self.fixed_point = fixed_point
+        self._calculation_cache = calculation_cache
+        self.factor_service = factor_service or EmissionFactorService()
+        self.formula_library = formula_library or FormulaLibrary()
+        self.activity_store = activity_store
+        self.parameter_store = parameter_store
+        self.defaults = defaults or {}
+        self.plant_groups = plant_groups or {}
+        # 结果代数：每次产生或刷新结果、每次修改缺省因子都递增，溯源索引据此判断是否失效
+        self._generation = 0
+        self._last_cube = None
+        self.incremental = None
+        self.default_factor_ids = {}
+        self._scheduler = None
+        self._jobs = {}
+        self._tracer = None
+        self._tracer_key = None
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setInterval(refresh_interval)
+        self._refresh_timer.timeout.connect(self._refresh_if_pending)
+
+    @property
+    def last_cube(self):
+        """最近一次核算（或增量刷新）的结果立方体。"""
+        return self._last_cube
+
+    @last_cube.setter
+    def last_cube(self, cube):
+        # 增量模式下刷新后仍是同一个立方体对象，因此每次赋值都视为新结果
+        self._last_cube = cube
+        self._generation += 1
+
+    @property
+    def calculation_cache(self):
+        """核算结果磁盘缓存（首次使用时在 CALCULATION_CACHE_DIR 下创建）。"""
+        if self._calculation_cache is None:
+            self._calculation_cache = CalculationCache(CALCULATION_CACHE_DIR)
+        return self._calculation_cache
+
+    def fingerprint(self, first_month, n_months=12, plants=None, defaults=None, default_factor_ids=None):
+        """
+        当前输入数据、缺省因子与公式版本下，这次核算的缓存键。
+
+        :param defaults: 缺省参数快照，默认取当前的 self.defaults（default_factor_ids 同理）
+        """
+        formula = self.formula_library.get("combustion")
+        return calculation_fingerprint(
+            self.activity_store, self.parameter_store, first_month, n_months,
+            self.defaults if defaults is None else defaults,
+            self.default_factor_ids if default_factor_ids is None else default_factor_ids,
+            (formula.code, formula.version), self.fixed_point, plants,
+        )
+
+    def calculate_combustion(self, first_month=None, n_months=12, use_cache=True):
+        """
+        计算 n_months 个月全部机组、全部燃料的燃烧排放，作为最近一次核算结果并发出 calculation_finished。
+
+        use_cache 为 True 时先按输入指纹查磁盘缓存，命中直接返回；未命中则计算后写入缓存。
+        :return: 已填充 emissions 的 CombustionCube
+        """
+        cube = self.combustion_cube(first_month, n_months, use_cache)
+        self.last_cube = cube
+        self.calculation_finished.emit(cube)
+        return cube
+
+    def combustion_cube(self, first_month=None, n_months=12, use_cache=True, defaults=None):
+        """
+        计算并返回燃烧排放立方体，不改动 last_cube、不发出信号，可在工作线程中调用
+        （报告、证据包等后台任务用它取数，不会与界面上的核算相互覆盖结果）。
+
+        :param defaults: 缺省参数快照，默认取当前的 self.defaults
+        :return: 已填充 emissions 的 CombustionCube
+        """
+        started = time.perf_counter()
+        defaults = copy.deepcopy(self.defaults) if defaults is None else defaults
+        if first_month is None:
+            view = self.activity_store.columns()
+            first_month = view.period.min() if len(view) else np.datetime64("today")
+        key = None
+        if use_cache:
+            key = self.fingerprint(first_month, n_months, defaults=defaults)
+            cube = self.calculation_cache.get(key)
+            if cube is not None:
+                logger.info("燃烧排放核算命中缓存 %s，用时 %.3fs", key[:12], time.perf_counter() - started)
+                return cube
+        cube = build_combustion_cube(
+            self.activity_store.columns(),
+            self.parameter_store.columns() if self.parameter_store is not None else None,
+            first_month, n_months, defaults, self.fixed_point,
+        )
+        calculate_combustion(cube)
+        if key is not None:
+            try:
+                self.calculation_cache.put(key, cube)
+            except OSError as exc:
+                logger.warning("核算结果写入缓存失败: %s", exc)
+        logger.info("燃烧排放核算完成: %s 个格子，用时 %.3fs", cube.activity.size, time.perf_counter() - started)
+        return cube
+
+    # ---- 并行核算 -----------------------------------------------------------
+
+    @property
+    def scheduler(self):
+        """并行核算调度器（首次使用时创建，进程池在多次核算间复用）。"""
+        if self._scheduler is None:
+            self._scheduler = ParallelCalculationScheduler(self.activity_store, self.parameter_store)
+        return self._scheduler
+
+    def start_parallel_calculation(self, first_month, n_months=12, plants=None, use_cache=True):
+        """
+        在后台按 电厂 × 时段 分区并行核算。
+
+        use_cache 为 True 时与 calculate_combustion 共用磁盘缓存：先按输入指纹查缓存，
+        命中则不再分发分区；未命中则把合并后的结果写入缓存。指纹在工作线程中计算，不阻塞界面。
+        进度、分区结果与完成/失败/取消事件同时通过 worker 信号和 app_signals() 广播。
+        :return: CalculationTaskWorker，可调用其 cancel()
+        """
+        defaults = copy.deepcopy(self.defaults)
+        factor_ids = copy.deepcopy(self.default_factor_ids)
+
+        def cache_key():
+            return self.fingerprint(first_month, n_months, plants, defaults, factor_ids)
+
+        worker = CalculationTaskWorker(self.scheduler, first_month, n_months, defaults, plants, self.fixed_point,
+                                       cache=self.calculation_cache if use_cache else None, cache_key=cache_key)
+        signals = app_signals()
+        worker.progress.connect(signals.calculation_progress)
+        worker.partial.connect(signals.calculation_partial)
+        worker.failed.connect(signals.calculation_failed)
+        worker.cancelled.connect(signals.calculation_cancelled)
+        worker.finished.connect(self._on_parallel_finished)
+        self._start_worker(worker)
+        return worker
+
+    def _on_parallel_finished(self, cube):
+        self.last_cube = cube
+        self.calculation_finished.emit(cube)
+        app_signals().calculation_finished.emit(cube)
+
+    def _start_worker(self, worker):
+        thread = QThread(self)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        for signal in (worker.finished, worker.failed, worker.cancelled):
+            signal.connect(thread.quit)
+        thread.finished.connect(lambda: self._jobs.pop(id(worker), None))
+        thread.finished.connect(thread.deleteLater)
+        self._jobs[id(worker)] = (thread, worker)
+        thread.start()
+        return worker
+
+    def cancel_all_jobs(self):
+        for _thread, worker in list(self._jobs.values()):
+            worker.cancel()
+
+    def shutdown(self):
+        """取消后台任务并关闭进程池，应用退出时调用。"""
+        self.cancel_all_jobs()
+        self.disable_incremental()
+        if self._scheduler is not None:
+            self._scheduler.close()
+
+    def estimate_uncertainty(self, spec=None, draws=None, seed=None, progress_callback=None):
+        """
+        对最近一次核算结果做蒙特卡洛不确定性分析。
+
+        :return: UncertaintyResult
+        """
+        if self.last_cube is None:
+            raise RuntimeError("尚未进行核算")
+        options = {"draws": draws} if draws else {}
+        result = monte_carlo_uncertainty(self.last_cube, spec, seed=seed, progress_callback=progress_callback,
+                                         **options)
+        logger.info("不确定性分析完成: %s 次抽样，总排放相对不确定度 %.2f%%，用时 %.2fs",
+                    result.draws, result.total_relative * 100, result.elapsed)
+        return result
+
+    # ---- 结果溯源 -----------------------------------------------------------
+
+    def tracer(self):
+        """
+        返回最近一次核算结果的溯源查询对象。
+
+        溯源索引在首次查询时建立，之后仅当结果（含增量刷新）、缺省因子或输入数据的行集合变化时重建
+        （未经刷新的数值更正不改变依赖关系，无需重建）。
+        """
+        if self.last_cube is None:
+            raise RuntimeError("尚未进行核算")
+        parameter_version = self.parameter_store.version if self.parameter_store is not None else None
+        key = (self._generation, self.activity_store.version, parameter_version)
+        if self._tracer is None or self._tracer_key != key:
+            self._tracer, self._tracer_key = LineageTracer(self.lineage_of(self.last_cube)), key
+        return self._tracer
+
+    def lineage_of(self, cube, default_factor_ids=None):
+        """
+        为给定的核算结果建立溯源数据（ResultLineage），不影响 tracer() 的缓存。
+
+        :param default_factor_ids: 核算时所用缺省参数的因子编号快照，默认取当前的 self.default_factor_ids
+        """
+        formula = self.formula_library.get("combustion")
+        return build_lineage(
+            cube, self.activity_store.columns(),
+            self.parameter_store.columns() if self.parameter_store is not None else None,
+            self.default_factor_ids if default_factor_ids is None else default_factor_ids,
+            formula.code, formula.version,
+        )
+
+    def trace(self, plant_code=None, unit_code=None, month=None, fuel_type=None):
+        """从合计追溯到参与计算的活动数据、参数数据、缺省因子与公式版本。"""
+        return self.tracer().trace(plant_code, unit_code, month, fuel_type)
+
+    def trace_readings(self, row_ids, store=None, limit=None):
+        """按 row_id 取出原始读数视图（最多 limit 行）。"""
+        store = store or self.activity_store
+        row_ids = np.asarray(row_ids[:limit] if limit is not None else row_ids, dtype=np.int64)
+        return store.columns().take(store.positions_of(row_ids))
+
+    def evaluate_formula(self, code, **inputs):
+        """
+        用公式库中的公式对整列输入求值。
+
+        :raises FormulaError: 公式不存在、无法编译或缺少变量
+        """
+        return self.formula_library.evaluate(code, **inputs)
+
+    # ---- 增量重算 -----------------------------------------------------------
+
+    def enable_incremental(self, first_month=None, n_months=12, auto_refresh=True):
+        """
+        全量计算一次并开始跟踪输入变化。
+
+        增量计算器以浮点增量累加活动数据与排放合计，不支持定点模式；
+        fixed_point 为 True 时拒绝启用，以免增量结果与定点核算结果不一致。
+        :param auto_refresh: 为 True 时由定时器自动刷新；否则需手动调用 refresh()
+        :return: IncrementalCombustionCalculator
+        :raises ValueError: 控制器处于定点模式
+        """
+        if self.fixed_point:
+            raise ValueError("定点核算模式不支持增量重算，请使用 calculate_combustion() 整体核算")
+        self.disable_incremental()
+        self.incremental = IncrementalCombustionCalculator(
+            self.activity_store, self.parameter_store, first_month, n_months,
+            self.defaults, self.plant_groups,
+        )
+        self.last_cube = self.incremental.cube
+        self.calculation_finished.emit(self.last_cube)
+        if auto_refresh:
+            self._refresh_timer.start()
+        return self.incremental
+
+    def disable_incremental(self):
+        self._refresh_timer.stop()
+        if self.incremental is not None:
+            self.incremental.close()
+            self.incremental = None
+
+    def set_default_factor(self, parameter_type, fuel_type, value, factor_id=None):
+        """
+        更新缺省参数；增量模式下只标脏依赖该因子的格子。
+
+        :param value: 标量，或逐月取值 {"YYYY-MM": 值}
+        :param factor_id: 取自因子库时的因子编号（逐月取值时为 {"YYYY-MM": 因子编号}），用于结果溯源；
+                          手工设置时为 None
+        """
+        self.defaults.setdefault(parameter_type, {})[fuel_type] = value
+        ids = self.default_factor_ids.setdefault(parameter_type, {})
+        if factor_id is None:
+            ids.pop(fuel_type, None)
+        else:
+            ids[fuel_type] = factor_id
+        self._generation += 1
+        if self.incremental is not None:
+            self.incremental.set_default(parameter_type, fuel_type, value)
+
+    def apply_factor_library(self, first_month, n_months=12, jurisdiction=DEFAULT_JURISDICTION):
+        """
+        以因子库中逐月生效的因子作为 first_month 起 n_months 个月的缺省参数。
+
+        各月取当月 1 日生效的因子，年内因子更替时前后月份各用各的因子；
+        因子库未覆盖的月份没有缺省值，缺少实测值的格子保持 NaN。
+        :return: 实际设置的 {参数类型: {燃料: {"YYYY-MM": 值}}}
+        """
+        defaults = {}
+        for parameter_type, by_fuel in self.factor_service.factors_by_month(first_month, n_months,
+                                                                           jurisdiction).items():
+            for fuel_type, by_month in by_fuel.items():
+                values = {month: factor.value for month, factor in by_month.items()}
+                factor_ids = {month: factor.factor_id for month, factor in by_month.items()}
+                self.set_default_factor(parameter_type, fuel_type, values, factor_ids)
+                defaults.setdefault(parameter_type, {})[fuel_type] = values
+        return defaults
+
+    def refresh(self):
+        """立即重算脏格子并发出 results_updated。"""
+        if self.incremental is None:
+            raise RuntimeError("未启用增量重算")
+        stats = self.incremental.refresh()
+        self.last_cube = self.incremental.cube
+        if stats.dirty_cells:
+            logger.info("增量重算 %s 个格子，涉及 %s 个机组，用时 %.4fs%s", stats.dirty_cells, len(stats.units),
+                        stats.elapsed, "（整体重建）" if stats.full_rebuild else "")
+            self.results_updated.emit(stats)
+        return stats
+
+    def _refresh_if_pending(self):
+        if self.incremental is not None and self.incremental.pending:
+            self.refresh()
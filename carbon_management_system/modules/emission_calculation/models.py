@@ -7,16 +7,297 @@
 # @Description: 定义 emission_calculation 模块的数据模型 (例如，与数据库表对应的类，或业务对象类)。
 
 # Python 标准库导入
-import sys
-import os
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Optional
 
-# PyQt5 相关导入 (根据实际需要调整)
-# from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel
-# from PyQt5.QtCore import Qt, pyqtSignal, QObject
+# 第三方库导入
+import numpy as np
 
-# 项目内部模块导入 (示例)
-# from ..core.base_controller import BaseController
-# from ...utils.logger_setup import logger
+# 项目内部模块导入
+from ...utils.constants import DEFAULT_JURISDICTION
 
 
-pass # 请在此处实现具体功能
+@dataclass
+class EmissionResult:
+    """单个 (机组, 月份, 燃料) 的燃料燃烧排放核算结果。"""
+
+    plant_code: str
+    unit_code: str
+    fuel_type: str
+    month: str
+    activity: float
+    ncv: float
+    carbon_content: float
+    oxidation_rate: float
+    emission_tco2: float
+    result_id: Optional[int] = field(default=None, compare=False)
+
+
+@dataclass
+class CombustionCube:
+    """
+    燃料燃烧核算的输入立方体：各数组形状均为 (机组数, 月数, 燃料数)。
+
+    units 为 (电厂编码, 机组编码) 列表，months 为 datetime64[M] 数组，fuels 为燃料类型列表。
+    缺少参数的格子为 NaN，对应的排放也为 NaN，提示需要补录数据或选用缺省值。
+    fixed_point 为 True 时各输入已按定点规则舍入，emissions_fixed 中 NaN 格子记为 0。
+    """
+
+    units: list
+    months: np.ndarray
+    fuels: list
+    activity: np.ndarray
+    ncv: np.ndarray
+    carbon_content: np.ndarray
+    oxidation_rate: np.ndarray
+    emissions: Optional[np.ndarray] = None
+    fixed_point: bool = False
+    emissions_fixed: Optional[np.ndarray] = None   # 定点模式下的 int64 排放量（× 10^FIXED_POINT_EMISSION_DECIMALS）
+
+    @property
+    def shape(self):
+        return self.activity.shape
+
+    def cell_label(self, u, m, f):
+        plant_code, unit_code = self.units[u]
+        return plant_code, unit_code, str(self.months[m]), self.fuels[f]
+
+    def to_results(self, include_empty=False):
+        """把非零活动数据的格子展开为 EmissionResult 列表（供界面展示）。"""
+        if self.emissions is None:
+            raise ValueError("尚未计算排放量")
+        cells = np.argwhere(self.activity != 0) if not include_empty else np.argwhere(np.ones(self.shape, bool))
+        results = []
+        for u, m, f in cells:
+            plant_code, unit_code, month, fuel = self.cell_label(u, m, f)
+            results.append(EmissionResult(
+                plant_code, unit_code, fuel, month,
+                float(self.activity[u, m, f]), float(self.ncv[u, m, f]), float(self.carbon_content[u, m, f]),
+                float(self.oxidation_rate[u, m, f]), float(self.emissions[u, m, f]),
+            ))
+        return results
+
+
+@dataclass
+class RecalculationStats:
+    """一次增量重算的统计：重算了哪些格子，以及由此变动的机组/电厂/集团汇总。"""
+
+    dirty_cells: int
+    units: list
+    plants: list
+    groups: list
+    elapsed: float
+    full_rebuild: bool = False
+
+
+@dataclass
+class EmissionFactor:
+    """
+    排放因子库中的一条因子。
+
+    有效期为 [effective_from, effective_to)，effective_to 为 None 表示长期有效。
+    factor_type 与参数类型一致（如 ncv / carbon_content / oxidation_rate），
+    因此因子可直接作为缺少实测值时的缺省参数。
+    """
+
+    fuel_type: str
+    factor_type: str
+    value: float
+    effective_from: date
+    effective_to: Optional[date] = None
+    jurisdiction: str = DEFAULT_JURISDICTION
+    measure_unit: str = ""
+    source: str = ""
+    factor_id: Optional[int] = field(default=None, compare=False)
+
+
+@dataclass
+class CalculationFormula:
+    """
+    核算方法学公式。
+
+    expression 为 Python 算术表达式，变量名须在 variables 中声明；可用的常量与函数见
+    services.FORMULA_CONSTANTS / FORMULA_FUNCTIONS。公式内容修改后 version 递增，
+    编译结果按 (code, version) 缓存。
+    """
+
+    code: str
+    name: str
+    expression: str
+    variables: dict = field(default_factory=dict)   # {变量名: 说明（含单位）}
+    result_unit: str = "tCO2"
+    description: str = ""
+    version: int = 1
+
+
+BUILTIN_FORMULAS = (
+    CalculationFormula(
+        "combustion", "化石燃料燃烧排放",
+        "activity * ncv * carbon_content * oxidation_rate * CO2_C_RATIO",
+        {"activity": "燃料消耗量 (t 或 万Nm3)", "ncv": "低位发热量 (GJ/t)",
+         "carbon_content": "单位热值含碳量 (tC/GJ)", "oxidation_rate": "碳氧化率"},
+        description="燃料燃烧排放 = 消耗量 × 低位发热量 × 单位热值含碳量 × 碳氧化率 × 44/12",
+    ),
+    CalculationFormula(
+        "desulfurization", "脱硫过程排放",
+        "carbonate * purity * emission_factor * transformation_rate",
+        {"carbonate": "脱硫剂（碳酸盐）消耗量 (t)", "purity": "碳酸盐含量 (0~1)",
+         "emission_factor": "碳酸盐排放因子 (tCO2/t)", "transformation_rate": "转化率"},
+        description="脱硫排放 = 碳酸盐消耗量 × 含量 × 排放因子 × 转化率",
+    ),
+    CalculationFormula(
+        "purchased_electricity", "购入电力间接排放",
+        "electricity * grid_factor",
+        {"electricity": "净购入电量 (MWh)", "grid_factor": "电网排放因子 (tCO2/MWh)"},
+    ),
+    CalculationFormula(
+        "process_mass_balance", "工业过程排放（碳平衡法）",
+        "maximum(carbon_in - carbon_out, 0) * CO2_C_RATIO",
+        {"carbon_in": "输入物料含碳量 (tC)", "carbon_out": "产品及废物含碳量 (tC)"},
+        description="过程排放 = max(输入碳 − 输出碳, 0) × 44/12",
+    ),
+)
+
+
+@dataclass
+class CalculationPartition:
+    """并行核算的一个分区：一个电厂的若干机组在一段连续月份内的数据。"""
+
+    partition_id: int
+    plant_code: str
+    first_month: np.datetime64
+    n_months: int
+    units: list = field(default_factory=list)    # (电厂编码, 机组编码) 列表
+
+
+@dataclass
+class PartitionResult:
+    """单个分区的核算结果，随完成顺序流式返回。"""
+
+    partition: CalculationPartition
+    cube: CombustionCube
+    elapsed: float
+
+    @property
+    def total_emissions(self):
+        return float(np.nansum(self.cube.emissions))
+
+
+@dataclass
+class CalculationProgress:
+    """并行核算进度。"""
+
+    partitions_done: int
+    partitions_total: int
+    elapsed: float
+    last_result: Optional[PartitionResult] = None
+
+    @property
+    def fraction(self):
+        return self.partitions_done / self.partitions_total if self.partitions_total else 1.0
+
+    @property
+    def eta_seconds(self):
+        if not self.partitions_done:
+            return None
+        return self.elapsed / self.partitions_done * (self.partitions_total - self.partitions_done)
+
+
+@dataclass
+class ResultLineage:
+    """
+    排放结果的溯源信息，全部以整数数组保存（CSR 形式）。
+
+    结果格子按 CombustionCube 的扁平下标编号；第 c 个格子依赖的活动数据行为
+    activity_rows[activity_offsets[c]:activity_offsets[c + 1]]，参数数据行同理。
+    factor_ids 形状为 (格子数, 参数类型数)，取值为该格子所用缺省因子的 factor_id，
+    使用实测值或无因子编号（手工设置的缺省值）时为 -1。
+    formula_code / formula_version 记录计算所用公式的版本。
+    """
+
+    units: list
+    months: np.ndarray
+    fuels: list
+    activity_offsets: np.ndarray
+    activity_rows: np.ndarray
+    parameter_offsets: np.ndarray
+    parameter_rows: np.ndarray
+    factor_ids: np.ndarray
+    formula_code: str
+    formula_version: int
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in (
+            "activity_offsets", "activity_rows", "parameter_offsets", "parameter_rows", "factor_ids"))
+
+
+@dataclass
+class LineageTrace:
+    """一次追溯查询的结果：所涉结果格子及其依赖的输入编号。"""
+
+    cells: np.ndarray
+    activity_rows: np.ndarray
+    parameter_rows: np.ndarray
+    factor_ids: np.ndarray
+    formula_code: str
+    formula_version: int
+    elapsed: float
+
+
+@dataclass
+class UncertaintySpec:
+    """
+    输入量的相对不确定度（95% 置信水平下的半宽，如 0.02 表示 ±2%），服从正态分布。
+
+    by_fuel 可按燃料覆盖：{燃料: {"activity": 0.01, "ncv": ...}}。
+    """
+
+    activity: float = 0.02
+    ncv: float = 0.02
+    carbon_content: float = 0.02
+    oxidation_rate: float = 0.01
+    by_fuel: dict = field(default_factory=dict)
+
+    def of(self, name, fuel_type):
+        return self.by_fuel.get(fuel_type, {}).get(name, getattr(self, name))
+
+
+@dataclass
+class UncertaintyResult:
+    """蒙特卡洛不确定性分析结果：各级合计的均值、标准差与置信区间。"""
+
+    units: list
+    plants: list
+    draws: int
+    confidence: float
+    seed: Optional[int]
+    unit_mean: np.ndarray
+    unit_std: np.ndarray
+    unit_interval: np.ndarray      # 形状 (机组数, 2)
+    plant_mean: np.ndarray
+    plant_std: np.ndarray
+    plant_interval: np.ndarray     # 形状 (电厂数, 2)
+    total_mean: float
+    total_std: float
+    total_interval: tuple
+    elapsed: float = 0.0
+
+    @staticmethod
+    def _relative(mean, interval):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return (np.asarray(interval)[..., 1] - np.asarray(interval)[..., 0]) / 2 / np.abs(mean)
+
+    @property
+    def unit_relative(self):
+        """各机组的相对不确定度（置信区间半宽 / 均值）。"""
+        return self._relative(self.unit_mean, self.unit_interval)
+
+    @property
+    def plant_relative(self):
+        return self._relative(self.plant_mean, self.plant_interval)
+
+    @property
+    def total_relative(self):
+        return float(self._relative(self.total_mean, self.total_interval))
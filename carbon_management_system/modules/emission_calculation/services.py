@@ -7,16 +7,1893 @@
 # @Description: 提供 emission_calculation 模块中更复杂或可复用的业务服务逻辑。
 
 # Python 标准库导入
-import sys
+import ast
+import bisect
+import contextlib
+import hashlib
+import json
+import logging
+import multiprocessing
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import replace
+from datetime import date, datetime
 
-# PyQt5 相关导入 (根据实际需要调整)
-# from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel
-# from PyQt5.QtCore import Qt, pyqtSignal, QObject
+# 第三方库导入
+import numpy as np
 
-# 项目内部模块导入 (示例)
-# from ..core.base_controller import BaseController
-# from ...utils.logger_setup import logger
+# 项目内部模块导入
+from ..data_acquisition.models import ColumnView
+from ...utils.constants import (
+    CALCULATION_CACHE_FORMAT,
+    CALCULATION_CACHE_MAX_BYTES,
+    CALCULATION_PARTITION_MONTHS,
+    CALCULATION_TASKS_PER_WORKER,
+    CO2_C_RATIO,
+    COMBUSTION_PARAMETERS,
+    DEFAULT_JURISDICTION,
+    DEFAULT_PLANT_GROUP,
+    FACTOR_LOOKUP_CACHE_SIZE,
+    FIXED_POINT_ACTIVITY_DECIMALS,
+    FIXED_POINT_EMISSION_DECIMALS,
+    FIXED_POINT_PARAMETER_DECIMALS,
+    FORMULA_MAX_EXPONENT,
+    MONTE_CARLO_CHUNK_SIZE,
+    MONTE_CARLO_DRAWS,
+    MONTE_CARLO_HISTOGRAM_BINS,
+    PARAM_CARBON_CONTENT,
+    PARAM_NCV,
+    PARAM_OXIDATION_RATE,
+    UNCERTAINTY_CONFIDENCE,
+)
+from ...utils.exceptions import CalculationCancelledError, FormulaError
+from .models import (
+    BUILTIN_FORMULAS,
+    CalculationPartition,
+    CalculationProgress,
+    CombustionCube,
+    LineageTrace,
+    PartitionResult,
+    RecalculationStats,
+    ResultLineage,
+    UncertaintyResult,
+    UncertaintySpec,
+)
 
+logger = logging.getLogger(__name__)
 
-pass # 请在此处实现具体功能
+_CUBE_ARRAYS = ("activity", "ncv", "carbon_content", "oxidation_rate", "emissions")
+
+
+# ---------------------------------------------------------------------------
+# 燃料燃烧 CO2 排放（向量化）
+# ---------------------------------------------------------------------------
+
+def combustion_emissions(activity, ncv, carbon_content, oxidation_rate):
+    """
+    燃料燃烧排放量 = 活动数据 × 低位发热量 × 单位热值含碳量 × 碳氧化率 × 44/12。
+
+    参数可以是任意可广播的数组（如 机组 × 月 × 燃料），一次性整体计算。
+    乘法顺序与 combustion_emission_scalar 完全一致，两者结果逐元素相同。
+    """
+    return np.asarray(activity, dtype=np.float64) * ncv * carbon_content * oxidation_rate * CO2_C_RATIO
+
+
+def combustion_emission_scalar(activity, ncv, carbon_content, oxidation_rate):
+    """逐条计算的参考实现，用于校验向量化结果。"""
+    return activity * ncv * carbon_content * oxidation_rate * CO2_C_RATIO
+
+
+# ---------------------------------------------------------------------------
+# 定点数运算
+# ---------------------------------------------------------------------------
+
+# int64 定点值的安全上限，留出一位余量防止求和溢出
+_FIXED_POINT_LIMIT = 2 ** 62
+
+
+def to_fixed(values, decimals):
+    """
+    把浮点数组转换为定点 int64（值 × 10^decimals），四舍六入五成双；NaN 记为 0。
+
+    :raises OverflowError: 数值超出 int64 定点表示范围
+    """
+    scaled = np.rint(np.nan_to_num(np.asarray(values, dtype=np.float64)) * 10.0 ** decimals)
+    if scaled.size and np.abs(scaled).max() >= _FIXED_POINT_LIMIT:
+        raise OverflowError(f"数值超出定点数表示范围（{decimals} 位小数）")
+    return scaled.astype(np.int64)
+
+
+def from_fixed(values, decimals):
+    return np.asarray(values, dtype=np.int64) / 10.0 ** decimals
+
+
+def format_fixed(value, decimals):
+    """把定点整数精确格式化为十进制字符串，如 format_fixed(-1234567, 6) -> "-1.234567"。"""
+    value = int(value)
+    sign = "-" if value < 0 else ""
+    whole, frac = divmod(abs(value), 10 ** decimals)
+    return f"{sign}{whole}.{frac:0{decimals}d}" if decimals else f"{sign}{whole}"
+
+
+def _divide_half_even(numerators, denominators):
+    """int64 整除并按四舍六入五成双取整（分母为正）。"""
+    quotient, remainder = np.divmod(numerators, denominators)
+    twice = 2 * remainder
+    round_up = (twice > denominators) | ((twice == denominators) & (quotient % 2 == 1))
+    return quotient + round_up
+
+
+def _fixed_group_sum(cells, values, size):
+    """按格子对 int64 求和。整数加法满足结合律，结果与行序、分区方式无关。"""
+    sums = np.zeros(size, dtype=np.int64)
+    if len(cells):
+        order = np.argsort(cells, kind="stable")
+        sorted_cells = cells[order]
+        starts = np.flatnonzero(np.r_[True, sorted_cells[1:] != sorted_cells[:-1]])
+        sums[sorted_cells[starts]] = np.add.reduceat(values[order], starts)
+    return sums
+
+
+def _cube_index(codec_labels, cube_labels):
+    """建立 存储编码 -> 立方体下标 的查找数组；立方体中不存在的编码映射为 -1。"""
+    positions = {label: i for i, label in enumerate(cube_labels)}
+    return np.array([positions.get(label, -1) for label in codec_labels], dtype=np.int64)
+
+
+def _month_index(periods, first_month, n_months):
+    months = (periods.astype("datetime64[M]") - first_month).astype(np.int64)
+    return months, (months >= 0) & (months < n_months)
+
+
+def _cell_index(view, codecs, units, fuels, first_month, n_months):
+    """
+    计算视图中每一行所属立方体格子的扁平下标 (u * 月数 + m) * 燃料数 + f。
+
+    两个存储各有独立的编码器，因此按标签把存储编码映射到立方体下标；
+    不落在立方体内（机组/燃料未知或月份越界）的行下标为 -1。
+
+    :param codecs: 视图所属存储的编码表（store.codecs）
+    """
+    unit_map = _cube_index(codecs["unit"].labels, units)
+    fuel_map = _cube_index(codecs["fuel"].labels, fuels)
+    u_idx = unit_map[view.unit]
+    f_idx = fuel_map[view.fuel]
+    m_idx, in_range = _month_index(view.period, first_month, n_months)
+    valid = in_range & (u_idx >= 0) & (f_idx >= 0)
+    return np.where(valid, (u_idx * n_months + m_idx) * len(fuels) + f_idx, -1)
+
+
+def _parameter_aggregates(view, codecs, values, cells, parameter_type, size, fixed_point=False):
+    """
+    按格子累计某类参数的 (合计, 有效值个数)；values 可与视图中的当前值不同（用于更正前的旧值）。
+
+    fixed_point 为 True 时合计为定点 int64（× 10^FIXED_POINT_PARAMETER_DECIMALS）。
+    """
+    code = codecs["parameter"].code_of(parameter_type)
+    if code is None:
+        return np.zeros(size, dtype=np.int64 if fixed_point else np.float64), np.zeros(size, dtype=np.int64)
+    mask = (view.parameter == code) & (cells >= 0) & ~np.isnan(values)
+    if fixed_point:
+        sums = _fixed_group_sum(cells[mask], to_fixed(values[mask], FIXED_POINT_PARAMETER_DECIMALS), size)
+    else:
+        sums = np.bincount(cells[mask], weights=values[mask], minlength=size)
+    counts = np.bincount(cells[mask], minlength=size).astype(np.int64)
+    return sums, counts
+
+
+def _month_default(value, month, missing=np.nan):
+    """
+    取某月的缺省值。缺省值可以是对所有月份都适用的标量，也可以是逐月取值 {"YYYY-MM": 值}
+    （因子库中的因子可能在年内更替，见 EmissionFactorService.factors_by_month）。
+    """
+    if isinstance(value, dict):
+        return value.get(str(np.datetime64(month, "M")), missing)
+    return missing if value is None else value
+
+
+def _default_table(fuel_defaults, months, fuels, missing=np.nan, dtype=np.float64):
+    """
+    把 {燃料: 缺省值} 展开为按 (月, 燃料) 排列的扁平数组，格子的查表下标为 扁平格子下标 % (月数 × 燃料数)。
+
+    :param fuel_defaults: {燃料: 标量或 {"YYYY-MM": 值}}
+    """
+    table = np.full((len(months), len(fuels)), missing, dtype=dtype)
+    labels = [str(month) for month in np.asarray(months, dtype="datetime64[M]")]
+    for f, fuel in enumerate(fuels):
+        value = fuel_defaults.get(fuel)
+        if isinstance(value, dict):
+            table[:, f] = [value.get(label, missing) for label in labels]
+        elif value is not None:
+            table[:, f] = value
+    return table.reshape(-1)
+
+
+def _default_index(size, n_months, n_fuels):
+    """各格子在 _default_table 中的下标（格子按 (机组, 月, 燃料) 展平）。"""
+    return np.arange(size) % max(n_months * n_fuels, 1)
+
+
+def _resolve_parameter(sums, counts, defaults, default_index):
+    """
+    实测均值优先；无实测值时取该月该燃料的缺省值，仍没有则为 NaN。
+
+    :param defaults: _default_table 生成的缺省值数组（无缺省值处为 NaN）
+    :param default_index: 各格子在 defaults 中的下标
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        values = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+    missing = counts == 0
+    if len(defaults):
+        values[missing] = defaults[default_index[missing]]
+    return values
+
+
+def _resolve_parameter_fixed(sums, counts, defaults, default_index):
+    """
+    定点模式下的 _resolve_parameter：实测均值按五成双舍入到定点，缺省值同样先舍入，
+    因此返回的浮点值恰为 定点整数 / 10^位数，与计算顺序无关。
+    """
+    decimals = FIXED_POINT_PARAMETER_DECIMALS
+    values = np.full(len(sums), np.nan)
+    measured = counts > 0
+    values[measured] = from_fixed(_divide_half_even(sums[measured], counts[measured]), decimals)
+    missing = ~measured
+    if len(defaults):
+        fallback = defaults[default_index[missing]]
+        has_default = ~np.isnan(fallback)
+        resolved = np.full(len(fallback), np.nan)
+        resolved[has_default] = from_fixed(to_fixed(fallback[has_default], decimals), decimals)
+        values[missing] = resolved
+    return values
+
+
+def build_combustion_cube(activity_view, parameter_view=None, first_month=None, n_months=12, defaults=None,
+                          fixed_point=False):
+    """
+    由活动数据与参数数据视图构造 (机组 × 月 × 燃料) 输入立方体。
+
+    - 活动数据按格子求和（NaN 视为缺失）；
+    - 参数按格子取算术平均；没有实测值的格子依次取 defaults[参数类型][燃料类型]
+      （逐月取值时取该格子所在月份的值），仍没有则保持 NaN；
+    - 全部聚合都是 bincount 一次完成，不逐条循环。
+
+    :param activity_view: ActivityColumnStore 的视图
+    :param parameter_view: ParameterColumnStore 的视图，可为 None（全部用缺省值）
+    :param first_month: 第一个月（datetime / "2024-01" / datetime64），默认取活动数据最早月份
+    :param n_months: 月数
+    :param defaults: {参数类型: {燃料类型: 缺省值或 {"YYYY-MM": 缺省值}}}
+    :param fixed_point: 定点模式，见 calculate_combustion
+    """
+    return _combustion_cube(
+        activity_view, activity_view.store.codecs,
+        parameter_view, parameter_view.store.codecs if parameter_view is not None else None,
+        first_month, n_months, defaults, fixed_point=fixed_point,
+    )
+
+
+def _combustion_cube(activity_view, activity_codecs, parameter_view, parameter_codecs, first_month, n_months,
+                     defaults, units=None, fuels=None, fixed_point=False):
+    """
+    build_combustion_cube 的实现。编码表单独传入，视图可以是脱离存储的 ColumnView，
+    以便把分区数据连同编码表发送到子进程计算；units / fuels 为 None 时取数据中出现的全部值。
+    """
+    if first_month is None:
+        first_month = activity_view.period.min() if len(activity_view) else np.datetime64("today")
+    first_month = np.datetime64(first_month, "M")
+    months = first_month + np.arange(n_months)
+
+    _month, in_range = _month_index(activity_view.period, first_month, n_months)
+    if units is None:
+        units = [activity_codecs["unit"].decode(code) for code in np.unique(activity_view.unit[in_range])]
+    if fuels is None:
+        fuels = [activity_codecs["fuel"].decode(code) for code in np.unique(activity_view.fuel[in_range])]
+    shape = (len(units), n_months, len(fuels))
+    size = int(np.prod(shape))
+
+    cells = _cell_index(activity_view, activity_codecs, units, fuels, first_month, n_months)
+    valid = cells >= 0
+    if fixed_point:
+        quantities = to_fixed(activity_view.quantity[valid], FIXED_POINT_ACTIVITY_DECIMALS)
+        activity = from_fixed(_fixed_group_sum(cells[valid], quantities, size),
+                              FIXED_POINT_ACTIVITY_DECIMALS).reshape(shape)
+    else:
+        activity = np.bincount(cells[valid], weights=np.nan_to_num(activity_view.quantity[valid]),
+                               minlength=size).reshape(shape)
+
+    default_index = _default_index(size, n_months, len(fuels))
+    parameters = {}
+    parameter_cells = None
+    if parameter_view is not None and len(parameter_view):
+        parameter_cells = _cell_index(parameter_view, parameter_codecs, units, fuels, first_month, n_months)
+    for parameter_type in COMBUSTION_PARAMETERS:
+        if parameter_cells is not None:
+            sums, counts = _parameter_aggregates(parameter_view, parameter_codecs, parameter_view.value,
+                                                 parameter_cells, parameter_type, size, fixed_point)
+        else:
+            sums = np.zeros(size, dtype=np.int64 if fixed_point else np.float64)
+            counts = np.zeros(size, dtype=np.int64)
+        lookup = _default_table((defaults or {}).get(parameter_type, {}), months, fuels)
+        resolve = _resolve_parameter_fixed if fixed_point else _resolve_parameter
+        parameters[parameter_type] = resolve(sums, counts, lookup, default_index).reshape(shape)
+
+    return CombustionCube(
+        units=units, months=months, fuels=fuels, activity=activity,
+        ncv=parameters[PARAM_NCV], carbon_content=parameters[PARAM_CARBON_CONTENT],
+        oxidation_rate=parameters[PARAM_OXIDATION_RATE], fixed_point=fixed_point,
+    )
+
+
+def calculate_combustion(cube):
+    """
+    对整个立方体一次性计算排放，结果写入 cube.emissions 并返回。
+
+    定点模式（cube.fixed_point）的舍入规则：
+    - 每条活动数据、参数数据先按五成双舍入为定点 int64，按格子求和只用整数加法；
+    - 参数均值 = 定点合计 / 条数，按五成双舍入到定点；
+    - 每个格子的排放 = 各定点输入还原出的浮点数之积（逐元素运算，结果只取决于该格子的输入），
+      再按五成双舍入为定点 int64，写入 cube.emissions_fixed；
+    - 一切汇总（机组、电厂、全年）都在 int64 上进行，结果与求和顺序、并行分区方式无关，逐位可复现。
+    """
+    cube.emissions = combustion_emissions(cube.activity, cube.ncv, cube.carbon_content, cube.oxidation_rate)
+    if cube.fixed_point:
+        cube.emissions_fixed = to_fixed(cube.emissions, FIXED_POINT_EMISSION_DECIMALS)
+    return cube.emissions
+
+
+def fixed_point_totals(cube, by="unit"):
+    """
+    定点模式下的精确汇总（int64，× 10^FIXED_POINT_EMISSION_DECIMALS）。
+
+    :param by: "unit" -> {(电厂, 机组): 整数}；"plant" -> {电厂: 整数}；"total" -> 整数
+    """
+    if cube.emissions_fixed is None:
+        raise ValueError("立方体不是以定点模式计算的")
+    unit_totals = cube.emissions_fixed.reshape(len(cube.units), -1).sum(axis=1)
+    if by == "total":
+        return int(unit_totals.sum())
+    if by == "unit":
+        return {unit: int(total) for unit, total in zip(cube.units, unit_totals)}
+    if by == "plant":
+        totals = {}
+        for (plant_code, _unit), total in zip(cube.units, unit_totals):
+            totals[plant_code] = totals.get(plant_code, 0) + int(total)
+        return totals
+    raise ValueError(f"不支持的汇总维度: {by}")
+
+
+def reference_combustion(cube):
+    """逐格调用标量公式的参考实现，仅用于核对与测试，速度很慢。"""
+    emissions = np.empty(cube.shape)
+    for index in np.ndindex(*cube.shape):
+        emissions[index] = combustion_emission_scalar(
+            float(cube.activity[index]), float(cube.ncv[index]),
+            float(cube.carbon_content[index]), float(cube.oxidation_rate[index]),
+        )
+    return emissions
+
+
+def summarize_emissions(cube, by="unit"):
+    """
+    汇总排放量（忽略 NaN 格子）。
+
+    :param by: "unit" -> {(电厂, 机组): t}；"plant" -> {电厂: t}；"month" -> {月份: t}；"fuel" -> {燃料: t}
+    """
+    emissions = np.nan_to_num(cube.emissions)
+    if by == "unit":
+        return {unit: float(total) for unit, total in zip(cube.units, emissions.sum(axis=(1, 2)))}
+    if by == "month":
+        return {str(month): float(total) for month, total in zip(cube.months, emissions.sum(axis=(0, 2)))}
+    if by == "fuel":
+        return {fuel: float(total) for fuel, total in zip(cube.fuels, emissions.sum(axis=(0, 1)))}
+    if by == "plant":
+        totals = {}
+        for (plant_code, _unit), total in zip(cube.units, emissions.sum(axis=(1, 2))):
+            totals[plant_code] = totals.get(plant_code, 0.0) + float(total)
+        return totals
+    raise ValueError(f"不支持的汇总维度: {by}")
+
+
+# ---------------------------------------------------------------------------
+# 增量重算（依赖图）
+# ---------------------------------------------------------------------------
+
+class IncrementalCombustionCalculator:
+    """
+    维护燃烧排放结果及其输入之间的依赖关系，输入变化时只重算受影响的格子。
+
+    依赖关系按立方体格子 (机组, 月, 燃料) 组织：
+    - 活动数据行、参数数据行通过自身的 (机组, 月份, 燃料) 唯一确定所依赖的格子；
+    - 缺省排放因子 (参数类型, 燃料) 影响该燃料下所有缺少实测值的格子（逐月缺省值同样按燃料整体标脏）；
+    - 每个格子的排放汇总到机组，机组汇总到电厂，电厂汇总到集团。
+
+    实例注册为活动数据与参数数据存储的监听者：写入、更正只在对应格子上累加增量并标脏，
+    代价与批量大小成正比；refresh() 仅重算脏格子，再把排放变化量沿
+    机组 → 电厂 → 集团 逐级累加，因此一次小批量更正后的刷新与全厂群规模基本无关。
+    出现立方体以外的新机组或新燃料的活动数据时无法增量处理，refresh() 会退化为整体重建。
+    立方体的机组、燃料只由活动数据决定（与 build_combustion_cube 一致），因此落在立方体以外的
+    参数数据行不影响任何结果，直接忽略、不触发重建；该机组或燃料日后出现活动数据时，
+    整体重建会从存储中重新读到这些参数。
+
+    存储的写入可能来自其他线程（如实时数据库采集），内部用锁保护。存储在自身锁内回调监听者，
+    因此加锁顺序固定为 活动数据存储 → 参数数据存储 → 计算器，重建与刷新也按此顺序取锁，
+    刷新期间的写入会等待刷新结束。
+    """
+
+    def __init__(self, activity_store, parameter_store=None, first_month=None, n_months=12,
+                 defaults=None, plant_groups=None, subscribe=True):
+        self.activity_store = activity_store
+        self.parameter_store = parameter_store
+        self.n_months = n_months
+        self.defaults = {
+            key: {fuel: dict(value) if isinstance(value, dict) else value for fuel, value in by_fuel.items()}
+            for key, by_fuel in (defaults or {}).items()
+        }
+        self.plant_groups = dict(plant_groups or {})
+        self._first_month = first_month
+        self._lock = threading.RLock()
+        with self._locked():
+            # 重建与注册监听之间不能插入写入，否则这批数据既不在立方体中也不会被回调
+            self.rebuild()
+            if subscribe:
+                activity_store.subscribe(self)
+                if parameter_store is not None:
+                    parameter_store.subscribe(self)
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """按固定顺序取得存储锁与计算器锁。"""
+        with contextlib.ExitStack() as stack:
+            for store in (self.activity_store, self.parameter_store):
+                if store is not None:
+                    stack.enter_context(store.lock)
+            stack.enter_context(self._lock)
+            yield
+
+    def close(self):
+        """取消对存储的监听。"""
+        for store in (self.activity_store, self.parameter_store):
+            if store is not None:
+                try:
+                    store.unsubscribe(self)
+                except ValueError:
+                    pass
+
+    # ---- 整体构建 -----------------------------------------------------------
+
+    def rebuild(self):
+        """从存储全量重建立方体、参数累计量与各级汇总。"""
+        with self._locked():
+            parameter_view = self.parameter_store.columns() if self.parameter_store is not None else None
+            cube = build_combustion_cube(self.activity_store.columns(), parameter_view,
+                                         self._first_month, self.n_months, self.defaults)
+            self.cube = cube
+            self.first_month = cube.months[0]
+            size = cube.activity.size
+            self._fuel_index = np.arange(size) % max(len(cube.fuels), 1)
+            self._default_index = _default_index(size, self.n_months, len(cube.fuels))
+            self._unit_of_cell = np.arange(size) // max(self.n_months * len(cube.fuels), 1)
+
+            self._param_sums, self._param_counts = {}, {}
+            cells = (_cell_index(parameter_view, parameter_view.store.codecs, cube.units, cube.fuels,
+                                 self.first_month, self.n_months)
+                     if parameter_view is not None and len(parameter_view) else None)
+            for parameter_type in COMBUSTION_PARAMETERS:
+                if cells is not None:
+                    sums, counts = _parameter_aggregates(parameter_view, parameter_view.store.codecs,
+                                                         parameter_view.value, cells, parameter_type, size)
+                else:
+                    sums, counts = np.zeros(size), np.zeros(size, dtype=np.int64)
+                self._param_sums[parameter_type] = sums
+                self._param_counts[parameter_type] = counts
+
+            calculate_combustion(cube)
+            self.plants = sorted({plant_code for plant_code, _unit in cube.units})
+            plant_pos = {plant_code: i for i, plant_code in enumerate(self.plants)}
+            self._plant_of_unit = np.array([plant_pos[plant_code] for plant_code, _unit in cube.units],
+                                           dtype=np.int64)
+            self.groups = sorted({self.plant_groups.get(plant_code, DEFAULT_PLANT_GROUP)
+                                  for plant_code in self.plants})
+            group_pos = {group: i for i, group in enumerate(self.groups)}
+            self._group_of_plant = np.array(
+                [group_pos[self.plant_groups.get(plant_code, DEFAULT_PLANT_GROUP)] for plant_code in self.plants],
+                dtype=np.int64)
+
+            self.unit_totals = np.nan_to_num(cube.emissions).reshape(len(cube.units), -1).sum(axis=1)
+            self.plant_totals = np.bincount(self._plant_of_unit, weights=self.unit_totals,
+                                            minlength=len(self.plants))
+            self.group_totals = np.bincount(self._group_of_plant, weights=self.plant_totals,
+                                            minlength=len(self.groups))
+            self._dirty = np.zeros(size, dtype=bool)
+            self._structure_dirty = False
+
+    # ---- 存储监听接口 -------------------------------------------------------
+
+    def rows_appended(self, batch):
+        if batch.store is self.activity_store:
+            self._apply_activity(batch, np.nan_to_num(batch.quantity))
+        else:
+            self._apply_parameters(batch, batch.value, None)
+
+    def rows_updated(self, batch, old_values):
+        if batch.store is self.activity_store:
+            self._apply_activity(batch, np.nan_to_num(batch.quantity) - np.nan_to_num(old_values))
+        else:
+            self._apply_parameters(batch, batch.value, old_values)
+
+    def _apply_activity(self, batch, deltas):
+        with self._lock:
+            cube = self.cube
+            cells = _cell_index(batch, batch.store.codecs, cube.units, cube.fuels, self.first_month, self.n_months)
+            valid = cells >= 0
+            _month, in_range = _month_index(batch.period, self.first_month, self.n_months)
+            if np.any(in_range & ~valid):
+                # 立方体中没有的机组或燃料：依赖图结构变化，下一次刷新整体重建。
+                # 数量为 0 或缺测的行同样会让整体构建纳入该机组/燃料，不能按增量是否为 0 判断
+                self._structure_dirty = True
+            flat = cube.activity.reshape(-1)
+            flat += np.bincount(cells[valid], weights=deltas[valid], minlength=flat.size)
+            self._dirty[cells[valid]] = True
+
+    def _apply_parameters(self, batch, new_values, old_values):
+        with self._lock:
+            cube = self.cube
+            cells = _cell_index(batch, batch.store.codecs, cube.units, cube.fuels, self.first_month, self.n_months)
+            if not np.any(cells >= 0):
+                # 全部落在立方体以外：没有依赖这些参数的格子（见类说明）
+                return
+            size = cube.activity.size
+            for parameter_type in COMBUSTION_PARAMETERS:
+                sums, counts = _parameter_aggregates(batch, batch.store.codecs, new_values, cells, parameter_type, size)
+                if old_values is not None:
+                    old_sums, old_counts = _parameter_aggregates(batch, batch.store.codecs, old_values, cells,
+                                                                 parameter_type, size)
+                    sums, counts = sums - old_sums, counts - old_counts
+                self._param_sums[parameter_type] += sums
+                self._param_counts[parameter_type] += counts
+            self._dirty[cells[cells >= 0]] = True
+
+    def set_default(self, parameter_type, fuel_type, value):
+        """
+        设置或更新某燃料的缺省参数（排放因子），并把依赖它的格子标脏。
+
+        只有该燃料下缺少实测值的格子依赖缺省值；value 为 None 表示删除缺省值，
+        为 {"YYYY-MM": 值} 时按月取值。
+        """
+        with self._lock:
+            fuel_defaults = self.defaults.setdefault(parameter_type, {})
+            if value is None:
+                fuel_defaults.pop(fuel_type, None)
+            elif isinstance(value, dict):
+                fuel_defaults[fuel_type] = {str(month): float(v) for month, v in value.items()}
+            else:
+                fuel_defaults[fuel_type] = float(value)
+            if fuel_type not in self.cube.fuels:
+                return
+            fuel = self.cube.fuels.index(fuel_type)
+            dependents = (self._fuel_index == fuel) & (self._param_counts[parameter_type] == 0)
+            self._dirty |= dependents
+
+    # ---- 重算 ---------------------------------------------------------------
+
+    @property
+    def pending(self):
+        """是否有待重算的格子。"""
+        return self._structure_dirty or bool(self._dirty.any())
+
+    def refresh(self):
+        """
+        重算全部脏格子并沿汇总层级传播变化量。
+
+        :return: RecalculationStats
+        """
+        started = time.perf_counter()
+        with self._locked():
+            if self._structure_dirty:
+                self.rebuild()
+                cube = self.cube
+                return RecalculationStats(cube.activity.size, list(cube.units), list(self.plants),
+                                          list(self.groups), time.perf_counter() - started, full_rebuild=True)
+
+            cells = np.flatnonzero(self._dirty)
+            self._dirty[cells] = False
+            if len(cells) == 0:
+                return RecalculationStats(0, [], [], [], time.perf_counter() - started)
+
+            cube = self.cube
+            default_index = self._default_index[cells]
+            resolved = {}
+            for parameter_type in COMBUSTION_PARAMETERS:
+                lookup = _default_table(self.defaults.get(parameter_type, {}), cube.months, cube.fuels)
+                values = _resolve_parameter(self._param_sums[parameter_type][cells],
+                                            self._param_counts[parameter_type][cells], lookup, default_index)
+                getattr(cube, parameter_type).reshape(-1)[cells] = values
+                resolved[parameter_type] = values
+
+            emissions = cube.emissions.reshape(-1)
+            old = np.nan_to_num(emissions[cells])
+            new = combustion_emissions(cube.activity.reshape(-1)[cells], resolved[PARAM_NCV],
+                                       resolved[PARAM_CARBON_CONTENT], resolved[PARAM_OXIDATION_RATE])
+            emissions[cells] = new
+
+            # 变化量逐级传播：格子 -> 机组 -> 电厂 -> 集团
+            unit_idx = self._unit_of_cell[cells]
+            touched_units = np.unique(unit_idx)
+            unit_delta = np.bincount(unit_idx, weights=np.nan_to_num(new) - old, minlength=len(cube.units))
+            self.unit_totals += unit_delta
+            plant_delta = np.bincount(self._plant_of_unit, weights=unit_delta, minlength=len(self.plants))
+            self.plant_totals += plant_delta
+            self.group_totals += np.bincount(self._group_of_plant, weights=plant_delta, minlength=len(self.groups))
+            touched_plants = np.unique(self._plant_of_unit[touched_units])
+            touched_groups = np.unique(self._group_of_plant[touched_plants])
+
+            return RecalculationStats(
+                len(cells),
+                [cube.units[i] for i in touched_units],
+                [self.plants[i] for i in touched_plants],
+                [self.groups[i] for i in touched_groups],
+                time.perf_counter() - started,
+            )
+
+    # ---- 读取 ---------------------------------------------------------------
+
+    def unit_total(self, plant_code, unit_code):
+        return float(self.unit_totals[self.cube.units.index((plant_code, unit_code))])
+
+    def plant_total(self, plant_code):
+        return float(self.plant_totals[self.plants.index(plant_code)])
+
+    def group_total(self, group=DEFAULT_PLANT_GROUP):
+        return float(self.group_totals[self.groups.index(group)])
+
+    def inputs_of(self, plant_code, unit_code, month, fuel_type):
+        """
+        返回某个结果格子所依赖的输入。
+
+        :return: {"activity": 活动数据 row_id 数组, "parameters": 参数数据 row_id 数组,
+                  "defaults": [(参数类型, 缺省值), ...]}
+        """
+        start = np.datetime64(month, "M")
+        end = start + 1
+        inputs = {"activity": np.empty(0, dtype=np.int64), "parameters": np.empty(0, dtype=np.int64),
+                  "defaults": []}
+        for key, store in (("activity", self.activity_store), ("parameters", self.parameter_store)):
+            if store is None:
+                continue
+            view = store.slice(plant_code, unit_code, start.astype("datetime64[s]"), end.astype("datetime64[s]"))
+            fuel = store.codecs["fuel"].code_of(fuel_type)
+            inputs[key] = view.row_id[view.fuel == fuel].copy() if fuel is not None else inputs[key]
+        u = self.cube.units.index((plant_code, unit_code))
+        m = int((start - self.first_month).astype(np.int64))
+        f = self.cube.fuels.index(fuel_type)
+        cell = (u * self.n_months + m) * len(self.cube.fuels) + f
+        for parameter_type in COMBUSTION_PARAMETERS:
+            value = _month_default(self.defaults.get(parameter_type, {}).get(fuel_type), start, None)
+            if self._param_counts[parameter_type][cell] == 0 and value is not None:
+                inputs["defaults"].append((parameter_type, value))
+        return inputs
+
+
+# ---------------------------------------------------------------------------
+# 排放因子库：有效期区间索引 + LRU 缓存
+# ---------------------------------------------------------------------------
+
+_OPEN_END = np.iinfo(np.int64).max
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def _day_number(value):
+    """把 date / datetime / "YYYY-MM-DD" / datetime64 统一转为自 1970-01-01 起的天数。"""
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        # 逐条查询的热路径，避免构造 datetime64
+        return value.toordinal() - _EPOCH_ORDINAL
+    return int(np.datetime64(value, "D").astype(np.int64))
+
+
+class LRUCache:
+    """容量受限的最近最少使用缓存，记录命中与未命中次数。"""
+
+    _MISSING = object()
+
+    def __init__(self, maxsize=FACTOR_LOOKUP_CACHE_SIZE):
+        if maxsize <= 0:
+            raise ValueError("缓存容量必须为正数")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        value = self._data.get(key, self._MISSING)
+        if value is self._MISSING:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        """清空缓存内容（命中统计保留）。"""
+        self._data.clear()
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits,
+                "misses": self.misses, "hit_rate": self.hit_rate}
+
+
+class FactorIntervalIndex:
+    """
+    按 (燃料, 因子类型, 管辖区) 分组、按生效日期排序的因子区间索引。
+
+    同一分组内的有效期互不重叠，因此按起始日排序后，某日期所在的区间
+    就是“起始日 <= 日期”的最后一个区间，二分查找即可定位，复杂度 O(log n)。
+    """
+
+    def __init__(self):
+        self._groups = {}   # key -> ([起始日], [截止日], [因子])
+
+    @staticmethod
+    def key_of(factor):
+        return factor.fuel_type, factor.factor_type, factor.jurisdiction
+
+    def __len__(self):
+        return sum(len(starts) for starts, _ends, _factors in self._groups.values())
+
+    def __iter__(self):
+        for _starts, _ends, factors in self._groups.values():
+            yield from factors
+
+    def keys(self):
+        return list(self._groups)
+
+    def add(self, factor):
+        """
+        插入一条因子。
+
+        :raises ValueError: 有效期为空或与同组已有因子重叠
+        """
+        start = _day_number(factor.effective_from)
+        end = _day_number(factor.effective_to) if factor.effective_to is not None else _OPEN_END
+        if end <= start:
+            raise ValueError(f"因子有效期为空: {factor.effective_from} ~ {factor.effective_to}")
+        starts, ends, factors = self._groups.setdefault(self.key_of(factor), ([], [], []))
+        pos = bisect.bisect_right(starts, start)
+        if (pos > 0 and ends[pos - 1] > start) or (pos < len(starts) and starts[pos] < end):
+            raise ValueError(f"因子有效期与已有因子重叠: {factor.fuel_type}/{factor.factor_type}/"
+                             f"{factor.jurisdiction} {factor.effective_from} ~ {factor.effective_to}")
+        starts.insert(pos, start)
+        ends.insert(pos, end)
+        factors.insert(pos, factor)
+
+    def remove(self, factor):
+        key = self.key_of(factor)
+        starts, ends, factors = self._groups.get(key, ([], [], []))
+        pos = bisect.bisect_left(starts, _day_number(factor.effective_from))
+        if pos == len(starts) or factors[pos] is not factor and factors[pos] != factor:
+            raise KeyError("因子不在索引中")
+        del starts[pos], ends[pos], factors[pos]
+        if not starts:
+            del self._groups[key]
+
+    def find(self, fuel_type, factor_type, jurisdiction, day):
+        """返回某天生效的因子；day 为天数（见 _day_number），未找到返回 None。"""
+        group = self._groups.get((fuel_type, factor_type, jurisdiction))
+        if group is None:
+            return None
+        starts, ends, factors = group
+        pos = bisect.bisect_right(starts, day) - 1
+        if pos >= 0 and day < ends[pos]:
+            return factors[pos]
+        return None
+
+    def find_many(self, fuel_type, factor_type, jurisdiction, days):
+        """
+        批量查找：对天数数组一次 searchsorted，返回因子值数组（未覆盖的日期为 NaN）。
+        """
+        days = np.asarray(days, dtype=np.int64)
+        values = np.full(days.shape, np.nan)
+        group = self._groups.get((fuel_type, factor_type, jurisdiction))
+        if group is None:
+            return values
+        starts, ends, factors = group
+        pos = np.searchsorted(np.asarray(starts, dtype=np.int64), days, side="right") - 1
+        hit = pos >= 0
+        hit[hit] = days[hit] < np.asarray(ends, dtype=np.int64)[pos[hit]]
+        values[hit] = np.array([factor.value for factor in factors])[pos[hit]]
+        return values
+
+
+class EmissionFactorService:
+    """
+    排放因子库：区间索引之前加一层 LRU 缓存。
+
+    核算时同一 (燃料, 因子类型, 管辖区, 日期) 会被大量记录重复查询，缓存命中时
+    不再二分查找。未找到地方管辖区的因子时回退到 DEFAULT_JURISDICTION。
+    因子增删会清空缓存，避免读到过期结果。
+    """
+
+    def __init__(self, factors=(), cache_size=FACTOR_LOOKUP_CACHE_SIZE):
+        self.index = FactorIntervalIndex()
+        self.cache = LRUCache(cache_size)
+        self._by_id = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+        for factor in factors:
+            self.add_factor(factor)
+
+    def factors(self):
+        """按 (燃料, 因子类型, 管辖区, 生效日) 排序的全部因子。"""
+        return sorted(self.index, key=lambda f: (f.fuel_type, f.factor_type, f.jurisdiction,
+                                                 _day_number(f.effective_from)))
+
+    def add_factor(self, factor):
+        """
+        :raises ValueError: 有效期为空或与已有因子重叠
+        """
+        with self._lock:
+            self.index.add(factor)
+            if factor.factor_id is None:
+                factor.factor_id = self._next_id
+            self._next_id = max(self._next_id, factor.factor_id + 1)
+            self._by_id[factor.factor_id] = factor
+            self.cache.clear()
+        return factor
+
+    def remove_factor(self, factor_id):
+        with self._lock:
+            factor = self._by_id.pop(factor_id, None)
+            if factor is None:
+                raise KeyError(f"因子不存在: {factor_id}")
+            self.index.remove(factor)
+            self.cache.clear()
+        return factor
+
+    def lookup(self, fuel_type, factor_type, at, jurisdiction=DEFAULT_JURISDICTION):
+        """
+        查找某日期生效的因子。
+
+        :return: EmissionFactor，未找到返回 None
+        """
+        day = _day_number(at)
+        key = (fuel_type, factor_type, jurisdiction, day)
+        with self._lock:
+            factor = self.cache.get(key, LRUCache._MISSING)
+            if factor is LRUCache._MISSING:
+                factor = self.index.find(fuel_type, factor_type, jurisdiction, day)
+                if factor is None and jurisdiction != DEFAULT_JURISDICTION:
+                    factor = self.index.find(fuel_type, factor_type, DEFAULT_JURISDICTION, day)
+                self.cache.put(key, factor)
+        return factor
+
+    def value(self, fuel_type, factor_type, at, jurisdiction=DEFAULT_JURISDICTION, default=np.nan):
+        factor = self.lookup(fuel_type, factor_type, at, jurisdiction)
+        return factor.value if factor is not None else default
+
+    def values(self, fuel_type, factor_type, periods, jurisdiction=DEFAULT_JURISDICTION):
+        """对一列时间批量取因子值（不经过缓存），未覆盖的日期为 NaN。"""
+        days = np.asarray(periods).astype("datetime64[D]").astype(np.int64)
+        with self._lock:
+            values = self.index.find_many(fuel_type, factor_type, jurisdiction, days)
+            if jurisdiction != DEFAULT_JURISDICTION:
+                missing = np.isnan(values)
+                if missing.any():
+                    values[missing] = self.index.find_many(fuel_type, factor_type, DEFAULT_JURISDICTION,
+                                                           days[missing])
+        return values
+
+    def factors_at(self, at, jurisdiction=DEFAULT_JURISDICTION, factor_types=COMBUSTION_PARAMETERS):
+        """取某日期生效的全部因子：{因子类型: {燃料: EmissionFactor}}。"""
+        fuels = sorted({fuel for fuel, _type, _jurisdiction in self.index.keys()})
+        factors = {}
+        for factor_type in factor_types:
+            for fuel_type in fuels:
+                factor = self.lookup(fuel_type, factor_type, at, jurisdiction)
+                if factor is not None:
+                    factors.setdefault(factor_type, {})[fuel_type] = factor
+        return factors
+
+    def factors_by_month(self, first_month, n_months=12, jurisdiction=DEFAULT_JURISDICTION,
+                         factor_types=COMBUSTION_PARAMETERS):
+        """
+        逐月取生效的因子（各月取当月 1 日生效的因子），年内因子更替时前后月份各用各的因子。
+
+        :return: {因子类型: {燃料: {"YYYY-MM": EmissionFactor}}}，没有生效因子的月份不出现
+        """
+        months = np.datetime64(first_month, "M") + np.arange(n_months)
+        days = [month.astype("datetime64[D]").astype(date) for month in months]
+        fuels = sorted({fuel for fuel, _type, _jurisdiction in self.index.keys()})
+        factors = {}
+        for factor_type in factor_types:
+            for fuel_type in fuels:
+                by_month = {}
+                for month, day in zip(months, days):
+                    factor = self.lookup(fuel_type, factor_type, day, jurisdiction)
+                    if factor is not None:
+                        by_month[str(month)] = factor
+                if by_month:
+                    factors.setdefault(factor_type, {})[fuel_type] = by_month
+        return factors
+
+    def defaults_at(self, at, jurisdiction=DEFAULT_JURISDICTION, factor_types=COMBUSTION_PARAMETERS):
+        """
+        取某日期生效的全部因子，整理为核算使用的缺省参数 {参数类型: {燃料: 值}}。
+        """
+        return {factor_type: {fuel: factor.value for fuel, factor in by_fuel.items()}
+                for factor_type, by_fuel in self.factors_at(at, jurisdiction, factor_types).items()}
+
+    def cache_stats(self):
+        """缓存统计：{"size", "maxsize", "hits", "misses", "hit_rate"}。"""
+        return self.cache.stats()
+
+
+# ---------------------------------------------------------------------------
+# 核算公式编译
+# ---------------------------------------------------------------------------
+
+FORMULA_CONSTANTS = {"CO2_C_RATIO": CO2_C_RATIO}
+
+FORMULA_FUNCTIONS = {
+    "abs": np.abs,
+    "minimum": np.minimum,
+    "maximum": np.maximum,
+    "where": np.where,
+    "sqrt": np.sqrt,
+    "exp": np.exp,
+    "log": np.log,
+}
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.Call, ast.Name, ast.Load, ast.Constant,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.USub, ast.UAdd,
+    ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq,
+)
+
+
+class CompiledFormula:
+    """
+    编译后的公式：对整列数组一次求值，不逐条解释表达式树。
+
+    调用时按变量名传入标量或可广播的数组，返回 float64 数组。
+    """
+
+    def __init__(self, formula, code_object, variables):
+        self.formula = formula
+        self.variables = variables          # 表达式实际用到的变量，按出现顺序
+        self._code = code_object
+
+    @property
+    def key(self):
+        return self.formula.code, self.formula.version
+
+    def __call__(self, **inputs):
+        missing = [name for name in self.variables if name not in inputs]
+        if missing:
+            raise FormulaError(f"缺少公式变量: {', '.join(missing)}", self.formula.code)
+        namespace = {"__builtins__": {}}
+        namespace.update(FORMULA_CONSTANTS)
+        namespace.update(FORMULA_FUNCTIONS)
+        for name in self.variables:
+            namespace[name] = np.asarray(inputs[name], dtype=np.float64)
+        try:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return np.asarray(eval(self._code, namespace), dtype=np.float64)
+        except (ArithmeticError, ValueError, TypeError) as exc:
+            # 溢出、输入形状无法广播等求值错误统一报告为公式错误
+            raise FormulaError(f"公式求值失败: {exc}", self.formula.code) from exc
+
+
+def _is_constant_expression(node):
+    return not any(isinstance(child, ast.Name) and child.id not in FORMULA_CONSTANTS for child in ast.walk(node))
+
+
+def _literal_number(node):
+    """数值字面量（可带正负号）的值；不是字面量时返回 None。"""
+    sign = 1
+    while isinstance(node, ast.UnaryOp):
+        sign = -sign if isinstance(node.op, ast.USub) else sign
+        node = node.operand
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        return sign * node.value
+    return None
+
+
+def compile_formula(formula):
+    """
+    解析并校验公式表达式，编译为 CompiledFormula。
+
+    只允许算术、比较运算与 FORMULA_FUNCTIONS 中的函数；变量必须在 formula.variables
+    中声明。编译后的代码对象在受限命名空间中求值，不能访问内置函数或属性。
+    比较只能有一个运算符（a < b < c 对数组没有意义）；常量幂指数须为绝对值不超过
+    FORMULA_MAX_EXPONENT 的字面量。整数常量按 float64 编译，求值全程为浮点运算，
+    不会出现任意精度整数的长时间计算。
+
+    :raises FormulaError: 语法错误、使用了不允许的语法、未声明的变量或超出上限的幂指数
+    """
+    try:
+        tree = ast.parse(formula.expression, mode="eval")
+    except SyntaxError as exc:
+        raise FormulaError(f"公式语法错误（第 {exc.offset or len(formula.expression)} 列）: {exc.msg}",
+                           formula.code) from None
+
+    used = []
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise FormulaError(f"公式中不允许使用 {type(node).__name__}", formula.code)
+        if isinstance(node, ast.Constant) and (isinstance(node.value, bool)
+                                               or not isinstance(node.value, (int, float))):
+            raise FormulaError(f"公式中只允许数值常量: {node.value!r}", formula.code)
+        if isinstance(node, ast.Compare) and len(node.ops) > 1:
+            raise FormulaError(f"公式中不允许连续比较: {ast.unparse(node)}", formula.code)
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Pow) and _is_constant_expression(node.right):
+            exponent = _literal_number(node.right)
+            if exponent is None or abs(exponent) > FORMULA_MAX_EXPONENT:
+                raise FormulaError(f"常量幂指数须为绝对值不超过 {FORMULA_MAX_EXPONENT} 的数值: "
+                                   f"{ast.unparse(node.right)}", formula.code)
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in FORMULA_FUNCTIONS or node.keywords:
+                raise FormulaError(f"不支持的函数调用: {ast.unparse(node)}", formula.code)
+        if isinstance(node, ast.Name) and node.id not in FORMULA_FUNCTIONS and node.id not in FORMULA_CONSTANTS:
+            if node.id not in formula.variables:
+                raise FormulaError(f"未声明的变量: {node.id}", formula.code)
+            if node.id not in used:
+                used.append(node.id)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant):
+            node.value = float(node.value)
+    return CompiledFormula(formula, compile(tree, f"<formula:{formula.code}>", "eval"), tuple(used))
+
+
+class FormulaLibrary:
+    """
+    核算公式库。公式修改即升版本，编译结果按 (code, version) 缓存，
+    同一版本在整个进程内只解析、校验、编译一次。
+    """
+
+    def __init__(self, formulas=BUILTIN_FORMULAS):
+        self._formulas = {}
+        self._compiled = {}
+        self._lock = threading.Lock()
+        for formula in formulas:
+            self._formulas[formula.code] = formula
+
+    def __contains__(self, code):
+        return code in self._formulas
+
+    def formulas(self):
+        return list(self._formulas.values())
+
+    def get(self, code):
+        try:
+            return self._formulas[code]
+        except KeyError:
+            raise FormulaError("公式不存在", code) from None
+
+    def save(self, formula):
+        """
+        新增或修改公式：先编译校验，通过后才写入；内容变化时版本号自动递增。
+
+        :raises FormulaError: 公式无法编译
+        """
+        current = self._formulas.get(formula.code)
+        if current is not None and self._content(current) == self._content(formula):
+            return current
+        # 库内保存副本，调用方之后修改自己的对象不会让缓存的编译结果与公式内容脱节
+        formula = replace(formula, variables=dict(formula.variables))
+        if current is not None and formula.version <= current.version:
+            formula.version = current.version + 1
+        compiled = compile_formula(formula)
+        with self._lock:
+            self._formulas[formula.code] = formula
+            self._compiled[compiled.key] = compiled
+        return formula
+
+    @staticmethod
+    def _content(formula):
+        return (formula.name, formula.expression, formula.variables, formula.result_unit, formula.description)
+
+    def compiled(self, code):
+        """取当前版本的编译结果（缓存未命中时编译）。"""
+        formula = self.get(code)
+        key = (formula.code, formula.version)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = compile_formula(formula)
+            with self._lock:
+                self._compiled[key] = compiled
+        return compiled
+
+    def evaluate(self, code, **inputs):
+        return self.compiled(code)(**inputs)
+
+    @property
+    def cached_versions(self):
+        return sorted(self._compiled)
+
+
+# ---------------------------------------------------------------------------
+# 并行核算调度
+# ---------------------------------------------------------------------------
+
+_ACTIVITY_PAYLOAD_COLUMNS = ("row_id", "unit", "fuel", "period", "quantity")
+_PARAMETER_PAYLOAD_COLUMNS = ("row_id", "unit", "fuel", "period", "parameter", "value")
+
+
+def _run_combustion_partition(partition, fuels, activity, activity_codecs, parameters, parameter_codecs, defaults,
+                              fixed_point=False):
+    """子进程入口：计算一个分区的燃烧排放。须为模块级函数才能被 pickle。"""
+    started = time.perf_counter()
+    cube = _combustion_cube(activity, activity_codecs, parameters, parameter_codecs,
+                            partition.first_month, partition.n_months, defaults,
+                            units=partition.units, fuels=fuels, fixed_point=fixed_point)
+    calculate_combustion(cube)
+    return PartitionResult(partition, cube, time.perf_counter() - started)
+
+
+class ParallelCalculationScheduler:
+    """
+    把全厂群的核算按 电厂 × 时段 拆分为分区，分发到进程池并行计算。
+
+    - 父进程只负责切片打包：存储按 (电厂, 机组, 时间) 排序，每个分区是若干机组的
+      连续切片，复制成本接近内存拷贝；编码映射、按格子聚合和排放计算都在子进程完成；
+    - 分区结果按完成顺序回调 partial_callback，同时回调进度，界面可以边算边显示；
+    - 同时在途的分区数限制为 工作进程数 × CALCULATION_TASKS_PER_WORKER，控制内存占用；
+    - 分区按 (机组, 月份) 互不重叠，且分区内行序与整体视图一致，因此合并结果与
+      build_combustion_cube 单进程计算逐位相同。
+
+    max_workers 为 1 时在当前进程内串行执行，便于调试。
+    """
+
+    def __init__(self, activity_store, parameter_store=None, max_workers=None,
+                 partition_months=CALCULATION_PARTITION_MONTHS, mp_context="spawn"):
+        self.activity_store = activity_store
+        self.parameter_store = parameter_store
+        self.max_workers = max_workers or multiprocessing.cpu_count()
+        self.partition_months = partition_months
+        self.mp_context = mp_context
+        self._executor = None
+
+    def _ensure_executor(self):
+        """进程池在多次核算之间复用，避免每次都承担子进程启动与模块导入的开销。"""
+        if self._executor is None:
+            context = multiprocessing.get_context(self.mp_context)
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+        return self._executor
+
+    def close(self):
+        """关闭进程池。"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    # ---- 分区 ---------------------------------------------------------------
+
+    def _unit_slice(self, store, unit, start, end, columns):
+        plant_code, unit_code = unit
+        view = store.slice(plant_code, unit_code, start, end)
+        return {name: getattr(view, name) for name in columns}
+
+    def plan(self, first_month, n_months, plants=None):
+        """
+        生成分区列表与全局燃料列表。
+
+        :return: (分区列表, 机组列表, 燃料列表)，机组与燃料按编码顺序排列，与单进程计算一致
+        """
+        first_month = np.datetime64(first_month, "M")
+        start = first_month.astype("datetime64[s]")
+        end = (first_month + n_months).astype("datetime64[s]")
+        codecs = self.activity_store.codecs
+        plants = set(plants) if plants is not None else None
+        fuel_present = np.zeros(len(codecs["fuel"]), dtype=bool)
+        units_by_plant = {}
+        for unit in codecs["unit"].labels:
+            if plants is not None and unit[0] not in plants:
+                continue
+            fuel = self._unit_slice(self.activity_store, unit, start, end, ("fuel",))["fuel"]
+            if len(fuel):
+                fuel_present |= np.bincount(fuel, minlength=len(fuel_present)) > 0
+                units_by_plant.setdefault(unit[0], []).append(unit)
+        fuels = [codecs["fuel"].decode(code) for code in np.flatnonzero(fuel_present)]
+
+        partitions = []
+        for plant_code in sorted(units_by_plant):
+            for offset in range(0, n_months, self.partition_months):
+                partitions.append(CalculationPartition(
+                    len(partitions), plant_code, first_month + offset,
+                    min(self.partition_months, n_months - offset), units_by_plant[plant_code],
+                ))
+        units = sorted((unit for group in units_by_plant.values() for unit in group),
+                       key=codecs["unit"].code_of)
+        return partitions, units, fuels
+
+    def _payload(self, partition, store, columns):
+        if store is None:
+            return None
+        start = partition.first_month.astype("datetime64[s]")
+        end = (partition.first_month + partition.n_months).astype("datetime64[s]")
+        slices = [self._unit_slice(store, unit, start, end, columns) for unit in partition.units]
+        # 脱离存储的视图：只携带列数据，编码表另行传递
+        return ColumnView(None, {name: np.concatenate([part[name] for part in slices]) for name in columns})
+
+    def _arguments(self, partition, fuels, defaults, fixed_point):
+        parameter_codecs = self.parameter_store.codecs if self.parameter_store is not None else None
+        return (
+            partition, fuels,
+            self._payload(partition, self.activity_store, _ACTIVITY_PAYLOAD_COLUMNS), self.activity_store.codecs,
+            self._payload(partition, self.parameter_store, _PARAMETER_PAYLOAD_COLUMNS), parameter_codecs,
+            defaults, fixed_point,
+        )
+
+    # ---- 执行 ---------------------------------------------------------------
+
+    def run(self, first_month, n_months=12, defaults=None, plants=None, progress_callback=None,
+            partial_callback=None, cancel_event=None, fixed_point=False):
+        """
+        并行计算并合并为完整的 CombustionCube。
+
+        :param progress_callback: 分区规划完成后调用一次，之后每完成一个分区调用一次，参数为 CalculationProgress
+        :param partial_callback: 每完成一个分区调用一次，参数为 PartitionResult
+        :param cancel_event: threading.Event，置位后不再提交新分区并放弃排队中的分区
+        :param fixed_point: 定点模式；合并后的 emissions_fixed 与单进程定点计算逐位相同
+        :raises CalculationCancelledError: 被取消
+        """
+        started = time.perf_counter()
+        partitions, units, fuels = self.plan(first_month, n_months, plants)
+        first_month = np.datetime64(first_month, "M")
+        cube = self._empty_cube(first_month, n_months, units, fuels, defaults or {}, fixed_point)
+        unit_pos = {unit: i for i, unit in enumerate(units)}
+
+        def collect(result):
+            part = result.partition
+            rows = [unit_pos[unit] for unit in part.units]
+            m0 = int((part.first_month - first_month).astype(np.int64))
+            months = slice(m0, m0 + part.n_months)
+            for name in _CUBE_ARRAYS + (("emissions_fixed",) if fixed_point else ()):
+                getattr(cube, name)[rows, months, :] = getattr(result.cube, name)
+            done = collect.count = collect.count + 1
+            if partial_callback is not None:
+                partial_callback(result)
+            if progress_callback is not None:
+                progress_callback(CalculationProgress(done, len(partitions), time.perf_counter() - started, result))
+        collect.count = 0
+        if progress_callback is not None:
+            progress_callback(CalculationProgress(0, len(partitions), time.perf_counter() - started))
+
+        if self.max_workers <= 1:
+            for partition in partitions:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise CalculationCancelledError("核算已取消")
+                collect(_run_combustion_partition(*self._arguments(partition, fuels, defaults, fixed_point)))
+            return cube
+
+        executor = self._ensure_executor()
+        pending = set()
+        queue = iter(partitions)
+        limit = self.max_workers * CALCULATION_TASKS_PER_WORKER
+        try:
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise CalculationCancelledError("核算已取消")
+                for partition in queue:
+                    pending.add(executor.submit(_run_combustion_partition,
+                                                *self._arguments(partition, fuels, defaults, fixed_point)))
+                    if len(pending) >= limit:
+                        break
+                if not pending:
+                    break
+                # 定期醒来检查取消标志
+                done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future.result())
+        finally:
+            # 取消或出错时放弃尚未开始的分区；正在运行的分区结束后结果被丢弃
+            for future in pending:
+                future.cancel()
+        logger.info("并行核算完成: %s 个分区，%s 个工作进程，用时 %.2fs", len(partitions), self.max_workers,
+                    time.perf_counter() - started)
+        return cube
+
+    @staticmethod
+    def _empty_cube(first_month, n_months, units, fuels, defaults, fixed_point=False):
+        shape = (len(units), n_months, len(fuels))
+        parameters = {}
+        for parameter_type in COMBUSTION_PARAMETERS:
+            values = _default_table(defaults.get(parameter_type, {}), first_month + np.arange(n_months), fuels)
+            parameters[parameter_type] = np.broadcast_to(values.reshape(shape[1:]), shape).copy()
+        cube = CombustionCube(
+            units=list(units), months=first_month + np.arange(n_months), fuels=list(fuels),
+            activity=np.zeros(shape), ncv=parameters[PARAM_NCV],
+            carbon_content=parameters[PARAM_CARBON_CONTENT], oxidation_rate=parameters[PARAM_OXIDATION_RATE],
+            fixed_point=fixed_point,
+        )
+        calculate_combustion(cube)
+        return cube
+
+
+# ---------------------------------------------------------------------------
+# 结果溯源
+# ---------------------------------------------------------------------------
+
+def _compact_ids(row_ids):
+    """row_id 不超过 uint32 范围时以 4 字节保存，溯源数据量减半。"""
+    if len(row_ids) == 0 or row_ids.max() < np.iinfo(np.uint32).max:
+        return row_ids.astype(np.uint32)
+    return row_ids.astype(np.int64)
+
+
+def _group_rows(cells, row_ids, size):
+    """按格子把行编号分组为 CSR：(偏移数组, 按格子排列的行编号)。组内保持原有行序。"""
+    valid = cells >= 0
+    cells, row_ids = cells[valid], row_ids[valid]
+    order = np.argsort(cells, kind="stable")
+    offsets = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(cells, minlength=size), out=offsets[1:])
+    return offsets, _compact_ids(row_ids[order])
+
+
+def build_lineage(cube, activity_view, parameter_view=None, default_factor_ids=None,
+                  formula_code="combustion", formula_version=1):
+    """
+    为一个已计算的立方体建立溯源索引。
+
+    :param default_factor_ids: {参数类型: {燃料: factor_id 或 {"YYYY-MM": factor_id}}}，缺省参数来自因子库时提供
+    :return: ResultLineage
+    """
+    size = cube.activity.size
+    first_month, n_months = cube.months[0], len(cube.months)
+    cells = _cell_index(activity_view, activity_view.store.codecs, cube.units, cube.fuels, first_month, n_months)
+    activity_offsets, activity_rows = _group_rows(cells, activity_view.row_id, size)
+
+    measured = np.zeros((size, len(COMBUSTION_PARAMETERS)), dtype=bool)
+    parameter_offsets, parameter_rows = np.zeros(size + 1, dtype=np.int64), np.empty(0, dtype=np.uint32)
+    if parameter_view is not None and len(parameter_view):
+        codecs = parameter_view.store.codecs
+        cells = _cell_index(parameter_view, codecs, cube.units, cube.fuels, first_month, n_months)
+        codes = [codecs["parameter"].code_of(parameter_type) for parameter_type in COMBUSTION_PARAMETERS]
+        relevant = np.isin(parameter_view.parameter, [code for code in codes if code is not None])
+        cells = np.where(relevant & ~np.isnan(parameter_view.value), cells, -1)
+        parameter_offsets, parameter_rows = _group_rows(cells, parameter_view.row_id, size)
+        for k, code in enumerate(codes):
+            if code is not None:
+                hit = cells[parameter_view.parameter == code]
+                measured[hit[hit >= 0], k] = True
+
+    factor_ids = np.full((size, len(COMBUSTION_PARAMETERS)), -1, dtype=np.int32)
+    default_index = _default_index(size, n_months, len(cube.fuels))
+    for k, parameter_type in enumerate(COMBUSTION_PARAMETERS):
+        ids = (default_factor_ids or {}).get(parameter_type, {})
+        lookup = _default_table(ids, cube.months, cube.fuels, missing=-1, dtype=np.int32)
+        if len(lookup):
+            factor_ids[:, k] = np.where(measured[:, k], -1, lookup[default_index])
+
+    return ResultLineage(
+        units=list(cube.units), months=cube.months.copy(), fuels=list(cube.fuels),
+        activity_offsets=activity_offsets, activity_rows=activity_rows,
+        parameter_offsets=parameter_offsets, parameter_rows=parameter_rows,
+        factor_ids=factor_ids, formula_code=formula_code, formula_version=formula_version,
+    )
+
+
+def _gather(offsets, rows, cells):
+    """取出多个格子的行编号；格子连续时直接返回切片（零拷贝）。"""
+    if len(cells) == 0:
+        return rows[:0]
+    if cells[-1] - cells[0] + 1 == len(cells):
+        return rows[offsets[cells[0]]:offsets[cells[-1] + 1]]
+    starts, ends = offsets[cells], offsets[cells + 1]
+    lengths = ends - starts
+    total = int(lengths.sum())
+    # 每段起点减去其在结果中的位置，再加上连续序号，即得到各元素在 rows 中的下标
+    shift = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return rows[shift + np.arange(total)]
+
+
+class LineageTracer:
+    """
+    溯源查询：从任意层级的合计（机组/电厂/月份/燃料的组合）追溯到原始读数。
+
+    结果格子的扁平下标以机组为最高位，同一机组全年的格子是一段连续区间，
+    对应的行编号也连续，因此“某机组年度合计”的追溯是一次切片；跨机组的查询
+    用向量化的区间拼接，代价与返回的行数成正比。
+    """
+
+    def __init__(self, lineage):
+        self.lineage = lineage
+        self._unit_pos = {unit: i for i, unit in enumerate(lineage.units)}
+        self._plants = np.array([plant_code for plant_code, _unit in lineage.units], dtype=object)
+
+    def cells(self, plant_code=None, unit_code=None, month=None, fuel_type=None):
+        """按条件选出结果格子的扁平下标（升序）。"""
+        lineage = self.lineage
+        n_units, n_months, n_fuels = len(lineage.units), len(lineage.months), len(lineage.fuels)
+        if unit_code is not None:
+            u = self._unit_pos.get((plant_code, unit_code))
+            units = np.array([u] if u is not None else [], dtype=np.int64)
+        elif plant_code is not None:
+            units = np.flatnonzero(self._plants == plant_code)
+        else:
+            units = np.arange(n_units)
+        if month is not None:
+            m = int((np.datetime64(month, "M") - lineage.months[0]).astype(np.int64))
+            months = np.array([m] if 0 <= m < n_months else [], dtype=np.int64)
+        else:
+            months = np.arange(n_months)
+        if fuel_type is not None:
+            fuels = np.array([lineage.fuels.index(fuel_type)] if fuel_type in lineage.fuels else [], dtype=np.int64)
+        else:
+            fuels = np.arange(n_fuels)
+        return ((units[:, None, None] * n_months + months[None, :, None]) * n_fuels + fuels[None, None, :]).ravel()
+
+    def trace(self, plant_code=None, unit_code=None, month=None, fuel_type=None):
+        """
+        :return: LineageTrace，activity_rows / parameter_rows 为 row_id 数组
+        """
+        started = time.perf_counter()
+        lineage = self.lineage
+        cells = self.cells(plant_code, unit_code, month, fuel_type)
+        activity_rows = _gather(lineage.activity_offsets, lineage.activity_rows, cells)
+        parameter_rows = _gather(lineage.parameter_offsets, lineage.parameter_rows, cells)
+        factor_ids = np.unique(lineage.factor_ids[cells])
+        return LineageTrace(cells, activity_rows, parameter_rows, factor_ids[factor_ids >= 0],
+                            lineage.formula_code, lineage.formula_version, time.perf_counter() - started)
+
+    def subset(self, plant_code):
+        """
+        只含某电厂各机组的溯源数据（ResultLineage），格子按原顺序重新编号。
+
+        用于把溯源数据交给单个电厂的核查机构，不附带其他电厂的数据。
+        """
+        lineage = self.lineage
+        cells = self.cells(plant_code)
+
+        def csr(offsets, rows):
+            lengths = offsets[cells + 1] - offsets[cells]
+            sub_offsets = np.zeros(len(cells) + 1, dtype=offsets.dtype)
+            np.cumsum(lengths, out=sub_offsets[1:])
+            return sub_offsets, _gather(offsets, rows, cells)
+
+        activity_offsets, activity_rows = csr(lineage.activity_offsets, lineage.activity_rows)
+        parameter_offsets, parameter_rows = csr(lineage.parameter_offsets, lineage.parameter_rows)
+        return ResultLineage(
+            units=[lineage.units[u] for u in np.flatnonzero(self._plants == plant_code)],
+            months=lineage.months, fuels=list(lineage.fuels),
+            activity_offsets=activity_offsets, activity_rows=activity_rows,
+            parameter_offsets=parameter_offsets, parameter_rows=parameter_rows,
+            factor_ids=lineage.factor_ids[cells],
+            formula_code=lineage.formula_code, formula_version=lineage.formula_version,
+        )
+
+
+def save_lineage(lineage, path):
+    """以 .npz 保存溯源数据；标签以字符串数组保存，不使用 pickle。"""
+    np.savez(
+        path,
+        plants=np.array([plant_code for plant_code, _unit in lineage.units], dtype=str),
+        unit_codes=np.array([unit_code for _plant, unit_code in lineage.units], dtype=str),
+        months=lineage.months, fuels=np.array(lineage.fuels, dtype=str),
+        activity_offsets=lineage.activity_offsets, activity_rows=lineage.activity_rows,
+        parameter_offsets=lineage.parameter_offsets, parameter_rows=lineage.parameter_rows,
+        factor_ids=lineage.factor_ids,
+        formula=np.array([lineage.formula_code, str(lineage.formula_version)], dtype=str),
+    )
+
+
+def load_lineage(path):
+    with np.load(path, allow_pickle=False) as data:
+        return ResultLineage(
+            units=list(zip(data["plants"].tolist(), data["unit_codes"].tolist())),
+            months=data["months"], fuels=data["fuels"].tolist(),
+            activity_offsets=data["activity_offsets"], activity_rows=data["activity_rows"],
+            parameter_offsets=data["parameter_offsets"], parameter_rows=data["parameter_rows"],
+            factor_ids=data["factor_ids"],
+            formula_code=str(data["formula"][0]), formula_version=int(data["formula"][1]),
+        )
+
+
+# ---------------------------------------------------------------------------
+# 蒙特卡洛不确定性分析
+# ---------------------------------------------------------------------------
+
+# 正态分布 95% 置信水平对应的覆盖因子，用于把“±x%（95%）”换算为相对标准差
+_COVERAGE_FACTOR_95 = 1.959963984540054
+
+_UNCERTAIN_INPUTS = ("activity",) + COMBUSTION_PARAMETERS
+
+
+class _StreamingSummary:
+    """
+    逐批累计若干个量（列）的抽样统计，内存与抽样次数无关。
+
+    - 均值与方差按 Chan 等人的分组合并公式逐批合并，数值稳定；
+    - 分位数用固定分箱数的直方图估计：初始分箱范围由调用方给出的预期中心 ± 8 倍预期标准差
+      确定（与分批方式无关）；有值落在范围以外时，把该列相邻两箱合并、范围向越界一侧加倍，
+      直到覆盖该值，不会截断任何抽样。分位数在分箱内线性插值，并以实际最小、最大值截断。
+
+    内存占用为 列数 × bins 个计数，与 draws 无关。
+    """
+
+    _SPAN_SIGMAS = 8.0
+
+    def __init__(self, center, spread, bins=MONTE_CARLO_HISTOGRAM_BINS):
+        """
+        :param center: 各列的预期中心值
+        :param spread: 各列的预期标准差，为 0 时取极窄的初始范围，由扩展机制兜底
+        :param bins: 分箱数，须为不小于 2 的偶数（扩展时两两合并）
+        """
+        if bins < 2 or bins % 2:
+            raise ValueError("直方图分箱数须为不小于 2 的偶数")
+        center = np.asarray(center, dtype=np.float64)
+        spread = np.asarray(spread, dtype=np.float64)
+        n_columns = len(center)
+        self.bins = bins
+        self.count = 0
+        self.mean = np.zeros(n_columns)
+        self._m2 = np.zeros(n_columns)
+        self.minimum = np.full(n_columns, np.inf)
+        self.maximum = np.full(n_columns, -np.inf)
+        half = np.where(spread > 0, self._SPAN_SIGMAS * spread, np.maximum(np.abs(center), 1.0) * 1e-9)
+        self._lo = center - half
+        self._width = 2 * half / bins
+        self._histogram = np.zeros((n_columns, bins), dtype=np.int64)
+
+    def update(self, values):
+        """累计一批抽样，values 形状为 (批量, 列数)。"""
+        n = len(values)
+        if n == 0:
+            return
+        batch_mean = values.mean(axis=0)
+        batch_m2 = ((values - batch_mean) ** 2).sum(axis=0)
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean = self.mean + delta * (n / total)
+        self._m2 = self._m2 + batch_m2 + delta ** 2 * (self.count * n / total)
+        self.count = total
+        batch_min, batch_max = values.min(axis=0), values.max(axis=0)
+        np.minimum(self.minimum, batch_min, out=self.minimum)
+        np.maximum(self.maximum, batch_max, out=self.maximum)
+
+        outside = (batch_min < self._lo) | (batch_max >= self._lo + self.bins * self._width)
+        for column in np.flatnonzero(outside):
+            self._widen(column, batch_min[column], batch_max[column])
+        # 范围已覆盖全部值，截断只防止上界处的浮点舍入
+        index = np.clip(np.floor((values - self._lo) / self._width), 0, self.bins - 1).astype(np.int64)
+        index += np.arange(values.shape[1]) * self.bins
+        self._histogram += np.bincount(index.ravel(), minlength=self._histogram.size).reshape(self._histogram.shape)
+
+    def _widen(self, column, low, high):
+        """把一列的分箱范围逐次加倍直到覆盖 [low, high]，已有计数两两合并。"""
+        half_bins = self.bins // 2
+        while low < self._lo[column] or high >= self._lo[column] + self.bins * self._width[column]:
+            merged = self._histogram[column].reshape(half_bins, 2).sum(axis=1)
+            self._histogram[column] = 0
+            if low < self._lo[column]:
+                self._histogram[column, half_bins:] = merged
+                self._lo[column] -= self.bins * self._width[column]
+            else:
+                self._histogram[column, :half_bins] = merged
+            self._width[column] *= 2
+
+    @property
+    def std(self):
+        return np.sqrt(self._m2 / max(self.count, 1))
+
+    def percentiles(self, percentiles):
+        """估计各列的分位数，返回形状 (列数, len(percentiles))。"""
+        n_columns = len(self.mean)
+        result = np.empty((n_columns, len(percentiles)))
+        if self.count == 0:
+            result.fill(np.nan)
+            return result
+        cumulative = np.cumsum(self._histogram, axis=1)
+        rows = np.arange(n_columns)
+        for k, percentile in enumerate(percentiles):
+            rank = percentile / 100 * self.count
+            b = np.minimum((cumulative < rank).sum(axis=1), self.bins - 1)
+            before = np.where(b > 0, cumulative[rows, np.maximum(b - 1, 0)], 0)
+            inside = self._histogram[rows, b]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                fraction = np.where(inside > 0, (rank - before) / inside, 0.5)
+            estimate = self._lo + (b + np.clip(fraction, 0.0, 1.0)) * self._width
+            result[:, k] = np.clip(estimate, self.minimum, self.maximum)
+        return result
+
+
+def _uncertainty_inputs(cube, spec):
+    """
+    :return: (各 (机组, 燃料) 的全年基准排放, 各输入量按燃料的相对标准差 (输入量, 燃料),
+              碳氧化率相对误差上限 (机组, 燃料))
+    """
+    # NaN（参数缺失）按 0 计，与合计口径一致
+    base = np.nansum(cube.emissions, axis=1)
+    sigma = np.array([[spec.of(name, fuel) / _COVERAGE_FACTOR_95 for fuel in cube.fuels]
+                      for name in _UNCERTAIN_INPUTS]).reshape(len(_UNCERTAIN_INPUTS), len(cube.fuels))
+    # 碳氧化率不能超过 1：按各 (机组, 燃料) 的基准值求出相对误差的上限
+    oxidation = np.nanmean(cube.oxidation_rate, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        oxidation_cap = np.where(oxidation > 0, 1.0 / oxidation - 1.0, np.inf)
+    return base, sigma, oxidation_cap
+
+
+def _uncertainty_draws(cube, spec, draws, chunk_size, seed):
+    """
+    按批生成各机组全年排放的抽样，逐批产出形状为 (批量, 机组数) 的数组。
+
+    随机数按“抽样次数”为最外层维度生成，因此相同 seed 与 draws 下，
+    不论 chunk_size 取多少，拼接后的抽样序列都逐位相同。
+    """
+    base, sigma, oxidation_cap = _uncertainty_inputs(cube, spec)
+    n_units, n_fuels = base.shape
+    rng = np.random.default_rng(seed)
+    for lo in range(0, draws, chunk_size):
+        n = min(chunk_size, draws - lo)
+        normals = rng.standard_normal((n, len(_UNCERTAIN_INPUTS), n_units, n_fuels))
+        factor = np.ones((n, n_units, n_fuels))
+        for k, name in enumerate(_UNCERTAIN_INPUTS):
+            error = normals[:, k] * sigma[k]
+            if name == PARAM_OXIDATION_RATE:
+                np.minimum(error, oxidation_cap, out=error)
+            factor *= np.maximum(1.0 + error, 0.0)
+        yield np.einsum("duf,uf->du", factor, base)
+
+
+def monte_carlo_uncertainty(cube, spec=None, draws=MONTE_CARLO_DRAWS, chunk_size=MONTE_CARLO_CHUNK_SIZE,
+                            seed=None, confidence=UNCERTAINTY_CONFIDENCE, progress_callback=None,
+                            bins=MONTE_CARLO_HISTOGRAM_BINS):
+    """
+    对已计算的立方体做蒙特卡洛不确定性分析，给出机组、电厂与总计的置信区间。
+
+    假设同一 (机组, 燃料) 的各输入量误差来自同一计量/检测方法，在全年各月间完全相关，
+    不同机组、不同燃料、不同输入量之间相互独立。于是每次抽样只需对每个 (机组, 燃料)
+    抽取 4 个相对误差，乘到该组合的全年基准排放上，运算量与月份数、原始记录数无关。
+
+    抽样分批进行，每批 chunk_size 次，中间数组大小为 批量 × 机组数 × 燃料数；
+    每批之后只把各级合计并入流式统计（见 _StreamingSummary），不保留逐次抽样结果，
+    内存占用上限约为 批量 × 机组数 × 燃料数 + (机组数 + 电厂数 + 1) × bins，与总抽样次数无关。
+    均值与标准差是精确值；置信区间由直方图估计，误差远小于抽样误差。
+    相同的 seed、draws 与 bins 给出相同的抽样序列与置信区间，与 chunk_size 无关
+    （均值、标准差的逐批合并顺序随 chunk_size 变化，只有末位舍入差异）。
+
+    :param cube: 已计算 emissions 的 CombustionCube
+    :param spec: UncertaintySpec，默认各输入 ±2%（碳氧化率 ±1%）
+    :param progress_callback: 每批完成后调用，参数为 (已完成次数, 总次数)
+    :param bins: 估计分位数所用的直方图分箱数
+    :return: UncertaintyResult
+    """
+    if cube.emissions is None:
+        raise ValueError("尚未计算排放量")
+    spec = spec or UncertaintySpec()
+    started = time.perf_counter()
+    n_units = len(cube.units)
+    plants = sorted({plant_code for plant_code, _unit in cube.units})
+    plant_pos = {plant_code: i for i, plant_code in enumerate(plants)}
+    plant_matrix = np.zeros((n_units, len(plants)))
+    plant_matrix[np.arange(n_units), [plant_pos[plant_code] for plant_code, _unit in cube.units]] = 1.0
+
+    # 直方图的初始范围取自误差设定的解析近似（各输入独立、相对误差乘积的方差），与分批方式无关
+    base, sigma, _cap = _uncertainty_inputs(cube, spec)
+    relative_variance = np.prod(1.0 + sigma ** 2, axis=0) - 1.0
+    unit_center, unit_variance = base.sum(axis=1), (base ** 2 * relative_variance).sum(axis=1)
+    unit_summary = _StreamingSummary(unit_center, np.sqrt(unit_variance), bins)
+    plant_summary = _StreamingSummary(unit_center @ plant_matrix, np.sqrt(unit_variance @ plant_matrix), bins)
+    total_summary = _StreamingSummary([unit_center.sum()], [np.sqrt(unit_variance.sum())], bins)
+    done = 0
+    for unit_totals in _uncertainty_draws(cube, spec, draws, chunk_size, seed):
+        unit_summary.update(unit_totals)
+        plant_summary.update(unit_totals @ plant_matrix)
+        total_summary.update(unit_totals.sum(axis=1, keepdims=True))
+        done += len(unit_totals)
+        if progress_callback is not None:
+            progress_callback(done, draws)
+
+    tail = (1.0 - confidence) / 2 * 100
+    percentiles = (tail, 100 - tail)
+    total_interval = total_summary.percentiles(percentiles)[0]
+    return UncertaintyResult(
+        units=list(cube.units), plants=plants, draws=draws, confidence=confidence, seed=seed,
+        unit_mean=unit_summary.mean, unit_std=unit_summary.std,
+        unit_interval=unit_summary.percentiles(percentiles),
+        plant_mean=plant_summary.mean, plant_std=plant_summary.std,
+        plant_interval=plant_summary.percentiles(percentiles),
+        total_mean=float(total_summary.mean[0]), total_std=float(total_summary.std[0]),
+        total_interval=(float(total_interval[0]), float(total_interval[1])),
+        elapsed=time.perf_counter() - started,
+    )
+
+
+# ---------------------------------------------------------------------------
+# 核算结果磁盘缓存
+# ---------------------------------------------------------------------------
+
+def calculation_fingerprint(activity_store, parameter_store, first_month, n_months, defaults=None,
+                            default_factor_ids=None, formula_key=("combustion", 1), fixed_point=False, plants=None):
+    """
+    计算一次核算的输入指纹（BLAKE2b 十六进制）。
+
+    指纹覆盖：核算区间内各机组的活动数据与参数数据切片（按存储顺序逐列散列，
+    切片为零拷贝视图，散列速度接近内存带宽）、切片中出现的编码所对应的标签、
+    缺省参数及其因子编号、公式编号与版本、是否定点模式、缓存格式版本。
+    任一输入变化都会得到不同的指纹；数据未变时指纹稳定，可作为缓存键。
+    并行核算与单进程核算结果逐位相同，两者共用同一指纹。
+
+    :param plants: 只核算部分电厂时的电厂列表，指纹只覆盖这些电厂的数据；None 表示全部电厂
+    """
+    first_month = np.datetime64(first_month, "M")
+    start = first_month.astype("datetime64[s]")
+    end = (first_month + n_months).astype("datetime64[s]")
+    digest = hashlib.blake2b(digest_size=20)
+    header = {
+        "format": CALCULATION_CACHE_FORMAT, "first_month": str(first_month), "n_months": int(n_months),
+        "defaults": defaults or {}, "factor_ids": default_factor_ids or {}, "formula": list(formula_key),
+        "fixed_point": bool(fixed_point),
+    }
+    if plants is not None:
+        plants = set(plants)
+        header["plants"] = sorted(plants)
+    digest.update(json.dumps(header, sort_keys=True, ensure_ascii=False, default=float).encode("utf-8"))
+    stores = (("activity", activity_store, ("fuel", "period", "quantity")),
+              ("parameter", parameter_store, ("fuel", "period", "parameter", "value")))
+    for name, store, columns in stores:
+        if store is None:
+            continue
+        digest.update(name.encode())
+        codecs = store.codecs
+        for unit in codecs["unit"].labels:
+            if plants is not None and unit[0] not in plants:
+                continue
+            view = store.slice(unit[0], unit[1], start, end)
+            if not len(view):
+                continue
+            digest.update(json.dumps(unit, ensure_ascii=False).encode("utf-8"))
+            for column in columns:
+                values = getattr(view, column)
+                digest.update(np.ascontiguousarray(values).view(np.uint8))
+                if column in codecs:
+                    # 编码是存储内部的，必须连同标签一起散列
+                    labels = [codecs[column].decode(code) for code in np.unique(values)]
+                    digest.update(json.dumps(labels, ensure_ascii=False).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def save_cube(cube, path):
+    """以 .npz 保存立方体（不使用 pickle）。"""
+    np.savez(
+        path,
+        plants=np.array([plant_code for plant_code, _unit in cube.units], dtype=str),
+        unit_codes=np.array([unit_code for _plant, unit_code in cube.units], dtype=str),
+        months=cube.months, fuels=np.array(cube.fuels, dtype=str),
+        **{name: getattr(cube, name) for name in _CUBE_ARRAYS},
+        **({"emissions_fixed": cube.emissions_fixed} if cube.emissions_fixed is not None else {}),
+    )
+
+
+def load_cube(path):
+    with np.load(path, allow_pickle=False) as data:
+        return CombustionCube(
+            units=list(zip(data["plants"].tolist(), data["unit_codes"].tolist())),
+            months=data["months"], fuels=data["fuels"].tolist(),
+            **{name: data[name] for name in _CUBE_ARRAYS},
+            fixed_point="emissions_fixed" in data.files,
+            emissions_fixed=data["emissions_fixed"] if "emissions_fixed" in data.files else None,
+        )
+
+
+class CalculationCache:
+    """
+    以输入指纹为键的核算结果磁盘缓存。
+
+    每个结果保存为 <指纹>.npz，先写临时文件再原子改名，进程中途退出不会留下半个文件。
+    命中时刷新文件修改时间；写入后若总大小超过 max_bytes，按修改时间从旧到新淘汰（LRU）。
+    """
+
+    SUFFIX = ".npz"
+
+    def __init__(self, root, max_bytes=CALCULATION_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, key + self.SUFFIX)
+
+    def get(self, key):
+        """命中返回 CombustionCube，否则返回 None；损坏的缓存文件会被删除。"""
+        path = self._path(key)
+        try:
+            cube = load_cube(path)
+        except FileNotFoundError:
+            cube = None
+        except (OSError, ValueError, KeyError) as exc:
+            logger.warning("核算缓存文件损坏，已删除: %s (%s)", path, exc)
+            self._remove(path)
+            cube = None
+        if cube is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return cube
+
+    def put(self, key, cube):
+        """写入一个结果；写入失败（如磁盘已满）时删除临时文件后重新抛出异常。"""
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as handle:
+                save_cube(cube, handle)
+            os.replace(tmp_path, path)
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+        self.evict()
+        return path
+
+    def entries(self):
+        """[(路径, 大小, 修改时间)]，按修改时间从旧到新。"""
+        entries = []
+        with os.scandir(self.root) as scan:
+            for entry in scan:
+                if entry.name.endswith(self.SUFFIX) and entry.is_file():
+                    stat = entry.stat()
+                    entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda item: item[2])
+
+    def size(self):
+        return sum(size for _path, size, _mtime in self.entries())
+
+    def evict(self):
+        """淘汰最久未使用的结果，直至总大小不超过上限；返回淘汰的文件数。"""
+        with self._lock:
+            entries = self.entries()
+            total = sum(size for _path, size, _mtime in entries)
+            removed = 0
+            for path, size, _mtime in entries:
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+                removed += 1
+            return removed
+
+    def clear(self):
+        for path, _size, _mtime in self.entries():
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def stats(self):
+        entries = self.entries()
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return {"entries": len(entries), "bytes": sum(size for _path, size, _mtime in entries),
+                "max_bytes": self.max_bytes, "hits": hits, "misses": misses}
@@ -6,17 +6,122 @@
 # @Software: PyCharm / VSCode
 # @Description: emission_calculation 模块的 calculation_task_widget.py 文件。
 
-# Python 标准库导入
-import sys
-import os
+# 第三方库导入
+import numpy as np
 
-# PyQt5 相关导入 (根据实际需要调整)
-# from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel
-# from PyQt5.QtCore import Qt, pyqtSignal, QObject
+# PyQt5 相关导入
+from PyQt5.QtCore import QDate
+from PyQt5.QtWidgets import (
+    QDateEdit, QHBoxLayout, QHeaderView, QLabel, QProgressBar, QPushButton, QSpinBox, QTableWidget,
+    QTableWidgetItem, QVBoxLayout, QWidget,
+)
 
-# 项目内部模块导入 (示例)
-# from ..core.base_controller import BaseController
-# from ...utils.logger_setup import logger
+# 项目内部模块导入
+from ....core.app_signals import app_signals
+from ....utils.helpers import format_duration
 
 
-pass # 请在此处实现具体功能
+class CalculationTaskWidget(QWidget):
+    """
+    核算任务界面：启动并行核算、显示分区进度与已完成分区的结果，可随时取消。
+
+    进度与结果从应用信号总线接收，因此由其他入口（如定时任务）发起的核算也会显示在这里。
+    """
+
+    HEADERS = ("分区", "电厂", "起始月", "月数", "机组数", "排放量 (tCO2)", "用时")
+
+    def __init__(self, controller, parent=None):
+        super().__init__(parent)
+        self.controller = controller
+        self._worker = None
+
+        self.month_edit = QDateEdit(QDate(QDate.currentDate().year() - 1, 1, 1), self)
+        self.month_edit.setDisplayFormat("yyyy-MM")
+        self.months_spin = QSpinBox(self)
+        self.months_spin.setRange(1, 120)
+        self.months_spin.setValue(12)
+        self.workers_label = QLabel(f"工作进程: {controller.scheduler.max_workers}", self)
+        self.start_button = QPushButton("开始核算", self)
+        self.cancel_button = QPushButton("取消", self)
+        self.cancel_button.setEnabled(False)
+        self.progress_bar = QProgressBar(self)
+        self.status_label = QLabel("", self)
+        self.table = QTableWidget(0, len(self.HEADERS), self)
+        self.table.setHorizontalHeaderLabels(self.HEADERS)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+
+        controls = QHBoxLayout()
+        controls.addWidget(QLabel("起始月", self))
+        controls.addWidget(self.month_edit)
+        controls.addWidget(QLabel("月数", self))
+        controls.addWidget(self.months_spin)
+        controls.addWidget(self.workers_label)
+        controls.addStretch(1)
+        controls.addWidget(self.start_button)
+        controls.addWidget(self.cancel_button)
+        layout = QVBoxLayout(self)
+        layout.addLayout(controls)
+        layout.addWidget(self.progress_bar)
+        layout.addWidget(self.status_label)
+        layout.addWidget(self.table, 1)
+
+        self.start_button.clicked.connect(self.start)
+        self.cancel_button.clicked.connect(self.cancel)
+        signals = app_signals()
+        signals.calculation_progress.connect(self.on_progress)
+        signals.calculation_partial.connect(self.on_partial)
+        signals.calculation_finished.connect(self.on_finished)
+        signals.calculation_failed.connect(self.on_failed)
+        signals.calculation_cancelled.connect(self.on_cancelled)
+
+    def start(self):
+        first_month = self.month_edit.date().toString("yyyy-MM")
+        self.table.setRowCount(0)
+        self.progress_bar.setValue(0)
+        self.status_label.setText("正在划分分区…")
+        self._set_running(True)
+        self._worker = self.controller.start_parallel_calculation(first_month, self.months_spin.value())
+        return self._worker
+
+    def cancel(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self.status_label.setText("正在取消…")
+
+    def _set_running(self, running):
+        self.start_button.setEnabled(not running)
+        self.cancel_button.setEnabled(running)
+
+    def on_progress(self, progress):
+        self.progress_bar.setMaximum(max(progress.partitions_total, 1))
+        self.progress_bar.setValue(progress.partitions_done)
+        self.status_label.setText(
+            f"已完成 {progress.partitions_done}/{progress.partitions_total} 个分区，"
+            f"已用 {format_duration(progress.elapsed)}，预计剩余 {format_duration(progress.eta_seconds)}"
+        )
+
+    def on_partial(self, result):
+        part = result.partition
+        row = self.table.rowCount()
+        self.table.insertRow(row)
+        cells = (part.partition_id, part.plant_code, str(part.first_month), part.n_months, len(part.units),
+                 f"{result.total_emissions:,.2f}", f"{result.elapsed:.2f}s")
+        for col, value in enumerate(cells):
+            self.table.setItem(row, col, QTableWidgetItem(str(value)))
+
+    def on_finished(self, cube):
+        self._set_running(False)
+        self._worker = None
+        total = float(np.nansum(cube.emissions))
+        self.status_label.setText(f"核算完成：{len(cube.units)} 个机组，合计 {total:,.2f} tCO2")
+
+    def on_failed(self, message):
+        self._set_running(False)
+        self._worker = None
+        self.status_label.setText(message)
+
+    def on_cancelled(self):
+        self._set_running(False)
+        self._worker = None
+        self.status_label.setText("核算已取消")
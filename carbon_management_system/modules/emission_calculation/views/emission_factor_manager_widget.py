@@ -6,17 +6,179 @@
 # @Software: PyCharm / VSCode
 # @Description: emission_calculation 模块的 emission_factor_manager_widget.py 文件。
 
-# Python 标准库导入
-import sys
-import os
+# PyQt5 相关导入
+from PyQt5.QtCore import QDate, QTimer
+from PyQt5.QtWidgets import (
+    QCheckBox, QComboBox, QDateEdit, QDoubleSpinBox, QFormLayout, QGroupBox, QHBoxLayout, QHeaderView, QLabel,
+    QLineEdit, QMessageBox, QPushButton, QTableWidget, QTableWidgetItem, QVBoxLayout, QWidget,
+)
 
-# PyQt5 相关导入 (根据实际需要调整)
-# from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel
-# from PyQt5.QtCore import Qt, pyqtSignal, QObject
+# 项目内部模块导入
+from ....utils.constants import COMBUSTION_PARAMETERS, DEFAULT_JURISDICTION
+from ..models import EmissionFactor
 
-# 项目内部模块导入 (示例)
-# from ..core.base_controller import BaseController
-# from ...utils.logger_setup import logger
+_FACTOR_TYPE_LABELS = {
+    "ncv": "低位发热量",
+    "carbon_content": "单位热值含碳量",
+    "oxidation_rate": "碳氧化率",
+}
 
 
-pass # 请在此处实现具体功能
+class EmissionFactorManagerWidget(QWidget):
+    """
+    排放因子库管理界面。
+
+    因子按 (燃料, 因子类型, 管辖区) 建立有效期区间索引，同组有效期不得重叠；
+    下方可按日期试查因子，并实时显示查询缓存的命中率。
+    """
+
+    HEADERS = ("编号", "燃料", "因子类型", "管辖区", "数值", "单位", "生效日", "失效日", "来源")
+
+    def __init__(self, controller, parent=None):
+        super().__init__(parent)
+        self.controller = controller
+        self.service = controller.factor_service
+
+        self.table = QTableWidget(0, len(self.HEADERS), self)
+        self.table.setHorizontalHeaderLabels(self.HEADERS)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.horizontalHeader().setSectionResizeMode(len(self.HEADERS) - 1, QHeaderView.Stretch)
+
+        self.fuel_edit = QLineEdit(self)
+        self.type_combo = QComboBox(self)
+        for factor_type in COMBUSTION_PARAMETERS:
+            self.type_combo.addItem(_FACTOR_TYPE_LABELS[factor_type], factor_type)
+        self.jurisdiction_edit = QLineEdit(DEFAULT_JURISDICTION, self)
+        self.value_spin = QDoubleSpinBox(self)
+        self.value_spin.setDecimals(6)
+        self.value_spin.setRange(0, 1e9)
+        self.unit_edit = QLineEdit(self)
+        self.from_edit = QDateEdit(QDate.currentDate(), self)
+        self.from_edit.setCalendarPopup(True)
+        self.to_edit = QDateEdit(QDate.currentDate().addYears(1), self)
+        self.to_edit.setCalendarPopup(True)
+        self.open_end_check = QCheckBox("长期有效", self)
+        self.source_edit = QLineEdit(self)
+        self.add_button = QPushButton("添加因子", self)
+        self.remove_button = QPushButton("删除选中", self)
+        self.apply_button = QPushButton("按年度逐月应用为缺省参数", self)
+
+        form = QFormLayout()
+        form.addRow("燃料", self.fuel_edit)
+        form.addRow("因子类型", self.type_combo)
+        form.addRow("管辖区", self.jurisdiction_edit)
+        form.addRow("数值", self.value_spin)
+        form.addRow("单位", self.unit_edit)
+        end_row = QHBoxLayout()
+        end_row.addWidget(self.to_edit, 1)
+        end_row.addWidget(self.open_end_check)
+        form.addRow("生效日", self.from_edit)
+        form.addRow("失效日（不含）", end_row)
+        form.addRow("来源", self.source_edit)
+        buttons = QHBoxLayout()
+        for button in (self.add_button, self.remove_button, self.apply_button):
+            buttons.addWidget(button)
+        buttons.addStretch(1)
+
+        self.lookup_date = QDateEdit(QDate.currentDate(), self)
+        self.lookup_date.setCalendarPopup(True)
+        self.lookup_button = QPushButton("查询", self)
+        self.lookup_label = QLabel("", self)
+        self.stats_label = QLabel("", self)
+        lookup_box = QGroupBox("按日期查询（使用燃料、因子类型、管辖区输入框）", self)
+        lookup_layout = QHBoxLayout(lookup_box)
+        lookup_layout.addWidget(self.lookup_date)
+        lookup_layout.addWidget(self.lookup_button)
+        lookup_layout.addWidget(self.lookup_label, 1)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.table, 1)
+        layout.addLayout(form)
+        layout.addLayout(buttons)
+        layout.addWidget(lookup_box)
+        layout.addWidget(self.stats_label)
+
+        self.open_end_check.toggled.connect(lambda checked: self.to_edit.setEnabled(not checked))
+        self.add_button.clicked.connect(self.add_factor)
+        self.remove_button.clicked.connect(self._remove_selected)
+        self.apply_button.clicked.connect(self._apply_as_defaults)
+        self.lookup_button.clicked.connect(self.lookup)
+
+        # 核算过程中命中率持续变化，定时刷新统计
+        self._stats_timer = QTimer(self)
+        self._stats_timer.setInterval(1000)
+        self._stats_timer.timeout.connect(self.refresh_stats)
+        self._stats_timer.start()
+
+        self.reload()
+
+    def reload(self):
+        factors = self.service.factors()
+        self.table.setRowCount(len(factors))
+        for row, factor in enumerate(factors):
+            cells = (
+                factor.factor_id, factor.fuel_type, _FACTOR_TYPE_LABELS.get(factor.factor_type, factor.factor_type),
+                factor.jurisdiction, f"{factor.value:g}", factor.measure_unit, factor.effective_from,
+                factor.effective_to or "长期", factor.source,
+            )
+            for col, value in enumerate(cells):
+                self.table.setItem(row, col, QTableWidgetItem(str(value)))
+        self.refresh_stats()
+
+    def add_factor(self):
+        factor = EmissionFactor(
+            fuel_type=self.fuel_edit.text().strip(),
+            factor_type=self.type_combo.currentData(),
+            value=self.value_spin.value(),
+            effective_from=self.from_edit.date().toPyDate(),
+            effective_to=None if self.open_end_check.isChecked() else self.to_edit.date().toPyDate(),
+            jurisdiction=self.jurisdiction_edit.text().strip() or DEFAULT_JURISDICTION,
+            measure_unit=self.unit_edit.text().strip(),
+            source=self.source_edit.text().strip(),
+        )
+        if not factor.fuel_type:
+            QMessageBox.warning(self, "因子配置错误", "请填写燃料类型")
+            return None
+        try:
+            self.service.add_factor(factor)
+        except ValueError as exc:
+            QMessageBox.warning(self, "因子配置错误", str(exc))
+            return None
+        self.reload()
+        return factor
+
+    def _remove_selected(self):
+        rows = sorted({index.row() for index in self.table.selectedIndexes()})
+        for row in rows:
+            self.service.remove_factor(int(self.table.item(row, 0).text()))
+        if rows:
+            self.reload()
+
+    def _apply_as_defaults(self):
+        # 按所选日期所在年度逐月应用，年内更替的因子在各自生效的月份使用
+        year = self.lookup_date.date().year()
+        defaults = self.controller.apply_factor_library(
+            f"{year:04d}-01", 12, self.jurisdiction_edit.text().strip() or DEFAULT_JURISDICTION)
+        count = sum(len(values) for values in defaults.values())
+        self.lookup_label.setText(f"已按月应用 {year} 年 {count} 个缺省参数")
+
+    def lookup(self):
+        factor = self.service.lookup(
+            self.fuel_edit.text().strip(), self.type_combo.currentData(), self.lookup_date.date().toPyDate(),
+            self.jurisdiction_edit.text().strip() or DEFAULT_JURISDICTION,
+        )
+        if factor is None:
+            self.lookup_label.setText("该日期无生效因子")
+        else:
+            self.lookup_label.setText(f"#{factor.factor_id} {factor.value:g} {factor.measure_unit}"
+                                      f"（{factor.jurisdiction}，{factor.effective_from} 起）")
+        self.refresh_stats()
+        return factor
+
+    def refresh_stats(self):
+        stats = self.service.cache_stats()
+        self.stats_label.setText(
+            f"因子 {len(self.service.index):,} 条；缓存 {stats['size']:,}/{stats['maxsize']:,}，"
+            f"命中 {stats['hits']:,}，未命中 {stats['misses']:,}，命中率 {stats['hit_rate']:.1%}"
+        )
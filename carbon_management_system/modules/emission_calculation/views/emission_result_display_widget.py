@@ -6,17 +6,160 @@
 # @Software: PyCharm / VSCode
 # @Description: emission_calculation 模块的 emission_result_display_widget.py 文件。
 
-# Python 标准库导入
-import sys
-import os
+# 第三方库导入
+import numpy as np
 
-# PyQt5 相关导入 (根据实际需要调整)
-# from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel
-# from PyQt5.QtCore import Qt, pyqtSignal, QObject
+# PyQt5 相关导入
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import (
+    QHBoxLayout, QHeaderView, QLabel, QPushButton, QSplitter, QTableWidget, QTableWidgetItem, QVBoxLayout, QWidget,
+)
 
-# 项目内部模块导入 (示例)
-# from ..core.base_controller import BaseController
-# from ...utils.logger_setup import logger
+# 项目内部模块导入
+from ....utils.constants import COMBUSTION_PARAMETERS
 
+# 追溯时最多在界面中列出的原始读数条数，完整编号列表仍可通过控制器获取
+MAX_TRACE_ROWS_SHOWN = 500
 
-pass # 请在此处实现具体功能
+
+def _fill_row(table, row, values):
+    for col, value in enumerate(values):
+        item = QTableWidgetItem(value if isinstance(value, str) else f"{value:,.4f}".rstrip("0").rstrip("."))
+        table.setItem(row, col, item)
+
+
+class EmissionResultDisplayWidget(QWidget):
+    """
+    排放核算结果展示与追溯界面。
+
+    上方为各机组年度合计，选中机组后中间列出其 月 × 燃料 明细；
+    “追溯”把所选机组（或所在电厂）的合计展开为参与计算的原始读数、参数、缺省因子与公式版本。
+    """
+
+    UNIT_HEADERS = ("电厂", "机组", "排放量 (tCO2)")
+    DETAIL_HEADERS = ("月份", "燃料", "活动数据", "低位发热量", "单位热值含碳量", "碳氧化率", "排放量 (tCO2)")
+    READING_HEADERS = ("row_id", "时间", "燃料", "数值")
+
+    def __init__(self, controller, parent=None):
+        super().__init__(parent)
+        self.controller = controller
+        self.cube = None
+
+        self.unit_table = QTableWidget(0, len(self.UNIT_HEADERS), self)
+        self.unit_table.setHorizontalHeaderLabels(self.UNIT_HEADERS)
+        self.unit_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.unit_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.unit_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.detail_table = QTableWidget(0, len(self.DETAIL_HEADERS), self)
+        self.detail_table.setHorizontalHeaderLabels(self.DETAIL_HEADERS)
+        self.detail_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.detail_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.reading_table = QTableWidget(0, len(self.READING_HEADERS), self)
+        self.reading_table.setHorizontalHeaderLabels(self.READING_HEADERS)
+        self.reading_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.trace_unit_button = QPushButton("追溯所选", self)
+        self.trace_plant_button = QPushButton("追溯电厂合计", self)
+        self.summary_label = QLabel("", self)
+        self.trace_label = QLabel("", self)
+        self.trace_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        self.trace_label.setWordWrap(True)
+
+        trace_panel = QWidget(self)
+        trace_layout = QVBoxLayout(trace_panel)
+        trace_layout.setContentsMargins(0, 0, 0, 0)
+        buttons = QHBoxLayout()
+        buttons.addWidget(self.trace_unit_button)
+        buttons.addWidget(self.trace_plant_button)
+        buttons.addStretch(1)
+        trace_layout.addLayout(buttons)
+        trace_layout.addWidget(self.trace_label)
+        trace_layout.addWidget(self.reading_table, 1)
+        splitter = QSplitter(Qt.Vertical, self)
+        splitter.addWidget(self.unit_table)
+        splitter.addWidget(self.detail_table)
+        splitter.addWidget(trace_panel)
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.summary_label)
+        layout.addWidget(splitter, 1)
+
+        self.unit_table.itemSelectionChanged.connect(self._show_selected_unit)
+        self.trace_unit_button.clicked.connect(lambda: self.trace_selected(plant_level=False))
+        self.trace_plant_button.clicked.connect(lambda: self.trace_selected(plant_level=True))
+        controller.calculation_finished.connect(self.show_cube)
+        controller.results_updated.connect(lambda _stats: self.show_cube(controller.last_cube))
+        if controller.last_cube is not None:
+            self.show_cube(controller.last_cube)
+
+    def show_cube(self, cube):
+        selected = self.selected_unit()
+        self.cube = cube
+        totals = np.nansum(cube.emissions.reshape(len(cube.units), -1), axis=1)
+        self.unit_table.setRowCount(len(cube.units))
+        for row, ((plant_code, unit_code), total) in enumerate(zip(cube.units, totals)):
+            _fill_row(self.unit_table, row, (plant_code, unit_code, float(total)))
+        self.summary_label.setText(f"{len(cube.units)} 个机组，{len(cube.months)} 个月，"
+                                   f"合计 {float(totals.sum()):,.2f} tCO2")
+        if selected in cube.units:
+            self.unit_table.selectRow(cube.units.index(selected))
+
+    def selected_unit(self):
+        rows = {index.row() for index in self.unit_table.selectedIndexes()}
+        if not rows or self.cube is None:
+            return None
+        return self.cube.units[min(rows)]
+
+    def _selected_cell(self):
+        rows = {index.row() for index in self.detail_table.selectedIndexes()}
+        if not rows:
+            return None, None
+        row = min(rows)
+        return self.detail_table.item(row, 0).text(), self.detail_table.item(row, 1).text()
+
+    def _show_selected_unit(self):
+        unit = self.selected_unit()
+        self.detail_table.setRowCount(0)
+        if unit is None:
+            return
+        cube = self.cube
+        u = cube.units.index(unit)
+        for m, month in enumerate(cube.months):
+            for f, fuel in enumerate(cube.fuels):
+                if cube.activity[u, m, f] == 0:
+                    continue
+                row = self.detail_table.rowCount()
+                self.detail_table.insertRow(row)
+                params = [float(getattr(cube, name)[u, m, f]) for name in COMBUSTION_PARAMETERS]
+                _fill_row(self.detail_table, row, (str(month), fuel, float(cube.activity[u, m, f]), *params,
+                                                   float(cube.emissions[u, m, f])))
+
+    def trace_selected(self, plant_level=False):
+        """
+        追溯所选机组（选中明细行时为该 月 × 燃料 格子）或其所在电厂的合计。
+
+        :return: LineageTrace，未选择机组时返回 None
+        """
+        unit = self.selected_unit()
+        if unit is None:
+            self.trace_label.setText("请先选择机组")
+            return None
+        plant_code, unit_code = unit
+        if plant_level:
+            trace = self.controller.trace(plant_code)
+            scope = f"电厂 {plant_code} 合计"
+        else:
+            month, fuel = self._selected_cell()
+            trace = self.controller.trace(plant_code, unit_code, month, fuel)
+            scope = f"机组 {plant_code}/{unit_code}" + (f" {month} {fuel}" if month else " 合计")
+        factors = ", ".join(f"#{factor_id}" for factor_id in trace.factor_ids) or "无"
+        self.trace_label.setText(
+            f"{scope}：{len(trace.cells):,} 个结果格子，活动数据 {len(trace.activity_rows):,} 条，"
+            f"参数数据 {len(trace.parameter_rows):,} 条，缺省因子 {factors}，"
+            f"公式 {trace.formula_code} v{trace.formula_version}；查询用时 {trace.elapsed * 1000:.1f} ms"
+        )
+        readings = self.controller.trace_readings(trace.activity_rows, limit=MAX_TRACE_ROWS_SHOWN)
+        fuel_labels = readings.store.codecs["fuel"].decode_many(readings.fuel)
+        self.reading_table.setRowCount(len(readings))
+        for row in range(len(readings)):
+            _fill_row(self.reading_table, row, (str(int(readings.row_id[row])), str(readings.period[row]),
+                                                str(fuel_labels[row]), float(readings.quantity[row])))
+        return trace
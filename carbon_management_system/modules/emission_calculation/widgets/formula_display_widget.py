@@ -6,17 +6,139 @@
 # @Software: PyCharm / VSCode
 # @Description: emission_calculation 模块的 formula_display_widget.py 文件。
 
-# Python 标准库导入
-import sys
-import os
+# PyQt5 相关导入
+from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtWidgets import (
+    QFormLayout, QHBoxLayout, QHeaderView, QLabel, QLineEdit, QListWidget, QListWidgetItem, QPlainTextEdit,
+    QPushButton, QTableWidget, QTableWidgetItem, QVBoxLayout, QWidget,
+)
 
-# PyQt5 相关导入 (根据实际需要调整)
-# from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel
-# from PyQt5.QtCore import Qt, pyqtSignal, QObject
+# 项目内部模块导入
+from ....utils.exceptions import FormulaError
+from ..models import CalculationFormula
+from ..services import compile_formula
 
-# 项目内部模块导入 (示例)
-# from ..core.base_controller import BaseController
-# from ...utils.logger_setup import logger
 
+class FormulaDisplayWidget(QWidget):
+    """
+    核算公式查看与编辑控件。
 
-pass # 请在此处实现具体功能
+    左侧列出公式库中的公式，右侧显示表达式与变量说明。编辑后“校验”只做解析与编译，
+    “保存”通过后写入公式库并升版本，已编译结果按版本缓存，旧版本不受影响。
+    """
+
+    formula_saved = pyqtSignal(object)   # CalculationFormula
+
+    def __init__(self, formula_library, parent=None):
+        super().__init__(parent)
+        self.library = formula_library
+
+        self.list_widget = QListWidget(self)
+        self.name_edit = QLineEdit(self)
+        self.version_label = QLabel("", self)
+        self.expression_edit = QPlainTextEdit(self)
+        self.expression_edit.setFixedHeight(60)
+        self.variables_table = QTableWidget(0, 2, self)
+        self.variables_table.setHorizontalHeaderLabels(("变量", "说明"))
+        self.variables_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.unit_edit = QLineEdit(self)
+        self.description_edit = QLineEdit(self)
+        self.status_label = QLabel("", self)
+        self.status_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        self.add_variable_button = QPushButton("添加变量", self)
+        self.validate_button = QPushButton("校验", self)
+        self.save_button = QPushButton("保存", self)
+
+        form = QFormLayout()
+        form.addRow("名称", self.name_edit)
+        form.addRow("版本", self.version_label)
+        form.addRow("表达式", self.expression_edit)
+        form.addRow("变量", self.variables_table)
+        form.addRow("结果单位", self.unit_edit)
+        form.addRow("说明", self.description_edit)
+        buttons = QHBoxLayout()
+        for button in (self.add_variable_button, self.validate_button, self.save_button):
+            buttons.addWidget(button)
+        buttons.addStretch(1)
+        detail = QVBoxLayout()
+        detail.addLayout(form)
+        detail.addLayout(buttons)
+        detail.addWidget(self.status_label)
+        layout = QHBoxLayout(self)
+        layout.addWidget(self.list_widget, 1)
+        layout.addLayout(detail, 3)
+
+        self.list_widget.currentItemChanged.connect(lambda item, _previous: self.show_formula(item))
+        self.add_variable_button.clicked.connect(lambda: self.variables_table.insertRow(self.variables_table.rowCount()))
+        self.validate_button.clicked.connect(self.validate)
+        self.save_button.clicked.connect(self.save)
+
+        self.reload()
+
+    def reload(self):
+        current = self.current_code()
+        self.list_widget.clear()
+        for formula in self.library.formulas():
+            item = QListWidgetItem(f"{formula.name} ({formula.code})", self.list_widget)
+            item.setData(Qt.UserRole, formula.code)
+            if formula.code == current:
+                self.list_widget.setCurrentItem(item)
+        if self.list_widget.currentItem() is None and self.list_widget.count():
+            self.list_widget.setCurrentRow(0)
+
+    def current_code(self):
+        item = self.list_widget.currentItem()
+        return item.data(Qt.UserRole) if item is not None else None
+
+    def show_formula(self, item):
+        if item is None:
+            return
+        formula = self.library.get(item.data(Qt.UserRole))
+        self.name_edit.setText(formula.name)
+        self.version_label.setText(f"v{formula.version}")
+        self.expression_edit.setPlainText(formula.expression)
+        self.variables_table.setRowCount(len(formula.variables))
+        for row, (name, text) in enumerate(formula.variables.items()):
+            self.variables_table.setItem(row, 0, QTableWidgetItem(name))
+            self.variables_table.setItem(row, 1, QTableWidgetItem(text))
+        self.unit_edit.setText(formula.result_unit)
+        self.description_edit.setText(formula.description)
+        self.status_label.setText("")
+
+    def edited_formula(self):
+        """由当前编辑内容构造公式（版本号沿用当前版本，保存时由公式库决定是否递增）。"""
+        code = self.current_code()
+        variables = {}
+        for row in range(self.variables_table.rowCount()):
+            name_item, text_item = self.variables_table.item(row, 0), self.variables_table.item(row, 1)
+            name = name_item.text().strip() if name_item else ""
+            if name:
+                variables[name] = text_item.text().strip() if text_item else ""
+        return CalculationFormula(
+            code=code, name=self.name_edit.text().strip(),
+            expression=self.expression_edit.toPlainText().strip(), variables=variables,
+            result_unit=self.unit_edit.text().strip(), description=self.description_edit.text().strip(),
+            version=self.library.get(code).version,
+        )
+
+    def validate(self):
+        try:
+            compiled = compile_formula(self.edited_formula())
+        except FormulaError as exc:
+            self.status_label.setText(f"校验失败: {exc}")
+            return False
+        self.status_label.setText(f"校验通过，使用变量: {', '.join(compiled.variables)}")
+        return True
+
+    def save(self):
+        if self.current_code() is None:
+            return None
+        try:
+            formula = self.library.save(self.edited_formula())
+        except FormulaError as exc:
+            self.status_label.setText(f"保存失败: {exc}")
+            return None
+        self.version_label.setText(f"v{formula.version}")
+        self.status_label.setText(f"已保存为 v{formula.version}")
+        self.formula_saved.emit(formula)
+        return formula
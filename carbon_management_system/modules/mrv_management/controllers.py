@@ -7,16 +7,480 @@
 # @Description: 实现 mrv_management 模块的业务逻辑和流程控制，协调模型和视图。
 
 # Python 标准库导入
-import sys
-import os
+import copy
+import logging
+import threading
+from datetime import datetime
 
-# PyQt5 相关导入 (根据实际需要调整)
-# from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel
-# from PyQt5.QtCore import Qt, pyqtSignal, QObject
+# PyQt5 相关导入
+from PyQt5.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
 
-# 项目内部模块导入 (示例)
-# from ..core.base_controller import BaseController
-# from ...utils.logger_setup import logger
+# 项目内部模块导入
+from ...config.settings import COMPLIANCE_SCHEDULE_FILE, DQCP_STORE_DIR, NON_CONFORMITY_FILE, REPORT_CACHE_DIR
+from ...utils.exceptions import (
+    EvidenceExportCancelledError,
+    EvidenceExportError,
+    ReportCancelledError,
+    ReportGenerationError,
+)
+from ..data_acquisition.services import QueryFilter
+from ..emission_calculation.services import LineageTracer
+from .models import PERIOD_MONTH
+from .services import (
+    ComplianceScheduler,
+    DqcpVersionStore,
+    EmissionReportGenerator,
+    EvidencePackageExporter,
+    NonConformityRegister,
+    ReportFragmentCache,
+    ReportTemplateLibrary,
+    document_entries,
+    documents_for_rows,
+    lineage_entry,
+    non_conformity_entry,
+    query_extract_entry,
+)
 
+logger = logging.getLogger(__name__)
 
-pass # 请在此处实现具体功能
+
+class ReportGenerationWorker(QObject):
+    """在后台线程中取核算结果并生成报告的工作对象。"""
+
+    progress = pyqtSignal(int, int)     # 已写行数, 总行数
+    finished = pyqtSignal(object)       # ReportRenderStats
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, generator, cube_provider, template_name, path, organization, year, month=None, fmt=None):
+        super().__init__()
+        self._generator = generator
+        self._cube_provider = cube_provider
+        self._args = (template_name, path, organization, year, month, fmt)
+        self._cancel_event = threading.Event()
+
+    @pyqtSlot()
+    def run(self):
+        template_name, path, organization, year, month, fmt = self._args
+        try:
+            cube = self._cube_provider(f"{year:04d}-01", 12)
+            if self._cancel_event.is_set():
+                raise ReportCancelledError("报告生成已取消", template_name)
+            stats = self._generator.render(
+                template_name, cube, path, organization, year, month, fmt,
+                progress_callback=self.progress.emit, cancel_event=self._cancel_event,
+            )
+        except ReportCancelledError:
+            self.cancelled.emit()
+        except ReportGenerationError as exc:
+            self.failed.emit(str(exc))
+        except Exception as exc:  # 工作线程内的异常必须转成信号，否则会被静默吞掉
+            logger.exception("报告生成失败")
+            self.failed.emit(f"报告生成失败: {exc}")
+        else:
+            self.finished.emit(stats)
+
+    def cancel(self):
+        self._cancel_event.set()
+
+
+class EmissionReportController(QObject):
+    """
+    排放报告控制器：从排放核算控制器取核算结果，按模板在后台生成年度/月度报告。
+
+    核算结果在工作线程中通过 calculation_controller.combustion_cube 获取（不改动核算控制器的
+    last_cube），输入未变时直接命中核算结果磁盘缓存，同一年度的多份报告（年报、各月月报）不会重复核算。
+    incremental 为 True 时 HTML 报告按段落/机组增量渲染：数据更正后重新生成，
+    只重新渲染输入变化的片段，其余片段取自 REPORT_CACHE_DIR 下的片段缓存。
+    """
+
+    report_finished = pyqtSignal(object)    # ReportRenderStats
+
+    def __init__(self, calculation_controller, template_library=None, fragment_cache=None, organization="",
+                 incremental=True, parent=None):
+        super().__init__(parent)
+        self.calculation_controller = calculation_controller
+        self.template_library = template_library or ReportTemplateLibrary()
+        self.generator = EmissionReportGenerator(self.template_library)
+        self.organization = organization
+        self.incremental = incremental
+        self._fragment_cache = fragment_cache
+        self._jobs = {}
+
+    @property
+    def fragment_cache(self):
+        """报告片段缓存（首次使用时在 REPORT_CACHE_DIR 下创建）。"""
+        if self._fragment_cache is None:
+            self._fragment_cache = ReportFragmentCache(REPORT_CACHE_DIR)
+        return self._fragment_cache
+
+    def templates(self):
+        """[(模板名, 说明, 报告期类型)]，供界面列出可选模板。"""
+        templates = []
+        for name in self.template_library.names():
+            try:
+                template = self.template_library.get(name)
+            except ReportGenerationError as exc:
+                logger.warning("跳过无效的报告模板: %s", exc)
+                continue
+            templates.append((name, template.description or name, template.period))
+        return templates
+
+    def is_monthly(self, template_name):
+        return self.template_library.get(template_name).period == PERIOD_MONTH
+
+    def start_report(self, template_name, path, year, month=None, fmt=None, organization=None, connect=None):
+        """
+        在后台生成报告。
+
+        模板或报告期不合法时会立即失败，需要订阅信号的调用方应通过 connect 在线程启动前连接。
+        缺省参数在启动时取快照，生成期间界面上修改缺省因子不影响本次报告。
+        :param connect: 可选，在线程启动前以工作对象为参数调用
+        :return: ReportGenerationWorker，可调用其 cancel()
+        """
+        self.generator.fragment_cache = self.fragment_cache if self.incremental else None
+        calculation = self.calculation_controller
+        defaults = copy.deepcopy(calculation.defaults)
+
+        def cube_provider(first_month, n_months):
+            return calculation.combustion_cube(first_month, n_months, defaults=defaults)
+
+        worker = ReportGenerationWorker(
+            self.generator, cube_provider, template_name, path,
+            self.organization if organization is None else organization, year, month, fmt,
+        )
+        worker.finished.connect(self.report_finished)
+        return self._start_worker(worker, connect)
+
+    def _start_worker(self, worker, connect=None):
+        """把工作对象移入新线程，先调用 connect(worker) 供调用方连接信号，最后启动线程。"""
+        thread = QThread(self)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        for signal in (worker.finished, worker.failed, worker.cancelled):
+            signal.connect(thread.quit)
+        thread.finished.connect(lambda: self._jobs.pop(id(worker), None))
+        thread.finished.connect(thread.deleteLater)
+        self._jobs[id(worker)] = (thread, worker)
+        if connect is not None:
+            connect(worker)
+        thread.start()
+        return worker
+
+    def cancel_all_jobs(self):
+        for _thread, worker in list(self._jobs.values()):
+            worker.cancel()
+
+
+class DqcpController(QObject):
+    """
+    数据质量控制计划（DQCP）控制器：编辑、保存版本、浏览与比较历史。
+
+    版本以快照 + 增量的形式保存在 DqcpVersionStore 中，见其说明。
+    """
+
+    plan_saved = pyqtSignal(object)     # DqcpVersion
+
+    def __init__(self, version_store=None, parent=None):
+        super().__init__(parent)
+        self._version_store = version_store
+
+    @property
+    def version_store(self):
+        """DQCP 版本库（首次使用时在 DQCP_STORE_DIR 下打开）。"""
+        if self._version_store is None:
+            self._version_store = DqcpVersionStore(DQCP_STORE_DIR)
+        return self._version_store
+
+    def plans(self):
+        return self.version_store.plans()
+
+    def create_plan(self, plant_code, title, plan_id=None):
+        """为电厂新建计划，默认编号为 “<电厂编码>-DQCP”。"""
+        return self.version_store.create_plan(plan_id or f"{plant_code}-DQCP", plant_code, title)
+
+    def content(self, plan_id, version=None):
+        """某版本（默认最新版本）的正文。"""
+        return self.version_store.content(plan_id, version)
+
+    def save(self, plan_id, content, author="", comment=""):
+        """
+        保存新版本；正文未变化时不产生新版本。
+
+        :return: DqcpVersion
+        """
+        latest = self.version_store.plan(plan_id).version
+        meta = self.version_store.commit(plan_id, content, author, comment)
+        if meta.version != latest:
+            logger.info("DQCP %s 保存为 v%s（%s，%s 字节）", plan_id, meta.version,
+                        "快照" if meta.snapshot else "增量", meta.stored_bytes)
+            self.plan_saved.emit(meta)
+        return meta
+
+    def history(self, plan_id):
+        """版本元数据列表，最新版本在前。"""
+        return list(reversed(self.version_store.versions(plan_id)))
+
+    def diff(self, plan_id, old_version, new_version):
+        return self.version_store.diff(plan_id, old_version, new_version)
+
+    def stats(self, plan_id=None):
+        return self.version_store.stats(plan_id)
+
+
+class ComplianceCalendarController(QObject):
+    """
+    合规日历控制器：按月查询任务汇总、标记完成、检查到期提醒。
+
+    义务规则与完成记录保存在 schedule_path；任务本身不落盘，由 ComplianceScheduler 按需展开。
+    """
+
+    schedule_changed = pyqtSignal()
+    reminders_due = pyqtSignal(list)    # [ComplianceReminder]
+
+    def __init__(self, scheduler=None, schedule_path=COMPLIANCE_SCHEDULE_FILE, parent=None):
+        super().__init__(parent)
+        self._scheduler = scheduler
+        self.schedule_path = schedule_path
+
+    @property
+    def scheduler(self):
+        """合规调度器（首次使用时从 schedule_path 加载）。"""
+        if self._scheduler is None:
+            self._scheduler = ComplianceScheduler.load(self.schedule_path)
+        return self._scheduler
+
+    def month_summary(self, year, month):
+        return self.scheduler.month_summary(year, month)
+
+    def tasks_on(self, day):
+        return self.scheduler.tasks_on(day)
+
+    def upcoming(self, limit=10):
+        return self.scheduler.upcoming(limit)
+
+    def outstanding_reminders(self, today=None):
+        """当前已到提醒时间、仍未完成的全部提醒（按状态计算，包括重启前已逾期的任务）。"""
+        return self.scheduler.outstanding(today)
+
+    def plants(self):
+        return sorted({obligation.plant_code for obligation in self.scheduler.obligations()})
+
+    def add_plant(self, plant_code, start):
+        """为电厂登记标准合规义务（月度报送、年度报告、核查、清缴）。"""
+        added = self.scheduler.add_standard_obligations(plant_code, start)
+        self._changed()
+        return added
+
+    def add_obligation(self, obligation):
+        self.scheduler.add_obligation(obligation)
+        self._changed()
+        return obligation
+
+    def remove_plant(self, plant_code):
+        for obligation in self.scheduler.obligations(plant_code):
+            self.scheduler.remove_obligation(obligation.obligation_id)
+        self._changed()
+
+    def set_done(self, tasks, done=True):
+        """批量标记任务完成（或撤销完成），只保存一次日程文件。"""
+        for task in tasks:
+            if done:
+                self.scheduler.mark_done(task.obligation_id, task.due)
+            else:
+                self.scheduler.mark_pending(task.obligation_id, task.due)
+        self._changed()
+
+    def check_reminders(self, today=None):
+        """推进调度时钟，有新的到期提醒时发出 reminders_due；时钟有推进时保存日程，重启后不重复提醒。"""
+        cursor = self.scheduler.cursor
+        reminders = self.scheduler.advance(today)
+        if self.schedule_path and (reminders or self.scheduler.cursor != cursor):
+            self.scheduler.save(self.schedule_path)
+        if reminders:
+            logger.info("合规提醒 %s 项", len(reminders))
+            self.reminders_due.emit(reminders)
+        return reminders
+
+    def _changed(self):
+        if self.schedule_path:
+            self.scheduler.save(self.schedule_path)
+        self.schedule_changed.emit()
+
+
+class EvidenceExportWorker(QObject):
+    """在后台线程中收集证据并流式导出核查证据包的工作对象。"""
+
+    progress = pyqtSignal(object, object)   # 已处理字节数, 预计总字节数（可能超过 2^31，不用 int）
+    finished = pyqtSignal(object)           # EvidencePackageStats
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, exporter, entries_provider, path):
+        super().__init__()
+        self._exporter = exporter
+        self._entries_provider = entries_provider
+        self._path = path
+        self._cancel_event = threading.Event()
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            entries, metadata = self._entries_provider()
+            if self._cancel_event.is_set():
+                raise EvidenceExportCancelledError("证据包导出已取消")
+            stats = self._exporter.export(entries, self._path, metadata, progress_callback=self.progress.emit,
+                                          cancel_event=self._cancel_event)
+        except EvidenceExportCancelledError:
+            self.cancelled.emit()
+        except EvidenceExportError as exc:
+            self.failed.emit(str(exc))
+        except Exception as exc:  # 工作线程内的异常必须转成信号，否则会被静默吞掉
+            logger.exception("证据包导出失败")
+            self.failed.emit(f"证据包导出失败: {exc}")
+        else:
+            self.finished.emit(stats)
+
+    def cancel(self):
+        self._cancel_event.set()
+
+
+class VerificationSupportController(QObject):
+    """
+    第三方核查支持控制器：登记不符合项，按电厂、年度导出核查证据包。
+
+    证据包包含活动数据与参数数据摘录、关联的支撑文档、该电厂的核算溯源数据与不符合项记录，
+    由 EvidencePackageExporter 在后台线程中并行压缩、流式写出。
+    """
+
+    export_finished = pyqtSignal(object)    # EvidencePackageStats
+    non_conformities_changed = pyqtSignal()
+
+    def __init__(self, data_controller, calculation_controller, non_conformities=None,
+                 non_conformity_path=NON_CONFORMITY_FILE, exporter=None, parent=None):
+        super().__init__(parent)
+        self.data_controller = data_controller
+        self.calculation_controller = calculation_controller
+        self.non_conformity_path = non_conformity_path
+        self.exporter = exporter or EvidencePackageExporter()
+        self._non_conformities = non_conformities
+        self._jobs = {}
+
+    @property
+    def non_conformities(self):
+        """不符合项登记表（首次使用时从 non_conformity_path 加载）。"""
+        if self._non_conformities is None:
+            self._non_conformities = NonConformityRegister.load(self.non_conformity_path)
+        return self._non_conformities
+
+    def plants(self):
+        return sorted(self.data_controller.activity_store.codecs["plant"].labels)
+
+    def non_conformity_records(self, plant_code=None):
+        return self.non_conformities.records(plant_code)
+
+    def raise_non_conformity(self, plant_code, severity, description, clause="", raised_by="", document_ids=()):
+        record = self.non_conformities.raise_record(plant_code, severity, description, clause, raised_by,
+                                                    document_ids)
+        self._non_conformities_changed()
+        return record
+
+    def close_non_conformity(self, record_id, corrective_action):
+        record = self.non_conformities.close(record_id, corrective_action)
+        self._non_conformities_changed()
+        return record
+
+    def _non_conformities_changed(self):
+        if self.non_conformity_path:
+            self.non_conformities.save(self.non_conformity_path)
+        self.non_conformities_changed.emit()
+
+    def evidence_entries(self, plant_code, year):
+        """
+        收集某电厂某年度的证据条目。
+
+        数据摘录按页取数，支撑文档从内容寻址存储逐块读取，溯源数据在写到该条目时才核算、生成，
+        因此这里只做查询与文档匹配，不读取文件内容。
+        :return: (EvidenceEntry 列表, 清单附加信息)
+        :raises EvidenceExportError: 不符合项引用的文档不存在，或支撑文档内容已丢失
+        """
+        query = QueryFilter(plant_code=plant_code, start=datetime(year, 1, 1), end=datetime(year + 1, 1, 1))
+        activity = self.data_controller.activity_query.query(query)
+        parameters = self.data_controller.parameter_query.query(query)
+        records = self.non_conformity_records(plant_code)
+        document_service = self.data_controller.document_service
+        documents = documents_for_rows(
+            document_service.documents(),
+            {"activity": activity.view.row_id[activity.positions(0, len(activity))],
+             "parameter": parameters.view.row_id[parameters.positions(0, len(parameters))]},
+            extra_refs={f"plant:{plant_code}"},
+        )
+        # 不符合项引用的文档编号来自持久化的文档登记表，跨会话稳定；
+        # 无法解析的编号或内容已丢失的文档不能静默略过，否则证据包缺件而核查机构无从察觉
+        included = {document.document_id for document in documents}
+        missing = []
+        for record in records:
+            for document_id in record.document_ids:
+                document = document_service.find(document_id)
+                if document is None:
+                    missing.append(f"不符合项 {record.record_id} 引用的文档 {document_id}")
+                elif document_id not in included:
+                    included.add(document_id)
+                    documents.append(document)
+        missing += [f"文档 {document.document_id}（{document.file_name}）的内容" for document in documents
+                    if not document_service.blob_store.exists(document.content_hash)]
+        if missing:
+            logger.warning("证据包缺少支撑文档: %s", "；".join(missing))
+            raise EvidenceExportError("证据包缺少支撑文档：" + "；".join(missing))
+
+        def lineage():
+            # 由本次取得的立方体直接生成溯源数据，不读写核算控制器的 last_cube / tracer()：
+            # 其他线程同时核算别的期间时，证据包中的溯源数据仍与本年度结果对应
+            calculation = self.calculation_controller
+            defaults = copy.deepcopy(calculation.defaults)
+            factor_ids = copy.deepcopy(calculation.default_factor_ids)
+            cube = calculation.combustion_cube(f"{year:04d}-01", 12, defaults=defaults)
+            return LineageTracer(calculation.lineage_of(cube, factor_ids)).subset(plant_code)
+
+        tag = f"{plant_code}_{year}"
+        entries = [
+            query_extract_entry(f"data/activity_{tag}.csv", activity),
+            query_extract_entry(f"data/parameters_{tag}.csv", parameters),
+            lineage_entry(f"calculation/lineage_{tag}.npz", lineage),
+            non_conformity_entry("verification/non_conformities.csv", records),
+        ] + document_entries(document_service.blob_store, documents)
+        metadata = {"plant_code": plant_code, "year": year, "activity_rows": len(activity),
+                    "parameter_rows": len(parameters), "documents": len(documents),
+                    "non_conformities": len(records)}
+        return entries, metadata
+
+    def start_export(self, plant_code, year, path, connect=None):
+        """
+        在后台导出核查证据包。
+
+        缺少支撑文档时导出会立即失败，需要订阅信号的调用方应通过 connect 在线程启动前连接。
+        :param connect: 可选，在线程启动前以工作对象为参数调用
+        :return: EvidenceExportWorker，可调用其 cancel()
+        """
+        worker = EvidenceExportWorker(self.exporter, lambda: self.evidence_entries(plant_code, year), path)
+        worker.finished.connect(self.export_finished)
+        return self._start_worker(worker, connect)
+
+    def _start_worker(self, worker, connect=None):
+        """把工作对象移入新线程，先调用 connect(worker) 供调用方连接信号，最后启动线程。"""
+        thread = QThread(self)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        for signal in (worker.finished, worker.failed, worker.cancelled):
+            signal.connect(thread.quit)
+        thread.finished.connect(lambda: self._jobs.pop(id(worker), None))
+        thread.finished.connect(thread.deleteLater)
+        self._jobs[id(worker)] = (thread, worker)
+        if connect is not None:
+            connect(worker)
+        thread.start()
+        return worker
+
+    def cancel_all_jobs(self):
+        for _thread, worker in list(self._jobs.values()):
+            worker.cancel()
@@ -7,16 +7,256 @@
 # @Description: 定义 mrv_management 模块的数据模型 (例如，与数据库表对应的类，或业务对象类)。
 
 # Python 标准库导入
-import sys
-import os
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Optional
 
-# PyQt5 相关导入 (根据实际需要调整)
-# from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel
-# from PyQt5.QtCore import Qt, pyqtSignal, QObject
+# 报告模板中的段落类型
+SECTION_HEADING = "heading"
+SECTION_PARAGRAPH = "paragraph"
+SECTION_TABLE = "table"
+SECTION_CHART = "chart"
 
-# 项目内部模块导入 (示例)
-# from ..core.base_controller import BaseController
-# from ...utils.logger_setup import logger
+# 报告期类型
+PERIOD_YEAR = "year"
+PERIOD_MONTH = "month"
 
+# 合规义务的重复频率
+RECUR_ONCE = "once"
+RECUR_MONTHLY = "monthly"
+RECUR_YEARLY = "yearly"
 
-pass # 请在此处实现具体功能
+# 合规义务类型
+OBLIGATION_MONTHLY_DATA = "monthly_data"        # 月度排放数据报送
+OBLIGATION_ANNUAL_REPORT = "annual_report"      # 年度排放报告
+OBLIGATION_VERIFICATION = "verification"        # 年度核查
+OBLIGATION_SURRENDER = "surrender"              # 配额清缴
+OBLIGATION_OTHER = "other"
+
+# 合规任务状态
+TASK_PENDING = "pending"
+TASK_DONE = "done"
+TASK_OVERDUE = "overdue"
+
+# 不符合项的严重程度与状态
+NC_SEVERITY_MAJOR = "major"
+NC_SEVERITY_MINOR = "minor"
+NC_SEVERITY_OBSERVATION = "observation"
+NC_STATUS_OPEN = "open"
+NC_STATUS_CLOSED = "closed"
+
+
+@dataclass
+class TemplateColumn:
+    """报告表格的一列：取值字段、表头与格式说明（Python format spec，为空时原样输出）。"""
+
+    field: str
+    header: str
+    format: str = ""
+
+    def text(self, value):
+        """把单元格的值格式化为文本；缺失值（None / NaN）输出空串。"""
+        if value is None or value != value:
+            return ""
+        return format(value, self.format) if self.format else str(value)
+
+
+@dataclass
+class TemplateSection:
+    """
+    报告模板中的一个段落。
+
+    heading / paragraph 的 text 可以包含 {字段} 占位符（str.format 语法）；
+    table 的 rows 为行来源（见 services.REPORT_ROW_SOURCES），columns 为输出列；
+    chart 的 columns 固定为 [标签列, 数值列]。
+    """
+
+    type: str
+    text: str = ""
+    title: str = ""
+    rows: str = ""
+    columns: list = field(default_factory=list)
+    fields: tuple = ()          # 文本中引用的占位符字段，解析模板时提取
+
+    @property
+    def is_table(self):
+        return self.type == SECTION_TABLE
+
+
+@dataclass
+class ReportTemplate:
+    """解析后的报告模板；由 ReportTemplateLibrary 解析一次后缓存复用。"""
+
+    name: str
+    title: str
+    period: str
+    sections: list
+    description: str = ""
+    path: str = ""
+
+    @property
+    def tables(self):
+        return [section for section in self.sections if section.is_table]
+
+
+@dataclass
+class ReportRenderStats:
+    """一次报告生成的统计信息。"""
+
+    path: str
+    format: str
+    template: str
+    sections: int = 0
+    rows: int = 0
+    bytes_written: int = 0
+    elapsed: float = 0.0
+    period_label: Optional[str] = None
+    fragments_rendered: int = 0     # 输入有变化、重新渲染的片段数
+    fragments_reused: int = 0       # 输入未变、直接取自片段缓存的片段数
+    dirty_sections: list = field(default_factory=list)  # 有片段重新渲染的段落序号（从 0 开始）
+
+
+@dataclass
+class DataQualityControlPlan:
+    """数据质量控制计划（DQCP）：每个电厂一份，正文为富文本（HTML）。"""
+
+    plan_id: str
+    plant_code: str
+    title: str
+    content: str = ""
+    version: int = 0                # 最近一次保存的版本号，0 表示尚未保存
+    updated_at: Optional[datetime] = None
+    updated_by: str = ""
+
+
+@dataclass
+class DqcpVersion:
+    """
+    DQCP 的一个历史版本的元数据。
+
+    snapshot 为 True 时该版本以完整快照保存，否则以相对上一版本的增量保存；
+    content_hash 为正文的 SHA-256，还原时用于校验。
+    """
+
+    plan_id: str
+    version: int
+    created_at: datetime
+    author: str
+    comment: str
+    size: int                       # 正文 UTF-8 字节数
+    stored_bytes: int               # 实际占用（压缩后的快照或增量）
+    snapshot: bool
+    content_hash: str
+
+
+@dataclass
+class DqcpDiff:
+    """两个版本之间的逐行差异；hunks 为 [(操作, 旧文本, 新文本)]，操作为 replace / delete / insert。"""
+
+    plan_id: str
+    old_version: int
+    new_version: int
+    hunks: list = field(default_factory=list)
+    added_lines: int = 0
+    removed_lines: int = 0
+
+
+@dataclass(frozen=True)
+class RecurrenceRule:
+    """
+    合规义务的重复规则。
+
+    monthly 每 interval 个月在第 day 日到期，yearly 每 interval 年在 month 月 day 日到期，
+    once 只在 start 当天到期；day 超过当月天数时取月末。重复从 start 所在月（年）起算，到 end 为止。
+    period_lag 为到期日相对所属报告期的滞后（monthly 以月计，yearly 以年计），
+    例如“次月 10 日前报送上月数据”为 monthly、day=10、period_lag=1。
+    """
+
+    freq: str
+    start: date
+    day: int = 1
+    month: int = 1
+    interval: int = 1
+    period_lag: int = 0
+    end: Optional[date] = None
+
+
+@dataclass
+class ComplianceObligation:
+    """电厂的一项合规义务；只保存重复规则，具体任务在查看日历时按需展开。"""
+
+    obligation_id: str
+    plant_code: str
+    kind: str
+    title: str
+    rule: RecurrenceRule
+    lead_days: int = 7              # 到期前多少天开始提醒
+
+
+@dataclass
+class ComplianceTask:
+    """合规义务的一次到期。"""
+
+    obligation_id: str
+    plant_code: str
+    kind: str
+    title: str
+    period: str                     # 所属报告期，如 "2024-05"、"2024"
+    due: date
+    status: str = TASK_PENDING
+    completed_at: Optional[datetime] = None
+
+
+@dataclass
+class CalendarDaySummary:
+    """日历中某一天的任务汇总。"""
+
+    day: date
+    total: int = 0
+    done: int = 0
+    kinds: dict = field(default_factory=dict)   # 义务类型 -> 任务数
+
+    @property
+    def outstanding(self):
+        return self.total - self.done
+
+
+@dataclass
+class ComplianceReminder:
+    """到达提醒时间的一组任务（各电厂的同一项义务在同一天到期）。"""
+
+    kind: str
+    title: str
+    period: str
+    due: date
+    total: int
+    outstanding: int
+
+
+@dataclass
+class NonConformity:
+    """第三方核查发现的不符合项及其整改情况。"""
+
+    record_id: int
+    plant_code: str
+    severity: str
+    description: str
+    clause: str = ""                # 依据的核算指南/标准条款
+    raised_by: str = ""
+    raised_at: Optional[datetime] = None
+    status: str = NC_STATUS_OPEN
+    corrective_action: str = ""
+    closed_at: Optional[datetime] = None
+    document_ids: list = field(default_factory=list)    # 相关支撑文档编号
+
+
+@dataclass
+class EvidencePackageStats:
+    """一次核查证据包导出的统计信息。"""
+
+    path: str
+    entries: int = 0
+    bytes_in: int = 0               # 各条目原始内容字节数之和
+    bytes_written: int = 0          # 压缩包大小
+    elapsed: float = 0.0
+    workers: int = 0
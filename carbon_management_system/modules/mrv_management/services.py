@@ -7,16 +7,2151 @@
 # @Description: 提供 mrv_management 模块中更复杂或可复用的业务服务逻辑。
 
 # Python 标准库导入
-import sys
+import bisect
+import calendar
+import csv
+import difflib
+import hashlib
+import heapq
+import html
+import io
+import json
+import logging
 import os
+import re
+import string
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from datetime import date, datetime, timedelta
+from typing import Callable, Optional
 
-# PyQt5 相关导入 (根据实际需要调整)
-# from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel
-# from PyQt5.QtCore import Qt, pyqtSignal, QObject
+# 第三方库导入
+import numpy as np
 
-# 项目内部模块导入 (示例)
-# from ..core.base_controller import BaseController
-# from ...utils.logger_setup import logger
+# 项目内部模块导入
+from ...config.settings import REPORT_TEMPLATE_DIR
+from ...utils.constants import (
+    COMPLIANCE_MONTH_CACHE_SIZE,
+    COMPLIANCE_REMINDER_LOOKBACK_DAYS,
+    DQCP_SNAPSHOT_DELTA_RATIO,
+    DQCP_SNAPSHOT_INTERVAL,
+    DQCP_VERSION_CACHE_SIZE,
+    EVIDENCE_BLOCK_SIZE,
+    EVIDENCE_COMPRESS_LEVEL,
+    EVIDENCE_STORED_SUFFIXES,
+    FIXED_POINT_EMISSION_DECIMALS,
+    REPORT_FRAGMENT_CACHE_MAX_BYTES,
+    REPORT_FRAGMENT_FORMAT,
+    REPORT_ROW_CHUNK_SIZE,
+    REPORT_TEMPLATE_SUFFIX,
+)
+from ...utils.exceptions import (
+    ComplianceScheduleError,
+    DocumentStoreError,
+    EvidenceExportCancelledError,
+    EvidenceExportError,
+    ReportCancelledError,
+    ReportGenerationError,
+    VerificationSupportError,
+    VersionStoreError,
+)
+from ..emission_calculation.services import LRUCache, from_fixed, save_lineage
+from .models import (
+    NC_SEVERITY_MAJOR,
+    NC_SEVERITY_MINOR,
+    NC_SEVERITY_OBSERVATION,
+    NC_STATUS_CLOSED,
+    OBLIGATION_ANNUAL_REPORT,
+    OBLIGATION_MONTHLY_DATA,
+    OBLIGATION_SURRENDER,
+    OBLIGATION_VERIFICATION,
+    PERIOD_MONTH,
+    PERIOD_YEAR,
+    RECUR_MONTHLY,
+    RECUR_ONCE,
+    RECUR_YEARLY,
+    SECTION_CHART,
+    SECTION_HEADING,
+    SECTION_PARAGRAPH,
+    SECTION_TABLE,
+    TASK_DONE,
+    TASK_OVERDUE,
+    TASK_PENDING,
+    CalendarDaySummary,
+    ComplianceObligation,
+    ComplianceReminder,
+    ComplianceTask,
+    DataQualityControlPlan,
+    DqcpDiff,
+    DqcpVersion,
+    EvidencePackageStats,
+    NonConformity,
+    RecurrenceRule,
+    ReportRenderStats,
+    ReportTemplate,
+    TemplateColumn,
+    TemplateSection,
+)
 
+logger = logging.getLogger(__name__)
 
-pass # 请在此处实现具体功能
+
+# ---------------------------------------------------------------------------
+# 报告表格的行来源
+# ---------------------------------------------------------------------------
+#
+# 汇总类行来源（电厂、机组、燃料、月份）一次返回整列数据 {字段: 数组}；
+# 明细类行来源按机组分组（机组 × 月、机组 × 月 × 燃料），先取出有数据的格子编号，
+# 再按机组切块生成列数据。报告生成时逐块取出、逐行写出，内存占用只与块大小有关；
+# 按机组切块也使每个机组的明细可以作为独立的片段缓存（见 ReportFragmentCache）。
+
+def _emission_totals(cube, axis):
+    """沿 axis 汇总排放量；定点模式下在 int64 上求和，结果与逐格相加的精确值一致。"""
+    if cube.fixed_point and cube.emissions_fixed is not None:
+        return from_fixed(cube.emissions_fixed.sum(axis=axis), FIXED_POINT_EMISSION_DECIMALS)
+    return np.nansum(cube.emissions, axis=axis)
+
+
+def _cell_emissions(cube):
+    if cube.fixed_point and cube.emissions_fixed is not None:
+        return from_fixed(cube.emissions_fixed, FIXED_POINT_EMISSION_DECIMALS)
+    return cube.emissions
+
+
+def _cube_labels(cube):
+    """立方体各维度的标签数组（object），每次报告生成只构造一次。"""
+    plants = np.empty(len(cube.units), dtype=object)
+    units = np.empty(len(cube.units), dtype=object)
+    plants[:] = [plant_code for plant_code, _unit in cube.units]
+    units[:] = [unit_code for _plant, unit_code in cube.units]
+    fuels = np.empty(len(cube.fuels), dtype=object)
+    fuels[:] = list(cube.fuels)
+    months = np.datetime_as_string(np.asarray(cube.months, dtype="datetime64[M]")).astype(object)
+    return {"plants": plants, "units": units, "months": months, "fuels": fuels}
+
+
+def _share(values, total):
+    values = np.asarray(values, dtype=np.float64)
+    return values / total if total else np.full(values.shape, np.nan)
+
+
+def _plant_columns(cube, labels):
+    plant_labels, first, inverse = np.unique(labels["plants"], return_index=True, return_inverse=True)
+    order = np.argsort(first)           # 按电厂在立方体中出现的顺序输出
+    unit_totals = _emission_totals(cube, (1, 2))
+    totals = np.bincount(inverse, weights=unit_totals, minlength=len(plant_labels))[order]
+    return {
+        "plant_code": plant_labels[order],
+        "unit_count": np.bincount(inverse, minlength=len(plant_labels))[order],
+        "emission_tco2": totals,
+        "share": _share(totals, float(unit_totals.sum())),
+    }
+
+
+def _unit_columns(cube, labels):
+    totals = _emission_totals(cube, (1, 2))
+    return {"plant_code": labels["plants"], "unit_code": labels["units"], "emission_tco2": totals,
+            "share": _share(totals, float(totals.sum()))}
+
+
+def _fuel_columns(cube, labels):
+    totals = _emission_totals(cube, (0, 1))
+    return {"fuel_type": labels["fuels"], "activity": np.nansum(cube.activity, axis=(0, 1)),
+            "emission_tco2": totals, "share": _share(totals, float(totals.sum()))}
+
+
+def _month_columns(cube, labels):
+    totals = _emission_totals(cube, (0, 2))
+    return {"month": labels["months"], "emission_tco2": totals, "share": _share(totals, float(totals.sum()))}
+
+
+def _unit_month_cells(cube):
+    """有活动数据的 (机组, 月) 格子的扁平编号（升序），以及每个机组占用的编号数。"""
+    return np.flatnonzero((cube.activity != 0).any(axis=2)), cube.shape[1]
+
+
+def _unit_month_columns(cube, labels, cells):
+    u, m = np.unravel_index(cells, cube.shape[:2])
+    return {"plant_code": labels["plants"][u], "unit_code": labels["units"][u], "month": labels["months"][m],
+            "emission_tco2": _emission_totals(cube, 2)[u, m]}
+
+
+def _unit_month_fuel_cells(cube):
+    return np.flatnonzero(cube.activity != 0), cube.shape[1] * cube.shape[2]
+
+
+def _unit_month_fuel_columns(cube, labels, cells):
+    u, m, f = np.unravel_index(cells, cube.shape)
+    return {
+        "plant_code": labels["plants"][u], "unit_code": labels["units"][u], "month": labels["months"][m],
+        "fuel_type": labels["fuels"][f], "activity": cube.activity[u, m, f], "ncv": cube.ncv[u, m, f],
+        "carbon_content": cube.carbon_content[u, m, f], "oxidation_rate": cube.oxidation_rate[u, m, f],
+        "emission_tco2": _cell_emissions(cube)[u, m, f],
+    }
+
+
+# 行来源名 -> (可用字段, 列数据函数, 格子函数)；格子函数为 None 的是汇总类行来源
+REPORT_ROW_SOURCES = {
+    "plant": (("plant_code", "unit_count", "emission_tco2", "share"), _plant_columns, None),
+    "unit": (("plant_code", "unit_code", "emission_tco2", "share"), _unit_columns, None),
+    "fuel": (("fuel_type", "activity", "emission_tco2", "share"), _fuel_columns, None),
+    "month": (("month", "emission_tco2", "share"), _month_columns, None),
+    "unit_month": (("plant_code", "unit_code", "month", "emission_tco2"), _unit_month_columns, _unit_month_cells),
+    "unit_month_fuel": (("plant_code", "unit_code", "month", "fuel_type", "activity", "ncv", "carbon_content",
+                         "oxidation_rate", "emission_tco2"), _unit_month_fuel_columns, _unit_month_fuel_cells),
+}
+
+
+def is_per_unit_source(source):
+    """明细类行来源按机组分组，可按机组切块渲染与缓存。"""
+    return REPORT_ROW_SOURCES[source][2] is not None
+
+
+def _unit_blocks(source, cube, labels):
+    """
+    按机组切分明细类行来源：产出 (机组下标, 行数, 取列数据的函数)，没有数据的机组跳过。
+
+    列数据延迟到调用时才生成，命中片段缓存的机组不必构造。
+    """
+    _fields, columns, cells_of = REPORT_ROW_SOURCES[source]
+    cells, per_unit = cells_of(cube)
+    bounds = np.searchsorted(cells, np.arange(len(cube.units) + 1) * per_unit).tolist()
+    for u in range(len(cube.units)):
+        lo, hi = bounds[u], bounds[u + 1]
+        if hi > lo:
+            yield u, hi - lo, (lambda block=cells[lo:hi]: columns(cube, labels, block))
+
+
+def _source_row_count(source, cube, labels):
+    _fields, columns, cells_of = REPORT_ROW_SOURCES[source]
+    if cells_of is not None:
+        return len(cells_of(cube)[0])
+    return len(next(iter(columns(cube, labels).values())))
+
+
+# 标题与段落文本中可用的占位符字段
+REPORT_CONTEXT_FIELDS = (
+    "organization", "year", "month", "period_label", "plant_count", "unit_count", "fuel_count",
+    "total_emissions", "generated_at",
+)
+
+
+# ---------------------------------------------------------------------------
+# 模板解析与缓存
+# ---------------------------------------------------------------------------
+
+def _text_fields(text, template_name):
+    """提取 str.format 占位符字段并校验；只允许 REPORT_CONTEXT_FIELDS 中的简单字段名。"""
+    fields = []
+    try:
+        parsed = list(string.Formatter().parse(text))
+    except ValueError as exc:
+        raise ReportGenerationError(f"模板文本格式错误: {exc}", template_name) from exc
+    for _literal, name, _spec, _conversion in parsed:
+        if name is None:
+            continue
+        if name not in REPORT_CONTEXT_FIELDS:
+            raise ReportGenerationError(f"模板引用了未知字段: {{{name}}}", template_name)
+        fields.append(name)
+    return tuple(fields)
+
+
+def parse_template(data, name="", path=""):
+    """
+    把模板的 JSON 结构解析为 ReportTemplate，并校验段落类型、行来源、列字段与占位符。
+
+    段落类型：heading / paragraph（text）、table（rows + columns）、
+    chart（rows + label + value，按汇总类行来源绘制条形图）。
+
+    :raises ReportGenerationError: 模板结构不合法
+    """
+    name = data.get("name") or name
+    period = data.get("period", PERIOD_YEAR)
+    if period not in (PERIOD_YEAR, PERIOD_MONTH):
+        raise ReportGenerationError(f"不支持的报告期类型: {period}", name)
+    title = data.get("title", "")
+    _text_fields(title, name)
+    sections = []
+    for index, raw in enumerate(data.get("sections", []), start=1):
+        kind = raw.get("type")
+        if kind in (SECTION_HEADING, SECTION_PARAGRAPH):
+            text = raw.get("text", "")
+            sections.append(TemplateSection(kind, text=text, fields=_text_fields(text, name)))
+        elif kind == SECTION_TABLE:
+            source = raw.get("rows")
+            if source not in REPORT_ROW_SOURCES:
+                raise ReportGenerationError(f"第 {index} 段：未知的表格行来源 {source!r}", name)
+            available = REPORT_ROW_SOURCES[source][0]
+            columns = []
+            for column in raw.get("columns", []):
+                if column.get("field") not in available:
+                    raise ReportGenerationError(
+                        f"第 {index} 段：行来源 {source} 没有字段 {column.get('field')!r}", name)
+                columns.append(TemplateColumn(column["field"], column.get("header", column["field"]),
+                                              column.get("format", "")))
+            if not columns:
+                raise ReportGenerationError(f"第 {index} 段：表格没有定义列", name)
+            title_text = raw.get("title", "")
+            sections.append(TemplateSection(kind, title=title_text, rows=source, columns=columns,
+                                            fields=_text_fields(title_text, name)))
+        elif kind == SECTION_CHART:
+            source = raw.get("rows")
+            if source not in REPORT_ROW_SOURCES or is_per_unit_source(source):
+                raise ReportGenerationError(f"第 {index} 段：图表只支持汇总类行来源，不支持 {source!r}", name)
+            available = REPORT_ROW_SOURCES[source][0]
+            label, value = raw.get("label"), raw.get("value")
+            if label not in available or value not in available:
+                raise ReportGenerationError(f"第 {index} 段：行来源 {source} 没有字段 {label!r} 或 {value!r}", name)
+            title_text = raw.get("title", "")
+            columns = [TemplateColumn(label, label), TemplateColumn(value, value, raw.get("format", ""))]
+            sections.append(TemplateSection(kind, title=title_text, rows=source, columns=columns,
+                                            fields=_text_fields(title_text, name)))
+        else:
+            raise ReportGenerationError(f"第 {index} 段：未知的段落类型 {kind!r}", name)
+    return ReportTemplate(name, title, period, sections, data.get("description", ""), path)
+
+
+def load_template(path):
+    """读取并解析模板文件。"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    try:
+        with open(path, encoding="utf-8") as fh:
+            data = json.load(fh)
+    except (OSError, ValueError) as exc:
+        raise ReportGenerationError(f"无法读取报告模板: {exc}", name) from exc
+    return parse_template(data, name, path)
+
+
+class ReportTemplateLibrary:
+    """
+    报告模板库：模板目录下每个 *.json 文件是一个模板，文件名（不含后缀）即模板名。
+
+    模板只在首次使用时解析，解析结果按 (修改时间, 大小) 缓存；文件未变时
+    之后的每次报告生成都直接复用，文件被修改后下次使用时自动重新解析。
+    """
+
+    def __init__(self, template_dir=REPORT_TEMPLATE_DIR):
+        self.template_dir = template_dir
+        self.parse_count = 0
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def names(self):
+        try:
+            files = os.listdir(self.template_dir)
+        except FileNotFoundError:
+            return []
+        return sorted(os.path.splitext(f)[0] for f in files if f.endswith(REPORT_TEMPLATE_SUFFIX))
+
+    def path_of(self, name):
+        return os.path.join(self.template_dir, name + REPORT_TEMPLATE_SUFFIX)
+
+    def get(self, name):
+        """
+        返回解析后的模板。
+
+        :raises ReportGenerationError: 模板不存在或不合法
+        """
+        path = self.path_of(name)
+        try:
+            stat = os.stat(path)
+        except OSError as exc:
+            raise ReportGenerationError("报告模板不存在", name) from exc
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._cache.get(name)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+        template = load_template(path)
+        with self._lock:
+            self._cache[name] = (stamp, template)
+            self.parse_count += 1
+        return template
+
+
+# ---------------------------------------------------------------------------
+# 流式输出
+# ---------------------------------------------------------------------------
+
+class HtmlReportWriter:
+    """
+    以 HTML 输出报告：边生成边写入文件，表格逐行写出，不在内存中拼接整份文档。
+
+    样式针对打印优化（表头在每页重复、行不跨页断开），可直接在浏览器中打印为 PDF。
+    支持片段捕获：begin_fragment() 与 end_fragment() 之间写出的内容同时作为片段返回，
+    供 ReportFragmentCache 缓存；命中缓存时用 write_fragment() 原样写入。
+    """
+
+    format = "html"
+    supports_fragments = True
+
+    _STYLE = (
+        "body{font-family:'SimSun','Songti SC',serif;font-size:10.5pt;margin:2cm}"
+        "h1{text-align:center;font-size:18pt}h2{font-size:14pt;margin-top:1.5em}"
+        "table{border-collapse:collapse;width:100%;margin:0.5em 0 1em}"
+        "caption{font-weight:bold;margin-bottom:0.3em}"
+        "th,td{border:1px solid #666;padding:2px 4px}th{background:#eee}td.n{text-align:right}"
+        "thead{display:table-header-group}tr{page-break-inside:avoid}"
+        "figure{margin:0.5em 0 1em;page-break-inside:avoid}figcaption{font-weight:bold;text-align:center}"
+    )
+    _CHART_BAR_HEIGHT = 18
+    _CHART_LABEL_WIDTH = 110
+    _CHART_WIDTH = 640
+
+    def __init__(self, path):
+        self._out = open(path, "wb")
+        self._fh = self._out
+        self._columns = []
+
+    def _write(self, text):
+        self._fh.write(text.encode("utf-8"))
+
+    def begin_fragment(self):
+        self._fh = io.BytesIO()
+
+    def end_fragment(self):
+        """结束片段捕获：把片段写入报告并返回片段字节。"""
+        data = self._fh.getvalue()
+        self._fh = self._out
+        self._out.write(data)
+        return data
+
+    def write_fragment(self, data):
+        self._out.write(data)
+
+    def begin(self, title):
+        self._write('<!DOCTYPE html>\n<html lang="zh-CN"><head><meta charset="utf-8">'
+                    f"<title>{html.escape(title)}</title><style>{self._STYLE}</style></head><body>\n"
+                    f"<h1>{html.escape(title)}</h1>\n")
+
+    def heading(self, text):
+        self._write(f"<h2>{html.escape(text)}</h2>\n")
+
+    def paragraph(self, text):
+        self._write(f"<p>{html.escape(text)}</p>\n")
+
+    def chart(self, title, columns, labels, values):
+        """以内联 SVG 绘制水平条形图（不依赖外部绘图库，打印时为矢量图）。"""
+        _label_column, value_column = columns
+        valid = [value for value in values if value == value and value > 0]
+        scale = (self._CHART_WIDTH - self._CHART_LABEL_WIDTH - 120) / max(valid) if valid else 0.0
+        bar = self._CHART_BAR_HEIGHT
+        height = bar * len(labels) + 4
+        parts = [f'<figure><svg xmlns="http://www.w3.org/2000/svg" width="{self._CHART_WIDTH}" height="{height}" '
+                 f'font-size="11">']
+        for i, (label, value) in enumerate(zip(labels, values)):
+            y = i * bar + 2
+            width = value * scale if value == value and value > 0 else 0.0
+            parts.append(
+                f'<text x="{self._CHART_LABEL_WIDTH - 6}" y="{y + bar - 6}" text-anchor="end">'
+                f"{html.escape(str(label))}</text>"
+                f'<rect x="{self._CHART_LABEL_WIDTH}" y="{y}" width="{width:.1f}" height="{bar - 4}" fill="#4a7ab5"/>'
+                f'<text x="{self._CHART_LABEL_WIDTH + width + 4:.1f}" y="{y + bar - 6}">'
+                f"{html.escape(value_column.text(value))}</text>"
+            )
+        parts.append(f"</svg><figcaption>{html.escape(title)}</figcaption></figure>\n")
+        self._write("".join(parts))
+
+    def set_columns(self, columns):
+        """设置后续 write_row 使用的列（表头片段取自缓存时由生成器直接调用）。"""
+        self._columns = [(column, ' class="n"' if column.format else "") for column in columns]
+
+    def begin_table(self, title, columns):
+        self.set_columns(columns)
+        header = "".join(f"<th>{html.escape(column.header)}</th>" for column in columns)
+        self._write(f"<table><caption>{html.escape(title)}</caption><thead><tr>{header}</tr></thead><tbody>\n")
+
+    def write_row(self, values):
+        cells = "".join(f"<td{css}>{html.escape(column.text(value))}</td>"
+                        for (column, css), value in zip(self._columns, values))
+        self._write(f"<tr>{cells}</tr>\n")
+
+    def end_table(self):
+        self._write("</tbody></table>\n")
+
+    def close(self):
+        self._write("</body></html>\n")
+        self._out.close()
+
+    def abort(self):
+        self._out.close()
+
+
+class XlsxReportWriter:
+    """
+    以 XLSX 输出报告（依赖 openpyxl）。
+
+    使用 openpyxl 的 write_only 模式：每个表格一个工作表，行追加后即序列化到临时文件，
+    保存时再流式打包，工作簿不会整体驻留内存。标题与段落写在首个“报告”工作表中。
+    数值单元格保存原始数值（缺失值留空），便于核查人员在 Excel 中继续计算。
+    工作表 XML 由 openpyxl 生成，无法按片段复用，因此 XLSX 报告每次完整生成。
+    """
+
+    format = "xlsx"
+    supports_fragments = False
+
+    _INVALID_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+    def __init__(self, path):
+        try:
+            from openpyxl import Workbook
+        except ImportError as exc:  # pragma: no cover - 取决于运行环境
+            raise ReportGenerationError("生成 XLSX 报告需要安装 openpyxl") from exc
+        self.path = path
+        self._workbook = Workbook(write_only=True)
+        self._summary = self._workbook.create_sheet("报告")
+        self._sheet = None
+        self._sheet_names = {"报告"}
+
+    def _sheet_name(self, title):
+        base = self._INVALID_SHEET_CHARS.sub("", title).strip()[:28] or "表"
+        name, suffix = base, 1
+        while name in self._sheet_names:
+            suffix += 1
+            name = f"{base[:28 - len(str(suffix))]}_{suffix}"
+        self._sheet_names.add(name)
+        return name
+
+    def begin(self, title):
+        self._summary.append([title])
+
+    def heading(self, text):
+        self._summary.append([])
+        self._summary.append([text])
+
+    def paragraph(self, text):
+        self._summary.append([text])
+
+    def chart(self, title, columns, labels, values):
+        """图表以数据表形式写在“报告”工作表中，可在 Excel 中据此插入图表。"""
+        self._summary.append([title])
+        self._summary.append([column.header for column in columns])
+        for label, value in zip(labels, values):
+            self._summary.append([label, None if value != value else value])
+
+    def set_columns(self, columns):
+        pass
+
+    def begin_table(self, title, columns):
+        name = self._sheet_name(title)
+        self._summary.append([f"{title}（见工作表“{name}”）"])
+        self._sheet = self._workbook.create_sheet(name)
+        self._sheet.append([column.header for column in columns])
+
+    def write_row(self, values):
+        self._sheet.append([None if isinstance(value, float) and value != value else value for value in values])
+
+    def end_table(self):
+        self._sheet = None
+
+    def close(self):
+        self._workbook.save(self.path)
+
+    def abort(self):
+        self._workbook = None
+
+
+# 输出格式 -> 输出器，与 REPORT_FORMATS 一一对应
+REPORT_WRITERS = {writer.format: writer for writer in (HtmlReportWriter, XlsxReportWriter)}
+
+
+# ---------------------------------------------------------------------------
+# 报告片段缓存
+# ---------------------------------------------------------------------------
+
+def _fragment_key(*parts):
+    """
+    以 BLAKE2b 散列片段的全部输入：数值数组按原始字节、标签数组按文本、其余按 repr。
+
+    返回 hashlib 对象，可 copy() 后继续追加（同一表格内各机组共用表格级前缀）。
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"report-fragment-v{REPORT_FRAGMENT_FORMAT}".encode())
+    return _update_key(digest, *parts)
+
+
+def _update_key(digest, *parts):
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            if part.dtype == object:
+                digest.update("\x1f".join(map(str, part.tolist())).encode("utf-8"))
+            else:
+                digest.update(f"{part.dtype.str}{part.shape}".encode())
+                digest.update(np.ascontiguousarray(part).data)
+        else:
+            digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\x1e")
+    return digest
+
+
+class ReportFragmentCache:
+    """
+    已渲染报告片段的磁盘缓存。
+
+    报告按段落切分为片段：标题与叙述段落、汇总表格、图表各为一个片段，
+    明细表格再按机组切分（每个机组的明细行一个片段）。片段的键是其全部输入
+    （段落定义、格式化后的文字、所用数组切片）的摘要，输入不变则键不变。
+    数据更正后重新生成报告时，只有输入变化的片段（脏片段）需要重新渲染，
+    其余片段直接从磁盘按字节拼接，报告内容与完整重新生成逐字节相同。
+
+    片段按键的前两位分目录保存，先写临时文件再原子改名；命中时刷新修改时间，
+    evict() 按修改时间从旧到新淘汰，直到总大小不超过 max_bytes。
+    """
+
+    SUFFIX = ".frag"
+
+    def __init__(self, root, max_bytes=REPORT_FRAGMENT_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key + self.SUFFIX)
+
+    def get(self, key):
+        """命中返回片段字节，否则返回 None。"""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as fh:
+                data = fh.read()
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key, data):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp_path, path)
+        return path
+
+    def entries(self):
+        """[(路径, 大小, 修改时间)]，按修改时间从旧到新。"""
+        entries = []
+        with os.scandir(self.root) as shards:
+            for shard in shards:
+                if not shard.is_dir():
+                    continue
+                with os.scandir(shard.path) as scan:
+                    for entry in scan:
+                        if entry.name.endswith(self.SUFFIX) and entry.is_file():
+                            stat = entry.stat()
+                            entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda item: item[2])
+
+    def size(self):
+        return sum(size for _path, size, _mtime in self.entries())
+
+    def evict(self):
+        """淘汰最久未使用的片段，直至总大小不超过上限；返回淘汰的片段数。"""
+        with self._lock:
+            entries = self.entries()
+            total = sum(size for _path, size, _mtime in entries)
+            removed = 0
+            for path, size, _mtime in entries:
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+                removed += 1
+            return removed
+
+    def clear(self):
+        for path, _size, _mtime in self.entries():
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def stats(self):
+        entries = self.entries()
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return {"entries": len(entries), "bytes": sum(size for _path, size, _mtime in entries),
+                "max_bytes": self.max_bytes, "hits": hits, "misses": misses}
+
+
+# ---------------------------------------------------------------------------
+# 报告生成
+# ---------------------------------------------------------------------------
+
+def period_cube(cube, year, month=None):
+    """
+    从核算立方体中截取报告期（某年或某年某月），数组均为切片视图，不复制数据。
+
+    :raises ReportGenerationError: 立方体不覆盖整个报告期
+    """
+    first = np.datetime64(f"{int(year):04d}-{int(month or 1):02d}", "M")
+    n_months = 1 if month else 12
+    months = np.asarray(cube.months, dtype="datetime64[M]")
+    start = int(np.searchsorted(months, first))
+    stop = start + n_months
+    if stop > len(months) or months[start] != first or months[stop - 1] != first + (n_months - 1):
+        period = str(first) if month else f"{first} 起 12 个月"
+        raise ReportGenerationError(f"核算结果不覆盖报告期 {period}")
+    window = slice(start, stop)
+    arrays = {name: getattr(cube, name)[:, window] for name in ("activity", "ncv", "carbon_content", "oxidation_rate")}
+    return replace(
+        cube, months=cube.months[window], **arrays,
+        emissions=None if cube.emissions is None else cube.emissions[:, window],
+        emissions_fixed=None if cube.emissions_fixed is None else cube.emissions_fixed[:, window],
+    )
+
+
+def report_context(cube, organization="", year=None, month=None):
+    """报告标题与段落中占位符的取值。"""
+    period_label = f"{year}年{int(month)}月" if month else f"{year}年度"
+    return {
+        "organization": organization,
+        "year": year,
+        "month": month or "",
+        "period_label": period_label,
+        "plant_count": len({plant_code for plant_code, _unit in cube.units}),
+        "unit_count": len(cube.units),
+        "fuel_count": len(cube.fuels),
+        "total_emissions": float(_emission_totals(cube, None)),
+        "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M"),
+    }
+
+
+class _RenderPass:
+    """一次报告生成的状态：输出器、片段缓存、统计与进度。"""
+
+    def __init__(self, writer, fragment_cache, stats, total_rows, chunk_size, progress_callback, cancel_event,
+                 template):
+        self.writer = writer
+        self.cache = fragment_cache if writer.supports_fragments else None
+        self.stats = stats
+        self.total_rows = total_rows
+        self.chunk_size = chunk_size
+        self.progress_callback = progress_callback
+        self.cancel_event = cancel_event
+        self.template = template
+        self._reported = 0
+
+    def check_cancel(self):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise ReportCancelledError("报告生成已取消", self.template.name)
+
+    def fragment(self, index, key, render):
+        """
+        输出一个片段：缓存命中则原样写入，否则渲染、写入并存入缓存。
+
+        :param index: 所属段落序号，用于统计脏段落
+        :param key: 片段输入的摘要对象（_fragment_key）；不使用缓存时可为 None
+        :param render: 无参函数，通过输出器写出片段内容
+        """
+        if self.cache is None:
+            render()
+            return
+        digest = key.hexdigest()
+        data = self.cache.get(digest)
+        if data is not None:
+            self.writer.write_fragment(data)
+            self.stats.fragments_reused += 1
+            return
+        self.writer.begin_fragment()
+        render()
+        self.cache.put(digest, self.writer.end_fragment())
+        self.stats.fragments_rendered += 1
+        if not self.stats.dirty_sections or self.stats.dirty_sections[-1] != index:
+            self.stats.dirty_sections.append(index)
+
+    def write_rows(self, columns, fields, count):
+        for start in range(0, count, self.chunk_size):
+            values = [columns[field][start:start + self.chunk_size].tolist() for field in fields]
+            for row in zip(*values):
+                self.writer.write_row(row)
+
+    def advance(self, rows):
+        self.stats.rows += rows
+        if self.progress_callback is not None and (
+                self.stats.rows - self._reported >= self.chunk_size or self.stats.rows == self.total_rows):
+            self._reported = self.stats.rows
+            self.progress_callback(self.stats.rows, self.total_rows)
+
+
+class EmissionReportGenerator:
+    """
+    按模板生成年度/月度排放报告。
+
+    模板取自 ReportTemplateLibrary（解析一次后缓存）；表格数据按块或按机组生成，
+    逐行交给输出器写入文件，整个过程中内存里只有当前块。
+    报告先写入同目录下的 .part 临时文件，成功后原子替换为目标文件；
+    失败或取消时删除临时文件，不会留下不完整的报告。
+
+    提供 fragment_cache 时按段落/机组增量渲染（见 ReportFragmentCache）：
+    数据更正后重新生成，只重新渲染输入变化的片段，统计见 ReportRenderStats。
+    """
+
+    def __init__(self, template_library=None, fragment_cache=None, chunk_size=REPORT_ROW_CHUNK_SIZE):
+        self.template_library = template_library or ReportTemplateLibrary()
+        self.fragment_cache = fragment_cache
+        self.chunk_size = chunk_size
+
+    @staticmethod
+    def format_of(path, fmt=None):
+        fmt = (fmt or os.path.splitext(path)[1].lstrip(".")).lower()
+        if fmt not in REPORT_WRITERS:
+            raise ReportGenerationError(f"不支持的报告格式: {fmt or '(无后缀)'}")
+        return fmt
+
+    def render(self, template_name, cube, path, organization="", year=None, month=None, fmt=None,
+               progress_callback=None, cancel_event=None):
+        """
+        生成报告。
+
+        :param cube: 已计算排放的 CombustionCube，须覆盖报告期；年报取 year 起 12 个月，月报取 year-month
+        :param year: 报告年份，默认取立方体第一个月所在年份
+        :param month: 月报的月份（1~12）；月度模板必须提供
+        :param fmt: "html" / "xlsx"，默认按 path 后缀判断
+        :param progress_callback: callback(已写行数, 总行数)，大约每写完一块调用一次
+        :param cancel_event: threading.Event，置位后在下一个片段开始前抛出 ReportCancelledError
+        :return: ReportRenderStats
+        """
+        started = time.perf_counter()
+        template = self.template_library.get(template_name)
+        fmt = self.format_of(path, fmt)
+        if cube.emissions is None:
+            raise ReportGenerationError("核算结果尚未计算排放量", template.name)
+        if year is None:
+            year = int(str(np.datetime64(cube.months[0], "Y")))
+        if template.period == PERIOD_MONTH and not month:
+            raise ReportGenerationError("月度报告需要指定月份", template.name)
+        cube = period_cube(cube, year, month if template.period == PERIOD_MONTH else None)
+        context = report_context(cube, organization, year, month if template.period == PERIOD_MONTH else None)
+        labels = _cube_labels(cube)
+        total_rows = sum(_source_row_count(section.rows, cube, labels) for section in template.tables)
+        stats = ReportRenderStats(path, fmt, template.name, period_label=context["period_label"])
+
+        partial = path + ".part"
+        writer = REPORT_WRITERS[fmt](partial)
+        run = _RenderPass(writer, self.fragment_cache, stats, total_rows, self.chunk_size, progress_callback,
+                          cancel_event, template)
+        try:
+            writer.begin(template.title.format(**context))
+            for index, section in enumerate(template.sections):
+                run.check_cancel()
+                stats.sections += 1
+                self._render_section(run, index, section, cube, labels, context)
+            writer.close()
+            os.replace(partial, path)
+        except BaseException:
+            writer.abort()
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        if run.cache is not None:
+            run.cache.evict()
+        stats.bytes_written = os.path.getsize(path)
+        stats.elapsed = time.perf_counter() - started
+        logger.info("报告已生成: %s（%s 段，%s 行，%.1f KB，用时 %.2fs；重新渲染 %s 个片段，复用 %s 个）",
+                    path, stats.sections, stats.rows, stats.bytes_written / 1024, stats.elapsed,
+                    stats.fragments_rendered, stats.fragments_reused)
+        return stats
+
+    def _render_section(self, run, index, section, cube, labels, context):
+        writer = run.writer
+        keyed = run.cache is not None
+        if section.type in (SECTION_HEADING, SECTION_PARAGRAPH):
+            text = section.text.format(**context)
+            render = writer.heading if section.type == SECTION_HEADING else writer.paragraph
+            key = _fragment_key(writer.format, section.type, text) if keyed else None
+            run.fragment(index, key, lambda: render(text))
+            return
+
+        title = section.title.format(**context)
+        fields = [column.field for column in section.columns]
+        _available, columns_of, _cells_of = REPORT_ROW_SOURCES[section.rows]
+        if section.type == SECTION_CHART:
+            columns = columns_of(cube, labels)
+            label_values, values = columns[fields[0]], columns[fields[1]]
+            key = _fragment_key(writer.format, section, title, label_values, values) if keyed else None
+            run.fragment(index, key, lambda: writer.chart(title, section.columns, label_values.tolist(),
+                                                          values.tolist()))
+            return
+
+        if not is_per_unit_source(section.rows):
+            columns = columns_of(cube, labels)
+            count = len(columns[fields[0]])
+            key = _fragment_key(writer.format, section, title, *(columns[f] for f in fields)) if keyed else None
+
+            def render_table():
+                writer.begin_table(title, section.columns)
+                run.write_rows(columns, fields, count)
+                writer.end_table()
+
+            run.fragment(index, key, render_table)
+            run.advance(count)
+            return
+
+        # 明细表：表头一个片段，每个机组的明细行一个片段
+        prefix = None
+        if keyed:
+            prefix = _fragment_key(writer.format, section, title, labels["months"], labels["fuels"], cube.fixed_point)
+        run.fragment(index, prefix and prefix.copy(), lambda: writer.begin_table(title, section.columns))
+        writer.set_columns(section.columns)
+        emissions = cube.emissions_fixed if cube.fixed_point and cube.emissions_fixed is not None else cube.emissions
+        for u, count, columns_of_unit in _unit_blocks(section.rows, cube, labels):
+            run.check_cancel()
+            key = None
+            if keyed:
+                key = _update_key(prefix.copy(), labels["plants"][u], labels["units"][u], cube.activity[u],
+                                  cube.ncv[u], cube.carbon_content[u], cube.oxidation_rate[u], emissions[u])
+            run.fragment(index, key, lambda: run.write_rows(columns_of_unit(), fields, count))
+            run.advance(count)
+        writer.end_table()
+
+
+# ---------------------------------------------------------------------------
+# DQCP 版本库（快照 + 增量）
+# ---------------------------------------------------------------------------
+
+def _common_affixes(old, new):
+    """old 与 new 的公共前缀、公共后缀长度（后缀不与前缀重叠）。"""
+    limit = min(len(old), len(new))
+    prefix = 0
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    return prefix, suffix
+
+
+def line_opcodes(old_lines, new_lines):
+    """
+    逐行比较，返回 difflib 风格的 [(操作, i1, i2, j1, j2)]。
+
+    先去掉公共前缀与后缀，只对中间变化的部分运行 SequenceMatcher：
+    大文档上的局部修改（最常见的情形）比较代价与修改范围成正比，而不是与全文长度成正比。
+    """
+    prefix, suffix = _common_affixes(old_lines, new_lines)
+    opcodes = [("equal", 0, prefix, 0, prefix)] if prefix else []
+    old_end, new_end = len(old_lines) - suffix, len(new_lines) - suffix
+    matcher = difflib.SequenceMatcher(None, old_lines[prefix:old_end], new_lines[prefix:new_end])
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        opcodes.append((tag, i1 + prefix, i2 + prefix, j1 + prefix, j2 + prefix))
+    if suffix:
+        opcodes.append(("equal", old_end, len(old_lines), new_end, len(new_lines)))
+    return opcodes
+
+
+def make_delta(old_lines, new_lines):
+    """
+    生成把 old_lines 变为 new_lines 的增量：[[起始行, 行数], "插入文本", ...]。
+
+    列表项为整数对时表示从旧版本复制连续若干行，为字符串时表示插入的文本（含换行）。
+    """
+    delta = []
+    for tag, i1, i2, j1, j2 in line_opcodes(old_lines, new_lines):
+        if tag == "equal":
+            delta.append([i1, i2 - i1])
+        elif j2 > j1:
+            delta.append("".join(new_lines[j1:j2]))
+    return delta
+
+
+def apply_delta(old_lines, delta):
+    """按 make_delta 的增量由旧版本的行还原新版本的行。"""
+    lines = []
+    for op in delta:
+        if isinstance(op, str):
+            lines.extend(op.splitlines(keepends=True))
+        else:
+            start, count = op
+            lines.extend(old_lines[start:start + count])
+    return lines
+
+
+class DqcpVersionStore:
+    """
+    DQCP 版本库：每个版本以“完整快照”或“相对上一版本的逐行增量”保存（zlib 压缩）。
+
+    - 每隔 snapshot_interval 个版本强制保存一次快照；增量压缩后超过快照压缩后大小的
+      DQCP_SNAPSHOT_DELTA_RATIO 时（大改版）也直接保存快照。因此还原任一版本只需
+      从不晚于它的最近快照开始回放至多 snapshot_interval - 1 个增量，耗时有上界；
+    - 已还原的版本按行列表缓存在 LRU 中，浏览相邻版本时从缓存中最近的版本继续回放；
+    - 还原结果以 SHA-256 校验，发现不一致立即报错，不会静默返回错误内容；
+    - root 不为 None 时持久化到磁盘：<root>/<plan_id>/plan.json 为计划元数据与最新正文，
+      versions.jsonl 逐行追加版本元数据，v<版本号>.snap / .delta 为压缩后的内容。
+    """
+
+    def __init__(self, root=None, snapshot_interval=DQCP_SNAPSHOT_INTERVAL, cache_size=DQCP_VERSION_CACHE_SIZE):
+        self.root = root
+        self.snapshot_interval = snapshot_interval
+        self._plans = {}
+        self._versions = {}         # plan_id -> [DqcpVersion]，下标为 版本号 - 1
+        self._blobs = {}            # (plan_id, version) -> 压缩内容（仅内存模式）
+        self._cache = LRUCache(cache_size)
+        self._lock = threading.RLock()
+        if root is not None:
+            os.makedirs(root, exist_ok=True)
+            self._load()
+
+    # ---- 持久化 -------------------------------------------------------------
+
+    def _plan_dir(self, plan_id):
+        if not plan_id or os.sep in plan_id or plan_id.startswith("."):
+            raise VersionStoreError(f"无效的计划编号: {plan_id!r}")
+        return os.path.join(self.root, plan_id)
+
+    def _blob_path(self, plan_id, version, snapshot):
+        return os.path.join(self._plan_dir(plan_id), f"v{version:06d}" + (".snap" if snapshot else ".delta"))
+
+    def _load(self):
+        for plan_id in sorted(os.listdir(self.root)):
+            plan_path = os.path.join(self.root, plan_id, "plan.json")
+            if not os.path.exists(plan_path):
+                continue
+            with open(plan_path, encoding="utf-8") as fh:
+                data = json.load(fh)
+            data["updated_at"] = datetime.fromisoformat(data["updated_at"]) if data.get("updated_at") else None
+            self._plans[plan_id] = DataQualityControlPlan(**data)
+            versions = []
+            index_path = os.path.join(self.root, plan_id, "versions.jsonl")
+            if os.path.exists(index_path):
+                with open(index_path, encoding="utf-8") as fh:
+                    for line in fh:
+                        if line.strip():
+                            item = json.loads(line)
+                            item["created_at"] = datetime.fromisoformat(item["created_at"])
+                            versions.append(DqcpVersion(**item))
+            self._versions[plan_id] = versions
+            if "content" not in data and versions:
+                # 早期的 plan.json 不含正文：从最新版本还原
+                self._plans[plan_id].content = "".join(self._lines(plan_id, len(versions)))
+
+    def _write_plan(self, plan):
+        if self.root is None:
+            return
+        os.makedirs(self._plan_dir(plan.plan_id), exist_ok=True)
+        data = {"plan_id": plan.plan_id, "plant_code": plan.plant_code, "title": plan.title,
+                "content": plan.content, "version": plan.version, "updated_by": plan.updated_by,
+                "updated_at": plan.updated_at.isoformat() if plan.updated_at else None}
+        path = os.path.join(self._plan_dir(plan.plan_id), "plan.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as fh:
+            json.dump(data, fh, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+    def _write_version(self, meta, blob):
+        if self.root is None:
+            self._blobs[(meta.plan_id, meta.version)] = blob
+            return
+        path = self._blob_path(meta.plan_id, meta.version, meta.snapshot)
+        with open(path + ".tmp", "wb") as fh:
+            fh.write(blob)
+        os.replace(path + ".tmp", path)
+        # 内容先落盘、元数据后追加：元数据中出现的版本一定有完整内容
+        item = {**meta.__dict__, "created_at": meta.created_at.isoformat()}
+        with open(os.path.join(self._plan_dir(meta.plan_id), "versions.jsonl"), "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+    def _read_blob(self, meta):
+        if self.root is None:
+            return self._blobs[(meta.plan_id, meta.version)]
+        try:
+            with open(self._blob_path(meta.plan_id, meta.version, meta.snapshot), "rb") as fh:
+                return fh.read()
+        except FileNotFoundError:
+            raise VersionStoreError(f"版本内容缺失: {meta.plan_id} v{meta.version}") from None
+
+    # ---- 计划与版本 ---------------------------------------------------------
+
+    def plans(self):
+        return list(self._plans.values())
+
+    def plan(self, plan_id):
+        try:
+            return self._plans[plan_id]
+        except KeyError:
+            raise VersionStoreError(f"计划不存在: {plan_id}") from None
+
+    def create_plan(self, plan_id, plant_code, title):
+        with self._lock:
+            if plan_id in self._plans:
+                raise VersionStoreError(f"计划已存在: {plan_id}")
+            plan = DataQualityControlPlan(plan_id, plant_code, title)
+            if self.root is not None:
+                self._plan_dir(plan_id)
+            self._plans[plan_id] = plan
+            self._versions[plan_id] = []
+            self._write_plan(plan)
+            return plan
+
+    def versions(self, plan_id):
+        """版本元数据列表，按版本号升序。"""
+        self.plan(plan_id)
+        return list(self._versions[plan_id])
+
+    def _meta(self, plan_id, version):
+        versions = self._versions.get(plan_id)
+        if versions is None:
+            raise VersionStoreError(f"计划不存在: {plan_id}")
+        if not 1 <= version <= len(versions):
+            raise VersionStoreError(f"版本不存在: {plan_id} v{version}")
+        return versions[version - 1]
+
+    def commit(self, plan_id, content, author="", comment=""):
+        """
+        保存一个新版本；正文与最新版本完全相同时不产生新版本。
+
+        :return: DqcpVersion（未变化时返回最新版本的元数据）
+        """
+        with self._lock:
+            plan = self.plan(plan_id)
+            versions = self._versions[plan_id]
+            content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+            if versions and versions[-1].content_hash == content_hash:
+                return versions[-1]
+            version = len(versions) + 1
+            lines = content.splitlines(keepends=True)
+            snapshot_blob = zlib.compress(content.encode("utf-8"))
+            blob, snapshot = snapshot_blob, True
+            if versions and (version - self._snapshot_base(plan_id, version - 1)) < self.snapshot_interval:
+                delta = make_delta(self._lines(plan_id, version - 1), lines)
+                delta_blob = zlib.compress(json.dumps(delta, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+                if len(delta_blob) <= len(snapshot_blob) * DQCP_SNAPSHOT_DELTA_RATIO:
+                    blob, snapshot = delta_blob, False
+            meta = DqcpVersion(plan_id, version, datetime.now(), author, comment, len(content.encode("utf-8")),
+                               len(blob), snapshot, content_hash)
+            self._write_version(meta, blob)
+            versions.append(meta)
+            self._cache.put((plan_id, version), lines)
+            plan.content, plan.version, plan.updated_at, plan.updated_by = content, version, meta.created_at, author
+            self._write_plan(plan)
+            return meta
+
+    def _snapshot_base(self, plan_id, version):
+        """不晚于 version 的最近快照版本号。"""
+        versions = self._versions[plan_id]
+        while not versions[version - 1].snapshot:
+            version -= 1
+        return version
+
+    def _lines(self, plan_id, version):
+        """还原某版本的行列表（内部使用，调用方不得修改返回的列表）。"""
+        cached = self._cache.get((plan_id, version))
+        if cached is not None:
+            return cached
+        base = self._snapshot_base(plan_id, version)
+        # 从缓存中离目标最近的版本开始回放，没有则从快照开始
+        start, lines = base, None
+        for candidate in range(version - 1, base - 1, -1):
+            lines = self._cache.get((plan_id, candidate))
+            if lines is not None:
+                start = candidate
+                break
+        if lines is None:
+            lines = zlib.decompress(self._read_blob(self._meta(plan_id, base))).decode("utf-8").splitlines(
+                keepends=True)
+        for current in range(start + 1, version + 1):
+            delta = json.loads(zlib.decompress(self._read_blob(self._meta(plan_id, current))))
+            lines = apply_delta(lines, delta)
+        meta = self._meta(plan_id, version)
+        if hashlib.sha256("".join(lines).encode("utf-8")).hexdigest() != meta.content_hash:
+            raise VersionStoreError(f"版本内容校验失败: {plan_id} v{version}")
+        self._cache.put((plan_id, version), lines)
+        return lines
+
+    def content(self, plan_id, version=None):
+        """还原某版本的正文；version 为 None 时返回最新版本。"""
+        with self._lock:
+            if version is None:
+                version = len(self._versions.get(plan_id, []))
+                if not version:
+                    return self.plan(plan_id).content
+            self._meta(plan_id, version)
+            return "".join(self._lines(plan_id, version))
+
+    def diff(self, plan_id, old_version, new_version):
+        """比较两个版本（不要求相邻），返回 DqcpDiff。"""
+        with self._lock:
+            self._meta(plan_id, old_version)
+            self._meta(plan_id, new_version)
+            old_lines, new_lines = self._lines(plan_id, old_version), self._lines(plan_id, new_version)
+        result = DqcpDiff(plan_id, old_version, new_version)
+        for tag, i1, i2, j1, j2 in line_opcodes(old_lines, new_lines):
+            if tag == "equal":
+                continue
+            result.hunks.append((tag, "".join(old_lines[i1:i2]), "".join(new_lines[j1:j2])))
+            result.removed_lines += i2 - i1
+            result.added_lines += j2 - j1
+        return result
+
+    def stats(self, plan_id=None):
+        """存储统计：{"versions", "snapshots", "full_bytes", "stored_bytes", "ratio"}；plan_id 为空时统计全部计划。"""
+        plan_ids = [plan_id] if plan_id else list(self._versions)
+        versions = [meta for pid in plan_ids for meta in self._versions.get(pid, [])]
+        full = sum(meta.size for meta in versions)
+        stored = sum(meta.stored_bytes for meta in versions)
+        return {"versions": len(versions), "snapshots": sum(meta.snapshot for meta in versions),
+                "full_bytes": full, "stored_bytes": stored, "ratio": stored / full if full else 0.0}
+
+
+# ---------------------------------------------------------------------------
+# 合规日历调度
+# ---------------------------------------------------------------------------
+
+# 新增电厂时默认登记的义务：(类型, 名称, 频率, 月, 日, 报告期滞后, 提前提醒天数)
+STANDARD_OBLIGATIONS = (
+    (OBLIGATION_MONTHLY_DATA, "月度排放数据报送", RECUR_MONTHLY, 1, 10, 1, 5),
+    (OBLIGATION_ANNUAL_REPORT, "年度排放报告提交", RECUR_YEARLY, 3, 31, 1, 30),
+    (OBLIGATION_VERIFICATION, "年度排放核查", RECUR_YEARLY, 6, 30, 1, 30),
+    (OBLIGATION_SURRENDER, "配额清缴", RECUR_YEARLY, 12, 31, 1, 30),
+)
+
+
+def _clamped_date(year, month, day):
+    return date(year, month, min(day, calendar.monthrange(year, month)[1]))
+
+
+def validate_rule(rule):
+    """:raises ComplianceScheduleError: 规则字段无效"""
+    if rule.freq not in (RECUR_ONCE, RECUR_MONTHLY, RECUR_YEARLY):
+        raise ComplianceScheduleError(f"未知的重复频率: {rule.freq}")
+    if not 1 <= rule.day <= 31 or not 1 <= rule.month <= 12 or rule.interval < 1:
+        raise ComplianceScheduleError(f"重复规则无效: {rule}")
+    if rule.end is not None and rule.end < rule.start:
+        raise ComplianceScheduleError(f"重复规则的结束日早于开始日: {rule}")
+
+
+def rule_occurrences(rule, start, end):
+    """
+    展开重复规则在 [start, end] 内的到期日（升序）。
+
+    直接对齐到窗口内的第一个周期，只计算窗口内的日期，开销与规则起始日距今多远无关。
+    """
+    lo = max(start, rule.start)
+    hi = min(end, rule.end) if rule.end is not None else end
+    if lo > hi:
+        return []
+    if rule.freq == RECUR_ONCE:
+        return [rule.start] if lo <= rule.start <= hi else []
+    if rule.freq == RECUR_MONTHLY:
+        # 以“年 × 12 + 月”为周期编号
+        anchor, first, last = (d.year * 12 + d.month - 1 for d in (rule.start, lo, hi))
+
+        def due_of(index):
+            return _clamped_date(index // 12, index % 12 + 1, rule.day)
+    else:
+        anchor, first, last = rule.start.year, lo.year, hi.year
+
+        def due_of(index):
+            return _clamped_date(index, rule.month, rule.day)
+    step = rule.interval
+    index = anchor + max(0, -(-(first - anchor) // step)) * step
+    result = []
+    while index <= last:
+        due = due_of(index)
+        if lo <= due <= hi:
+            result.append(due)
+        index += step
+    return result
+
+
+def next_occurrence(rule, after):
+    """after 之后（不含当天）的第一个到期日；规则已结束时返回 None。"""
+    if rule.freq == RECUR_ONCE:
+        return rule.start if rule.start > after else None
+    span = 31 * (rule.interval + 1) if rule.freq == RECUR_MONTHLY else 366 * (rule.interval + 1)
+    start = max(after + timedelta(days=1), rule.start)
+    due = rule_occurrences(rule, start, start + timedelta(days=span))
+    return due[0] if due else None
+
+
+def occurrence_period(rule, due):
+    """到期日所属的报告期标签：monthly 为 "YYYY-MM"，yearly 为 "YYYY"，once 为到期日。"""
+    if rule.freq == RECUR_MONTHLY:
+        index = due.year * 12 + due.month - 1 - rule.period_lag
+        return f"{index // 12:04d}-{index % 12 + 1:02d}"
+    if rule.freq == RECUR_YEARLY:
+        return f"{due.year - rule.period_lag:04d}"
+    return due.isoformat()
+
+
+def _group_key(obligation):
+    """
+    义务组的键：到期日序列相同、只是起止日期不同的义务归为一组。
+
+    间隔大于 1 的规则按起始月（年）对间隔取余区分相位；once 规则按到期日区分。
+    """
+    rule = obligation.rule
+    if rule.freq == RECUR_ONCE:
+        phase = rule.start.toordinal()
+    elif rule.freq == RECUR_MONTHLY:
+        phase = (rule.start.year * 12 + rule.start.month - 1) % rule.interval
+    else:
+        phase = rule.start.year % rule.interval
+    return (rule.freq, rule.day, rule.month, rule.interval, phase, rule.period_lag,
+            obligation.kind, obligation.title, obligation.lead_days)
+
+
+class _ObligationGroup:
+    """同一组义务：起止日期各自有序保存，某个到期日上有效的义务数用二分查找得到。"""
+
+    __slots__ = ("key", "pattern", "ids", "starts", "ends", "open_ended")
+
+    def __init__(self, key, obligation):
+        self.key = key
+        self.pattern = obligation
+        self.ids = set()
+        self.starts = []
+        self.ends = []
+        self.open_ended = 0
+
+    def add(self, obligation):
+        self.ids.add(obligation.obligation_id)
+        bisect.insort(self.starts, obligation.rule.start)
+        if obligation.rule.end is None:
+            self.open_ended += 1
+        else:
+            bisect.insort(self.ends, obligation.rule.end)
+
+    def remove(self, obligation):
+        self.ids.discard(obligation.obligation_id)
+        del self.starts[bisect.bisect_left(self.starts, obligation.rule.start)]
+        if obligation.rule.end is None:
+            self.open_ended -= 1
+        else:
+            del self.ends[bisect.bisect_left(self.ends, obligation.rule.end)]
+
+    @property
+    def span_rule(self):
+        """覆盖组内全部义务的规则：最早的开始日到最晚的结束日。"""
+        end = None if self.open_ended else self.ends[-1]
+        return replace(self.pattern.rule, start=self.starts[0], end=end)
+
+    def active(self, due):
+        """到期日 due 上有效（已开始、未结束）的义务数。"""
+        return bisect.bisect_right(self.starts, due) - bisect.bisect_left(self.ends, due)
+
+
+class ComplianceScheduler:
+    """
+    合规日历调度器。
+
+    义务只保存重复规则，不预先生成任务。各电厂的同一项义务（规则、类型、名称、提醒天数相同，
+    只是起止日期不同）归为一组：按月展开时每组只计算一次窗口内的到期日，任务数由组内起止日期二分得到，
+    因此翻月开销只与义务组数有关，与电厂数量无关；展开结果按月缓存。
+    具体任务（ComplianceTask）只在查看某一天时才按组内义务逐个生成。
+
+    到期提醒用最小堆调度：每组在堆中只保留下一次提醒（到期日减提前天数），
+    advance(today) 弹出已到提醒时间的项，再惰性压入该组的下一次到期，堆大小与义务组数相当。
+    各组最近一次已发出提醒的到期日记录在案（随日程文件保存），组内义务增删后从其之后重新调度，
+    不会重复提醒；advance() 只返回新到的提醒，当前全部未完成的提醒由 outstanding() 按状态计算。
+    完成记录按 (义务编号, 到期日) 保存，并按 (组, 到期日) 计数，月视图据此直接得到完成数。
+    """
+
+    def __init__(self, today=None, month_cache_size=COMPLIANCE_MONTH_CACHE_SIZE):
+        self._obligations = {}
+        self._groups = {}
+        self._completed = {}
+        self._done_counts = {}
+        self._heap = []
+        self._scheduled = {}
+        self._unscheduled = set()       # 义务有增删、下次到期待重新计算的组
+        self._delivered = {}            # 组键 -> 最近一次已发出提醒的到期日
+        self._seq = 0
+        self._cursor = today or date.today()
+        self._generation = 0
+        self._month_cache = LRUCache(month_cache_size)
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # 义务
+    # ------------------------------------------------------------------
+
+    def obligations(self, plant_code=None):
+        return [ob for ob in self._obligations.values() if plant_code is None or ob.plant_code == plant_code]
+
+    def obligation(self, obligation_id):
+        try:
+            return self._obligations[obligation_id]
+        except KeyError:
+            raise ComplianceScheduleError(f"合规义务不存在: {obligation_id}") from None
+
+    @property
+    def group_count(self):
+        return len(self._groups)
+
+    def add_obligation(self, obligation):
+        validate_rule(obligation.rule)
+        with self._lock:
+            if obligation.obligation_id in self._obligations:
+                raise ComplianceScheduleError(f"合规义务已存在: {obligation.obligation_id}")
+            key = _group_key(obligation)
+            group = self._groups.get(key)
+            if group is None:
+                group = self._groups[key] = _ObligationGroup(key, obligation)
+            group.add(obligation)
+            self._obligations[obligation.obligation_id] = obligation
+            self._structure_changed(group)
+        return obligation
+
+    def add_standard_obligations(self, plant_code, start):
+        """为电厂登记 STANDARD_OBLIGATIONS 中的各项义务，自 start 起生效。"""
+        added = []
+        for kind, title, freq, month, day, lag, lead_days in STANDARD_OBLIGATIONS:
+            rule = RecurrenceRule(freq, start, day=day, month=month, period_lag=lag)
+            added.append(self.add_obligation(
+                ComplianceObligation(f"{plant_code}:{kind}", plant_code, kind, title, rule, lead_days)))
+        return added
+
+    def remove_obligation(self, obligation_id):
+        with self._lock:
+            obligation = self.obligation(obligation_id)
+            key = _group_key(obligation)
+            group = self._groups[key]
+            for due in [due for ob_id, due in self._completed if ob_id == obligation_id]:
+                self._set_done(obligation_id, due, None)
+            group.remove(obligation)
+            del self._obligations[obligation_id]
+            if not group.ids:
+                del self._groups[key]
+                self._scheduled.pop(key, None)
+                self._unscheduled.discard(key)
+                self._delivered.pop(key, None)
+            self._structure_changed(group if group.ids else None)
+
+    def _structure_changed(self, group):
+        """组结构变化：月视图缓存失效；组的下次提醒推迟到下次 advance() / upcoming() 时再计算。"""
+        self._generation += 1
+        if group is not None:
+            self._unscheduled.add(group.key)
+
+    # ------------------------------------------------------------------
+    # 日历视图
+    # ------------------------------------------------------------------
+
+    def _month_occurrences(self, year, month):
+        """某月内各组的到期日与任务数 [(到期日, 组, 任务数)]，按月缓存。"""
+        cache_key = (year, month, self._generation)
+        cached = self._month_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        first = date(year, month, 1)
+        last = _clamped_date(year, month, 31)
+        entries = []
+        for group in self._groups.values():
+            for due in rule_occurrences(group.span_rule, first, last):
+                total = group.active(due)
+                if total:
+                    entries.append((due, group, total))
+        entries.sort(key=lambda entry: entry[0])
+        self._month_cache.put(cache_key, entries)
+        return entries
+
+    def month_summary(self, year, month):
+        """某月每天的任务汇总 {日期: CalendarDaySummary}，只含有任务的日期。"""
+        with self._lock:
+            summary = {}
+            for due, group, total in self._month_occurrences(year, month):
+                day = summary.get(due)
+                if day is None:
+                    day = summary[due] = CalendarDaySummary(due)
+                kind = group.pattern.kind
+                day.total += total
+                day.done += self._done_counts.get((group.key, due), 0)
+                day.kinds[kind] = day.kinds.get(kind, 0) + total
+            return summary
+
+    def tasks_on(self, day, today=None):
+        """某一天到期的全部任务，按电厂排序；today 用于判断是否逾期（默认今天）。"""
+        today = today or date.today()
+        tasks = []
+        with self._lock:
+            for due, group, _total in self._month_occurrences(day.year, day.month):
+                if due != day:
+                    continue
+                for obligation_id in group.ids:
+                    obligation = self._obligations[obligation_id]
+                    rule = obligation.rule
+                    if rule.start > due or (rule.end is not None and rule.end < due):
+                        continue
+                    completed_at = self._completed.get((obligation_id, due))
+                    status = TASK_DONE if completed_at else TASK_OVERDUE if due < today else TASK_PENDING
+                    tasks.append(ComplianceTask(obligation_id, obligation.plant_code, obligation.kind,
+                                                obligation.title, occurrence_period(rule, due), due,
+                                                status, completed_at))
+        tasks.sort(key=lambda task: (task.plant_code, task.kind, task.obligation_id))
+        return tasks
+
+    # ------------------------------------------------------------------
+    # 完成记录
+    # ------------------------------------------------------------------
+
+    def _set_done(self, obligation_id, due, completed_at):
+        key = (_group_key(self._obligations[obligation_id]), due)
+        was_done = (obligation_id, due) in self._completed
+        if completed_at is None:
+            if was_done:
+                del self._completed[(obligation_id, due)]
+                self._done_counts[key] -= 1
+                if not self._done_counts[key]:
+                    del self._done_counts[key]
+        else:
+            self._completed[(obligation_id, due)] = completed_at
+            if not was_done:
+                self._done_counts[key] = self._done_counts.get(key, 0) + 1
+
+    def mark_done(self, obligation_id, due, completed_at=None):
+        """
+        把义务在 due 的那次到期标记为已完成。
+
+        :raises ComplianceScheduleError: 义务不存在或 due 不是该义务的到期日
+        """
+        with self._lock:
+            rule = self.obligation(obligation_id).rule
+            if rule_occurrences(rule, due, due) != [due]:
+                raise ComplianceScheduleError(f"{due} 不是义务 {obligation_id} 的到期日")
+            self._set_done(obligation_id, due, completed_at or datetime.now())
+
+    def mark_pending(self, obligation_id, due):
+        with self._lock:
+            self.obligation(obligation_id)
+            self._set_done(obligation_id, due, None)
+
+    def completed_at(self, obligation_id, due):
+        return self._completed.get((obligation_id, due))
+
+    # ------------------------------------------------------------------
+    # 到期提醒
+    # ------------------------------------------------------------------
+
+    @property
+    def cursor(self):
+        """调度时钟：最近一次 advance() 推进到的日期。"""
+        return self._cursor
+
+    def _schedule_pending(self):
+        for key in self._unscheduled:
+            group = self._groups[key]
+            # 从时钟当天起重新调度，但已经发出过提醒的到期日不再重复
+            after = self._cursor - timedelta(days=1)
+            delivered = self._delivered.get(key)
+            if delivered is not None and delivered > after:
+                after = delivered
+            self._schedule(group, next_occurrence(group.span_rule, after))
+        self._unscheduled.clear()
+
+    def _schedule(self, group, due):
+        if due is None or self._scheduled.get(group.key) == due:
+            return
+        self._scheduled[group.key] = due
+        self._seq += 1
+        heapq.heappush(self._heap, (due - timedelta(days=group.pattern.lead_days), self._seq, due, group.key))
+
+    def _reminder(self, group, due):
+        total = group.active(due)
+        outstanding = total - self._done_counts.get((group.key, due), 0)
+        pattern = group.pattern
+        return ComplianceReminder(pattern.kind, pattern.title, occurrence_period(pattern.rule, due), due,
+                                  total, outstanding)
+
+    def advance(self, today=None):
+        """
+        推进调度时钟到 today，返回其间到达提醒时间且仍有未完成任务的提醒（按到期日排序）。
+
+        每组弹出后立即压入下一次到期，重复义务永远只展开到下一次。
+        """
+        today = today or date.today()
+        reminders = []
+        with self._lock:
+            self._schedule_pending()
+            while self._heap and self._heap[0][0] <= today:
+                _remind, _seq, due, key = heapq.heappop(self._heap)
+                group = self._groups.get(key)
+                if group is None or self._scheduled.get(key) != due:
+                    continue                    # 组已删除或已重新调度，跳过过期的堆项
+                del self._scheduled[key]
+                self._delivered[key] = due
+                reminder = self._reminder(group, due)
+                if reminder.outstanding > 0:
+                    reminders.append(reminder)
+                self._schedule(group, next_occurrence(group.span_rule, due))
+            self._cursor = max(self._cursor, today)
+        reminders.sort(key=lambda reminder: (reminder.due, reminder.kind))
+        return reminders
+
+    def outstanding(self, today=None, lookback_days=COMPLIANCE_REMINDER_LOOKBACK_DAYS):
+        """
+        today 时已到提醒时间、仍有未完成任务的全部提醒（按到期日排序），只回溯 lookback_days 天。
+
+        与 advance() 不同，这里按义务规则与完成记录直接计算，不依赖调度时钟，
+        程序重启后此前逾期未完成的任务同样会列出。
+        """
+        today = today or date.today()
+        reminders = []
+        with self._lock:
+            for group in self._groups.values():
+                lead = timedelta(days=group.pattern.lead_days)
+                for due in rule_occurrences(group.span_rule, today - timedelta(days=lookback_days), today + lead):
+                    if due - lead > today or not group.active(due):
+                        continue
+                    reminder = self._reminder(group, due)
+                    if reminder.outstanding > 0:
+                        reminders.append(reminder)
+        reminders.sort(key=lambda reminder: (reminder.due, reminder.kind))
+        return reminders
+
+    def upcoming(self, limit=10):
+        """尚未到达提醒时间的下几组到期（不推进时钟）。"""
+        with self._lock:
+            self._schedule_pending()
+            entries = heapq.nsmallest(limit, (entry for entry in self._heap
+                                              if self._scheduled.get(entry[3]) == entry[2]))
+            return [self._reminder(self._groups[key], due) for _remind, _seq, due, key in entries]
+
+    # ------------------------------------------------------------------
+    # 持久化
+    # ------------------------------------------------------------------
+
+    def save(self, path):
+        """把义务规则与完成记录写入 JSON 文件（先写临时文件再替换）。"""
+        with self._lock:
+            data = {
+                "obligations": [
+                    {"obligation_id": ob.obligation_id, "plant_code": ob.plant_code, "kind": ob.kind,
+                     "title": ob.title, "lead_days": ob.lead_days,
+                     "rule": {"freq": ob.rule.freq, "start": ob.rule.start.isoformat(), "day": ob.rule.day,
+                              "month": ob.rule.month, "interval": ob.rule.interval,
+                              "period_lag": ob.rule.period_lag,
+                              "end": ob.rule.end.isoformat() if ob.rule.end else None}}
+                    for ob in self._obligations.values()
+                ],
+                "completed": [[ob_id, due.isoformat(), at.isoformat(timespec="seconds")]
+                              for (ob_id, due), at in self._completed.items()],
+                "cursor": self._cursor.isoformat(),
+                "delivered": [[list(key), due.isoformat()] for key, due in self._delivered.items()],
+            }
+        tmp_path = f"{path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            raise ComplianceScheduleError(f"无法写入合规日程文件 {path}: {exc}") from exc
+
+    @classmethod
+    def load(cls, path, today=None):
+        """
+        从 save() 写出的文件恢复调度器；文件不存在时返回空调度器。
+
+        调度时钟恢复为上次保存时的日期（不晚于 today），下一次 advance() 会补发程序关闭期间到达的提醒。
+        """
+        scheduler = cls(today)
+        if not os.path.exists(path):
+            return scheduler
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            for item in data.get("obligations", []):
+                rule = dict(item["rule"])
+                rule["start"] = date.fromisoformat(rule["start"])
+                rule["end"] = date.fromisoformat(rule["end"]) if rule.get("end") else None
+                scheduler.add_obligation(ComplianceObligation(
+                    item["obligation_id"], item["plant_code"], item["kind"], item["title"],
+                    RecurrenceRule(**rule), item.get("lead_days", 7)))
+            for obligation_id, due, completed_at in data.get("completed", []):
+                if obligation_id in scheduler._obligations:
+                    scheduler._set_done(obligation_id, date.fromisoformat(due),
+                                        datetime.fromisoformat(completed_at))
+            if data.get("cursor"):
+                scheduler._cursor = min(scheduler._cursor, date.fromisoformat(data["cursor"]))
+            for key, due in data.get("delivered", []):
+                key = tuple(key)
+                if key in scheduler._groups:
+                    scheduler._delivered[key] = date.fromisoformat(due)
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            raise ComplianceScheduleError(f"合规日程文件无效 {path}: {exc}") from exc
+        return scheduler
+
+
+# ---------------------------------------------------------------------------
+# 不符合项登记
+# ---------------------------------------------------------------------------
+
+NON_CONFORMITY_FIELDS = ("record_id", "plant_code", "severity", "description", "clause", "raised_by", "raised_at",
+                         "status", "corrective_action", "closed_at", "document_ids")
+
+
+class NonConformityRegister:
+    """核查不符合项登记表：登记、整改关闭与查询；以 JSON 文件保存。"""
+
+    def __init__(self):
+        self._records = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def records(self, plant_code=None, status=None):
+        return [record for record in self._records.values()
+                if (plant_code is None or record.plant_code == plant_code)
+                and (status is None or record.status == status)]
+
+    def get(self, record_id):
+        try:
+            return self._records[record_id]
+        except KeyError:
+            raise VerificationSupportError(f"不符合项不存在: {record_id}") from None
+
+    def raise_record(self, plant_code, severity, description, clause="", raised_by="", document_ids=()):
+        if severity not in (NC_SEVERITY_MAJOR, NC_SEVERITY_MINOR, NC_SEVERITY_OBSERVATION):
+            raise VerificationSupportError(f"未知的不符合项严重程度: {severity}")
+        with self._lock:
+            record = NonConformity(self._next_id, plant_code, severity, description, clause, raised_by,
+                                   datetime.now(), document_ids=list(document_ids))
+            self._records[record.record_id] = record
+            self._next_id += 1
+        return record
+
+    def close(self, record_id, corrective_action):
+        record = self.get(record_id)
+        record.status = NC_STATUS_CLOSED
+        record.corrective_action = corrective_action
+        record.closed_at = datetime.now()
+        return record
+
+    @staticmethod
+    def _row(record):
+        """按 NON_CONFORMITY_FIELDS 的顺序取出一条记录的文本值。"""
+        values = []
+        for name in NON_CONFORMITY_FIELDS:
+            value = getattr(record, name)
+            if isinstance(value, datetime):
+                value = value.isoformat(timespec="seconds")
+            elif isinstance(value, list):
+                value = " ".join(str(item) for item in value)
+            values.append("" if value is None else value)
+        return values
+
+    def save(self, path):
+        rows = [self._row(record) for record in self._records.values()]
+        tmp_path = f"{path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"fields": NON_CONFORMITY_FIELDS, "records": rows}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            raise VerificationSupportError(f"无法写入不符合项文件 {path}: {exc}") from exc
+
+    @classmethod
+    def load(cls, path):
+        """从 save() 写出的文件恢复；文件不存在时返回空登记表。"""
+        register = cls()
+        if not os.path.exists(path):
+            return register
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            for row in data.get("records", []):
+                values = dict(zip(data["fields"], row))
+                for name in ("raised_at", "closed_at"):
+                    values[name] = datetime.fromisoformat(values[name]) if values.get(name) else None
+                values["record_id"] = int(values["record_id"])
+                values["document_ids"] = [int(item) for item in str(values.get("document_ids", "")).split()]
+                record = NonConformity(**values)
+                register._records[record.record_id] = record
+                register._next_id = max(register._next_id, record.record_id + 1)
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            raise VerificationSupportError(f"不符合项文件无效 {path}: {exc}") from exc
+        return register
+
+
+# ---------------------------------------------------------------------------
+# 核查证据包：流式 ZIP 与并行压缩
+# ---------------------------------------------------------------------------
+
+EVIDENCE_MANIFEST_NAME = "manifest.json"
+
+# deflate 的回溯窗口；每块以前一块末尾这么多字节作为预设字典，分块压缩的压缩率接近整体压缩
+_DEFLATE_WINDOW = 32 * 1024
+
+_ZIP64_LIMIT = 0xFFFFFFFF
+_ZIP_VERSION = 45                   # ZIP64 需要 4.5
+_ZIP_FLAGS = 0x0808                 # bit 3：大小与 CRC 在数据描述符中；bit 11：文件名为 UTF-8
+_ZIP_STORED = 0
+_ZIP_DEFLATED = 8
+
+
+def _dos_datetime(moment):
+    return ((moment.hour << 11) | (moment.minute << 5) | (moment.second // 2),
+            ((moment.year - 1980) << 9) | (moment.month << 5) | moment.day)
+
+
+class _ZipStreamWriter:
+    """
+    只追加的 ZIP 写入器。
+
+    条目内容以已压缩好的原始 deflate 流（或原样）写入，CRC 与大小写在条目之后的 ZIP64 数据描述符中，
+    不需要回写文件头，因此证据包可以边压缩边写出；单个条目与整个压缩包都可以超过 4 GiB。
+    """
+
+    def __init__(self, fh):
+        self._fh = fh
+        self._offset = 0
+        self._central = []
+        self._current = None
+        self._time, self._date = _dos_datetime(datetime.now())
+
+    @property
+    def bytes_written(self):
+        return self._offset
+
+    def _write(self, data):
+        self._fh.write(data)
+        self._offset += len(data)
+
+    def begin(self, name, method):
+        encoded = name.encode("utf-8")
+        self._current = (encoded, method, self._offset)
+        extra = struct.pack("<2H2Q", 1, 16, 0, 0)   # ZIP64 扩展字段占位，大小以数据描述符为准
+        self._write(struct.pack("<4s5H3L2H", b"PK\x03\x04", _ZIP_VERSION, _ZIP_FLAGS, method, self._time,
+                                self._date, 0, _ZIP64_LIMIT, _ZIP64_LIMIT, len(encoded), len(extra)))
+        self._write(encoded + extra)
+
+    def write(self, data):
+        self._write(data)
+
+    def end(self, crc, compressed_size, size):
+        encoded, method, offset = self._current
+        self._write(struct.pack("<4sL2Q", b"PK\x07\x08", crc, compressed_size, size))
+        self._central.append((encoded, method, crc, compressed_size, size, offset))
+        self._current = None
+
+    def close(self):
+        """写出中央目录；条目数或偏移超出 ZIP 原始格式上限时附加 ZIP64 目录结束记录。"""
+        cd_offset = self._offset
+        for encoded, method, crc, compressed_size, size, offset in self._central:
+            extra = b""
+            if max(compressed_size, size, offset) >= _ZIP64_LIMIT:
+                extra = struct.pack("<2H3Q", 1, 24, size, compressed_size, offset)
+                compressed_size = size = offset = _ZIP64_LIMIT
+            self._write(struct.pack("<4s6H3L5H2L", b"PK\x01\x02", _ZIP_VERSION, _ZIP_VERSION, _ZIP_FLAGS, method,
+                                    self._time, self._date, crc, compressed_size, size, len(encoded), len(extra),
+                                    0, 0, 0, 0, offset))
+            self._write(encoded + extra)
+        count = len(self._central)
+        cd_size = self._offset - cd_offset
+        if count >= 0xFFFF or max(cd_offset, cd_size) >= _ZIP64_LIMIT:
+            zip64_offset = self._offset
+            self._write(struct.pack("<4sQ2H2L4Q", b"PK\x06\x06", 44, _ZIP_VERSION, _ZIP_VERSION, 0, 0,
+                                    count, count, cd_size, cd_offset))
+            self._write(struct.pack("<4sLQL", b"PK\x06\x07", 0, zip64_offset, 1))
+        self._write(struct.pack("<4s4H2LH", b"PK\x05\x06", 0, 0, min(count, 0xFFFF), min(count, 0xFFFF),
+                                min(cd_size, _ZIP64_LIMIT), min(cd_offset, _ZIP64_LIMIT), 0))
+
+
+def _deflate_block(data, level, zdict, final):
+    """
+    在线程池中执行：把一块数据压缩为原始 deflate 流的一段（zlib 处理大块数据时释放 GIL，可真正并行）。
+
+    非末块以 Z_SYNC_FLUSH 结束、按字节对齐，各块首尾相接即是一条完整的 deflate 流；末块以 Z_FINISH 结束。
+    """
+    if zdict:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15, zdict=zdict)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+def _rechunk(blocks, size):
+    """把任意大小的字节块重新切成 size 大小（末块可以更小）。"""
+    buffer = bytearray()
+    for block in blocks:
+        if not buffer and len(block) == size:
+            yield block
+            continue
+        buffer += block
+        while len(buffer) >= size:
+            yield bytes(buffer[:size])
+            del buffer[:size]
+    if buffer:
+        yield bytes(buffer)
+
+
+def _mark_last(blocks):
+    """产出 (块, 是否末块)；空条目产出一个空的末块。"""
+    iterator = iter(blocks)
+    previous = next(iterator, None)
+    if previous is None:
+        yield b"", True
+        return
+    for block in iterator:
+        yield previous, False
+        previous = block
+    yield previous, True
+
+
+@dataclass
+class EvidenceEntry:
+    """
+    证据包中的一个文件。
+
+    blocks 为无参可调用对象，返回字节块的可迭代对象（块大小任意）；导出写到该条目时才调用，
+    内容不会提前读入内存。size 为已知的原始大小，仅用于估计进度。
+    """
+
+    name: str
+    blocks: Callable
+    size: Optional[int] = None
+    compress: bool = True
+    sha256: str = ""                # 已知的内容哈希（如支撑文档），写入清单供核查机构校验
+
+
+class _EntryState:
+    __slots__ = ("entry", "method", "crc", "size", "compressed_size", "started")
+
+    def __init__(self, entry, method):
+        self.entry = entry
+        self.method = method
+        self.crc = 0
+        self.size = 0
+        self.compressed_size = 0
+        self.started = False
+
+
+class EvidencePackageExporter:
+    """
+    核查证据包导出：把数据摘录、支撑文档、核算溯源与不符合项记录流式写成一个 ZIP。
+
+    - 各条目按 block_size 分块，块在线程池中并行 deflate（以前一块末尾 32 KiB 作为预设字典），
+      主线程按顺序把压缩结果写入 ZIP，压缩包边压缩边落盘；
+    - 在途块数不超过 2 × 线程数，内存占用只与块大小和线程数有关，与证据包大小无关；
+    - 本身已压缩的文件（EVIDENCE_STORED_SUFFIXES）原样存储，不再耗费 CPU；
+    - 最后写入 manifest.json，列出各条目的原始大小、压缩后大小、CRC32 与已知的 SHA-256；
+    - 先写 .part 临时文件，完成后替换为目标文件；取消或失败时删除临时文件。
+    """
+
+    def __init__(self, max_workers=None, block_size=EVIDENCE_BLOCK_SIZE, compress_level=EVIDENCE_COMPRESS_LEVEL):
+        self.max_workers = max_workers or min(8, os.cpu_count() or 2)
+        self.block_size = block_size
+        self.compress_level = compress_level
+
+    def _method(self, entry):
+        if not entry.compress or entry.name.lower().endswith(EVIDENCE_STORED_SUFFIXES):
+            return _ZIP_STORED
+        return _ZIP_DEFLATED
+
+    def export(self, entries, path, metadata=None, progress_callback=None, cancel_event=None):
+        """
+        导出证据包。
+
+        :param entries: EvidenceEntry 列表，按顺序写入
+        :param metadata: 写入清单的附加信息（电厂、年度等）
+        :param progress_callback: 每写出一块以 (已处理原始字节数, 预计原始总字节数) 回调（在调用线程中）
+        :param cancel_event: threading.Event，置位后尽快停止
+        :return: EvidencePackageStats
+        :raises EvidenceExportCancelledError: 导出被取消
+        :raises EvidenceExportError: 条目内容读取或文件写入失败
+        """
+        started = time.perf_counter()
+        entries = list(entries)
+        names = [entry.name for entry in entries]
+        if len(set(names)) != len(names) or EVIDENCE_MANIFEST_NAME in names:
+            raise EvidenceExportError("证据包条目名称重复")
+        stats = EvidencePackageStats(path, workers=self.max_workers)
+        expected = sum(entry.size or 0 for entry in entries)
+        manifest = []
+        tmp_path = f"{path}.part"
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="evidence")
+        in_flight = deque()
+
+        def write_next():
+            state, raw_size, item, final = in_flight.popleft()
+            data = item.result() if isinstance(item, Future) else item
+            if not state.started:
+                writer.begin(state.entry.name, state.method)
+                state.started = True
+            writer.write(data)
+            state.compressed_size += len(data)
+            stats.bytes_in += raw_size
+            if final:
+                writer.end(state.crc, state.compressed_size, state.size)
+                manifest.append({"name": state.entry.name, "size": state.size,
+                                 "compressed_size": state.compressed_size, "crc32": f"{state.crc:08x}",
+                                 "sha256": state.entry.sha256})
+            if progress_callback is not None:
+                progress_callback(stats.bytes_in, max(expected, stats.bytes_in))
+
+        def add(entry):
+            state = _EntryState(entry, self._method(entry))
+            zdict = b""
+            for data, final in _mark_last(_rechunk(entry.blocks(), self.block_size)):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise EvidenceExportCancelledError("证据包导出已取消")
+                state.crc = zlib.crc32(data, state.crc)
+                state.size += len(data)
+                if state.method == _ZIP_DEFLATED:
+                    item = pool.submit(_deflate_block, data, self.compress_level, zdict, final)
+                    zdict = data[-_DEFLATE_WINDOW:]
+                else:
+                    item = data
+                in_flight.append((state, len(data), item, final))
+                while len(in_flight) > self.max_workers * 2:
+                    write_next()
+
+        try:
+            with open(tmp_path, "wb") as fh:
+                writer = _ZipStreamWriter(fh)
+                for entry in entries:
+                    add(entry)
+                while in_flight:
+                    write_next()
+                info = dict(metadata or {}, generated_at=datetime.now().isoformat(timespec="seconds"),
+                            entries=manifest)
+                manifest_bytes = json.dumps(info, ensure_ascii=False, indent=1).encode("utf-8")
+                add(EvidenceEntry(EVIDENCE_MANIFEST_NAME, lambda: [manifest_bytes], len(manifest_bytes)))
+                while in_flight:
+                    write_next()
+                writer.close()
+                stats.bytes_written = writer.bytes_written
+            os.replace(tmp_path, path)
+        except (OSError, DocumentStoreError) as exc:
+            self._discard(tmp_path)
+            raise EvidenceExportError(f"证据包导出失败: {exc}") from exc
+        except BaseException:
+            self._discard(tmp_path)
+            raise
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        stats.entries = len(manifest)
+        stats.elapsed = time.perf_counter() - started
+        logger.info("证据包 %s：%s 个文件，%s → %s 字节，用时 %.2fs（%s 线程）", path, stats.entries,
+                    stats.bytes_in, stats.bytes_written, stats.elapsed, stats.workers)
+        return stats
+
+    @staticmethod
+    def _discard(tmp_path):
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# ---- 证据包条目 -----------------------------------------------------------
+
+# 数据摘录 CSV 的表头与导入模板一致
+_EXTRACT_HEADERS = {"plant": "plant_code", "unit": "unit_code", "fuel": "fuel_type", "period": "period_start",
+                    "parameter": "parameter_type"}
+
+
+def _csv_blocks(header, pages):
+    """把逐页的行元组编码为 UTF-8（带 BOM，便于 Excel 打开）CSV 字节块。"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield b"\xef\xbb\xbf" + buffer.getvalue().encode("utf-8")
+    for rows in pages:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def bytes_entry(name, data):
+    return EvidenceEntry(name, lambda: [data], len(data))
+
+
+def file_entry(name, path, block_size=EVIDENCE_BLOCK_SIZE):
+    def blocks():
+        with open(path, "rb") as fh:
+            while True:
+                block = fh.read(block_size)
+                if not block:
+                    return
+                yield block
+    return EvidenceEntry(name, blocks, os.path.getsize(path))
+
+
+def query_extract_entry(name, result, page_size=50_000):
+    """查询结果集（ColumnQueryResult）的 CSV 摘录，逐页取数、逐页编码。"""
+    columns = [column for column in result.column_names if column != "row_id"]
+    header = ["row_id"] + [_EXTRACT_HEADERS.get(column, column) for column in columns]
+    columns = ["row_id"] + columns
+
+    def blocks():
+        pages = (result.fetch(offset, page_size, columns) for offset in range(0, len(result), page_size))
+        return _csv_blocks(header, pages)
+    return EvidenceEntry(name, blocks)
+
+
+def document_entries(blob_store, documents, prefix="documents/", block_size=EVIDENCE_BLOCK_SIZE):
+    """支撑文档条目：内容从内容寻址存储逐块读出，文件名前加文档编号以免重名。"""
+    return [
+        EvidenceEntry(f"{prefix}{document.document_id:06d}_{document.file_name}",
+                      lambda digest=document.content_hash: blob_store.iter_blocks(digest, block_size),
+                      document.size, sha256=document.content_hash)
+        for document in documents
+    ]
+
+
+def documents_for_rows(documents, row_ids_by_type, extra_refs=()):
+    """
+    找出关联到给定数据行的支撑文档。
+
+    row_ids_by_type 为 {数据类型: row_id 数组}，与文档 record_refs 中的 "<数据类型>:<记录编号>" 对应；
+    先收集各文档的关联编号，再用 np.isin 一次匹配，不为数据行建立 Python 集合。
+    extra_refs 中的关联（如 "plant:P01"）直接匹配。
+    """
+    extra_refs = set(extra_refs)
+    selected = {document.document_id for document in documents if document.record_refs & extra_refs}
+    for kind, row_ids in row_ids_by_type.items():
+        prefix = f"{kind}:"
+        owners, ids = [], []
+        for document in documents:
+            for ref in document.record_refs:
+                if ref.startswith(prefix) and ref[len(prefix):].isdigit():
+                    owners.append(document.document_id)
+                    ids.append(int(ref[len(prefix):]))
+        if ids:
+            hit = np.isin(np.array(ids, dtype=np.int64), np.asarray(row_ids, dtype=np.int64))
+            selected.update(np.array(owners, dtype=np.int64)[hit].tolist())
+    return [document for document in documents if document.document_id in selected]
+
+
+def lineage_entry(name, lineage_provider, block_size=EVIDENCE_BLOCK_SIZE):
+    """
+    核算溯源条目（save_lineage 的 .npz）。
+
+    溯源数据在写到该条目时才生成到临时文件，读完即删除，取消导出也不会留下临时文件。
+    """
+    def blocks():
+        fd, tmp_path = tempfile.mkstemp(suffix=".npz")
+        os.close(fd)
+        try:
+            save_lineage(lineage_provider(), tmp_path)
+            with open(tmp_path, "rb") as fh:
+                while True:
+                    block = fh.read(block_size)
+                    if not block:
+                        return
+                    yield block
+        finally:
+            os.remove(tmp_path)
+    return EvidenceEntry(name, blocks)
+
+
+def non_conformity_entry(name, records):
+    return EvidenceEntry(name, lambda: _csv_blocks(
+        NON_CONFORMITY_FIELDS, [[NonConformityRegister._row(record) for record in records]]))
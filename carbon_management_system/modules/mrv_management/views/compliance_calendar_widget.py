@@ -7,16 +7,220 @@
 # @Description: mrv_management 模块的 compliance_calendar_widget.py 文件。
 
 # Python 标准库导入
-import sys
-import os
+from datetime import date
 
-# PyQt5 相关导入 (根据实际需要调整)
-# from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel
-# from PyQt5.QtCore import Qt, pyqtSignal, QObject
+# PyQt5 相关导入
+from PyQt5.QtCore import QAbstractTableModel, QDate, QModelIndex, Qt, QTimer
+from PyQt5.QtGui import QBrush, QColor, QTextCharFormat
+from PyQt5.QtWidgets import (
+    QAbstractItemView, QCalendarWidget, QHBoxLayout, QInputDialog, QLabel, QListWidget, QMessageBox, QPushButton,
+    QTableView, QVBoxLayout, QWidget,
+)
 
-# 项目内部模块导入 (示例)
-# from ..core.base_controller import BaseController
-# from ...utils.logger_setup import logger
+# 项目内部模块导入
+from ....utils.exceptions import ComplianceScheduleError
+from ..models import (
+    OBLIGATION_ANNUAL_REPORT,
+    OBLIGATION_MONTHLY_DATA,
+    OBLIGATION_OTHER,
+    OBLIGATION_SURRENDER,
+    OBLIGATION_VERIFICATION,
+    TASK_DONE,
+    TASK_OVERDUE,
+    TASK_PENDING,
+)
 
+KIND_LABELS = {
+    OBLIGATION_MONTHLY_DATA: "月度报送",
+    OBLIGATION_ANNUAL_REPORT: "年度报告",
+    OBLIGATION_VERIFICATION: "核查",
+    OBLIGATION_SURRENDER: "清缴",
+    OBLIGATION_OTHER: "其他",
+}
+STATUS_LABELS = {TASK_PENDING: "待办", TASK_DONE: "已完成", TASK_OVERDUE: "逾期"}
+STATUS_COLORS = {TASK_PENDING: "#fff3cd", TASK_DONE: "#d4edda", TASK_OVERDUE: "#f8d7da"}
 
-pass # 请在此处实现具体功能
+# 到期提醒检查间隔（毫秒）
+REMINDER_CHECK_INTERVAL_MS = 60 * 60 * 1000
+
+
+class ComplianceTaskTableModel(QAbstractTableModel):
+    """某一天到期任务的表格模型；QTableView 只绘制可见行，上千个电厂的任务也能即时显示。"""
+
+    COLUMNS = (("plant_code", "电厂"), ("title", "义务"), ("period", "报告期"), ("due", "到期日"),
+               ("status", "状态"))
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._tasks = []
+
+    def set_tasks(self, tasks):
+        self.beginResetModel()
+        self._tasks = list(tasks)
+        self.endResetModel()
+
+    def task(self, row):
+        return self._tasks[row]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._tasks)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        task = self._tasks[index.row()]
+        name = self.COLUMNS[index.column()][0]
+        if role == Qt.DisplayRole:
+            if name == "status":
+                return STATUS_LABELS.get(task.status, task.status)
+            if name == "due":
+                return task.due.isoformat()
+            return getattr(task, name)
+        if role == Qt.BackgroundRole and name == "status":
+            return QBrush(QColor(STATUS_COLORS[task.status]))
+        if role == Qt.ToolTipRole and task.completed_at is not None:
+            return f"完成于 {task.completed_at:%Y-%m-%d %H:%M}"
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section][1]
+        return None
+
+
+class ComplianceCalendarWidget(QWidget):
+    """
+    合规日历：月历上按日标出到期任务（红色逾期、黄色待办、绿色已全部完成），
+    点击某天列出该天各电厂的任务并可标记完成；右侧显示到期提醒与即将到期的义务。
+
+    翻月时只向调度器取该月的按日汇总，任务明细在点击某天时才展开。
+    """
+
+    def __init__(self, controller, parent=None):
+        super().__init__(parent)
+        self.controller = controller
+
+        self.calendar = QCalendarWidget(self)
+        self.calendar.setGridVisible(True)
+        self.calendar.setVerticalHeaderFormat(QCalendarWidget.NoVerticalHeader)
+        self.month_label = QLabel("", self)
+        self.day_label = QLabel("", self)
+        self.task_model = ComplianceTaskTableModel(self)
+        self.task_view = QTableView(self)
+        self.task_view.setModel(self.task_model)
+        self.task_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.task_view.verticalHeader().setVisible(False)
+        self.task_view.horizontalHeader().setStretchLastSection(True)
+        self.done_button = QPushButton("标记完成", self)
+        self.undo_button = QPushButton("撤销完成", self)
+        self.add_plant_button = QPushButton("添加电厂义务", self)
+        self.reminder_list = QListWidget(self)
+
+        task_buttons = QHBoxLayout()
+        task_buttons.addWidget(self.done_button)
+        task_buttons.addWidget(self.undo_button)
+        task_buttons.addStretch(1)
+        task_buttons.addWidget(self.add_plant_button)
+        left = QVBoxLayout()
+        left.addWidget(self.calendar)
+        left.addWidget(self.month_label)
+        left.addWidget(self.day_label)
+        left.addWidget(self.task_view, 1)
+        left.addLayout(task_buttons)
+        right = QVBoxLayout()
+        right.addWidget(QLabel("到期提醒", self))
+        right.addWidget(self.reminder_list, 1)
+        layout = QHBoxLayout(self)
+        layout.addLayout(left, 3)
+        layout.addLayout(right, 1)
+
+        self.calendar.currentPageChanged.connect(self._render_month)
+        self.calendar.selectionChanged.connect(self._show_selected_day)
+        self.done_button.clicked.connect(lambda: self._set_selected_done(True))
+        self.undo_button.clicked.connect(lambda: self._set_selected_done(False))
+        self.add_plant_button.clicked.connect(self._on_add_plant)
+        self.controller.schedule_changed.connect(self.refresh)
+        self.controller.schedule_changed.connect(self._show_reminders)
+        self.controller.reminders_due.connect(lambda _reminders: self._show_reminders())
+
+        self._reminder_timer = QTimer(self)
+        self._reminder_timer.setInterval(REMINDER_CHECK_INTERVAL_MS)
+        self._reminder_timer.timeout.connect(self._check_reminders)
+        self._reminder_timer.start()
+
+        self.refresh()
+        self._check_reminders()
+
+    # ------------------------------------------------------------------
+    # 月视图
+    # ------------------------------------------------------------------
+
+    def refresh(self):
+        self._render_month(self.calendar.yearShown(), self.calendar.monthShown())
+        self._show_selected_day()
+
+    def _render_month(self, year, month):
+        self.calendar.setDateTextFormat(QDate(), QTextCharFormat())    # 清除上个月的标记
+        today = date.today()
+        total = outstanding = 0
+        for day, summary in self.controller.month_summary(year, month).items():
+            if summary.outstanding == 0:
+                status = TASK_DONE
+            else:
+                status = TASK_OVERDUE if day < today else TASK_PENDING
+            fmt = QTextCharFormat()
+            fmt.setBackground(QBrush(QColor(STATUS_COLORS[status])))
+            kinds = "，".join(f"{KIND_LABELS.get(kind, kind)} {count}" for kind, count in summary.kinds.items())
+            fmt.setToolTip(f"{summary.total} 项任务（{kinds}），未完成 {summary.outstanding}")
+            self.calendar.setDateTextFormat(QDate(day.year, day.month, day.day), fmt)
+            total += summary.total
+            outstanding += summary.outstanding
+        self.month_label.setText(f"{year} 年 {month} 月：{total} 项任务，未完成 {outstanding}")
+
+    def _show_selected_day(self):
+        selected = self.calendar.selectedDate()
+        day = date(selected.year(), selected.month(), selected.day())
+        tasks = self.controller.tasks_on(day)
+        self.task_model.set_tasks(tasks)
+        self.day_label.setText(f"{day.isoformat()} 到期 {len(tasks)} 项")
+
+    def _set_selected_done(self, done):
+        rows = sorted({index.row() for index in self.task_view.selectionModel().selectedRows()})
+        if not rows:
+            return
+        try:
+            self.controller.set_done([self.task_model.task(row) for row in rows], done)
+        except ComplianceScheduleError as exc:
+            QMessageBox.warning(self, "合规日历", str(exc))
+
+    def _on_add_plant(self):
+        plant_code, ok = QInputDialog.getText(self, "添加电厂义务", "电厂编码")
+        if not ok or not plant_code.strip():
+            return
+        shown = date(self.calendar.yearShown(), self.calendar.monthShown(), 1)
+        try:
+            self.controller.add_plant(plant_code.strip(), shown)
+        except ComplianceScheduleError as exc:
+            QMessageBox.warning(self, "添加电厂义务", str(exc))
+
+    # ------------------------------------------------------------------
+    # 提醒
+    # ------------------------------------------------------------------
+
+    def _check_reminders(self):
+        # 有新提醒时由 reminders_due 信号刷新列表
+        if not self.controller.check_reminders():
+            self._show_reminders()
+
+    def _show_reminders(self):
+        """列出全部未完成的提醒（按当前状态计算，不只是本次新到的）及接下来的几项到期。"""
+        self.reminder_list.clear()
+        for reminder in self.controller.outstanding_reminders():
+            self.reminder_list.addItem(f"⚠ {reminder.due:%Y-%m-%d} {reminder.period} {reminder.title}："
+                                       f"未完成 {reminder.outstanding}/{reminder.total}")
+        for reminder in self.controller.upcoming(5):
+            self.reminder_list.addItem(
+                f"{reminder.due:%Y-%m-%d} {reminder.period} {reminder.title}（{reminder.total} 家）")
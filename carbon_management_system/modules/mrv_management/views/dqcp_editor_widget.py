@@ -7,16 +7,229 @@
 # @Description: mrv_management 模块的 dqcp_editor_widget.py 文件。
 
 # Python 标准库导入
-import sys
-import os
+import html
 
-# PyQt5 相关导入 (根据实际需要调整)
-# from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel
-# from PyQt5.QtCore import Qt, pyqtSignal, QObject
+# PyQt5 相关导入
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import (
+    QAbstractItemView, QComboBox, QHBoxLayout, QHeaderView, QInputDialog, QLabel, QLineEdit, QMessageBox,
+    QPushButton, QSplitter, QTableWidget, QTableWidgetItem, QTextBrowser, QVBoxLayout, QWidget,
+)
 
-# 项目内部模块导入 (示例)
-# from ..core.base_controller import BaseController
-# from ...utils.logger_setup import logger
+# 项目内部模块导入
+from ....utils.exceptions import VersionStoreError
+from ....utils.helpers import format_bytes
+from ..widgets.rich_text_editor_widget import RichTextEditorWidget
 
+HISTORY_HEADERS = ("版本", "时间", "作者", "说明", "存储", "大小")
+DIFF_COLORS = {"delete": "#fdd", "insert": "#dfd"}
 
-pass # 请在此处实现具体功能
+
+class DqcpEditorWidget(QWidget):
+    """
+    数据质量控制计划编辑界面：编辑正文、保存为新版本、浏览版本历史并比较任意两个版本。
+
+    历史版本按需从版本库重建，只读显示在右侧预览区；“恢复到编辑器”后再次保存即形成新版本。
+    """
+
+    def __init__(self, controller, parent=None):
+        super().__init__(parent)
+        self.controller = controller
+
+        self.plan_combo = QComboBox(self)
+        self.new_plan_button = QPushButton("新建计划", self)
+        self.editor = RichTextEditorWidget(self)
+        self.author_edit = QLineEdit(self)
+        self.author_edit.setPlaceholderText("修订人")
+        self.comment_edit = QLineEdit(self)
+        self.comment_edit.setPlaceholderText("修订说明")
+        self.save_button = QPushButton("保存新版本", self)
+
+        self.history_table = QTableWidget(0, len(HISTORY_HEADERS), self)
+        self.history_table.setHorizontalHeaderLabels(HISTORY_HEADERS)
+        self.history_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.history_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.history_table.verticalHeader().setVisible(False)
+        self.history_table.horizontalHeader().setSectionResizeMode(3, QHeaderView.Stretch)
+        self.view_button = QPushButton("查看所选版本", self)
+        self.compare_button = QPushButton("比较所选两个版本", self)
+        self.restore_button = QPushButton("恢复到编辑器", self)
+        self.preview = QTextBrowser(self)
+        self.status_label = QLabel("", self)
+
+        plan_row = QHBoxLayout()
+        plan_row.addWidget(QLabel("计划", self))
+        plan_row.addWidget(self.plan_combo, 1)
+        plan_row.addWidget(self.new_plan_button)
+        save_row = QHBoxLayout()
+        save_row.addWidget(self.author_edit)
+        save_row.addWidget(self.comment_edit, 1)
+        save_row.addWidget(self.save_button)
+        edit_pane = QWidget(self)
+        edit_layout = QVBoxLayout(edit_pane)
+        edit_layout.setContentsMargins(0, 0, 0, 0)
+        edit_layout.addWidget(self.editor, 1)
+        edit_layout.addLayout(save_row)
+
+        history_buttons = QHBoxLayout()
+        history_buttons.addWidget(self.view_button)
+        history_buttons.addWidget(self.compare_button)
+        history_buttons.addWidget(self.restore_button)
+        history_pane = QWidget(self)
+        history_layout = QVBoxLayout(history_pane)
+        history_layout.setContentsMargins(0, 0, 0, 0)
+        history_layout.addWidget(self.history_table, 1)
+        history_layout.addLayout(history_buttons)
+        history_layout.addWidget(self.preview, 1)
+
+        splitter = QSplitter(Qt.Horizontal, self)
+        splitter.addWidget(edit_pane)
+        splitter.addWidget(history_pane)
+        layout = QVBoxLayout(self)
+        layout.addLayout(plan_row)
+        layout.addWidget(splitter, 1)
+        layout.addWidget(self.status_label)
+
+        self.plan_combo.currentIndexChanged.connect(self._on_plan_changed)
+        self.new_plan_button.clicked.connect(self._on_new_plan)
+        self.save_button.clicked.connect(self._on_save)
+        self.view_button.clicked.connect(self._on_view)
+        self.compare_button.clicked.connect(self._on_compare)
+        self.restore_button.clicked.connect(self._on_restore)
+        self.controller.plan_saved.connect(self._on_plan_saved)
+
+        self._reload_plans()
+
+    # ------------------------------------------------------------------
+    # 计划与历史
+    # ------------------------------------------------------------------
+
+    def current_plan_id(self):
+        return self.plan_combo.currentData()
+
+    def _reload_plans(self, select=None):
+        self.plan_combo.blockSignals(True)
+        self.plan_combo.clear()
+        for plan in sorted(self.controller.plans(), key=lambda p: p.plan_id):
+            self.plan_combo.addItem(f"{plan.plan_id}  {plan.title}", plan.plan_id)
+        if select is not None:
+            self.plan_combo.setCurrentIndex(max(self.plan_combo.findData(select), 0))
+        self.plan_combo.blockSignals(False)
+        self._on_plan_changed()
+
+    def _on_plan_changed(self, *_):
+        plan_id = self.current_plan_id()
+        has_plan = plan_id is not None
+        for widget in (self.editor, self.save_button, self.history_table):
+            widget.setEnabled(has_plan)
+        self.editor.set_html(self.controller.content(plan_id) if has_plan else "")
+        self.preview.clear()
+        self._refresh_history()
+
+    def _refresh_history(self):
+        plan_id = self.current_plan_id()
+        history = self.controller.history(plan_id) if plan_id is not None else []
+        self.history_table.setRowCount(len(history))
+        for row, meta in enumerate(history):
+            values = (f"v{meta.version}", meta.created_at.strftime("%Y-%m-%d %H:%M"), meta.author, meta.comment,
+                      "快照" if meta.snapshot else "增量",
+                      f"{format_bytes(meta.stored_bytes)} / {format_bytes(meta.size)}")
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                item.setData(Qt.UserRole, meta.version)
+                self.history_table.setItem(row, col, item)
+        self._update_status()
+
+    def _update_status(self):
+        plan_id = self.current_plan_id()
+        if plan_id is None:
+            self.status_label.setText("尚无计划，请先新建")
+            return
+        stats = self.controller.stats(plan_id)
+        self.status_label.setText(
+            f"{stats['versions']} 个版本（{stats['snapshots']} 个快照），"
+            f"占用 {format_bytes(stats['stored_bytes'])}，完整保存需 {format_bytes(stats['full_bytes'])}"
+        )
+
+    def _selected_versions(self):
+        rows = sorted({index.row() for index in self.history_table.selectionModel().selectedRows()})
+        return sorted(self.history_table.item(row, 0).data(Qt.UserRole) for row in rows)
+
+    # ------------------------------------------------------------------
+    # 操作
+    # ------------------------------------------------------------------
+
+    def _on_new_plan(self):
+        plant_code, ok = QInputDialog.getText(self, "新建计划", "电厂编码")
+        if not ok or not plant_code.strip():
+            return
+        title, ok = QInputDialog.getText(self, "新建计划", "计划名称", text=f"{plant_code.strip()} 数据质量控制计划")
+        if not ok:
+            return
+        try:
+            plan = self.controller.create_plan(plant_code.strip(), title.strip())
+        except VersionStoreError as exc:
+            QMessageBox.warning(self, "新建计划", str(exc))
+            return
+        self._reload_plans(select=plan.plan_id)
+
+    def _on_save(self):
+        plan_id = self.current_plan_id()
+        if plan_id is None:
+            return
+        latest = self.history_table.item(0, 0).data(Qt.UserRole) if self.history_table.rowCount() else 0
+        try:
+            meta = self.controller.save(plan_id, self.editor.html(), self.author_edit.text().strip(),
+                                        self.comment_edit.text().strip())
+        except VersionStoreError as exc:
+            QMessageBox.critical(self, "保存失败", str(exc))
+            return
+        self.editor.set_modified(False)
+        self.comment_edit.clear()
+        if meta.version == latest:
+            self.status_label.setText("正文没有变化，未产生新版本")
+
+    def _on_plan_saved(self, meta):
+        if meta.plan_id == self.current_plan_id():
+            self._refresh_history()
+
+    def _on_view(self):
+        versions = self._selected_versions()
+        if len(versions) != 1:
+            self.status_label.setText("请选择一个版本")
+            return
+        self.preview.setHtml(self.controller.content(self.current_plan_id(), versions[0]))
+
+    def _on_compare(self):
+        versions = self._selected_versions()
+        if len(versions) != 2:
+            self.status_label.setText("请选择两个版本进行比较")
+            return
+        diff = self.controller.diff(self.current_plan_id(), *versions)
+        self.preview.setHtml(render_diff_html(diff))
+
+    def _on_restore(self):
+        versions = self._selected_versions()
+        if len(versions) != 1:
+            self.status_label.setText("请选择一个版本")
+            return
+        if self.editor.modified and QMessageBox.question(
+                self, "恢复版本", "编辑器中有未保存的修改，确定覆盖吗？") != QMessageBox.Yes:
+            return
+        self.editor.set_html(self.controller.content(self.current_plan_id(), versions[0]))
+        self.editor.set_modified(True)
+        self.comment_edit.setText(f"恢复自 v{versions[0]}")
+
+
+def render_diff_html(diff):
+    """把 DqcpDiff 渲染为预览区使用的 HTML：删除行红底、新增行绿底。"""
+    parts = [f"<p><b>v{diff.old_version} → v{diff.new_version}</b>："
+             f"+{diff.added_lines} 行 / -{diff.removed_lines} 行</p>"]
+    if not diff.hunks:
+        parts.append("<p>两个版本内容相同</p>")
+    for tag, old_text, new_text in diff.hunks:
+        parts.append("<hr/>")
+        for kind, text, sign in (("delete", old_text, "-"), ("insert", new_text, "+")):
+            for line in text.splitlines():
+                parts.append(f'<pre style="background:{DIFF_COLORS[kind]};margin:0">{sign} {html.escape(line)}</pre>')
+    return "".join(parts)
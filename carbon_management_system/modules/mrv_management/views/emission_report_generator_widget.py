@@ -7,16 +7,171 @@
 # @Description: mrv_management 模块的 emission_report_generator_widget.py 文件。
 
 # Python 标准库导入
-import sys
 import os
+from datetime import date
 
-# PyQt5 相关导入 (根据实际需要调整)
-# from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel
-# from PyQt5.QtCore import Qt, pyqtSignal, QObject
+# PyQt5 相关导入
+from PyQt5.QtCore import QUrl
+from PyQt5.QtGui import QDesktopServices
+from PyQt5.QtWidgets import (
+    QComboBox, QFileDialog, QHBoxLayout, QLabel, QLineEdit, QProgressBar, QPushButton, QSpinBox, QVBoxLayout,
+    QWidget,
+)
 
-# 项目内部模块导入 (示例)
-# from ..core.base_controller import BaseController
-# from ...utils.logger_setup import logger
+# 项目内部模块导入
+from ....utils.constants import REPORT_FORMATS
+from ....utils.helpers import format_bytes, format_duration
 
 
-pass # 请在此处实现具体功能
+class EmissionReportGeneratorWidget(QWidget):
+    """
+    年度/月度排放报告生成界面：选择模板与报告期，在后台按模板流式生成报告文件。
+
+    报告在工作线程中逐行写出，界面只显示进度；生成完成后可直接打开报告。
+    数据更正后点击“重新生成”，以相同参数覆盖上一份报告，只重新渲染有变化的段落。
+    """
+
+    def __init__(self, controller, parent=None):
+        super().__init__(parent)
+        self.controller = controller
+        self._worker = None
+        self._last_path = None
+        self._last_request = None
+
+        self.template_combo = QComboBox(self)
+        for name, description, _period in controller.templates():
+            self.template_combo.addItem(description, name)
+        self.organization_edit = QLineEdit(controller.organization, self)
+        self.organization_edit.setPlaceholderText("报告主体名称")
+        self.year_spin = QSpinBox(self)
+        self.year_spin.setRange(2000, 2100)
+        self.year_spin.setValue(date.today().year - 1)
+        self.month_spin = QSpinBox(self)
+        self.month_spin.setRange(1, 12)
+        self.format_combo = QComboBox(self)
+        self.format_combo.addItems([fmt.upper() for fmt in REPORT_FORMATS])
+        self.generate_button = QPushButton("生成报告", self)
+        self.cancel_button = QPushButton("取消", self)
+        self.cancel_button.setEnabled(False)
+        self.regenerate_button = QPushButton("重新生成", self)
+        self.regenerate_button.setEnabled(False)
+        self.open_button = QPushButton("打开报告", self)
+        self.open_button.setEnabled(False)
+        self.progress_bar = QProgressBar(self)
+        self.status_label = QLabel("", self)
+
+        controls = QHBoxLayout()
+        controls.addWidget(QLabel("模板", self))
+        controls.addWidget(self.template_combo, 1)
+        controls.addWidget(QLabel("年份", self))
+        controls.addWidget(self.year_spin)
+        controls.addWidget(QLabel("月份", self))
+        controls.addWidget(self.month_spin)
+        controls.addWidget(QLabel("格式", self))
+        controls.addWidget(self.format_combo)
+        subject = QHBoxLayout()
+        subject.addWidget(QLabel("报告主体", self))
+        subject.addWidget(self.organization_edit, 1)
+        subject.addWidget(self.generate_button)
+        subject.addWidget(self.cancel_button)
+        subject.addWidget(self.regenerate_button)
+        subject.addWidget(self.open_button)
+        layout = QVBoxLayout(self)
+        layout.addLayout(controls)
+        layout.addLayout(subject)
+        layout.addWidget(self.progress_bar)
+        layout.addWidget(self.status_label)
+        layout.addStretch(1)
+
+        self.template_combo.currentIndexChanged.connect(self._update_period_controls)
+        self.generate_button.clicked.connect(self.generate)
+        self.cancel_button.clicked.connect(self.cancel)
+        self.regenerate_button.clicked.connect(self.regenerate)
+        self.open_button.clicked.connect(self.open_report)
+        self._update_period_controls()
+
+    def _template_name(self):
+        return self.template_combo.currentData()
+
+    def _update_period_controls(self):
+        name = self._template_name()
+        self.month_spin.setEnabled(bool(name) and self.controller.is_monthly(name))
+        self.generate_button.setEnabled(bool(name))
+
+    def generate(self):
+        name = self._template_name()
+        fmt = REPORT_FORMATS[self.format_combo.currentIndex()]
+        year = self.year_spin.value()
+        month = self.month_spin.value() if self.month_spin.isEnabled() else None
+        default_name = f"{name}_{year}" + (f"{month:02d}" if month else "") + f".{fmt}"
+        path, _ = QFileDialog.getSaveFileName(self, "保存报告", default_name, f"{fmt.upper()} 文件 (*.{fmt})")
+        if path:
+            self.start(name, path, year, month, fmt)
+
+    def regenerate(self):
+        if self._last_request is not None:
+            self.start(*self._last_request)
+
+    def start(self, template_name, path, year, month=None, fmt=None):
+        self._last_request = (template_name, path, year, month, fmt)
+        self.progress_bar.setRange(0, 0)
+        self.status_label.setText(f"正在生成 {os.path.basename(path)} …")
+        self._set_running(True)
+        return self.controller.start_report(template_name, path, year, month, fmt,
+                                            organization=self.organization_edit.text().strip(),
+                                            connect=self._bind_worker)
+
+    def _bind_worker(self, worker):
+        self._worker = worker
+        worker.progress.connect(self.on_progress)
+        worker.finished.connect(self.on_finished)
+        worker.failed.connect(self.on_failed)
+        worker.cancelled.connect(self.on_cancelled)
+
+    def cancel(self):
+        if self._worker is not None:
+            self._worker.cancel()
+
+    def open_report(self):
+        if self._last_path:
+            QDesktopServices.openUrl(QUrl.fromLocalFile(self._last_path))
+
+    def _set_running(self, running):
+        self.generate_button.setEnabled(not running)
+        self.regenerate_button.setEnabled(not running and self._last_request is not None)
+        self.cancel_button.setEnabled(running)
+
+    def on_progress(self, done, total):
+        self.progress_bar.setRange(0, max(total, 1))
+        self.progress_bar.setValue(done)
+        self.status_label.setText(f"已写出 {done:,} / {total:,} 行")
+
+    def on_finished(self, stats):
+        self._worker = None
+        self._last_path = stats.path
+        self._set_running(False)
+        self.open_button.setEnabled(True)
+        self.progress_bar.setRange(0, 1)
+        self.progress_bar.setValue(1)
+        reuse = ""
+        if stats.fragments_reused:
+            reuse = (f"；重新渲染 {stats.fragments_rendered} 个片段（{len(stats.dirty_sections)} 段），"
+                     f"复用 {stats.fragments_reused} 个")
+        self.status_label.setText(
+            f"{stats.period_label}报告已生成：{stats.path}（{stats.rows:,} 行，{format_bytes(stats.bytes_written)}，"
+            f"用时 {format_duration(stats.elapsed)}{reuse}）"
+        )
+
+    def on_failed(self, message):
+        self._worker = None
+        self._set_running(False)
+        self.progress_bar.setRange(0, 1)
+        self.progress_bar.setValue(0)
+        self.status_label.setText(message)
+
+    def on_cancelled(self):
+        self._worker = None
+        self._set_running(False)
+        self.progress_bar.setRange(0, 1)
+        self.progress_bar.setValue(0)
+        self.status_label.setText("报告生成已取消")
@@ -7,16 +7,206 @@
 # @Description: mrv_management 模块的 verification_support_widget.py 文件。
 
 # Python 标准库导入
-import sys
 import os
+from datetime import date
 
-# PyQt5 相关导入 (根据实际需要调整)
-# from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel
-# from PyQt5.QtCore import Qt, pyqtSignal, QObject
+# PyQt5 相关导入
+from PyQt5.QtWidgets import (
+    QAbstractItemView, QComboBox, QFileDialog, QHBoxLayout, QHeaderView, QInputDialog, QLabel, QMessageBox,
+    QProgressBar, QPushButton, QSpinBox, QTableWidget, QTableWidgetItem, QVBoxLayout, QWidget,
+)
 
-# 项目内部模块导入 (示例)
-# from ..core.base_controller import BaseController
-# from ...utils.logger_setup import logger
+# 项目内部模块导入
+from ....utils.exceptions import VerificationSupportError
+from ....utils.helpers import format_bytes, format_duration
+from ..models import NC_SEVERITY_MAJOR, NC_SEVERITY_MINOR, NC_SEVERITY_OBSERVATION, NC_STATUS_CLOSED, NC_STATUS_OPEN
 
+SEVERITY_LABELS = {NC_SEVERITY_MAJOR: "严重", NC_SEVERITY_MINOR: "一般", NC_SEVERITY_OBSERVATION: "观察项"}
+STATUS_LABELS = {NC_STATUS_OPEN: "待整改", NC_STATUS_CLOSED: "已关闭"}
+NON_CONFORMITY_HEADERS = ("编号", "严重程度", "条款", "描述", "状态", "整改措施")
 
-pass # 请在此处实现具体功能
+# 进度条以千分比显示：证据包字节数可能超过 QProgressBar 的 int 上限
+PROGRESS_SCALE = 1000
+
+
+class VerificationSupportWidget(QWidget):
+    """
+    第三方核查支持界面：登记与关闭不符合项，按电厂、年度导出核查证据包（ZIP）。
+
+    证据包在后台线程中并行压缩、边压缩边写出，界面只显示进度，可随时取消。
+    """
+
+    def __init__(self, controller, parent=None):
+        super().__init__(parent)
+        self.controller = controller
+        self._worker = None
+
+        self.plant_combo = QComboBox(self)
+        self.year_spin = QSpinBox(self)
+        self.year_spin.setRange(2000, 2100)
+        self.year_spin.setValue(date.today().year - 1)
+        self.export_button = QPushButton("导出证据包", self)
+        self.cancel_button = QPushButton("取消", self)
+        self.cancel_button.setEnabled(False)
+        self.progress_bar = QProgressBar(self)
+        self.progress_bar.setRange(0, PROGRESS_SCALE)
+        self.progress_bar.setValue(0)
+        self.status_label = QLabel("", self)
+
+        self.nc_table = QTableWidget(0, len(NON_CONFORMITY_HEADERS), self)
+        self.nc_table.setHorizontalHeaderLabels(NON_CONFORMITY_HEADERS)
+        self.nc_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.nc_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.nc_table.verticalHeader().setVisible(False)
+        self.nc_table.horizontalHeader().setSectionResizeMode(3, QHeaderView.Stretch)
+        self.add_nc_button = QPushButton("登记不符合项", self)
+        self.close_nc_button = QPushButton("关闭所选", self)
+
+        controls = QHBoxLayout()
+        controls.addWidget(QLabel("电厂", self))
+        controls.addWidget(self.plant_combo, 1)
+        controls.addWidget(QLabel("年度", self))
+        controls.addWidget(self.year_spin)
+        controls.addWidget(self.export_button)
+        controls.addWidget(self.cancel_button)
+        nc_buttons = QHBoxLayout()
+        nc_buttons.addWidget(self.add_nc_button)
+        nc_buttons.addWidget(self.close_nc_button)
+        nc_buttons.addStretch(1)
+        layout = QVBoxLayout(self)
+        layout.addLayout(controls)
+        layout.addWidget(self.progress_bar)
+        layout.addWidget(self.status_label)
+        layout.addWidget(QLabel("不符合项", self))
+        layout.addWidget(self.nc_table, 1)
+        layout.addLayout(nc_buttons)
+
+        self.plant_combo.currentIndexChanged.connect(self.refresh_non_conformities)
+        self.export_button.clicked.connect(self.export)
+        self.cancel_button.clicked.connect(self.cancel)
+        self.add_nc_button.clicked.connect(self._on_add_non_conformity)
+        self.close_nc_button.clicked.connect(self._on_close_non_conformity)
+        self.controller.non_conformities_changed.connect(self.refresh_non_conformities)
+
+        self.refresh_plants()
+
+    def _plant_code(self):
+        return self.plant_combo.currentText() or None
+
+    def refresh_plants(self):
+        current = self.plant_combo.currentText()
+        self.plant_combo.blockSignals(True)
+        self.plant_combo.clear()
+        self.plant_combo.addItems(self.controller.plants())
+        self.plant_combo.setCurrentIndex(max(self.plant_combo.findText(current), 0))
+        self.plant_combo.blockSignals(False)
+        self.export_button.setEnabled(self.plant_combo.count() > 0 and self._worker is None)
+        self.refresh_non_conformities()
+
+    # ------------------------------------------------------------------
+    # 不符合项
+    # ------------------------------------------------------------------
+
+    def refresh_non_conformities(self, *_):
+        plant_code = self._plant_code()
+        records = self.controller.non_conformity_records(plant_code) if plant_code else []
+        self.nc_table.setRowCount(len(records))
+        for row, record in enumerate(records):
+            values = (str(record.record_id), SEVERITY_LABELS.get(record.severity, record.severity), record.clause,
+                      record.description, STATUS_LABELS.get(record.status, record.status), record.corrective_action)
+            for col, value in enumerate(values):
+                self.nc_table.setItem(row, col, QTableWidgetItem(value))
+        self.add_nc_button.setEnabled(plant_code is not None)
+
+    def _on_add_non_conformity(self):
+        plant_code = self._plant_code()
+        if plant_code is None:
+            return
+        labels = list(SEVERITY_LABELS.values())
+        label, ok = QInputDialog.getItem(self, "登记不符合项", "严重程度", labels, 1, False)
+        if not ok:
+            return
+        description, ok = QInputDialog.getMultiLineText(self, "登记不符合项", "不符合情况描述")
+        if not ok or not description.strip():
+            return
+        clause, ok = QInputDialog.getText(self, "登记不符合项", "依据条款（可选）")
+        if not ok:
+            return
+        severity = list(SEVERITY_LABELS)[labels.index(label)]
+        try:
+            self.controller.raise_non_conformity(plant_code, severity, description.strip(), clause.strip())
+        except VerificationSupportError as exc:
+            QMessageBox.warning(self, "登记不符合项", str(exc))
+
+    def _on_close_non_conformity(self):
+        rows = sorted({index.row() for index in self.nc_table.selectionModel().selectedRows()})
+        if not rows:
+            return
+        action, ok = QInputDialog.getMultiLineText(self, "关闭不符合项", "整改措施")
+        if not ok or not action.strip():
+            return
+        try:
+            for row in rows:
+                self.controller.close_non_conformity(int(self.nc_table.item(row, 0).text()), action.strip())
+        except VerificationSupportError as exc:
+            QMessageBox.warning(self, "关闭不符合项", str(exc))
+
+    # ------------------------------------------------------------------
+    # 证据包导出
+    # ------------------------------------------------------------------
+
+    def export(self):
+        plant_code = self._plant_code()
+        if plant_code is None:
+            return
+        year = self.year_spin.value()
+        path, _ = QFileDialog.getSaveFileName(self, "保存核查证据包", f"evidence_{plant_code}_{year}.zip",
+                                              "ZIP 文件 (*.zip)")
+        if path:
+            self.start(plant_code, year, path)
+
+    def start(self, plant_code, year, path):
+        self.progress_bar.setValue(0)
+        self.status_label.setText(f"正在收集证据并导出 {os.path.basename(path)} …")
+        self._set_running(True)
+        return self.controller.start_export(plant_code, year, path, connect=self._bind_worker)
+
+    def _bind_worker(self, worker):
+        self._worker = worker
+        worker.progress.connect(self.on_progress)
+        worker.finished.connect(self.on_finished)
+        worker.failed.connect(self.on_failed)
+        worker.cancelled.connect(self.on_cancelled)
+
+    def cancel(self):
+        if self._worker is not None:
+            self._worker.cancel()
+
+    def _set_running(self, running):
+        self.export_button.setEnabled(not running and self.plant_combo.count() > 0)
+        self.cancel_button.setEnabled(running)
+
+    def on_progress(self, done, total):
+        self.progress_bar.setValue(int(PROGRESS_SCALE * done / total) if total else 0)
+        self.status_label.setText(f"已处理 {format_bytes(done)} / {format_bytes(total)}")
+
+    def _finish(self, message, value=0):
+        self._worker = None
+        self._set_running(False)
+        self.progress_bar.setValue(value)
+        self.status_label.setText(message)
+
+    def on_finished(self, stats):
+        rate = stats.bytes_in / stats.elapsed if stats.elapsed else 0
+        self._finish(
+            f"证据包已导出：{stats.path}（{stats.entries} 个文件，{format_bytes(stats.bytes_in)} → "
+            f"{format_bytes(stats.bytes_written)}，用时 {format_duration(stats.elapsed)}，"
+            f"{format_bytes(rate)}/s，{stats.workers} 个压缩线程）",
+            PROGRESS_SCALE,
+        )
+
+    def on_failed(self, message):
+        self._finish(message)
+
+    def on_cancelled(self):
+        self._finish("证据包导出已取消")
@@ -6,17 +6,92 @@
 # @Software: PyCharm / VSCode
 # @Description: mrv_management 模块的 rich_text_editor_widget.py 文件。
 
-# Python 标准库导入
-import sys
-import os
+# PyQt5 相关导入
+from PyQt5.QtCore import pyqtSignal
+from PyQt5.QtGui import QFont, QTextCharFormat, QTextListFormat
+from PyQt5.QtWidgets import QAction, QTextEdit, QToolBar, QVBoxLayout, QWidget
 
-# PyQt5 相关导入 (根据实际需要调整)
-# from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel
-# from PyQt5.QtCore import Qt, pyqtSignal, QObject
 
-# 项目内部模块导入 (示例)
-# from ..core.base_controller import BaseController
-# from ...utils.logger_setup import logger
+class RichTextEditorWidget(QWidget):
+    """
+    带简单格式工具栏（加粗、斜体、下划线、项目符号、编号列表）的富文本编辑器。
 
+    正文以 HTML 读写；modified 表示自上次 set_html() / set_modified(False) 以来是否有修改。
+    """
 
-pass # 请在此处实现具体功能
+    content_changed = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.editor = QTextEdit(self)
+        self.editor.setAcceptRichText(True)
+        self.toolbar = QToolBar(self)
+
+        self.bold_action = self._add_action("加粗", "B", self._toggle_bold, checkable=True)
+        self.italic_action = self._add_action("斜体", "I", self._toggle_italic, checkable=True)
+        self.underline_action = self._add_action("下划线", "U", self._toggle_underline, checkable=True)
+        self.toolbar.addSeparator()
+        self._add_action("项目符号", "•", lambda: self._insert_list(QTextListFormat.ListDisc))
+        self._add_action("编号列表", "1.", lambda: self._insert_list(QTextListFormat.ListDecimal))
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.toolbar)
+        layout.addWidget(self.editor, 1)
+
+        self.editor.textChanged.connect(self.content_changed)
+        self.editor.currentCharFormatChanged.connect(self._sync_actions)
+
+    def _add_action(self, tooltip, text, slot, checkable=False):
+        action = QAction(text, self)
+        action.setToolTip(tooltip)
+        action.setCheckable(checkable)
+        action.triggered.connect(slot)
+        self.toolbar.addAction(action)
+        return action
+
+    def _merge_format(self, fmt):
+        cursor = self.editor.textCursor()
+        cursor.mergeCharFormat(fmt)
+        self.editor.mergeCurrentCharFormat(fmt)
+
+    def _toggle_bold(self, checked):
+        fmt = QTextCharFormat()
+        fmt.setFontWeight(QFont.Bold if checked else QFont.Normal)
+        self._merge_format(fmt)
+
+    def _toggle_italic(self, checked):
+        fmt = QTextCharFormat()
+        fmt.setFontItalic(checked)
+        self._merge_format(fmt)
+
+    def _toggle_underline(self, checked):
+        fmt = QTextCharFormat()
+        fmt.setFontUnderline(checked)
+        self._merge_format(fmt)
+
+    def _insert_list(self, style):
+        self.editor.textCursor().createList(style)
+
+    def _sync_actions(self, fmt):
+        self.bold_action.setChecked(fmt.fontWeight() >= QFont.Bold)
+        self.italic_action.setChecked(fmt.fontItalic())
+        self.underline_action.setChecked(fmt.fontUnderline())
+
+    def html(self):
+        return self.editor.toHtml()
+
+    def set_html(self, html):
+        self.editor.setHtml(html)
+        self.set_modified(False)
+
+    @property
+    def modified(self):
+        return self.editor.document().isModified()
+
+    def set_modified(self, modified):
+        self.editor.document().setModified(modified)
+
+    def set_read_only(self, read_only):
+        self.editor.setReadOnly(read_only)
+        self.toolbar.setEnabled(not read_only)
@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2025-05-08 00:09:43
+# @Author  : Your Name / Company Name
+# @Email   : your.email@example.com
+# @File    : __init__.py
+# @Software: PyCharm / VSCode
+# @Description: 模板文件子目录的包标记。
+
+"""随程序发布的报告模板（JSON）目录，见 config.settings.REPORT_TEMPLATE_DIR。"""
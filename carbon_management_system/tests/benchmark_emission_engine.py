@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2025-05-08 00:09:43
+# @Author  : Your Name / Company Name
+# @Email   : your.email@example.com
+# @File    : benchmark_emission_engine.py
+# @Software: PyCharm / VSCode
+# @Description: 核算引擎端到端基准测试：因子查找、公式求值、汇总与持久化的吞吐量与峰值内存。
+
+"""
+用法（在仓库根目录执行）::
+
+    python -m carbon_management_system.tests.benchmark_emission_engine --plants 4 --units 6 --years 1
+
+每次运行的结果以一行 JSON 追加到 benchmark_results/emission_engine.jsonl，
+并与同一规格、同一机器的上一次结果比较，吞吐量下降超过阈值的阶段会被标记为回归。
+结果与运行机器相关，只保存在本地，不纳入版本库。
+"""
+
+# Python 标准库导入
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+
+# 第三方库导入
+import numpy as np
+
+# 项目内部模块导入
+from ..modules.data_acquisition.services import TimeRollupService
+from ..modules.emission_calculation.models import BUILTIN_FORMULAS
+from ..modules.emission_calculation.services import (
+    CalculationCache,
+    IncrementalCombustionCalculator,
+    build_combustion_cube,
+    build_lineage,
+    calculate_combustion,
+    calculation_fingerprint,
+    compile_formula,
+    fixed_point_totals,
+    load_lineage,
+    save_lineage,
+)
+from ..utils.constants import COMBUSTION_PARAMETERS
+from .synthetic_fleet import FleetSpec, generate_fleet
+
+RESULTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_results", "emission_engine.jsonl")
+REGRESSION_THRESHOLD = 0.2          # 吞吐量相对上一次下降 20% 以上视为回归
+MIN_COMPARABLE_SECONDS = 0.01       # 耗时低于此值的阶段计时噪声过大，只报告不判定回归
+SCALAR_LOOKUP_SAMPLE = 100_000      # 逐条因子查找的抽样条数（走 LRU 缓存）
+INCREMENTAL_BATCH = 1_000           # 增量刷新阶段更正的读数条数
+BASELINE_KEYS = ("spec", "machine", "cpu_count")   # 只与这些字段都相同的历史结果比较
+
+
+def _measure(func, repeat):
+    """
+    执行一个阶段：先在 tracemalloc 下运行一次取峰值内存，再不跟踪地运行 repeat 次取最快耗时。
+
+    :return: (最后一次的返回值, 最快耗时秒, 峰值内存字节)
+    """
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return result, best, peak
+
+
+def _max_rss_bytes():
+    try:
+        import resource
+    except ImportError:         # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def run_benchmark(spec, repeat=3, workdir=None):
+    """
+    在合成电厂群上依次测量各阶段，返回结果字典。
+
+    每个阶段记录 rows（处理的行数/条数）、seconds、rows_per_second、peak_memory_bytes。
+    """
+    stages = {}
+
+    def record(name, rows, func):
+        result, seconds, peak = _measure(func, repeat)
+        stages[name] = {
+            "rows": int(rows),
+            "seconds": seconds,
+            "rows_per_second": rows / seconds if seconds > 0 else float("inf"),
+            "peak_memory_bytes": int(peak),
+        }
+        return result
+
+    fleet = record("generate", spec.activity_rows, lambda: generate_fleet(spec))
+    activity_view, parameter_view = fleet.activity.columns(), fleet.parameters.columns()
+    rows = len(activity_view)
+    first_month = np.datetime64(f"{spec.start_year}-01", "M")
+    n_months = spec.years * 12
+    fuel_codec = activity_view.store.codecs["fuel"]
+    fuel_masks = {fuel: activity_view.fuel == fuel_codec.code_of(fuel) for fuel in spec.fuels}
+    periods = activity_view.period
+    factors = fleet.factors
+
+    # ---- 因子查找 -----------------------------------------------------------
+    def vector_lookup():
+        values = {}
+        for fuel in spec.fuels:
+            for parameter_type in COMBUSTION_PARAMETERS:
+                values[(fuel, parameter_type)] = factors.values(fuel, parameter_type, periods[fuel_masks[fuel]],
+                                                                spec.jurisdictions[-1])
+        return values
+
+    factor_values = record("factor_lookup_vectorized", rows * len(COMBUSTION_PARAMETERS), vector_lookup)
+
+    sample = min(rows, SCALAR_LOOKUP_SAMPLE)
+    sample_fuels = fuel_codec.decode_many(activity_view.fuel[:sample]).tolist()
+    sample_days = periods[:sample].astype("datetime64[D]").astype(date).tolist()
+
+    def scalar_lookup():
+        for fuel, day in zip(sample_fuels, sample_days):
+            factors.lookup(fuel, COMBUSTION_PARAMETERS[0], day, spec.jurisdictions[-1])
+
+    record("factor_lookup_cached", sample, scalar_lookup)
+    stages["factor_lookup_cached"]["cache_hit_rate"] = factors.cache_stats()["hit_rate"]
+
+    # ---- 公式求值 -----------------------------------------------------------
+    combustion = next(formula for formula in BUILTIN_FORMULAS if formula.code == "combustion")
+    record("formula_compile", 1, lambda: compile_formula(combustion))
+    compiled = compile_formula(combustion)
+    quantities = {fuel: activity_view.quantity[fuel_masks[fuel]] for fuel in spec.fuels}
+
+    def evaluate():
+        return {fuel: compiled(activity=quantities[fuel],
+                               **{p: factor_values[(fuel, p)] for p in COMBUSTION_PARAMETERS})
+                for fuel in spec.fuels}
+
+    record("formula_evaluate", rows, evaluate)
+
+    # ---- 立方体核算 ---------------------------------------------------------
+    def calculate(fixed_point):
+        cube = build_combustion_cube(activity_view, parameter_view, first_month, n_months, fleet.defaults,
+                                     fixed_point=fixed_point)
+        calculate_combustion(cube)
+        return cube
+
+    cube = record("calculate_float", rows, lambda: calculate(False))
+    fixed_cube = record("calculate_fixed_point", rows, lambda: calculate(True))
+
+    # ---- 汇总 ---------------------------------------------------------------
+    record("rollup_time_series", rows, lambda: TimeRollupService(fleet.activity, subscribe=False))
+    record("rollup_fixed_point_totals", fixed_cube.activity.size, lambda: fixed_point_totals(fixed_cube, "plant"))
+    incremental = record("incremental_rebuild", rows, lambda: IncrementalCombustionCalculator(
+        fleet.activity, fleet.parameters, first_month, n_months, fleet.defaults, subscribe=False))
+    batch_rows = activity_view.row_id[:: max(1, rows // INCREMENTAL_BATCH)][:INCREMENTAL_BATCH]
+    fleet.activity.subscribe(incremental)
+
+    def incremental_refresh():
+        positions = fleet.activity.positions_of(batch_rows)
+        fleet.activity.update_values(batch_rows, fleet.activity.columns().quantity[positions] * 1.001)
+        return incremental.refresh()
+
+    record("incremental_refresh", len(batch_rows), incremental_refresh)
+    incremental.close()
+
+    # ---- 持久化 -------------------------------------------------------------
+    record("fingerprint", rows + len(parameter_view), lambda: calculation_fingerprint(
+        fleet.activity, fleet.parameters, first_month, n_months, fleet.defaults))
+    lineage = record("lineage_build", rows + len(parameter_view),
+                     lambda: build_lineage(cube, activity_view, parameter_view))
+    with tempfile.TemporaryDirectory(dir=workdir) as root:
+        cache = CalculationCache(os.path.join(root, "cache"))
+        key = calculation_fingerprint(fleet.activity, fleet.parameters, first_month, n_months, fleet.defaults)
+        record("cache_put", cube.activity.size, lambda: cache.put(key, cube))
+        record("cache_get", cube.activity.size, lambda: cache.get(key))
+        lineage_path = os.path.join(root, "lineage.npz")
+        record("lineage_save", len(lineage.activity_rows), lambda: save_lineage(lineage, lineage_path))
+        record("lineage_load", len(lineage.activity_rows), lambda: load_lineage(lineage_path))
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "spec": spec.to_dict(),
+        "activity_rows": rows,
+        "parameter_rows": len(parameter_view),
+        "total_emissions": float(np.nansum(cube.emissions)),
+        "max_rss_bytes": _max_rss_bytes(),
+        "stages": stages,
+    }
+
+
+def load_results(path=RESULTS_FILE):
+    """读取历史结果（每行一个 JSON），文件不存在时返回空列表。"""
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def save_result(result, path=RESULTS_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as fh:
+        fh.write(json.dumps(result, ensure_ascii=False, sort_keys=True) + "\n")
+
+
+def _baseline_key(result):
+    """可比较的前提：同一规格，且在同类机器（架构、CPU 数）上运行。"""
+    return tuple(result.get(name) for name in BASELINE_KEYS)
+
+
+def compare_results(current, history, threshold=REGRESSION_THRESHOLD):
+    """
+    与同一规格、同一机器的上一次结果逐阶段比较吞吐量。
+
+    :return: [(阶段, 上次 rows/s, 本次 rows/s, 变化比例, 是否回归)]，没有可比结果时为空列表
+    """
+    key = _baseline_key(current)
+    previous = next((entry for entry in reversed(history) if _baseline_key(entry) == key), None)
+    if previous is None:
+        return []
+    rows = []
+    for name, stage in current["stages"].items():
+        before = previous["stages"].get(name)
+        if not before or not before["rows_per_second"]:
+            continue
+        change = stage["rows_per_second"] / before["rows_per_second"] - 1.0
+        comparable = min(stage["seconds"], before["seconds"]) >= MIN_COMPARABLE_SECONDS
+        rows.append((name, before["rows_per_second"], stage["rows_per_second"], change,
+                     comparable and change < -threshold))
+    return rows
+
+
+def format_report(result, comparison):
+    lines = [
+        f"活动数据 {result['activity_rows']:,} 行，参数数据 {result['parameter_rows']:,} 行，"
+        f"版本 {result['revision'] or '-'}",
+        f"{'阶段':<28}{'耗时(s)':>10}{'吞吐(行/s)':>16}{'峰值内存(MB)':>14}",
+    ]
+    for name, stage in result["stages"].items():
+        lines.append(f"{name:<28}{stage['seconds']:>10.4f}{stage['rows_per_second']:>16,.0f}"
+                     f"{stage['peak_memory_bytes'] / 2 ** 20:>14.1f}")
+    if result["max_rss_bytes"]:
+        lines.append(f"进程峰值常驻内存: {result['max_rss_bytes'] / 2 ** 20:.1f} MB")
+    if comparison:
+        lines.append("与上一次同规格、同机器结果比较:")
+        for name, before, after, change, regressed in comparison:
+            flag = "  <-- 回归" if regressed else ""
+            lines.append(f"  {name:<26}{before:>16,.0f} -> {after:>16,.0f} ({change:+.1%}){flag}")
+    else:
+        lines.append("没有同规格、同机器的历史结果可比较。")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="核算引擎端到端基准测试")
+    parser.add_argument("--plants", type=int, default=FleetSpec.plants)
+    parser.add_argument("--units", type=int, default=FleetSpec.units_per_plant, help="每个电厂的机组数")
+    parser.add_argument("--fuels", default=",".join(FleetSpec.fuels), help="燃料，逗号分隔")
+    parser.add_argument("--years", type=int, default=FleetSpec.years)
+    parser.add_argument("--freq-minutes", type=int, default=FleetSpec.freq_minutes, help="读数间隔（分钟）")
+    parser.add_argument("--start-year", type=int, default=FleetSpec.start_year)
+    parser.add_argument("--seed", type=int, default=FleetSpec.seed)
+    parser.add_argument("--repeat", type=int, default=3, help="每个阶段重复次数，取最快一次")
+    parser.add_argument("--results", default=RESULTS_FILE, help="结果文件（JSON Lines）")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="回归判定阈值")
+    parser.add_argument("--no-save", action="store_true", help="不写入结果文件")
+    parser.add_argument("--fail-on-regression", action="store_true", help="出现回归时以非零状态退出")
+    args = parser.parse_args(argv)
+
+    spec = FleetSpec(plants=args.plants, units_per_plant=args.units, fuels=tuple(args.fuels.split(",")),
+                     years=args.years, freq_minutes=args.freq_minutes, start_year=args.start_year, seed=args.seed)
+    result = run_benchmark(spec, repeat=args.repeat)
+    comparison = compare_results(result, load_results(args.results), args.threshold)
+    print(format_report(result, comparison))
+    if not args.no_save:
+        save_result(result, args.results)
+    if args.fail_on_regression and any(regressed for *_rest, regressed in comparison):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
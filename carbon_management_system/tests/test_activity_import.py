@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2025-05-08 00:09:43
+# @Author  : Your Name / Company Name
+# @Email   : your.email@example.com
+# @File    : test_activity_import.py
+# @Software: PyCharm / VSCode
+# @Description: 活动数据流式导入的表头校验测试。
+
+# Python 标准库导入
+import time
+
+# 第三方库导入
+import pytest
+
+# PyQt5 相关导入
+from PyQt5.QtCore import QCoreApplication, QEventLoop
+
+# 项目内部模块导入
+from carbon_management_system.modules.data_acquisition.controllers import DataAcquisitionController
+from carbon_management_system.modules.data_acquisition.services import ActivityDataImportService
+from carbon_management_system.utils.exceptions import DataImportError
+
+HEADER = "plant_code,unit_code,fuel_type,period_start,quantity\n"
+
+
+def write_csv(tmp_path, text):
+    path = tmp_path / "activity.csv"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def import_csv(path):
+    written = []
+    result = ActivityDataImportService(chunk_size=2).import_file(path, written.extend)
+    return result, written
+
+
+def test_valid_file_is_imported(tmp_path):
+    path = write_csv(tmp_path, HEADER + "P1,U1,coal,2024-01-01,10\nP1,U1,coal,2024-01-02,x\nP1,U2,gas,2024-01-03,5\n")
+    result, written = import_csv(path)
+    assert result.rows_read == 3 and result.rows_written == 2 and result.rows_rejected == 1
+    assert [r.quantity for r in written] == [10.0, 5.0]
+
+
+@pytest.mark.parametrize("text, message", [
+    ("", "为空"),
+    (HEADER, "只有表头"),
+    (HEADER + "\n,,,,\n", "只有表头"),
+    ("plant_code,unit_code,period_start,quantity\n", "缺少必需列"),
+])
+def test_bad_header_is_rejected_before_any_row_is_parsed(tmp_path, text, message):
+    path = write_csv(tmp_path, text)
+    with pytest.raises(DataImportError, match=message) as excinfo:
+        import_csv(path)
+    assert excinfo.value.source == path
+
+
+@pytest.fixture(scope="session")
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+def wait_for_jobs(app, controller, timeout=30):
+    deadline = time.monotonic() + timeout
+    while controller._jobs and time.monotonic() < deadline:
+        app.processEvents(QEventLoop.AllEvents, 50)
+    assert not controller._jobs
+
+
+def test_background_import_failure_reaches_slots_connected_by_caller(app, tmp_path):
+    controller = DataAcquisitionController()
+    failures, running_at_connect = [], []
+
+    def connect(worker):
+        thread, _worker = controller._jobs[id(worker)]
+        running_at_connect.append(thread.isRunning())
+        worker.failed.connect(failures.append)
+
+    controller.start_activity_import(write_csv(tmp_path, HEADER), connect=connect)
+    wait_for_jobs(app, controller)
+    app.processEvents()
+    assert running_at_connect == [False]
+    assert len(failures) == 1 and "只有表头" in failures[0]
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2025-05-08 00:09:43
+# @Author  : Your Name / Company Name
+# @Email   : your.email@example.com
+# @File    : test_calculation_cache.py
+# @Software: PyCharm / VSCode
+# @Description: 核算结果磁盘缓存及其在单进程、并行核算中使用的测试。
+
+# Python 标准库导入
+import threading
+import time
+
+# 第三方库导入
+import numpy as np
+import pytest
+
+# PyQt5 相关导入
+from PyQt5.QtCore import QCoreApplication, QEventLoop
+
+# 项目内部模块导入
+from carbon_management_system.modules.emission_calculation import services
+from carbon_management_system.modules.emission_calculation.controllers import EmissionCalculationController
+from carbon_management_system.modules.emission_calculation.services import (
+    CalculationCache,
+    ParallelCalculationScheduler,
+)
+from carbon_management_system.tests.synthetic_fleet import FleetSpec, generate_fleet
+
+
+@pytest.fixture(scope="session")
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+@pytest.fixture
+def controller(app, tmp_path):
+    fleet = generate_fleet(FleetSpec(plants=2, units_per_plant=2, fuels=("coal", "gas"), freq_minutes=720))
+    controller = EmissionCalculationController(fleet.activity, fleet.parameters, defaults=fleet.defaults,
+                                               calculation_cache=CalculationCache(str(tmp_path / "cache")))
+    controller._scheduler = ParallelCalculationScheduler(fleet.activity, fleet.parameters, max_workers=1)
+    yield controller
+    controller.shutdown()
+
+
+def _run_parallel(controller, plants=None):
+    """通过 start_parallel_calculation 在后台线程核算，等待完成并返回 (结果, 实际计算的分区数)。"""
+    app = QCoreApplication.instance()
+    finished, partials = [], []
+    controller.calculation_finished.connect(finished.append)
+    worker = controller.start_parallel_calculation("2024-01", 12, plants)
+    worker.partial.connect(partials.append)
+    deadline = time.monotonic() + 60
+    # 等到工作线程退出（_jobs 清空），否则线程对象可能在运行中被回收
+    while (not finished or controller._jobs) and time.monotonic() < deadline:
+        app.processEvents(QEventLoop.AllEvents, 50)
+    controller.calculation_finished.disconnect(finished.append)
+    assert len(finished) == 1
+    return finished[0], len(partials)
+
+
+def test_parallel_calculation_uses_cache(controller):
+    cache = controller.calculation_cache
+    cube, partitions = _run_parallel(controller)
+    assert partitions > 0 and cache.stats()["entries"] == 1
+
+    cached, partitions = _run_parallel(controller)
+    assert partitions == 0 and cache.hits == 1
+    np.testing.assert_array_equal(cached.emissions, cube.emissions)
+
+
+def test_serial_and_parallel_share_cache_entries(controller):
+    serial = controller.calculate_combustion("2024-01", 12)
+    cube, partitions = _run_parallel(controller)
+    assert partitions == 0
+    np.testing.assert_array_equal(cube.emissions, serial.emissions)
+
+    # 只核算部分电厂时使用不同的缓存键
+    subset, partitions = _run_parallel(controller, plants=["P01"])
+    assert partitions > 0
+    assert {plant for plant, _unit in subset.units} == {"P01"}
+
+
+def test_failed_put_removes_temporary_file(tmp_path, monkeypatch, controller):
+    cache = CalculationCache(str(tmp_path / "failing"))
+    cube = controller.calculate_combustion("2024-01", 12, use_cache=False)
+
+    def fail(cube, handle):
+        handle.write(b"partial")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(services, "save_cube", fail)
+    with pytest.raises(OSError):
+        cache.put("key", cube)
+    assert list((tmp_path / "failing").iterdir()) == []
+
+
+def test_cache_counts_hits_and_misses_across_threads(tmp_path, controller):
+    cache = CalculationCache(str(tmp_path / "counted"))
+    cache.put("hit", controller.calculate_combustion("2024-01", 1, use_cache=False))
+    (tmp_path / "counted" / ("corrupt" + CalculationCache.SUFFIX)).write_bytes(b"not a cube")
+    barrier = threading.Barrier(8)
+
+    def reader(index):
+        barrier.wait()
+        for _ in range(50):
+            cache.get("hit" if index % 2 else "missing")
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 损坏的缓存文件计为未命中并被删除
+    assert cache.get("corrupt") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (200, 201, 1)
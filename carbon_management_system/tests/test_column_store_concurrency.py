@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2025-05-08 00:09:43
+# @Author  : Your Name / Company Name
+# @Email   : your.email@example.com
+# @File    : test_column_store_concurrency.py
+# @Software: PyCharm / VSCode
+# @Description: 列式存储在多线程写入与读取下的一致性测试。
+
+# Python 标准库导入
+import threading
+
+# 第三方库导入
+import numpy as np
+import pytest
+
+# 项目内部模块导入
+from carbon_management_system.modules.data_acquisition.models import ActivityColumnStore
+from carbon_management_system.modules.data_acquisition.services import TimeRollupService
+from carbon_management_system.modules.emission_calculation.services import IncrementalCombustionCalculator
+from carbon_management_system.tests.synthetic_fleet import FleetSpec, generate_fleet
+
+WRITERS = 4
+BATCHES = 50
+BATCH_SIZE = 40
+
+
+def run_threads(targets, timeout=60):
+    """并发运行各函数，任一线程抛出的异常在主线程重新抛出；超时视为死锁。"""
+    errors = []
+
+    def guarded(target):
+        try:
+            target()
+        except BaseException as exc:   # 把线程内的断言失败带回主线程
+            errors.append(exc)
+
+    threads = [threading.Thread(target=guarded, args=(target,), daemon=True) for target in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout)
+        assert not thread.is_alive(), "线程未在限定时间内结束（疑似死锁）"
+    if errors:
+        raise errors[0]
+
+
+def writer(store, plant_codes, unit_codes, fuel_types, month, seed):
+    rng = np.random.default_rng(seed)
+
+    def run():
+        for _ in range(BATCHES):
+            minutes = rng.integers(0, 27 * 24 * 60, BATCH_SIZE)
+            periods = np.datetime64(f"2024-{month:02d}-01T00:00:00", "s") + minutes.astype("timedelta64[m]")
+            pick = rng.integers(0, len(unit_codes), BATCH_SIZE)
+            store.append([plant_codes[i] for i in pick], [unit_codes[i] for i in pick],
+                         [fuel_types[i] for i in pick], periods, np.full(BATCH_SIZE, 1.0))
+    return run
+
+
+def test_views_are_consistent_snapshots_while_appending():
+    store = ActivityColumnStore()
+    plants, units, fuels = ["P1", "P2"], ["U1", "U2"], ["coal", "gas"]
+    stop = threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            view = store.columns()
+            # 视图内的行互不重复且已按 (plant, unit, period) 排序
+            assert len(np.unique(view.row_id)) == len(view)
+            order = np.lexsort((view.period, view.unit, view.plant))
+            assert np.array_equal(order, np.arange(len(view)))
+            part = store.slice(plant="P1", unit="U1")
+            assert np.all(np.diff(part.period.astype(np.int64)) >= 0)
+
+    def writers():
+        try:
+            run_threads([writer(store, plants, units, fuels, 1 + i, seed=i) for i in range(WRITERS)])
+        finally:
+            stop.set()
+
+    run_threads([writers, reader, reader])
+    view = store.columns()
+    assert len(view) == WRITERS * BATCHES * BATCH_SIZE
+    assert np.array_equal(np.sort(view.row_id), np.arange(len(view)))
+
+
+def test_rollup_and_calculator_match_rebuild_after_concurrent_appends():
+    fleet = generate_fleet(FleetSpec(plants=2, units_per_plant=2, fuels=("coal", "gas"), freq_minutes=720))
+    rollup = TimeRollupService(fleet.activity)
+    calculator = IncrementalCombustionCalculator(fleet.activity, fleet.parameters, "2024-01", 12,
+                                                 defaults=fleet.defaults)
+    view = fleet.activity.columns()
+    plant_code, unit_code = fleet.activity.codecs["unit"].decode(view.unit[0])
+    fuel_type = fleet.activity.codecs["fuel"].decode(view.fuel[0])
+    # 第二台为立方体以外的新机组，写入后下一次刷新退化为整体重建
+    plant_codes, unit_codes, fuel_types = [plant_code] * 2, [unit_code, "U-NEW"], [fuel_type] * 2
+    stop = threading.Event()
+
+    def refresher():
+        while not stop.is_set():
+            calculator.refresh()
+
+    def writers():
+        try:
+            run_threads([writer(fleet.activity, plant_codes, unit_codes, fuel_types, 1 + i, seed=i)
+                         for i in range(WRITERS)])
+        finally:
+            stop.set()
+
+    try:
+        run_threads([writers, refresher])
+        calculator.refresh()
+
+        expected = IncrementalCombustionCalculator(fleet.activity, fleet.parameters, "2024-01", 12,
+                                                   defaults=fleet.defaults, subscribe=False)
+        assert calculator.cube.units == expected.cube.units
+        np.testing.assert_allclose(calculator.cube.activity, expected.cube.activity, rtol=1e-12)
+        np.testing.assert_allclose(calculator.unit_totals, expected.unit_totals, rtol=1e-12)
+
+        plant_view = fleet.activity.slice(plant=plant_code)
+        total = float(np.nansum(plant_view.quantity[plant_view.fuel == view.fuel[0]]))
+        assert rollup.total("year", plant_code, fuel_type=fuel_type) == pytest.approx(total, rel=1e-12)
+    finally:
+        calculator.close()
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2025-05-08 00:09:43
+# @Author  : Your Name / Company Name
+# @Email   : your.email@example.com
+# @File    : test_columnar_exchange.py
+# @Software: PyCharm / VSCode
+# @Description: Parquet / Arrow IPC 导出、谓词下推扫描与导入回存储的往返测试。
+
+# Python 标准库导入
+from datetime import datetime
+
+# 第三方库导入
+import numpy as np
+import pytest
+
+# 项目内部模块导入
+from carbon_management_system.modules.data_acquisition.models import ActivityColumnStore, ParameterColumnStore
+from carbon_management_system.modules.data_acquisition.services import (
+    ColumnStoreQueryService,
+    QueryFilter,
+    export_columnar,
+    import_columnar,
+    read_columnar_table,
+)
+from carbon_management_system.tests.synthetic_fleet import FleetSpec, generate_fleet
+from carbon_management_system.utils.exceptions import DataImportError
+
+pa = pytest.importorskip("pyarrow")
+
+SUFFIXES = (".parquet", ".arrow", ".feather")
+
+
+@pytest.fixture(scope="module")
+def fleet():
+    return generate_fleet(FleetSpec(plants=2, units_per_plant=2, fuels=("coal", "gas"), freq_minutes=720))
+
+
+def rows(store, query_filter=None):
+    """取出全部行（不含 row_id）并按解码后的文本排序；存储内的行序取决于分类编码，两边不必相同。"""
+    result = ColumnStoreQueryService(store).query(query_filter)
+    names = [name for name in result.column_names if name != "row_id"]
+    return sorted(result.fetch(0, len(result), names))
+
+
+@pytest.mark.parametrize("suffix", SUFFIXES)
+@pytest.mark.parametrize("store_name, store_type", [("activity", ActivityColumnStore),
+                                                    ("parameters", ParameterColumnStore)])
+def test_round_trip_preserves_every_row(fleet, tmp_path, suffix, store_name, store_type):
+    source = getattr(fleet, store_name)
+    path = str(tmp_path / ("export" + suffix))
+    result = ColumnStoreQueryService(source).query()
+    assert export_columnar(result, path, row_group_size=1000) == len(result) > 1000
+
+    table = read_columnar_table(path)
+    assert pa.types.is_dictionary(table.schema.field("fuel").type)
+    # Parquet 没有秒精度的时间类型，写出时提升为毫秒
+    assert table.schema.field("period").type == pa.timestamp("ms" if suffix == ".parquet" else "s")
+
+    # 目标存储已有其他编码顺序的分类值，导入时按标签重新编码而不是照搬字典下标
+    target = store_type()
+    if store_type is ActivityColumnStore:
+        target.append(["P09"], ["U09"], ["oil"], [datetime(2023, 1, 1)], [1.0])
+    else:
+        target.append(["P09"], ["U09"], ["oil"], [datetime(2023, 1, 1)], ["ncv"], [1.0])
+    assert import_columnar(path, target) == len(result)
+    assert rows(target, QueryFilter(start=datetime(2024, 1, 1))) == rows(source)
+
+
+def test_export_follows_result_order_in_row_groups(fleet, tmp_path):
+    import pyarrow.parquet as pq
+
+    path = str(tmp_path / "sorted.parquet")
+    result = ColumnStoreQueryService(fleet.activity).query(QueryFilter(fuel_type="gas")).sorted_by("quantity", True)
+    export_columnar(result, path, row_group_size=500)
+    assert pq.ParquetFile(path).metadata.num_row_groups == -(-len(result) // 500)
+    quantities = read_columnar_table(path, columns=["quantity"]).column("quantity").to_numpy()
+    expected = [quantity for (quantity,) in result.fetch(0, len(result), ["quantity"])]
+    np.testing.assert_array_equal(quantities, expected)
+    assert read_columnar_table(path, columns=["quantity"]).column_names == ["quantity"]
+
+
+@pytest.mark.parametrize("suffix", (".parquet", ".arrow"))
+def test_filtered_import_pushes_the_query_down(fleet, tmp_path, suffix):
+    path = str(tmp_path / ("export" + suffix))
+    export_columnar(ColumnStoreQueryService(fleet.activity).query(), path)
+    query_filter = QueryFilter(plant_code="P02", unit_code="U01", fuel_type="coal",
+                               start=datetime(2024, 3, 1), end=datetime(2024, 4, 1))
+    expected = rows(fleet.activity, query_filter)
+    assert len(read_columnar_table(path, query_filter=query_filter)) == len(expected) > 0
+
+    target = ActivityColumnStore()
+    assert import_columnar(path, target, query_filter) == len(expected)
+    assert rows(target) == expected
+
+
+def test_unsupported_or_corrupt_files_are_import_errors(fleet, tmp_path):
+    result = ColumnStoreQueryService(fleet.activity).query()
+    with pytest.raises(DataImportError, match="不支持的列式文件类型"):
+        export_columnar(result, str(tmp_path / "export.csv"))
+    corrupt = tmp_path / "corrupt.parquet"
+    corrupt.write_bytes(b"not a parquet file")
+    with pytest.raises(DataImportError, match="读取列式文件失败") as excinfo:
+        import_columnar(str(corrupt), ActivityColumnStore())
+    assert excinfo.value.source == str(corrupt)
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2025-05-08 00:09:43
+# @Author  : Your Name / Company Name
+# @Email   : your.email@example.com
+# @File    : test_combustion.py
+# @Software: PyCharm / VSCode
+# @Description: 燃料燃烧排放立方体构造与向量化计算的测试。
+
+# Python 标准库导入
+from datetime import datetime
+
+# 第三方库导入
+import numpy as np
+import pytest
+
+# 项目内部模块导入
+from carbon_management_system.modules.data_acquisition.models import ActivityColumnStore, ParameterColumnStore
+from carbon_management_system.modules.emission_calculation.services import (
+    build_combustion_cube,
+    calculate_combustion,
+    reference_combustion,
+)
+from carbon_management_system.tests.synthetic_fleet import FleetSpec, generate_fleet
+from carbon_management_system.utils.constants import PARAM_CARBON_CONTENT, PARAM_NCV, PARAM_OXIDATION_RATE
+
+DEFAULTS = {
+    PARAM_NCV: {"coal": 20.0, "gas": 389.0},
+    PARAM_CARBON_CONTENT: {"coal": 0.026, "gas": 0.015},
+    PARAM_OXIDATION_RATE: {"coal": 0.98, "gas": 0.99},
+}
+
+
+@pytest.fixture(scope="module")
+def fleet():
+    return generate_fleet(FleetSpec(plants=2, units_per_plant=2, fuels=("coal", "gas", "oil"), freq_minutes=360))
+
+
+def _stores(activity_rows, parameter_rows=()):
+    activity, parameters = ActivityColumnStore(), ParameterColumnStore()
+    if activity_rows:
+        activity.append(*zip(*activity_rows))
+    if parameter_rows:
+        parameters.append(*zip(*parameter_rows))
+    return activity, parameters
+
+
+@pytest.mark.parametrize("fixed_point", [False, True])
+def test_vectorized_matches_reference(fleet, fixed_point):
+    cube = build_combustion_cube(fleet.activity.columns(), fleet.parameters.columns(), "2024-01", 12,
+                                 defaults=fleet.defaults, fixed_point=fixed_point)
+    emissions = calculate_combustion(cube)
+    assert cube.shape == (4, 12, 3)
+    assert not np.isnan(emissions).any()
+    np.testing.assert_array_equal(emissions, reference_combustion(cube))
+
+
+def test_missing_and_nan_parameters_fall_back_to_defaults():
+    activity, parameters = _stores(
+        [("P1", "U1", "coal", datetime(2024, 1, 5), 100.0),
+         ("P1", "U1", "coal", datetime(2024, 2, 5), 50.0)],
+        # 一月：一个有效化验值与一个 NaN（NaN 不参与均值）；二月：只有 NaN；碳氧化率没有实测值
+        [("P1", "U1", "coal", datetime(2024, 1, 5), PARAM_NCV, 21.0),
+         ("P1", "U1", "coal", datetime(2024, 1, 6), PARAM_NCV, np.nan),
+         ("P1", "U1", "coal", datetime(2024, 2, 5), PARAM_NCV, np.nan)],
+    )
+    cube = build_combustion_cube(activity.columns(), parameters.columns(), "2024-01", 2, defaults=DEFAULTS)
+    calculate_combustion(cube)
+
+    np.testing.assert_array_equal(cube.ncv[0, :, 0], [21.0, 20.0])
+    np.testing.assert_array_equal(cube.carbon_content[0, :, 0], [0.026, 0.026])
+    np.testing.assert_array_equal(cube.oxidation_rate[0, :, 0], [0.98, 0.98])
+    np.testing.assert_array_equal(cube.emissions, reference_combustion(cube))
+
+
+def test_parameter_without_measurement_or_default_is_nan():
+    activity, parameters = _stores([("P1", "U1", "diesel", datetime(2024, 1, 5), 10.0)])
+    cube = build_combustion_cube(activity.columns(), parameters.columns(), "2024-01", 1, defaults=DEFAULTS)
+    calculate_combustion(cube)
+    assert np.isnan(cube.ncv).all()
+    assert np.isnan(cube.emissions).all()
+
+
+def test_cube_excludes_unit_and_fuel_without_activity():
+    activity, parameters = _stores(
+        [("P1", "U1", "coal", datetime(2024, 1, 5), 100.0)],
+        # 只有化验数据、没有活动数据的机组与燃料不进入立方体，也不影响已有格子
+        [("P1", "U2", "coal", datetime(2024, 1, 5), PARAM_NCV, 30.0),
+         ("P1", "U1", "gas", datetime(2024, 1, 5), PARAM_NCV, 400.0)],
+    )
+    cube = build_combustion_cube(activity.columns(), parameters.columns(), "2024-01", 3, defaults=DEFAULTS)
+    calculate_combustion(cube)
+
+    assert cube.units == [("P1", "U1")]
+    assert cube.fuels == ["coal"]
+    assert cube.ncv[0, 0, 0] == 20.0
+    # 没有活动数据的月份排放为 0，而不是 NaN
+    np.testing.assert_array_equal(cube.activity[0, :, 0], [100.0, 0.0, 0.0])
+    np.testing.assert_array_equal(cube.emissions[0, 1:, 0], [0.0, 0.0])
+
+
+def test_cube_for_empty_store():
+    activity, parameters = _stores([])
+    cube = build_combustion_cube(activity.columns(), parameters.columns(), "2024-01", 12, defaults=DEFAULTS)
+    assert cube.shape == (0, 12, 0)
+    assert calculate_combustion(cube).size == 0
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2025-05-08 00:09:43
+# @Author  : Your Name / Company Name
+# @Email   : your.email@example.com
+# @File    : test_compliance_scheduler.py
+# @Software: PyCharm / VSCode
+# @Description: 合规日历到期提醒调度的测试。
+
+# Python 标准库导入
+from datetime import date
+
+# 项目内部模块导入
+from carbon_management_system.modules.mrv_management.models import OBLIGATION_MONTHLY_DATA
+from carbon_management_system.modules.mrv_management.services import ComplianceScheduler
+
+
+def _scheduler(today=date(2024, 7, 1)):
+    scheduler = ComplianceScheduler(today)
+    scheduler.add_standard_obligations("P1", date(2024, 1, 1))
+    return scheduler
+
+
+def _monthly(reminders):
+    return [(r.due, r.total, r.outstanding) for r in reminders if r.kind == OBLIGATION_MONTHLY_DATA]
+
+
+def test_reminder_is_delivered_once():
+    scheduler = _scheduler()
+    # 月度报送每月 10 日到期、提前 5 天提醒
+    assert _monthly(scheduler.advance(date(2024, 7, 6))) == [(date(2024, 7, 10), 1, 1)]
+    assert scheduler.advance(date(2024, 7, 6)) == []
+    assert scheduler.advance(date(2024, 7, 20)) == []
+    assert _monthly(scheduler.advance(date(2024, 8, 5))) == [(date(2024, 8, 10), 1, 1)]
+
+
+def test_adding_or_removing_obligations_does_not_repeat_delivered_reminder():
+    scheduler = _scheduler()
+    scheduler.add_standard_obligations("P2", date(2024, 1, 1))
+    assert _monthly(scheduler.advance(date(2024, 7, 6))) == [(date(2024, 7, 10), 2, 2)]
+
+    scheduler.add_standard_obligations("NEW", date(2024, 1, 1))
+    assert scheduler.advance(date(2024, 7, 6)) == []
+    scheduler.remove_obligation("P2:" + OBLIGATION_MONTHLY_DATA)
+    assert scheduler.advance(date(2024, 7, 7)) == []
+    # 下一次到期正常提醒，且包含新加入的电厂
+    assert _monthly(scheduler.advance(date(2024, 8, 5))) == [(date(2024, 8, 10), 2, 2)]
+
+
+def test_outstanding_is_computed_from_state():
+    scheduler = _scheduler()
+    scheduler.advance(date(2024, 7, 6))
+    # 没有新提醒时，已发出但仍未完成的提醒依然列出
+    assert scheduler.advance(date(2024, 7, 7)) == []
+    assert (date(2024, 7, 10), 1, 1) in _monthly(scheduler.outstanding(date(2024, 7, 7)))
+    assert (date(2024, 6, 10), 1, 1) in _monthly(scheduler.outstanding(date(2024, 7, 7)))
+
+    scheduler.mark_done("P1:" + OBLIGATION_MONTHLY_DATA, date(2024, 7, 10))
+    assert (date(2024, 7, 10), 1, 1) not in _monthly(scheduler.outstanding(date(2024, 7, 7)))
+    # 尚未到提醒时间的到期不列出
+    assert all(r.due <= date(2024, 7, 12) for r in scheduler.outstanding(date(2024, 7, 7)))
+
+
+def test_restart_keeps_clock_and_delivered_reminders(tmp_path):
+    path = tmp_path / "schedule.json"
+    scheduler = _scheduler()
+    scheduler.advance(date(2024, 7, 6))
+    scheduler.save(path)
+
+    # 同一天重启：不重复提醒
+    restarted = ComplianceScheduler.load(path, today=date(2024, 7, 6))
+    restarted.add_standard_obligations("NEW", date(2024, 1, 1))
+    assert restarted.advance(date(2024, 7, 6)) == []
+
+    # 关闭期间到达的提醒在重启后的第一次推进时补发
+    restarted = ComplianceScheduler.load(path, today=date(2024, 9, 20))
+    assert _monthly(restarted.advance(date(2024, 9, 20))) == [(date(2024, 8, 10), 1, 1), (date(2024, 9, 10), 1, 1)]
+    assert (date(2024, 7, 10), 1, 1) in _monthly(restarted.outstanding(date(2024, 9, 20)))
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2025-05-08 00:09:43
+# @Author  : Your Name / Company Name
+# @Email   : your.email@example.com
+# @File    : test_data_table_model.py
+# @Software: PyCharm / VSCode
+# @Description: 虚拟化表格模型按页加载、页面 LRU 缓存与查询层排序的测试。
+
+# Python 标准库导入
+from datetime import datetime, timedelta
+
+# 第三方库导入
+import pytest
+
+# PyQt5 相关导入
+from PyQt5.QtCore import QCoreApplication, Qt
+
+# 项目内部模块导入
+from carbon_management_system.modules.data_acquisition.models import ActivityColumnStore
+from carbon_management_system.modules.data_acquisition.services import (
+    ColumnQueryResult,
+    ColumnStoreQueryService,
+    QueryFilter,
+)
+from carbon_management_system.modules.data_acquisition.widgets.data_table_view import LazyQueryTableModel
+
+ROWS = 23
+PAGE_SIZE = 5
+
+
+@pytest.fixture(scope="session")
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+@pytest.fixture
+def service():
+    """U1 与 U2 交替写入，消耗量取 (7 * i) % ROWS，各不相同且与写入顺序无关。"""
+    store = ActivityColumnStore()
+    start = datetime(2024, 1, 1)
+    store.append(["P1"] * ROWS, [f"U{1 + i % 2}" for i in range(ROWS)], ["coal"] * ROWS,
+                 [start + timedelta(hours=i) for i in range(ROWS)], [float(7 * i % ROWS) for i in range(ROWS)])
+    return ColumnStoreQueryService(store)
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    """记录模型向结果集请求的每一页 (offset, limit)。"""
+    calls = []
+    fetch = ColumnQueryResult.fetch
+
+    def counting_fetch(self, offset, limit, columns=None):
+        calls.append((offset, limit))
+        return fetch(self, offset, limit, columns)
+
+    monkeypatch.setattr(ColumnQueryResult, "fetch", counting_fetch)
+    return calls
+
+
+def column(model, col):
+    return [model.data(model.index(row, col)) for row in range(model.rowCount())]
+
+
+def load_all(model):
+    while model.canFetchMore():
+        model.fetchMore()
+
+
+def test_rows_are_loaded_page_by_page(app, service, fetches):
+    model = LazyQueryTableModel(service.query, page_size=PAGE_SIZE, max_cached_pages=2)
+    totals = []
+    model.result_changed.connect(totals.append)
+    assert model.rowCount() == 0 and not model.canFetchMore()
+
+    model.set_filter(QueryFilter())
+    assert (totals, model.total_rows, model.rowCount(), model.columnCount()) == ([ROWS], ROWS, PAGE_SIZE, 5)
+    assert not fetches
+    loaded = [model.rowCount()]
+    while model.canFetchMore():
+        model.fetchMore()
+        loaded.append(model.rowCount())
+    assert loaded == [5, 10, 15, 20, 23]
+    model.fetchMore()
+    assert model.rowCount() == ROWS
+
+    assert model.headerData(4, Qt.Horizontal) == "消耗量" and model.headerData(0, Qt.Vertical) == "1"
+    assert [model.data(model.index(0, col)) for col in range(5)] == ["P1", "U1", "coal", "2024-01-01T00:00",
+                                                                    "0.0000"]
+    assert model.data(model.index(0, 4), Qt.TextAlignmentRole) == int(Qt.AlignRight | Qt.AlignVCenter)
+    assert fetches == [(0, PAGE_SIZE)]
+
+
+def test_page_cache_is_bounded_and_least_recently_used(app, service, fetches):
+    model = LazyQueryTableModel(service.query, page_size=PAGE_SIZE, max_cached_pages=2)
+    model.set_filter(QueryFilter())
+    load_all(model)
+    for row in (0, 6, 1, 12, 2, 7):
+        model.data(model.index(row, 4))
+    # 第 0 页在读取第 2 页前刚被访问过，淘汰的是第 1 页，之后再读第 1 页需要重新取数
+    assert fetches == [(0, PAGE_SIZE), (5, PAGE_SIZE), (10, PAGE_SIZE), (5, PAGE_SIZE)]
+    assert len(model._pages) == 2
+
+
+def test_sort_is_pushed_down_and_kept_across_filters(app, service, fetches):
+    model = LazyQueryTableModel(service.query, page_size=PAGE_SIZE)
+    model.set_filter(QueryFilter())
+    load_all(model)
+    model.data(model.index(0, 0))
+    layout_changes = []
+    model.layoutChanged.connect(lambda *args: layout_changes.append(args))
+
+    model.sort(4, Qt.DescendingOrder)
+    assert layout_changes and model.rowCount() == ROWS
+    # 排序后页面缓存作废，已取过的第 0 页需要按新顺序重新取数
+    assert model.data(model.index(0, 4)) == f"{ROWS - 1:,.4f}" and fetches == [(0, PAGE_SIZE)] * 2
+    assert column(model, 4) == [f"{value:,.4f}" for value in range(ROWS - 1, -1, -1)]
+
+    # 按机组升序是稳定排序：同一机组内保持上一次的消耗量降序
+    model.sort(1, Qt.AscendingOrder)
+    units, quantities = column(model, 1), [float(text) for text in column(model, 4)]
+    assert units == sorted(units) and units.count("U1") == 12
+    assert quantities[:12] == sorted(quantities[:12], reverse=True)
+    assert quantities[12:] == sorted(quantities[12:], reverse=True)
+
+    model.sort(4, Qt.AscendingOrder)
+    model.set_filter(QueryFilter(plant_code="P1", unit_code="U2"))
+    load_all(model)
+    assert model.total_rows == 11 and set(column(model, 1)) == {"U2"}
+    quantities = [float(text) for text in column(model, 4)]
+    assert quantities == sorted(quantities)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2025-05-08 00:09:43
+# @Author  : Your Name / Company Name
+# @Email   : your.email@example.com
+# @File    : test_document_store.py
+# @Software: PyCharm / VSCode
+# @Description: 支撑文档登记表持久化与垃圾回收的测试。
+
+# Python 标准库导入
+import time
+
+# 第三方库导入
+import pytest
+
+# PyQt5 相关导入
+from PyQt5.QtCore import QCoreApplication, QEventLoop
+
+# 项目内部模块导入
+from carbon_management_system.modules.data_acquisition.controllers import DataAcquisitionController
+from carbon_management_system.modules.data_acquisition.services import ContentAddressedBlobStore, DocumentService
+
+
+def _service(root):
+    return DocumentService(ContentAddressedBlobStore(str(root)))
+
+
+def test_registry_survives_restart(tmp_path):
+    service = _service(tmp_path)
+    info = service.blob_store.put_bytes(b"invoice")
+    document = service.register_blob(info, "invoice.pdf", ["activity:1"])
+    service.link(document.document_id, "activity:2")
+
+    reloaded = _service(tmp_path)
+    restored = reloaded.get(document.document_id)
+    assert restored.content_hash == info.digest
+    assert restored.record_refs == {"activity:1", "activity:2"}
+    # 新会话分配的编号不与已有文档冲突
+    other = reloaded.register_blob(reloaded.blob_store.put_bytes(b"scan"), "scan.png")
+    assert other.document_id > document.document_id
+
+
+def test_remove_orphans_keeps_documents_from_earlier_sessions(tmp_path):
+    service = _service(tmp_path)
+    kept = service.register_blob(service.blob_store.put_bytes(b"kept"), "kept.txt", ["activity:1"])
+
+    reloaded = _service(tmp_path)
+    assert reloaded.remove_orphans() == 0
+    assert reloaded.blob_store.exists(kept.content_hash)
+
+
+def test_remove_orphans_ignores_unregistered_blobs(tmp_path):
+    service = _service(tmp_path)
+    # 上传已写入对象、但尚未登记为文档
+    pending = service.blob_store.put_bytes(b"uploaded, not yet registered")
+    orphan = service.register_blob(service.blob_store.put_bytes(b"orphan"), "orphan.txt", ["activity:1"])
+    service.unlink(orphan.document_id, "activity:1")
+
+    freed = service.remove_orphans()
+    assert freed == len(b"orphan")
+    assert not service.blob_store.exists(orphan.content_hash)
+    assert service.blob_store.exists(pending.digest)
+    assert _service(tmp_path).find(orphan.document_id) is None
+
+
+@pytest.fixture(scope="session")
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+def test_background_upload_signals_reach_slots_connected_by_caller(app, tmp_path):
+    source = tmp_path / "report.pdf"
+    source.write_bytes(b"%PDF" * 1000)
+    controller = DataAcquisitionController(document_service=_service(tmp_path / "store"))
+    finished, running_at_connect = [], []
+
+    def connect(worker):
+        thread, _worker = controller._jobs[id(worker)]
+        running_at_connect.append(thread.isRunning())
+        worker.finished.connect(finished.append)
+
+    controller.start_document_upload(str(source), ["activity:7"], connect=connect)
+    deadline = time.monotonic() + 30
+    while controller._jobs and time.monotonic() < deadline:
+        app.processEvents(QEventLoop.AllEvents, 50)
+    app.processEvents()
+    assert running_at_connect == [False]
+    assert [doc.file_name for doc in finished] == ["report.pdf"]
+    assert finished[0].record_refs == {"activity:7"}
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2025-05-08 00:09:43
+# @Author  : Your Name / Company Name
+# @Email   : your.email@example.com
+# @File    : test_dqcp_versions.py
+# @Software: PyCharm / VSCode
+# @Description: DQCP 版本库（快照 + 增量）的保存、重新加载、回放与比较测试。
+
+# Python 标准库导入
+import difflib
+import json
+import os
+
+# 第三方库导入
+import pytest
+
+# 项目内部模块导入
+from carbon_management_system.modules.mrv_management.services import DqcpVersionStore
+from carbon_management_system.utils.exceptions import VersionStoreError
+
+VERSIONS = 23
+INTERVAL = 5
+
+
+def revision(n):
+    """第 n 版正文：逐版改写一行、每三版增加一节，第 12 版整体改版。"""
+    sections = 20 + n // 3
+    prefix = "修订版" if n >= 12 else "初版"
+    lines = [f"<h2>{prefix}第 {i} 节</h2>\n<p>监测点 {i} 的数据质量控制要求，第 {n if i == n % sections else 0} 次修改。</p>\n"
+             for i in range(sections)]
+    return "<html><body>\n" + "".join(lines) + "</body></html>\n"
+
+
+@pytest.fixture
+def root(tmp_path):
+    store = DqcpVersionStore(str(tmp_path), snapshot_interval=INTERVAL)
+    store.create_plan("P01-DQCP", "P01", "一号电厂数据质量控制计划")
+    for n in range(1, VERSIONS + 1):
+        store.commit("P01-DQCP", revision(n), author=f"user{n % 3}", comment=f"第 {n} 版")
+    return str(tmp_path)
+
+
+def test_reload_replays_every_version(root):
+    store = DqcpVersionStore(root, snapshot_interval=INTERVAL)
+    versions = store.versions("P01-DQCP")
+    assert [meta.version for meta in versions] == list(range(1, VERSIONS + 1))
+    # 至少每 INTERVAL 个版本一个快照，两次快照之间最多 INTERVAL - 1 个增量
+    snapshots = [meta.version for meta in versions if meta.snapshot]
+    assert snapshots[0] == 1 and all(b - a <= INTERVAL for a, b in zip(snapshots, snapshots[1:] + [VERSIONS + 1]))
+    assert store.stats("P01-DQCP")["ratio"] < 1.0
+
+    plan = store.plan("P01-DQCP")
+    assert (plan.version, plan.updated_by, plan.content) == (VERSIONS, f"user{VERSIONS % 3}", revision(VERSIONS))
+    for n in (VERSIONS, 1, 9, 10, 4, 17, 12, 11):
+        assert store.content("P01-DQCP", n) == revision(n)
+    assert store.content("P01-DQCP") == revision(VERSIONS)
+
+
+def test_diff_between_any_two_versions(root):
+    store = DqcpVersionStore(root, snapshot_interval=INTERVAL)
+    for old, new in ((3, 4), (2, 19), (19, 2), (11, 12)):
+        diff = store.diff("P01-DQCP", old, new)
+        old_lines, new_lines = revision(old).splitlines(True), revision(new).splitlines(True)
+        expected = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False).get_opcodes()
+        assert diff.removed_lines == sum(i2 - i1 for tag, i1, i2, _j1, _j2 in expected if tag != "equal")
+        assert diff.added_lines == sum(j2 - j1 for tag, _i1, _i2, j1, j2 in expected if tag != "equal")
+    assert not store.diff("P01-DQCP", 7, 7).hunks
+
+
+def test_unchanged_content_does_not_create_a_version(root):
+    store = DqcpVersionStore(root, snapshot_interval=INTERVAL)
+    assert store.commit("P01-DQCP", revision(VERSIONS)).version == VERSIONS
+    assert len(store.versions("P01-DQCP")) == VERSIONS
+
+
+def test_plan_without_stored_content_is_restored_from_latest_version(root):
+    path = os.path.join(root, "P01-DQCP", "plan.json")
+    with open(path, encoding="utf-8") as fh:
+        data = json.load(fh)
+    del data["content"]
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(data, fh, ensure_ascii=False)
+    assert DqcpVersionStore(root, snapshot_interval=INTERVAL).plan("P01-DQCP").content == revision(VERSIONS)
+
+
+def test_missing_delta_is_reported(root):
+    store = DqcpVersionStore(root, snapshot_interval=INTERVAL)
+    delta = next(meta for meta in store.versions("P01-DQCP") if not meta.snapshot)
+    path = os.path.join(root, "P01-DQCP", f"v{delta.version:06d}.delta")
+    os.remove(path)
+    with pytest.raises(VersionStoreError, match="缺失"):
+        DqcpVersionStore(root, snapshot_interval=INTERVAL).content("P01-DQCP", delta.version)
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2025-05-08 00:09:43
+# @Author  : Your Name / Company Name
+# @Email   : your.email@example.com
+# @File    : test_evidence_export.py
+# @Software: PyCharm / VSCode
+# @Description: 核查证据包收集支撑文档、流式 ZIP 写出与溯源数据的测试。
+
+# Python 标准库导入
+import io
+import json
+import time
+import zipfile
+
+# 第三方库导入
+import numpy as np
+import pytest
+
+# PyQt5 相关导入
+from PyQt5.QtCore import QCoreApplication, QEventLoop
+
+# 项目内部模块导入
+from carbon_management_system.modules.data_acquisition.controllers import DataAcquisitionController
+from carbon_management_system.modules.data_acquisition.services import ContentAddressedBlobStore, DocumentService
+from carbon_management_system.modules.emission_calculation.controllers import EmissionCalculationController
+from carbon_management_system.modules.emission_calculation.services import (
+    CalculationCache,
+    LineageTracer,
+    build_lineage,
+    load_lineage,
+)
+from carbon_management_system.modules.mrv_management.controllers import VerificationSupportController
+from carbon_management_system.modules.mrv_management.models import NC_SEVERITY_MINOR
+from carbon_management_system.modules.mrv_management.services import (
+    EvidenceEntry,
+    EvidencePackageExporter,
+    NonConformityRegister,
+    bytes_entry,
+)
+from carbon_management_system.tests.synthetic_fleet import FleetSpec, generate_fleet
+from carbon_management_system.utils.exceptions import EvidenceExportError
+
+
+def _controller(root, register):
+    documents = DocumentService(ContentAddressedBlobStore(str(root / "documents")))
+    data = DataAcquisitionController(document_service=documents)
+    return VerificationSupportController(data, None, non_conformities=register, non_conformity_path=None)
+
+
+def test_non_conformity_documents_resolve_after_restart(tmp_path):
+    register = NonConformityRegister()
+    first = _controller(tmp_path, register)
+    service = first.data_controller.document_service
+    document = service.register_blob(service.blob_store.put_bytes(b"lab report"), "report.pdf")
+    first.raise_non_conformity("P1", NC_SEVERITY_MINOR, "化验频次不足", document_ids=[document.document_id])
+
+    entries, metadata = _controller(tmp_path, register).evidence_entries("P1", 2024)
+    assert metadata["documents"] == 1
+    assert any(entry.name.endswith("report.pdf") for entry in entries)
+
+
+def test_unresolved_document_fails_export(tmp_path):
+    register = NonConformityRegister()
+    controller = _controller(tmp_path, register)
+    controller.raise_non_conformity("P1", NC_SEVERITY_MINOR, "缺少发票", document_ids=[404])
+
+    with pytest.raises(EvidenceExportError, match="404"):
+        controller.evidence_entries("P1", 2024)
+
+
+def test_streamed_zip_round_trips(tmp_path):
+    rng = np.random.default_rng(0)
+    text = b"".join(b"P01,U01,coal,2024-01-01 %02d:00:00,%f\n" % (i % 24, x) for i, x in enumerate(rng.random(4000)))
+    noise = rng.integers(0, 256, 50_000, dtype=np.uint8).tobytes()
+    entries = [
+        # 多块 deflate 条目，块大小任意
+        EvidenceEntry("data/activity.csv", lambda: [text[i:i + 777] for i in range(0, len(text), 777)], len(text)),
+        EvidenceEntry("documents/scan.png", lambda: [noise], len(noise)),      # 原样存储
+        EvidenceEntry("documents/raw.bin", lambda: iter([noise[:10_000]]), compress=False),
+        bytes_entry("verification/empty.csv", b""),
+        EvidenceEntry("data/generator.csv", lambda: iter(()), 0),               # 不产出任何块的空条目
+    ]
+    path = str(tmp_path / "evidence.zip")
+    stats = EvidencePackageExporter(max_workers=3, block_size=4096).export(entries, path, {"plant_code": "P01"})
+
+    with zipfile.ZipFile(path) as archive:
+        assert archive.testzip() is None
+        info = {item.filename: item for item in archive.infolist()}
+        assert archive.read("data/activity.csv") == text
+        assert info["data/activity.csv"].compress_type == zipfile.ZIP_DEFLATED
+        assert archive.read("documents/scan.png") == noise
+        assert info["documents/scan.png"].compress_type == zipfile.ZIP_STORED
+        assert archive.read("documents/raw.bin") == noise[:10_000]
+        assert archive.read("verification/empty.csv") == b""
+        assert archive.read("data/generator.csv") == b""
+        manifest = json.loads(archive.read("manifest.json"))
+    assert manifest["plant_code"] == "P01"
+    assert [entry["name"] for entry in manifest["entries"]] == [entry.name for entry in entries]
+    assert manifest["entries"][0]["size"] == len(text)
+    assert stats.entries == len(entries) + 1
+    assert not (tmp_path / "evidence.zip.part").exists()
+
+
+def test_lineage_comes_from_the_exported_years_cube(tmp_path):
+    fleet = generate_fleet(FleetSpec(plants=2, units_per_plant=2, fuels=("coal", "gas"), freq_minutes=720))
+    data = DataAcquisitionController(fleet.activity, fleet.parameters, document_service=DocumentService(
+        ContentAddressedBlobStore(str(tmp_path / "documents"))))
+    calculation = EmissionCalculationController(fleet.activity, fleet.parameters, defaults=fleet.defaults,
+                                                calculation_cache=CalculationCache(str(tmp_path / "cache")))
+    # 界面上正在查看另一期间的结果，导出证据包不能改动它
+    other = calculation.calculate_combustion("2024-07", 3, use_cache=False)
+    controller = VerificationSupportController(data, calculation, non_conformities=NonConformityRegister(),
+                                               non_conformity_path=None)
+
+    path = str(tmp_path / "evidence.zip")
+    entries, metadata = controller.evidence_entries("P01", 2024)
+    EvidencePackageExporter(max_workers=2).export(entries, path, metadata)
+
+    assert calculation.last_cube is other
+    with zipfile.ZipFile(path) as archive:
+        assert archive.testzip() is None
+        exported = load_lineage(io.BytesIO(archive.read("calculation/lineage_P01_2024.npz")))
+    cube = calculation.combustion_cube("2024-01", 12)
+    expected = LineageTracer(build_lineage(cube, fleet.activity.columns(), fleet.parameters.columns())).subset("P01")
+    assert exported.units == expected.units == [("P01", "U01"), ("P01", "U02")]
+    np.testing.assert_array_equal(exported.months, expected.months)
+    np.testing.assert_array_equal(exported.activity_rows, expected.activity_rows)
+    np.testing.assert_array_equal(exported.parameter_rows, expected.parameter_rows)
+    calculation.shutdown()
+
+
+@pytest.fixture(scope="session")
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+def test_background_export_failure_reaches_slots_connected_by_caller(app, tmp_path):
+    controller = _controller(tmp_path, NonConformityRegister())
+    controller.raise_non_conformity("P1", NC_SEVERITY_MINOR, "缺少发票", document_ids=[404])
+    failures, running_at_connect = [], []
+
+    def connect(worker):
+        thread, _worker = controller._jobs[id(worker)]
+        running_at_connect.append(thread.isRunning())
+        worker.failed.connect(failures.append)
+
+    controller.start_export("P1", 2024, str(tmp_path / "evidence.zip"), connect=connect)
+    deadline = time.monotonic() + 30
+    while controller._jobs and time.monotonic() < deadline:
+        app.processEvents(QEventLoop.AllEvents, 50)
+    app.processEvents()
+    assert running_at_connect == [False]
+    assert len(failures) == 1 and "404" in failures[0]
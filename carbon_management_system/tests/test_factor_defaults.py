@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2025-05-08 00:09:43
+# @Author  : Your Name / Company Name
+# @Email   : your.email@example.com
+# @File    : test_factor_defaults.py
+# @Software: PyCharm / VSCode
+# @Description: 因子库逐月缺省参数（年内因子更替）的测试。
+
+# Python 标准库导入
+from datetime import date, datetime
+
+# 第三方库导入
+import numpy as np
+import pytest
+
+# 项目内部模块导入
+from carbon_management_system.modules.data_acquisition.models import ActivityColumnStore, ParameterColumnStore
+from carbon_management_system.modules.emission_calculation.controllers import EmissionCalculationController
+from carbon_management_system.modules.emission_calculation.models import EmissionFactor
+from carbon_management_system.modules.emission_calculation.services import (
+    EmissionFactorService,
+    ParallelCalculationScheduler,
+)
+from carbon_management_system.utils.constants import PARAM_CARBON_CONTENT, PARAM_NCV, PARAM_OXIDATION_RATE
+
+
+@pytest.fixture
+def controller():
+    factors = EmissionFactorService()
+    for factor_type, value in ((PARAM_CARBON_CONTENT, 0.0153), (PARAM_OXIDATION_RATE, 0.99)):
+        factors.add_factor(EmissionFactor("gas", factor_type, value, date(2024, 1, 1), date(2025, 1, 1)))
+    # 低位发热量在 7 月 1 日更替
+    factors.add_factor(EmissionFactor("gas", PARAM_NCV, 389.31, date(2024, 1, 1), date(2024, 7, 1)))
+    factors.add_factor(EmissionFactor("gas", PARAM_NCV, 392.0, date(2024, 7, 1), date(2025, 1, 1)))
+
+    activity, parameters = ActivityColumnStore(), ParameterColumnStore()
+    months = [datetime(2024, month, 10) for month in range(1, 13)]
+    activity.append(["P1"] * 12, ["U1"] * 12, ["gas"] * 12, months, [10.0] * 12)
+    # 3 月有实测化验值，优先于缺省值
+    parameters.append(["P1"], ["U1"], ["gas"], [datetime(2024, 3, 5)], [PARAM_NCV], [380.0])
+    controller = EmissionCalculationController(activity, parameters, factor_service=factors)
+    yield controller
+    controller.shutdown()
+
+
+def test_factors_by_month_follows_effective_dates(controller):
+    by_month = controller.factor_service.factors_by_month("2024-05", 4)[PARAM_NCV]["gas"]
+    assert {month: factor.value for month, factor in by_month.items()} == {
+        "2024-05": 389.31, "2024-06": 389.31, "2024-07": 392.0, "2024-08": 392.0}
+    assert controller.factor_service.factors_by_month("2026-01", 1) == {}
+
+
+def test_apply_factor_library_uses_each_months_factor(controller):
+    defaults = controller.apply_factor_library("2024-01", 12)
+    assert len(defaults[PARAM_NCV]["gas"]) == 12
+
+    cube = controller.calculate_combustion("2024-01", 12, use_cache=False)
+    expected = [389.31] * 6 + [392.0] * 6
+    expected[2] = 380.0
+    np.testing.assert_array_equal(cube.ncv[0, :, 0], expected)
+
+    # 溯源记录各月实际使用的因子
+    first, second = (factor.factor_id for factor in controller.factor_service.factors()
+                     if factor.factor_type == PARAM_NCV)
+    assert first in controller.trace("P1", "U1", "2024-06").factor_ids
+    assert second in controller.trace("P1", "U1", "2024-07").factor_ids
+    assert first not in controller.trace("P1", "U1", "2024-03").factor_ids
+
+
+def test_monthly_defaults_agree_across_calculation_paths(controller):
+    controller.apply_factor_library("2024-01", 12)
+    cube = controller.calculate_combustion("2024-01", 12, use_cache=False)
+
+    scheduler = ParallelCalculationScheduler(controller.activity_store, controller.parameter_store, max_workers=1,
+                                             partition_months=5)
+    parallel = scheduler.run("2024-01", 12, defaults=controller.defaults)
+    np.testing.assert_array_equal(parallel.emissions, cube.emissions)
+
+    incremental = controller.enable_incremental("2024-01", 12, auto_refresh=False)
+    np.testing.assert_array_equal(incremental.cube.emissions, cube.emissions)
+    assert incremental.inputs_of("P1", "U1", "2024-08", "gas")["defaults"][0] == (PARAM_NCV, 392.0)
+
+    # 增量模式下更新逐月缺省值，只重算依赖的格子，结果与整体重建一致
+    controller.set_default_factor(PARAM_NCV, "gas", {"2024-12": 400.0})
+    incremental.refresh()
+    assert incremental.cube.ncv[0, 11, 0] == 400.0
+    assert np.isnan(incremental.cube.ncv[0, 0, 0])
+    rebuilt = controller.calculate_combustion("2024-01", 12, use_cache=False)
+    np.testing.assert_array_equal(incremental.cube.ncv, rebuilt.ncv)
+
+
+def test_trace_follows_factor_changes_in_incremental_mode(controller):
+    controller.enable_incremental("2024-01", 12, auto_refresh=False)
+    assert len(controller.trace("P1", "U1", "2024-06").factor_ids) == 0
+
+    controller.apply_factor_library("2024-01", 12)
+    controller.refresh()
+    expected = {factor_ids["2024-06"] for by_fuel in controller.default_factor_ids.values()
+                for factor_ids in by_fuel.values()}
+    assert set(controller.trace("P1", "U1", "2024-06").factor_ids.tolist()) == expected
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2025-05-08 00:09:43
+# @Author  : Your Name / Company Name
+# @Email   : your.email@example.com
+# @File    : test_formula.py
+# @Software: PyCharm / VSCode
+# @Description: 核算公式编译、校验与公式库版本缓存的测试。
+
+# 第三方库导入
+import numpy as np
+import pytest
+
+# 项目内部模块导入
+from carbon_management_system.modules.emission_calculation.models import CalculationFormula
+from carbon_management_system.modules.emission_calculation.services import FormulaLibrary, compile_formula
+from carbon_management_system.utils.constants import CO2_C_RATIO, FORMULA_MAX_EXPONENT
+from carbon_management_system.utils.exceptions import FormulaError
+
+
+def formula(expression, variables=("x", "y")):
+    return CalculationFormula("test", "测试公式", expression, {name: name for name in variables})
+
+
+def test_combustion_formula_evaluates_whole_columns():
+    compiled = FormulaLibrary().compiled("combustion")
+    activity = np.array([10.0, 20.0, np.nan])
+    result = compiled(activity=activity, ncv=20.0, carbon_content=0.026, oxidation_rate=np.array([0.98, 0.99, 1.0]))
+    np.testing.assert_allclose(result[:2], activity[:2] * 20.0 * 0.026 * np.array([0.98, 0.99]) * CO2_C_RATIO)
+    assert np.isnan(result[2])
+    assert set(compiled.variables) == {"activity", "ncv", "carbon_content", "oxidation_rate"}
+
+
+def test_integer_constants_evaluate_as_float():
+    compiled = compile_formula(formula("x ** 2 + y / 2 + where(x > 1, 7 / 2, -3)"))
+    np.testing.assert_allclose(compiled(x=np.array([1.0, 3.0]), y=3), [1 + 1.5 - 3, 9 + 1.5 + 3.5])
+
+
+@pytest.mark.parametrize("expression, message", [
+    ("x +", "语法错误"),
+    ("x.real", "不允许使用 Attribute"),
+    ("__import__('os')", "不支持的函数调用"),
+    ("x + 'a'", "只允许数值常量"),
+    ("x * True", "只允许数值常量"),
+    ("z + 1", "未声明的变量: z"),
+    ("sqrt(x, out=y)", "不支持的函数调用"),
+    ("0 < x < 1", "连续比较"),
+    ("10 ** 10 ** 10", "常量幂指数"),
+    ("x ** 100000", "常量幂指数"),
+    ("x ** -(65)", "常量幂指数"),
+    ("x ** (1 / 2)", "常量幂指数"),
+])
+def test_invalid_formula_is_rejected(expression, message):
+    with pytest.raises(FormulaError, match=message) as excinfo:
+        compile_formula(formula(expression))
+    assert excinfo.value.formula_code == "test"
+
+
+def test_exponents_within_bound_are_allowed():
+    compiled = compile_formula(formula(f"x ** {FORMULA_MAX_EXPONENT} + x ** -2 + x ** y + CO2_C_RATIO ** 2"))
+    np.testing.assert_allclose(compiled(x=np.array([1.0]), y=3.0), [1 + 1 + 1 + CO2_C_RATIO ** 2])
+
+
+@pytest.mark.parametrize("expression, inputs, message", [
+    ("x + y", {"x": np.ones(2), "y": np.ones(3)}, "求值失败"),
+    ("((2 ** 64) ** 64) ** 64", {}, "求值失败"),
+    ("x", {}, "缺少公式变量: x"),
+])
+def test_evaluation_errors_are_formula_errors(expression, inputs, message):
+    compiled = compile_formula(formula(expression))
+    with pytest.raises(FormulaError, match=message):
+        compiled(**inputs)
+
+
+def test_library_recompiles_only_new_versions():
+    library = FormulaLibrary()
+    library.save(formula("x + y"))
+    assert library.save(formula("x + y")).version == 1
+    saved = library.save(formula("x * y"))
+    assert saved.version == 2
+    assert library.evaluate("test", x=2.0, y=3.0) == 6.0
+    assert [key for key in library.cached_versions if key[0] == "test"] == [("test", 1), ("test", 2)]
+
+    with pytest.raises(FormulaError):
+        library.save(formula("0 < x < y"))
+    assert library.get("test").expression == "x * y"
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2025-05-08 00:09:43
+# @Author  : Your Name / Company Name
+# @Email   : your.email@example.com
+# @File    : test_historian_ingestion.py
+# @Software: PyCharm / VSCode
+# @Description: 历史库采集服务启停与写入失败处理的测试。
+
+# Python 标准库导入
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+
+# 第三方库导入
+import pytest
+
+# 项目内部模块导入
+from carbon_management_system.modules.data_acquisition.controllers import DataAcquisitionController
+from carbon_management_system.modules.data_acquisition.models import ActivityColumnStore
+from carbon_management_system.modules.data_acquisition.services import HistorianIngestionService, HistorianTag
+
+TAGS = [HistorianTag("FT-101", "P1", "U1", "coal")]
+
+
+class CountingClient:
+    """每次轮询返回一条读数。"""
+
+    def __init__(self):
+        self.polls = 0
+
+    async def poll(self):
+        self.polls += 1
+        return [("FT-101", datetime(2024, 1, 1) + timedelta(minutes=self.polls), 1.0)]
+
+
+class BlockingClient:
+    """轮询一直阻塞到 release 置位，模拟无响应的数据源。"""
+
+    def __init__(self):
+        self.polling = threading.Event()
+        self.release = threading.Event()
+
+    async def poll(self):
+        self.polling.set()
+        await asyncio.to_thread(self.release.wait)
+        return []
+
+
+class FailingStore(ActivityColumnStore):
+    def append(self, *columns):
+        raise OSError("disk full")
+
+
+def _service(store, clients, **options):
+    options = {"batch_size": 1, "flush_interval": 0.01, "poll_interval": 0.001, "max_pending": 2, **options}
+    return HistorianIngestionService(store, TAGS, clients, **options)
+
+
+def test_readings_are_written_until_stopped():
+    store = ActivityColumnStore()
+    service = _service(store, [CountingClient()])
+    thread = service.start_in_thread()
+    while len(store) < 5:
+        assert thread.is_alive()
+        thread.join(0.01)
+    service.stop(timeout=5)
+    assert not thread.is_alive()
+    assert service.error is None
+    assert service.stats.readings_written == len(store) == service.stats.readings_received
+
+
+def test_writer_failure_stops_pollers_and_is_raised():
+    clients = [CountingClient(), CountingClient()]
+    service = _service(FailingStore(), clients)
+    with pytest.raises(OSError, match="disk full"):
+        asyncio.run(asyncio.wait_for(service.run(), timeout=5))
+    assert isinstance(service.error, OSError)
+
+
+def test_writer_failure_in_thread_is_recorded():
+    service = _service(FailingStore(), [CountingClient()])
+    thread = service.start_in_thread()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert isinstance(service.error, OSError)
+
+
+def test_stop_before_event_loop_starts():
+    service = _service(ActivityColumnStore(), [CountingClient()])
+    service.stop()     # 尚未启动：不得阻塞
+    thread = service.start_in_thread()
+    service.stop(timeout=5)
+    assert not thread.is_alive()
+
+
+def test_restart_does_not_wait_for_an_unresponsive_source(caplog):
+    controller = DataAcquisitionController()
+    blocking = BlockingClient()
+    first = controller.start_historian_ingestion(TAGS, [blocking], poll_interval=0.001)
+    try:
+        assert blocking.polling.wait(5)
+        started = time.monotonic()
+        second = controller.start_historian_ingestion(TAGS, [CountingClient()], poll_interval=0.001)
+        assert time.monotonic() - started < 10
+        assert second is not first and first._thread.is_alive()
+        assert "未在" in caplog.text
+    finally:
+        blocking.release.set()
+        assert first.stop(timeout=5)
+        assert controller.stop_historian_ingestion(timeout=5) is None
+    assert controller._historian is None
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2025-05-08 00:09:43
+# @Author  : Your Name / Company Name
+# @Email   : your.email@example.com
+# @File    : test_incremental_calculation.py
+# @Software: PyCharm / VSCode
+# @Description: 增量重算与整体重建结果一致性的测试。
+
+# Python 标准库导入
+from datetime import datetime
+
+# 第三方库导入
+import numpy as np
+import pytest
+
+# 项目内部模块导入
+from carbon_management_system.modules.emission_calculation.controllers import EmissionCalculationController
+from carbon_management_system.modules.emission_calculation.services import IncrementalCombustionCalculator
+from carbon_management_system.tests.synthetic_fleet import FleetSpec, generate_fleet
+from carbon_management_system.utils.constants import PARAM_CARBON_CONTENT, PARAM_NCV, PARAM_OXIDATION_RATE
+
+
+@pytest.fixture
+def fleet():
+    return generate_fleet(FleetSpec(plants=2, units_per_plant=2, fuels=("coal", "gas"), freq_minutes=360))
+
+
+@pytest.fixture
+def calculator(fleet):
+    calculator = IncrementalCombustionCalculator(fleet.activity, fleet.parameters, "2024-01", 12,
+                                                 defaults=fleet.defaults)
+    yield calculator
+    calculator.close()
+
+
+def assert_matches_rebuild(calculator):
+    """增量结果与从存储全量重建的结果一致（增量累加与整体求和的顺序不同，只允许末位误差）。"""
+    expected = IncrementalCombustionCalculator(calculator.activity_store, calculator.parameter_store, "2024-01", 12,
+                                               defaults=calculator.defaults, subscribe=False)
+    assert calculator.cube.units == expected.cube.units
+    assert calculator.cube.fuels == expected.cube.fuels
+    for name in ("activity", "ncv", "carbon_content", "oxidation_rate", "emissions"):
+        np.testing.assert_allclose(getattr(calculator.cube, name), getattr(expected.cube, name), rtol=1e-12,
+                                   equal_nan=True, err_msg=name)
+    for name in ("unit_totals", "plant_totals", "group_totals"):
+        np.testing.assert_allclose(getattr(calculator, name), getattr(expected, name), rtol=1e-12, err_msg=name)
+
+
+def test_refresh_after_corrections_matches_rebuild(fleet, calculator):
+    activity_ids = fleet.activity.columns().row_id[::97]
+    fleet.activity.update_values(activity_ids, np.linspace(0.0, 50.0, len(activity_ids)))
+    parameter_view = fleet.parameters.columns()
+    parameter_ids = parameter_view.row_id[::13]
+    values = parameter_view.value[::13] * 1.05
+    values[::4] = np.nan   # 更正为缺测：均值改由其余化验值或缺省值决定
+    fleet.parameters.update_values(parameter_ids, values)
+
+    assert calculator.pending
+    stats = calculator.refresh()
+    assert not stats.full_rebuild and stats.dirty_cells > 0
+    assert not calculator.pending
+    assert_matches_rebuild(calculator)
+
+
+def test_refresh_after_default_change_matches_rebuild(calculator):
+    calculator.set_default(PARAM_NCV, "gas", 400.0)
+    calculator.set_default(PARAM_OXIDATION_RATE, "coal", 0.95)
+    stats = calculator.refresh()
+    assert not stats.full_rebuild and stats.dirty_cells > 0
+    assert_matches_rebuild(calculator)
+
+    # 删除缺省值后，缺少实测值的格子变为 NaN
+    calculator.set_default(PARAM_CARBON_CONTENT, "gas", None)
+    calculator.refresh()
+    assert np.isnan(calculator.cube.carbon_content[:, :, calculator.cube.fuels.index("gas")]).all()
+    assert_matches_rebuild(calculator)
+
+
+@pytest.mark.parametrize("plant_code, unit_code, fuel_type, quantity", [
+    ("P01", "U09", "coal", 10.0),    # 新机组
+    ("P03", "U01", "gas", 10.0),     # 新电厂
+    ("P01", "U01", "oil", 10.0),     # 新燃料
+    ("P01", "U09", "coal", 0.0),     # 数量为 0 的读数同样会让整体构建纳入新机组
+])
+def test_new_unit_or_fuel_triggers_full_rebuild(fleet, calculator, plant_code, unit_code, fuel_type, quantity):
+    calculator.set_default(PARAM_NCV, "oil", 42.6)
+    calculator.refresh()
+    fleet.activity.append([plant_code], [unit_code], [fuel_type], [datetime(2024, 3, 1)], [quantity])
+
+    assert calculator.pending
+    stats = calculator.refresh()
+    assert stats.full_rebuild
+    assert (plant_code, unit_code) in calculator.cube.units
+    assert fuel_type in calculator.cube.fuels
+    assert_matches_rebuild(calculator)
+
+
+def test_parameters_outside_cube_are_ignored_until_activity_arrives(fleet, calculator):
+    fleet.parameters.append(["P01"], ["U09"], ["coal"], [datetime(2024, 3, 1)], [PARAM_NCV], [25.0])
+    assert not calculator.pending
+    assert calculator.refresh().dirty_cells == 0
+    assert_matches_rebuild(calculator)
+
+    # 机组出现活动数据后整体重建，之前写入的化验值随之生效
+    fleet.activity.append(["P01"], ["U09"], ["coal"], [datetime(2024, 3, 1)], [10.0])
+    assert calculator.refresh().full_rebuild
+    u = calculator.cube.units.index(("P01", "U09"))
+    assert calculator.cube.ncv[u, 2, calculator.cube.fuels.index("coal")] == 25.0
+    assert_matches_rebuild(calculator)
+
+
+def test_activity_outside_months_is_ignored(fleet, calculator):
+    fleet.activity.append(["P01"], ["U09"], ["coal"], [datetime(2025, 3, 1)], [10.0])
+    assert not calculator.pending
+    assert_matches_rebuild(calculator)
+
+
+def test_fixed_point_controller_refuses_incremental_mode(fleet):
+    controller = EmissionCalculationController(fleet.activity, fleet.parameters, defaults=fleet.defaults,
+                                               fixed_point=True)
+    try:
+        with pytest.raises(ValueError, match="定点"):
+            controller.enable_incremental("2024-01", 12, auto_refresh=False)
+        assert controller.incremental is None
+        cube = controller.calculate_combustion("2024-01", 12, use_cache=False)
+        assert cube.fixed_point and cube.emissions_fixed is not None
+    finally:
+        controller.shutdown()
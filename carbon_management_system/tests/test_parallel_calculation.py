@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2025-05-08 00:09:43
+# @Author  : Your Name / Company Name
+# @Email   : your.email@example.com
+# @File    : test_parallel_calculation.py
+# @Software: PyCharm / VSCode
+# @Description: 并行分区核算与单进程核算逐位一致、定点汇总与分区方式无关的测试。
+
+# 第三方库导入
+import numpy as np
+import pytest
+
+# 项目内部模块导入
+from carbon_management_system.modules.data_acquisition.models import ActivityColumnStore, ParameterColumnStore
+from carbon_management_system.modules.emission_calculation.services import (
+    ParallelCalculationScheduler,
+    build_combustion_cube,
+    calculate_combustion,
+    fixed_point_totals,
+)
+from carbon_management_system.tests.synthetic_fleet import FleetSpec, generate_fleet
+
+CUBE_ARRAYS = ("activity", "ncv", "carbon_content", "oxidation_rate", "emissions")
+
+
+@pytest.fixture(scope="module")
+def fleet():
+    return generate_fleet(FleetSpec(plants=3, units_per_plant=2, fuels=("coal", "gas", "oil"), freq_minutes=240))
+
+
+def _serial(fleet, fixed_point):
+    cube = build_combustion_cube(fleet.activity.columns(), fleet.parameters.columns(), "2024-01", 12,
+                                 defaults=fleet.defaults, fixed_point=fixed_point)
+    calculate_combustion(cube)
+    return cube
+
+
+def _parallel(fleet, fixed_point, max_workers=1, partition_months=3):
+    scheduler = ParallelCalculationScheduler(fleet.activity, fleet.parameters, max_workers=max_workers,
+                                             partition_months=partition_months)
+    try:
+        return scheduler.run("2024-01", 12, defaults=fleet.defaults, fixed_point=fixed_point)
+    finally:
+        scheduler.close()
+
+
+def assert_identical(cube, expected):
+    assert cube.units == expected.units
+    assert cube.fuels == expected.fuels
+    np.testing.assert_array_equal(cube.months, expected.months)
+    for name in CUBE_ARRAYS + (("emissions_fixed",) if expected.fixed_point else ()):
+        # assert_array_equal 要求逐元素相等，不容许舍入误差
+        np.testing.assert_array_equal(getattr(cube, name), getattr(expected, name), err_msg=name)
+
+
+@pytest.mark.parametrize("fixed_point", [False, True])
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_parallel_matches_serial_bit_for_bit(fleet, max_workers, fixed_point):
+    assert_identical(_parallel(fleet, fixed_point, max_workers), _serial(fleet, fixed_point))
+
+
+@pytest.mark.parametrize("partition_months", [1, 5, 12])
+def test_fixed_point_totals_do_not_depend_on_partitioning(fleet, partition_months):
+    expected = _serial(fleet, fixed_point=True)
+    cube = _parallel(fleet, fixed_point=True, partition_months=partition_months)
+    for by in ("unit", "plant", "total"):
+        assert fixed_point_totals(cube, by) == fixed_point_totals(expected, by)
+
+
+def test_fixed_point_totals_do_not_depend_on_row_order(fleet):
+    """同样的读数以不同顺序、不同批次写入存储，定点汇总逐位相同。"""
+    activity, parameters = ActivityColumnStore(), ParameterColumnStore()
+    rng = np.random.default_rng(1)
+    for source, target, extra in ((fleet.activity, activity, ()), (fleet.parameters, parameters, ("parameter",))):
+        view = source.columns()
+        order = rng.permutation(len(view))
+        units = source.decode("unit", view.unit[order])
+        columns = [np.array([plant for plant, _unit in units]), np.array([unit for _plant, unit in units]),
+                   np.array(source.decode("fuel", view.fuel[order])), view.period[order]]
+        columns += [np.array(source.decode(name, getattr(view, name)[order])) for name in extra]
+        columns.append(getattr(view, source.VALUE_COLUMN)[order])
+        for chunk in np.array_split(np.arange(len(view)), 7):
+            target.append(*[column[chunk] for column in columns])
+
+    shuffled = build_combustion_cube(activity.columns(), parameters.columns(), "2024-01", 12,
+                                     defaults=fleet.defaults, fixed_point=True)
+    calculate_combustion(shuffled)
+    expected = _serial(fleet, fixed_point=True)
+    for by in ("unit", "plant", "total"):
+        assert fixed_point_totals(shuffled, by) == fixed_point_totals(expected, by)
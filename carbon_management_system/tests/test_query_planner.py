@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2025-05-08 00:09:43
+# @Author  : Your Name / Company Name
+# @Email   : your.email@example.com
+# @File    : test_query_planner.py
+# @Software: PyCharm / VSCode
+# @Description: 列式存储组合索引与查询计划的测试。
+
+# Python 标准库导入
+from datetime import datetime
+
+# 第三方库导入
+import numpy as np
+import pytest
+
+# 项目内部模块导入
+from carbon_management_system.modules.data_acquisition.services import ColumnStoreQueryService, QueryFilter
+from carbon_management_system.tests.synthetic_fleet import FleetSpec, generate_fleet
+
+
+@pytest.fixture
+def fleet():
+    return generate_fleet(FleetSpec(plants=3, units_per_plant=2, fuels=("coal", "gas"), freq_minutes=720))
+
+
+def expected_row_ids(view, store, query_filter):
+    """逐列掩码过滤得到的 row_id 集合，作为查询结果的对照。"""
+    codecs = store.codecs
+    mask = np.ones(len(view), dtype=bool)
+    if query_filter.plant_code:
+        mask &= view.plant == codecs["plant"].code_of(query_filter.plant_code)
+    if query_filter.unit_code:
+        units = [code for code, (plant, unit) in enumerate(codecs["unit"].labels)
+                 if unit == query_filter.unit_code and query_filter.plant_code in ("", plant)]
+        mask &= np.isin(view.unit, units)
+    if query_filter.fuel_type:
+        mask &= view.fuel == codecs["fuel"].code_of(query_filter.fuel_type)
+    if query_filter.start is not None:
+        mask &= view.period >= np.datetime64(query_filter.start, "s")
+    if query_filter.end is not None:
+        mask &= view.period < np.datetime64(query_filter.end, "s")
+    return np.sort(view.row_id[mask])
+
+
+FILTERS = [
+    (QueryFilter(), None),
+    (QueryFilter(plant_code="P02", unit_code="U01"), "clustered_plant_unit_period"),
+    (QueryFilter(plant_code="P02", start=datetime(2024, 3, 1), end=datetime(2024, 4, 1)), None),
+    (QueryFilter(fuel_type="gas", start=datetime(2024, 6, 1), end=datetime(2024, 6, 8)), "idx_fuel_period"),
+    (QueryFilter(unit_code="U02", fuel_type="coal"), None),
+    (QueryFilter(start=datetime(2024, 12, 31)), "idx_period"),
+]
+
+
+@pytest.mark.parametrize("query_filter, index_name", FILTERS)
+def test_query_matches_full_scan(fleet, query_filter, index_name):
+    service = ColumnStoreQueryService(fleet.activity)
+    result = service.query(query_filter)
+    view = fleet.activity.columns()
+    row_ids = [row_id for (row_id,) in result.fetch(0, len(result), ["row_id"])]
+    np.testing.assert_array_equal(np.sort(row_ids), expected_row_ids(view, fleet.activity, query_filter))
+    if index_name is not None:
+        assert result.plan.index.name == index_name
+    assert result.plan.result_rows == len(result) <= result.plan.estimated_rows
+
+
+def test_unknown_label_plans_an_empty_result(fleet):
+    plan = ColumnStoreQueryService(fleet.activity).explain(QueryFilter(fuel_type="oil"))
+    assert plan.empty_reason == "fuel=oil" and "空结果" in plan.explain()
+
+
+def test_index_follows_the_version_of_the_view(fleet):
+    store = fleet.activity
+    service = ColumnStoreQueryService(store)
+    query_filter = QueryFilter(fuel_type="gas", start=datetime(2024, 1, 1), end=datetime(2024, 1, 3))
+    old_view = store.columns()
+    store.append(["P01"] * 3, ["U01"] * 3, ["gas"] * 3,
+                 [datetime(2024, 1, 1, 5, 30), datetime(2024, 1, 2, 7), datetime(2025, 1, 1)], [1.0, 2.0, 3.0])
+    new_view = store.columns()
+    assert old_view.version < new_view.version == store.version
+
+    # 先用追加前取得的视图规划：索引按旧视图构建，不能被当作与存储当前版本一致
+    plan = service.planner.plan(query_filter, old_view)
+    positions = plan.index.positions(plan.lo, plan.hi)
+    np.testing.assert_array_equal(np.sort(old_view.row_id[positions]),
+                                  expected_row_ids(old_view, store, query_filter))
+
+    for view in (new_view, old_view, new_view):
+        plan = service.planner.plan(query_filter, view)
+        positions = plan.index.positions(plan.lo, plan.hi)
+        np.testing.assert_array_equal(np.sort(view.row_id[positions]), expected_row_ids(view, store, query_filter))
+    result = service.query(query_filter)
+    assert len(result) == len(expected_row_ids(new_view, store, query_filter))
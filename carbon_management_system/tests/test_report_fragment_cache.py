@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2025-05-08 00:09:43
+# @Author  : Your Name / Company Name
+# @Email   : your.email@example.com
+# @File    : test_report_fragment_cache.py
+# @Software: PyCharm / VSCode
+# @Description: 报告增量渲染（片段缓存）与完整生成逐字节一致的测试。
+
+# Python 标准库导入
+import json
+import os
+import threading
+
+# 第三方库导入
+import pytest
+
+# 项目内部模块导入
+from carbon_management_system.config.settings import REPORT_TEMPLATE_DIR
+from carbon_management_system.modules.emission_calculation.controllers import EmissionCalculationController
+from carbon_management_system.modules.emission_calculation.services import CalculationCache
+from carbon_management_system.modules.mrv_management.services import (
+    EmissionReportGenerator,
+    ReportFragmentCache,
+    ReportTemplateLibrary,
+    is_per_unit_source,
+)
+from carbon_management_system.tests.synthetic_fleet import FleetSpec, generate_fleet
+
+TEMPLATE = "annual_emission_report"
+
+
+@pytest.fixture
+def library(tmp_path):
+    """年报模板去掉生成时间，两次生成之间跨过整分钟也不影响逐字节比较。"""
+    with open(os.path.join(REPORT_TEMPLATE_DIR, TEMPLATE + ".json"), encoding="utf-8") as fh:
+        data = json.load(fh)
+    for section in data["sections"]:
+        if "text" in section:
+            section["text"] = section["text"].replace("本报告生成于 {generated_at}。", "")
+    template_dir = tmp_path / "templates"
+    template_dir.mkdir()
+    (template_dir / (TEMPLATE + ".json")).write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    return ReportTemplateLibrary(str(template_dir))
+
+
+@pytest.fixture
+def fleet():
+    return generate_fleet(FleetSpec(plants=2, units_per_plant=2, fuels=("coal", "gas"), freq_minutes=720))
+
+
+def render(generator, cube, path):
+    stats = generator.render(TEMPLATE, cube, str(path), "测试电力", 2024)
+    return stats, path.read_bytes()
+
+
+def test_regeneration_after_correction_is_byte_identical(fleet, library, tmp_path):
+    calculation = EmissionCalculationController(fleet.activity, fleet.parameters, defaults=fleet.defaults,
+                                                calculation_cache=CalculationCache(str(tmp_path / "cache")))
+    cache = ReportFragmentCache(str(tmp_path / "fragments"))
+    incremental = EmissionReportGenerator(library, cache)
+    full = EmissionReportGenerator(library)
+    try:
+        cube = calculation.combustion_cube("2024-01", 12)
+        first, first_bytes = render(incremental, cube, tmp_path / "first.html")
+        assert first.fragments_reused == 0 and first.fragments_rendered > 0
+
+        again, again_bytes = render(incremental, cube, tmp_path / "again.html")
+        assert again_bytes == first_bytes
+        assert again.fragments_rendered == 0 and again.fragments_reused == first.fragments_rendered
+
+        # 更正 P01/U01 一条读数：只有该机组的明细片段和受影响的汇总片段需要重新渲染
+        view = fleet.activity.slice("P01", "U01")
+        fleet.activity.update_values(view.row_id[100:101], [view.quantity[100] + 50.0])
+        cube = calculation.combustion_cube("2024-01", 12)
+        corrected, corrected_bytes = render(incremental, cube, tmp_path / "corrected.html")
+        _stats, expected_bytes = render(full, cube, tmp_path / "full.html")
+        assert corrected_bytes == expected_bytes != first_bytes
+    finally:
+        calculation.shutdown()
+
+    template = library.get(TEMPLATE)
+    detail = [i for i, section in enumerate(template.sections) if section.rows and is_per_unit_source(section.rows)]
+    headings = [i for i, section in enumerate(template.sections) if section.type == "heading"]
+    assert set(detail) <= set(corrected.dirty_sections)
+    assert not set(headings) & set(corrected.dirty_sections)
+    # 每个脏段落只重新渲染一个片段：明细表中其余机组与表头均取自缓存
+    assert corrected.fragments_rendered == len(corrected.dirty_sections)
+    assert corrected.fragments_reused == first.fragments_rendered - corrected.fragments_rendered
+
+
+def test_cache_counts_hits_and_misses_across_threads(tmp_path):
+    cache = ReportFragmentCache(str(tmp_path))
+    cache.put("ab" + "0" * 30, b"fragment")
+    barrier = threading.Barrier(8)
+
+    def reader(index):
+        barrier.wait()
+        for _ in range(200):
+            cache.get("ab" + "0" * 30 if index % 2 else "cd" + "0" * 30)
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (800, 800, 1)
+
+
+def test_evict_removes_least_recently_used_fragments(tmp_path):
+    cache = ReportFragmentCache(str(tmp_path), max_bytes=250)
+    keys = [f"{i:02d}" + "0" * 30 for i in range(3)]
+    for i, key in enumerate(keys):
+        path = cache.put(key, bytes(100))
+        os.utime(path, (1_000_000 + i, 1_000_000 + i))
+    assert cache.get(keys[0]) == bytes(100)      # 命中刷新修改时间，变为最近使用
+    assert cache.evict() == 1
+    assert cache.get(keys[1]) is None and cache.get(keys[2]) is not None
+    assert cache.size() == 200
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2025-05-08 00:09:43
+# @Author  : Your Name / Company Name
+# @Email   : your.email@example.com
+# @File    : test_report_generation.py
+# @Software: PyCharm / VSCode
+# @Description: 报告模板解析、流式 HTML 输出与后台报告生成的测试。
+
+# Python 标准库导入
+import json
+import os
+import threading
+import time
+
+# 第三方库导入
+import pytest
+
+# PyQt5 相关导入
+from PyQt5.QtCore import QCoreApplication, QEventLoop
+
+# 项目内部模块导入
+from carbon_management_system.modules.emission_calculation.controllers import EmissionCalculationController
+from carbon_management_system.modules.emission_calculation.services import CalculationCache
+from carbon_management_system.modules.mrv_management.controllers import EmissionReportController
+from carbon_management_system.modules.mrv_management.services import (
+    EmissionReportGenerator,
+    ReportTemplateLibrary,
+    parse_template,
+)
+from carbon_management_system.tests.synthetic_fleet import FleetSpec, generate_fleet
+from carbon_management_system.utils.exceptions import ReportCancelledError, ReportGenerationError
+
+TABLE = {"type": "table", "title": "机组", "rows": "unit_month_fuel",
+         "columns": [{"field": "unit_code"}, {"field": "emission_tco2", "format": ",.3f"}]}
+
+
+@pytest.fixture(scope="module")
+def fleet():
+    return generate_fleet(FleetSpec(plants=2, units_per_plant=2, fuels=("coal", "gas"), freq_minutes=720))
+
+
+@pytest.fixture
+def calculation(fleet, tmp_path):
+    controller = EmissionCalculationController(fleet.activity, fleet.parameters, defaults=fleet.defaults,
+                                               calculation_cache=CalculationCache(str(tmp_path / "cache")))
+    yield controller
+    controller.shutdown()
+
+
+def test_shipped_templates_parse_once_until_modified(tmp_path):
+    library = ReportTemplateLibrary()
+    assert {"annual_emission_report", "monthly_emission_report"} <= set(library.names())
+    for name in library.names():
+        assert library.get(name).sections
+
+    path = tmp_path / "brief.json"
+    path.write_text(json.dumps({"title": "{organization}", "sections": [TABLE]}), encoding="utf-8")
+    library = ReportTemplateLibrary(str(tmp_path))
+    first = library.get("brief")
+    assert library.get("brief") is first and library.parse_count == 1
+
+    path.write_text(json.dumps({"title": "{year}", "sections": [TABLE, TABLE]}), encoding="utf-8")
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+    assert len(library.get("brief").sections) == 2 and library.parse_count == 2
+
+
+@pytest.mark.parametrize("data, message", [
+    ({"period": "week"}, "报告期类型"),
+    ({"title": "{owner}"}, "未知字段"),
+    ({"title": "{organization"}, "格式错误"),
+    ({"sections": [{"type": "list"}]}, "未知的段落类型"),
+    ({"sections": [dict(TABLE, rows="site")]}, "未知的表格行来源"),
+    ({"sections": [dict(TABLE, columns=[{"field": "ncv"}], rows="plant")]}, "没有字段 'ncv'"),
+    ({"sections": [dict(TABLE, columns=[])]}, "没有定义列"),
+    ({"sections": [{"type": "chart", "rows": "unit_month", "label": "unit_code", "value": "emission_tco2"}]},
+     "只支持汇总类行来源"),
+    ({"sections": [{"type": "paragraph", "text": "{total_emissions:,.3f} {plants}"}]}, "未知字段"),
+])
+def test_invalid_template_is_rejected(data, message):
+    with pytest.raises(ReportGenerationError, match=message):
+        parse_template(data, "bad")
+
+
+def test_html_report_streams_every_row(calculation, tmp_path):
+    cube = calculation.combustion_cube("2024-01", 12)
+    path = str(tmp_path / "annual.html")
+    progress = []
+    stats = EmissionReportGenerator(chunk_size=7).render(
+        "annual_emission_report", cube, path, "测试电力", 2024, progress_callback=lambda *p: progress.append(p))
+
+    with open(path, encoding="utf-8") as fh:
+        text = fh.read()
+    header_rows = text.count("<thead>")
+    assert text.startswith("<!DOCTYPE html>") and text.endswith("</body></html>\n")
+    assert "测试电力2024年度" in text
+    assert text.count("<tr>") - header_rows == stats.rows > 0
+    assert progress[-1] == (stats.rows, stats.rows)
+    assert all(b[0] - a[0] >= 7 for a, b in zip(progress, progress[1:-1]))
+    assert stats.bytes_written == os.path.getsize(path)
+    assert not os.path.exists(path + ".part")
+
+
+def test_monthly_report_covers_one_month(calculation, tmp_path):
+    cube = calculation.combustion_cube("2024-01", 12)
+    generator = EmissionReportGenerator()
+    with pytest.raises(ReportGenerationError, match="指定月份"):
+        generator.render("monthly_emission_report", cube, str(tmp_path / "m.html"), year=2024)
+    with pytest.raises(ReportGenerationError, match="不覆盖报告期"):
+        generator.render("monthly_emission_report", cube, str(tmp_path / "m.html"), year=2025, month=1)
+
+    stats = generator.render("monthly_emission_report", cube, str(tmp_path / "m.html"), year=2024, month=3)
+    units_fuels = len(cube.units) * len(cube.fuels)
+    assert stats.period_label == "2024年3月" and stats.rows <= 2 + 2 + units_fuels
+
+
+def test_cancelled_report_leaves_no_file(calculation, tmp_path):
+    cube = calculation.combustion_cube("2024-01", 12)
+    cancel = threading.Event()
+    cancel.set()
+    path = str(tmp_path / "annual.html")
+    with pytest.raises(ReportCancelledError):
+        EmissionReportGenerator().render("annual_emission_report", cube, path, year=2024, cancel_event=cancel)
+    assert os.listdir(tmp_path) == ["cache"]
+
+
+@pytest.fixture(scope="session")
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+def run_report(app, controller, *args, **kwargs):
+    results, running_at_connect = {"finished": [], "failed": []}, []
+
+    def connect(worker):
+        thread, _worker = controller._jobs[id(worker)]
+        running_at_connect.append(thread.isRunning())
+        worker.finished.connect(results["finished"].append)
+        worker.failed.connect(results["failed"].append)
+
+    controller.start_report(*args, connect=connect, **kwargs)
+    deadline = time.monotonic() + 60
+    while controller._jobs and time.monotonic() < deadline:
+        app.processEvents(QEventLoop.AllEvents, 50)
+    app.processEvents()
+    assert not controller._jobs and running_at_connect == [False]
+    return results
+
+
+def test_background_report_does_not_touch_shown_result(app, calculation, tmp_path):
+    shown = calculation.calculate_combustion("2024-07", 3, use_cache=False)
+    controller = EmissionReportController(calculation, incremental=False)
+
+    results = run_report(app, controller, "annual_emission_report", str(tmp_path / "annual.html"), 2024)
+    assert len(results["finished"]) == 1 and not results["failed"]
+    assert calculation.last_cube is shown
+
+    results = run_report(app, controller, "monthly_emission_report", str(tmp_path / "monthly.html"), 2024)
+    assert not results["finished"] and len(results["failed"]) == 1 and "指定月份" in results["failed"][0]
+    assert calculation.last_cube is shown
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2025-05-08 00:09:43
+# @Author  : Your Name / Company Name
+# @Email   : your.email@example.com
+# @File    : test_time_rollup.py
+# @Software: PyCharm / VSCode
+# @Description: 日/月/年物化汇总随写入与更正增量更新的测试。
+
+# Python 标准库导入
+from datetime import datetime
+
+# 第三方库导入
+import numpy as np
+import pytest
+
+# 项目内部模块导入
+from carbon_management_system.modules.data_acquisition.models import ActivityColumnStore
+from carbon_management_system.modules.data_acquisition.services import TimeRollupService
+from carbon_management_system.tests.synthetic_fleet import FleetSpec, generate_fleet
+
+
+@pytest.fixture
+def store():
+    store = ActivityColumnStore()
+    store.append(
+        ["P1", "P1", "P1", "P1", "P2"], ["U1", "U1", "U2", "U1", "U1"], ["coal", "coal", "coal", "gas", "coal"],
+        [datetime(2024, 1, 1, 8), datetime(2024, 1, 2, 8), datetime(2024, 2, 1, 8), datetime(2024, 1, 1, 9),
+         datetime(2024, 1, 1, 8)],
+        [10.0, 20.0, 5.0, 3.0, 7.0],
+    )
+    return store
+
+
+def assert_matches_rebuild(rollup):
+    rebuilt = TimeRollupService(rollup.store, subscribe=False)
+    for plant_code, unit_code in rollup.store.codecs["unit"].labels:
+        for scope_unit in (None, unit_code):
+            for fuel_type in rollup.fuels(plant_code, scope_unit):
+                for granularity in rollup.granularities:
+                    actual = rollup.series(granularity, plant_code, scope_unit, fuel_type)
+                    expected = rebuilt.series(granularity, plant_code, scope_unit, fuel_type)
+                    np.testing.assert_array_equal(actual[0], expected[0])
+                    np.testing.assert_allclose(actual[1], expected[1], rtol=1e-12)
+                    np.testing.assert_array_equal(actual[2], expected[2])
+
+
+def test_series_are_kept_per_fuel(store):
+    rollup = TimeRollupService(store)
+    assert rollup.fuels("P1") == ["coal", "gas"] and rollup.fuels("P1", "U2") == ["coal"]
+
+    buckets, totals, counts = rollup.series("month", "P1", fuel_type="coal")
+    np.testing.assert_array_equal(buckets, np.array(["2024-01", "2024-02"], dtype="datetime64[M]"))
+    assert totals.tolist() == [30.0, 5.0] and counts.tolist() == [2, 1]
+    assert rollup.total("day", "P1", "U1", "coal", start=datetime(2024, 1, 2)) == 20.0
+    assert rollup.total("year", "P1", fuel_type="gas") == 3.0
+    assert rollup.total("year", "P3", fuel_type="coal") == 0.0
+    assert rollup.total("year", "P1", fuel_type="oil") == 0.0
+
+
+@pytest.mark.parametrize("fuel_type", ["", None])
+def test_series_without_fuel_is_refused(store, fuel_type):
+    rollup = TimeRollupService(store)
+    with pytest.raises(ValueError, match="计量单位"):
+        rollup.series("month", "P1", fuel_type=fuel_type)
+    with pytest.raises(ValueError, match="粒度"):
+        rollup.series("hour", "P1", fuel_type="coal")
+
+
+def test_appends_and_corrections_update_incrementally(store):
+    rollup = TimeRollupService(store)
+    store.append(["P1", "P1"], ["U1", "U3"], ["coal", "gas"], [datetime(2024, 3, 5), datetime(2024, 3, 6)],
+                 [np.nan, 4.0])
+    coal = store.columns()
+    coal_rows = coal.row_id[coal.fuel == store.codecs["fuel"].code_of("coal")]
+    store.update_values(coal_rows[:2], [np.nan, 1.5])
+
+    assert rollup.fuels("P1", "U3") == ["gas"]
+    assert_matches_rebuild(rollup)
+    # NaN 不计入合计与读数数：P1 的 coal 读数为 NaN、1.5、5.0 与新增的 NaN
+    _buckets, totals, counts = rollup.series("year", "P1", fuel_type="coal")
+    assert totals.tolist() == [6.5] and counts.tolist() == [2]
+
+
+def test_synthetic_fleet_totals_match_raw_readings():
+    fleet = generate_fleet(FleetSpec(plants=2, units_per_plant=2, fuels=("coal", "gas"), freq_minutes=720))
+    rollup = TimeRollupService(fleet.activity, subscribe=False)
+    view = fleet.activity.slice(plant="P01")
+    for fuel_type in rollup.fuels("P01"):
+        expected = np.nansum(view.quantity[view.fuel == fleet.activity.codecs["fuel"].code_of(fuel_type)])
+        assert rollup.total("year", "P01", fuel_type=fuel_type) == pytest.approx(expected, rel=1e-12)
+        months = rollup.series("month", "P01", fuel_type=fuel_type)[1]
+        assert months.sum() == pytest.approx(expected, rel=1e-12)
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2025-05-08 00:09:43
+# @Author  : Your Name / Company Name
+# @Email   : your.email@example.com
+# @File    : test_uncertainty.py
+# @Software: PyCharm / VSCode
+# @Description: 蒙特卡洛不确定性分析流式统计的测试。
+
+# Python 标准库导入
+import tracemalloc
+
+# 第三方库导入
+import numpy as np
+import pytest
+
+# 项目内部模块导入
+from carbon_management_system.modules.emission_calculation.models import UncertaintySpec
+from carbon_management_system.modules.emission_calculation.services import (
+    _StreamingSummary,
+    _uncertainty_draws,
+    build_combustion_cube,
+    calculate_combustion,
+    monte_carlo_uncertainty,
+)
+from carbon_management_system.tests.synthetic_fleet import FleetSpec, generate_fleet
+
+
+@pytest.fixture(scope="module")
+def cube():
+    fleet = generate_fleet(FleetSpec(plants=3, units_per_plant=4, fuels=("coal", "gas"), freq_minutes=720))
+    cube = build_combustion_cube(fleet.activity.columns(), fleet.parameters.columns(), "2024-01", 12,
+                                 defaults=fleet.defaults)
+    calculate_combustion(cube)
+    return cube
+
+
+def test_streaming_statistics_match_exact_statistics(cube):
+    draws, chunk_size, seed = 40_000, 7_000, 3
+    result = monte_carlo_uncertainty(cube, draws=draws, chunk_size=chunk_size, seed=seed)
+
+    # 用同一抽样序列保留全部结果，按定义直接计算
+    unit_totals = np.concatenate(list(_uncertainty_draws(cube, UncertaintySpec(), draws, chunk_size, seed)))
+    totals = unit_totals.sum(axis=1)
+    np.testing.assert_allclose(result.unit_mean, unit_totals.mean(axis=0), rtol=1e-12)
+    np.testing.assert_allclose(result.unit_std, unit_totals.std(axis=0), rtol=1e-9)
+    assert result.total_mean == pytest.approx(totals.mean(), rel=1e-12)
+    assert result.total_std == pytest.approx(totals.std(), rel=1e-9)
+    # 直方图分位数与精确分位数之差远小于标准差
+    exact = np.percentile(unit_totals, (2.5, 97.5), axis=0).T
+    assert np.all(np.abs(result.unit_interval - exact) < 0.01 * unit_totals.std(axis=0)[:, None])
+    exact_total = np.percentile(totals, (2.5, 97.5))
+    assert np.all(np.abs(np.array(result.total_interval) - exact_total) < 0.01 * totals.std())
+    assert result.plant_interval.shape == (3, 2)
+
+
+def test_results_are_reproducible(cube):
+    first = monte_carlo_uncertainty(cube, draws=5_000, chunk_size=1_000, seed=11)
+    second = monte_carlo_uncertainty(cube, draws=5_000, chunk_size=1_000, seed=11)
+    np.testing.assert_array_equal(first.unit_interval, second.unit_interval)
+    assert first.total_interval == second.total_interval
+
+
+def test_intervals_do_not_depend_on_chunk_size(cube):
+    draws = 20_000
+    whole = monte_carlo_uncertainty(cube, draws=draws, chunk_size=draws, seed=5)
+    for chunk_size in (1, 7, 333):
+        chunked = monte_carlo_uncertainty(cube, draws=draws, chunk_size=chunk_size, seed=5)
+        np.testing.assert_allclose(chunked.unit_interval, whole.unit_interval, rtol=1e-9)
+        np.testing.assert_allclose(chunked.plant_interval, whole.plant_interval, rtol=1e-9)
+        np.testing.assert_allclose(chunked.total_interval, whole.total_interval, rtol=1e-9)
+        assert chunked.total_std == pytest.approx(whole.total_std, rel=1e-9)
+    low, high = whole.total_interval
+    assert low < whole.total_mean < high
+    assert 0.01 < (high - low) / whole.total_mean < 0.2
+
+
+def test_histogram_widens_instead_of_clipping():
+    rng = np.random.default_rng(0)
+    values = rng.normal(100.0, 10.0, size=(50_000, 1))
+    # 初始范围故意取得极窄且偏离中心，之后逐条写入
+    summary = _StreamingSummary([150.0], [0.001], bins=512)
+    for lo in range(0, len(values), 1_000):
+        summary.update(values[lo:lo + 1_000])
+    exact = np.percentile(values[:, 0], (2.5, 50, 97.5))
+    np.testing.assert_allclose(summary.percentiles((2.5, 50, 97.5))[0], exact, atol=0.5)
+    assert summary._histogram.sum() == len(values)
+
+
+def test_memory_does_not_grow_with_draws(cube):
+    def peak(draws):
+        tracemalloc.start()
+        try:
+            monte_carlo_uncertainty(cube, draws=draws, chunk_size=2_000, seed=0)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    assert peak(100_000) < 1.5 * peak(10_000)
+
+
+def test_zero_emission_unit(cube):
+    cube.emissions[0] = 0.0
+    try:
+        result = monte_carlo_uncertainty(cube, draws=2_000, chunk_size=500, seed=0)
+    finally:
+        calculate_combustion(cube)
+    assert result.unit_mean[0] == 0.0 and result.unit_std[0] == 0.0
+    np.testing.assert_array_equal(result.unit_interval[0], [0.0, 0.0])
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2025-05-08 00:09:43
+# @Author  : Your Name / Company Name
+# @Email   : your.email@example.com
+# @File    : test_validation_rules.py
+# @Software: PyCharm / VSCode
+# @Description: 批量校验规则引擎（范围、环比、一致性、完整性与导入分块校验）的测试。
+
+# Python 标准库导入
+from datetime import datetime, timedelta
+
+# 第三方库导入
+import numpy as np
+import pytest
+
+# 项目内部模块导入
+from carbon_management_system.modules.data_acquisition.models import (
+    RULE_TARGET_PARAMETER,
+    RULE_TYPE_COMPLETENESS,
+    RULE_TYPE_CONSISTENCY,
+    RULE_TYPE_JUMP,
+    RULE_TYPE_RANGE,
+    ActivityColumnStore,
+    ActivityData,
+    ParameterColumnStore,
+    ValidationRule,
+)
+from carbon_management_system.modules.data_acquisition.services import ValidationRuleEngine
+
+
+def activity_store(units, fuels, periods, quantities):
+    store = ActivityColumnStore()
+    store.append(["P1"] * len(units), units, fuels, periods, quantities)
+    return store
+
+
+def test_range_rules_respect_fuel_scope_and_enabled_flag():
+    store = activity_store(["U1", "U1", "U1", "U2"], ["coal", "coal", "coal", "gas"],
+                           [datetime(2024, 1, d) for d in (1, 2, 3, 1)], [10.0, 80.0, -1.0, 60.0])
+    engine = ValidationRuleEngine([
+        ValidationRule(1, "消耗量范围", RULE_TYPE_RANGE, params={"min_value": 0, "max_value": 70}),
+        ValidationRule(2, "天然气上限", RULE_TYPE_RANGE, fuel_type="gas", params={"max_value": 50}),
+        ValidationRule(3, "燃油上限", RULE_TYPE_RANGE, fuel_type="oil", params={"max_value": 0}),
+        ValidationRule(4, "已停用", RULE_TYPE_RANGE, params={"max_value": 5}, enabled=False),
+    ])
+    report = engine.validate(store.columns())
+    assert report.rows_checked == 4 and len(engine.rules) == 4
+    assert {rule_id: rows.tolist() for rule_id, rows in report.by_rule().items()} == {1: [1, 2], 2: [3]}
+    assert report.violating_rows().tolist() == [1, 2, 3]
+
+    # 同一组已编译规则可直接用于切片视图，返回的是切片内的行下标
+    report = engine.validate(store.slice("P1", "U1"))
+    assert report.rows_checked == 3 and report.violating_rows().tolist() == [1, 2]
+
+
+def test_jump_flags_only_consecutive_months_of_the_same_series():
+    periods = [datetime(2024, 1, 1), datetime(2024, 1, 2), datetime(2024, 2, 1), datetime(2024, 2, 2),
+               datetime(2024, 3, 1), datetime(2024, 5, 1), datetime(2024, 1, 1), datetime(2024, 2, 1)]
+    store = activity_store(["U1"] * 6 + ["U2"] * 2, ["coal"] * 8, periods,
+                           [10.0, 10.0, 15.0, 15.0, 31.0, 100.0, 30.0, 10.0])
+    engine = ValidationRuleEngine([ValidationRule(1, "月度环比", RULE_TYPE_JUMP, params={"max_change_ratio": 0.3})])
+    # U1：1 月 20 -> 2 月 30 超限（整月两行都计入），3 月 31 未超限，5 月与 3 月不相邻；
+    # U2：1 月 30 -> 2 月 10 超限，与 U1 的序列互不影响
+    assert engine.validate(store.columns()).violating_rows().tolist() == [2, 3, 7]
+
+
+def test_completeness_flags_missing_values_and_gaps_within_a_series():
+    start = datetime(2024, 1, 1)
+    hours = [0, 1, 3, 4, 0, 1]
+    store = activity_store(["U1"] * 4 + ["U2"] * 2, ["coal"] * 6, [start + timedelta(hours=h) for h in hours],
+                           [1.0, 1.0, 1.0, np.nan, 1.0, 1.0])
+    engine = ValidationRuleEngine([ValidationRule(1, "完整性", RULE_TYPE_COMPLETENESS,
+                                                  params={"max_gap_hours": 1})])
+    # 断档记在断档之后的第一条读数上；跨序列的时间回退不算断档
+    assert engine.validate(store.columns()).violating_rows().tolist() == [2, 3]
+
+
+def test_parameter_view_runs_consistency_and_parameter_rules_only():
+    store = ParameterColumnStore()
+    days = [datetime(2024, 1, d) for d in (1, 2, 3, 4)]
+    store.append(["P1"] * 3, ["U1"] * 3, ["coal"] * 3, days[:3], ["ncv"] * 3, [20.0, 20.0, 0.0])
+    store.append(["P1"] * 4, ["U1"] * 4, ["coal"] * 4, days, ["carbon_content"] * 4, [0.52, 0.7, 0.5, 9.0])
+    engine = ValidationRuleEngine([
+        ValidationRule(1, "含碳量/热值一致性", RULE_TYPE_CONSISTENCY, target=RULE_TARGET_PARAMETER,
+                       params={"numerator": "carbon_content", "denominator": "ncv",
+                               "min_ratio": 0.024, "max_ratio": 0.029}),
+        ValidationRule(2, "热值范围", RULE_TYPE_RANGE, target=RULE_TARGET_PARAMETER, parameter_type="ncv",
+                       params={"min_value": 15}),
+        ValidationRule(3, "活动数据范围", RULE_TYPE_RANGE, params={"max_value": 0}),
+    ])
+    view = store.columns()
+    by_rule = engine.validate(view).by_rule()
+    # 视图按序列与时间排序，违规行下标换算回 row_id（追加顺序）再比较：
+    # 第 2 天比值超限、第 3 天热值为 0 比值非有限；第 4 天没有对应热值，不参与比较
+    assert {rule_id: sorted(view.row_id[rows].tolist()) for rule_id, rows in by_rule.items()} == {
+        1: [1, 2, 4, 5], 2: [2]}
+
+
+def test_unknown_rule_type_is_rejected():
+    with pytest.raises(ValueError, match="未知的校验规则类型"):
+        ValidationRuleEngine([ValidationRule(1, "未知", "median")])
+
+
+def test_import_validator_checks_single_row_rules():
+    engine = ValidationRuleEngine([
+        ValidationRule(7, "燃煤上限", RULE_TYPE_RANGE, fuel_type="coal", params={"max_value": 70}),
+        ValidationRule(8, "月度环比", RULE_TYPE_JUMP, params={"max_change_ratio": 0.0}),
+    ])
+    validate_chunk = engine.import_validator()
+    records = [(line_no, ActivityData("P1", "U1", fuel, datetime(2024, 1, 1), quantity))
+               for line_no, fuel, quantity in ((2, "coal", 10.0), (3, "coal", -1.0), (4, "coal", np.nan),
+                                               (5, "coal", 80.0), (6, "gas", 80.0))]
+    valid, errors = validate_chunk(records)
+    assert [record.quantity for record in valid] == [10.0, 80.0]
+    assert [(error.line_no, error.message) for error in errors] == [
+        (3, "活动数据不能为负"), (4, "数值非有限值"), (5, "违反校验规则 #7")]
+    assert validate_chunk([]) == ([], [])
@@ -6,17 +6,102 @@
 # @Software: PyCharm / VSCode
 # @Description: 定义项目中使用的全局常量，如枚举值、固定字符串、配置键名等。
 
-# Python 标准库导入
-import sys
-import os
+# ---------------------------------------------------------------------------
+# 数据采集与导入
+# ---------------------------------------------------------------------------
 
-# PyQt5 相关导入 (根据实际需要调整)
-# from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel
-# from PyQt5.QtCore import Qt, pyqtSignal, QObject
+# 流式导入时每个分块的行数：单块在内存中校验、写入后才读取下一块
+DEFAULT_IMPORT_CHUNK_SIZE = 50_000
 
-# 项目内部模块导入 (示例)
-# from ..core.base_controller import BaseController
-# from ...utils.logger_setup import logger
+# 导入过程中最多保留的行级错误条数，超出部分只计数不保存，保证内存有界
+MAX_IMPORT_ERRORS_KEPT = 1000
 
+# 支持流式导入的文件类型
+SUPPORTED_IMPORT_SUFFIXES = (".csv", ".xlsx", ".xlsm")
 
-pass # 请在此处实现具体功能
+# 内容寻址存储计算分块哈希时的分块大小（字节）
+DOCUMENT_HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Parquet 导出时每个行组的行数；读取时按行组统计信息做谓词下推
+PARQUET_ROW_GROUP_SIZE = 1_000_000
+
+# 支持的列式交换格式
+COLUMNAR_EXPORT_SUFFIXES = (".parquet", ".arrow", ".feather")
+
+# 在界面线程中停止历史库采集时等待采集线程退出的最长秒数，超时后线程在后台继续收尾
+HISTORIAN_STOP_TIMEOUT = 2.0
+
+# ---------------------------------------------------------------------------
+# 排放核算
+# ---------------------------------------------------------------------------
+
+# CO2 与 C 的分子量之比
+CO2_C_RATIO = 44.0 / 12.0
+
+# 核算公式中常量幂指数的绝对值上限（如 10**10**10 这类表达式在编译时即被拒绝）
+FORMULA_MAX_EXPONENT = 64
+
+# 燃料燃烧排放计算所需的参数类型（与参数数据中的 parameter_type 一致）
+PARAM_NCV = "ncv"                        # 低位发热量，GJ/t 或 GJ/万Nm3
+PARAM_CARBON_CONTENT = "carbon_content"  # 单位热值含碳量，tC/GJ
+PARAM_OXIDATION_RATE = "oxidation_rate"  # 碳氧化率，0~1
+COMBUSTION_PARAMETERS = (PARAM_NCV, PARAM_CARBON_CONTENT, PARAM_OXIDATION_RATE)
+
+# 未指定所属集团的电厂归入的默认集团
+DEFAULT_PLANT_GROUP = "ALL"
+
+# 排放因子库：未找到地方因子时回退到的全国缺省管辖区，以及查询缓存容量
+DEFAULT_JURISDICTION = "CN"
+FACTOR_LOOKUP_CACHE_SIZE = 4096
+
+# 并行核算：每个分区覆盖的月数，以及每个工作进程最多排队的分区数
+CALCULATION_PARTITION_MONTHS = 3
+CALCULATION_TASKS_PER_WORKER = 2
+
+# 蒙特卡洛不确定性分析：默认抽样次数、每批抽样次数、估计分位数的直方图分箱数与置信水平
+MONTE_CARLO_DRAWS = 100_000
+MONTE_CARLO_CHUNK_SIZE = 10_000
+MONTE_CARLO_HISTOGRAM_BINS = 2048
+UNCERTAINTY_CONFIDENCE = 0.95
+
+# 核算结果磁盘缓存的容量上限；缓存格式变化时递增版本号，使旧缓存自然失效
+CALCULATION_CACHE_MAX_BYTES = 512 * 1024 * 1024
+CALCULATION_CACHE_FORMAT = 1
+
+# 定点数核算模式的小数位数（以 int64 保存 值 × 10^位数，舍入方式为四舍六入五成双）
+FIXED_POINT_ACTIVITY_DECIMALS = 3     # 活动数据，t 或 万Nm3 精确到 0.001
+FIXED_POINT_PARAMETER_DECIMALS = 8    # 低位发热量、含碳量、氧化率
+FIXED_POINT_EMISSION_DECIMALS = 6     # 排放量，tCO2 精确到 1 g
+
+# ---------------------------------------------------------------------------
+# MRV 报告
+# ---------------------------------------------------------------------------
+
+# 报告模板文件后缀
+REPORT_TEMPLATE_SUFFIX = ".json"
+
+# 报告表格按块生成行：每块内向量化取值、格式化，再逐行写出
+REPORT_ROW_CHUNK_SIZE = 4096
+
+# 支持的报告输出格式
+REPORT_FORMATS = ("html", "xlsx")
+
+# 报告片段缓存的容量上限；片段格式变化时递增版本号，使旧片段自然失效
+REPORT_FRAGMENT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+REPORT_FRAGMENT_FORMAT = 1
+
+# DQCP 版本库：每隔多少个版本保存一次完整快照（还原任一版本最多回放 间隔-1 个增量），
+# 增量压缩后超过快照压缩后大小的该比例时直接改存快照；以及已还原版本的缓存条数
+DQCP_SNAPSHOT_INTERVAL = 16
+DQCP_SNAPSHOT_DELTA_RATIO = 0.5
+DQCP_VERSION_CACHE_SIZE = 64
+
+# 合规日历：按月缓存的到期日展开结果条数（约两年），以及列出未完成提醒时回溯的天数
+COMPLIANCE_MONTH_CACHE_SIZE = 24
+COMPLIANCE_REMINDER_LOOKBACK_DAYS = 366
+
+# 核查证据包：压缩分块大小（各块在线程池中独立 deflate）、压缩级别，
+# 以及本身已压缩、直接存储不再压缩的文件后缀
+EVIDENCE_BLOCK_SIZE = 1024 * 1024
+EVIDENCE_COMPRESS_LEVEL = 6
+EVIDENCE_STORED_SUFFIXES = (".zip", ".gz", ".7z", ".rar", ".jpg", ".jpeg", ".png", ".pdf", ".xlsx", ".docx", ".mp4")
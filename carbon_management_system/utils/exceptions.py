@@ -6,17 +6,84 @@
 # @Software: PyCharm / VSCode
 # @Description: 定义项目中自定义的异常类，用于更精确地处理特定错误情况。
 
-# Python 标准库导入
-import sys
-import os
+class CarbonManagementError(Exception):
+    """项目内所有自定义异常的基类。"""
 
-# PyQt5 相关导入 (根据实际需要调整)
-# from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel
-# from PyQt5.QtCore import Qt, pyqtSignal, QObject
 
-# 项目内部模块导入 (示例)
-# from ..core.base_controller import BaseController
-# from ...utils.logger_setup import logger
+class DataImportError(CarbonManagementError):
+    """数据导入失败（文件格式错误、缺少必需列、用户取消等）。"""
 
+    def __init__(self, message, source=None, line_no=None):
+        """
+        :param message: 错误描述
+        :param source: 出错的文件路径或数据源名称
+        :param line_no: 出错的行号（从 1 开始，含表头）
+        """
+        super().__init__(message)
+        self.source = source
+        self.line_no = line_no
 
-pass # 请在此处实现具体功能
+    def __str__(self):
+        location = ""
+        if self.source:
+            location = f" [{self.source}"
+            location += f":{self.line_no}]" if self.line_no else "]"
+        return f"{self.args[0]}{location}"
+
+
+class ImportCancelledError(DataImportError):
+    """用户在导入过程中主动取消。"""
+
+
+class DocumentStoreError(CarbonManagementError):
+    """支撑文档存储读写失败或内容校验不一致。"""
+
+
+class FormulaError(CarbonManagementError):
+    """核算公式解析、校验或求值失败。"""
+
+    def __init__(self, message, formula_code=None):
+        super().__init__(message)
+        self.formula_code = formula_code
+
+    def __str__(self):
+        return f"{self.args[0]} [{self.formula_code}]" if self.formula_code else self.args[0]
+
+
+class CalculationCancelledError(CarbonManagementError):
+    """用户取消了正在进行的核算任务。"""
+
+
+class ReportGenerationError(CarbonManagementError):
+    """报告模板解析或报告生成失败。"""
+
+    def __init__(self, message, template=None):
+        super().__init__(message)
+        self.template = template
+
+    def __str__(self):
+        return f"{self.args[0]} [{self.template}]" if self.template else self.args[0]
+
+
+class ReportCancelledError(ReportGenerationError):
+    """用户在报告生成过程中主动取消。"""
+
+
+class VersionStoreError(CarbonManagementError):
+    """版本库读写失败、版本不存在或还原内容校验不一致。"""
+
+
+class ComplianceScheduleError(CarbonManagementError):
+    """合规义务的重复规则无效、义务不存在或日程文件读写失败。"""
+
+
+class VerificationSupportError(CarbonManagementError):
+    """第三方核查支持：不符合项登记无效或读写失败。"""
+
+
+class EvidenceExportError(VerificationSupportError):
+    """核查证据包导出失败。"""
+
+
+class EvidenceExportCancelledError(EvidenceExportError):
+    """用户在证据包导出过程中主动取消。"""
@@ -6,17 +6,23 @@
 # @Software: PyCharm / VSCode
 # @Description: 包含项目中通用的辅助函数，如日期时间处理、文件操作、数据格式化等。
 
-# Python 标准库导入
-import sys
-import os
+def format_duration(seconds):
+    """把秒数格式化为 "1时02分03秒" / "02分03秒" 形式；None 表示未知。"""
+    if seconds is None:
+        return "--"
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}时{minutes:02d}分{secs:02d}秒"
+    return f"{minutes:02d}分{secs:02d}秒"
 
-# PyQt5 相关导入 (根据实际需要调整)
-# from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel
-# from PyQt5.QtCore import Qt, pyqtSignal, QObject
 
-# 项目内部模块导入 (示例)
-# from ..core.base_controller import BaseController
-# from ...utils.logger_setup import logger
-
-
-pass # 请在此处实现具体功能
+def format_bytes(size):
+    """把字节数格式化为人类可读的 KB/MB/GB 字符串。"""
+    size = float(size)
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"